@@ -0,0 +1,51 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     AnalyzeGlyphs.py
+#
+#     Find the stems and bars of all glyphs of a font, testing black and white
+#     on the coverage bitmaps of the glyphs, which are rasterized once at
+#     UNITS_PER_PIXEL. First in one process, then in a pool of forked processes
+#     by FontAnalyzer.analyzeGlyphs. Each run opens a new font, so the findings
+#     of the previous run are not reused. Then report the glyphs per second.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.fonttoolbox.objects.font import Font
+from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+
+FONT_NAME = 'Roboto-Regular'
+UNITS_PER_PIXEL = 4
+GLYPHS = 500 # Number of glyphs to analyze, None for all glyphs of the font.
+
+def analyze(fontPath, processes, glyphs=None):
+    u"""Answer the findings of the glyphs of a new font, analyzed by the number of processes,
+    or sequentially if processes is None."""
+    font = Font(fontPath)
+    font.analyzer.unitsPerPixel = UNITS_PER_PIXEL
+    glyphNames = font.ttFont.getGlyphOrder()[:glyphs]
+    return font.analyzer.analyzeGlyphs(glyphNames, processes=processes)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        FONT_NAME = sys.argv[1]
+    fontPath = getFontPathOfFont(FONT_NAME)
+    analyze(fontPath, None, 10) # Import the modules, before measuring.
+    for label, processes in (('1 process', None), ('Pool of all cores', 0)):
+        t = time()
+        findings = analyze(fontPath, processes, GLYPHS)
+        duration = time() - t
+        print('%s: %d glyphs in %0.2f sec: %0.1f glyphs/sec' % (label, len(findings), duration, len(findings) / duration))
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     CascadingCss.py
+#
+#     Build a deep element tree and count the number of css() calls and
+#     ancestor hops, with the original uncached parent walk and with the
+#     cached cascading values of Element.css().
+#
+from __future__ import print_function
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements.element import Element, NOTFOUND
+
+DEPTH = 40 # Depth of the element tree.
+WIDTH = 5 # Number of leaf elements at every level.
+ROUNDS = 10 # Number of times that all style keys are queried, e.g. by build and conditions.
+KEYS = ('font', 'fontSize', 'leading', 'rLeading', 'tracking', 'fill', 'stroke', 'strokeWidth',
+    'xAlign', 'yAlign', 'baselineGrid', 'hyphenation', 'language', 'textFill', 'notDefined')
+
+def makeTree(depth, width):
+    u"""Answer the document and the list of all elements in a tree of depth levels,
+    where every level has width leaf elements and one element to continue the tree."""
+    doc = Document(w=500, h=500, autoPages=1)
+    parent = doc[1]
+    parent.style['fontSize'] = 12 # Some values on the way down.
+    elements = []
+    for level in range(depth):
+        for n in range(width):
+            elements.append(Element(parent=parent, name='Leaf%d-%d' % (level, n)))
+        parent = Element(parent=parent, name='Level%d' % level)
+        if level % 10 == 0:
+            parent.style['leading'] = level
+        elements.append(parent)
+    return doc, elements
+
+class Counter(object):
+    calls = 0
+    hops = 0
+
+def uncachedCss(e, name, default=None):
+    u"""The original Element.css(), walking the parent tree for every call."""
+    Counter.calls += 1
+    while True:
+        style = e.style if hasattr(e, 'style') else e.rootStyle
+        if name in style and style[name] is not None:
+            return style[name]
+        if e.parent is None:
+            return style.get(name, default) if e is e.doc else default
+        Counter.hops += 1
+        e = e.parent
+
+def run(elements, css):
+    t = time()
+    for _ in range(ROUNDS):
+        for e in elements:
+            for key in KEYS:
+                css(e, key)
+    return time() - t
+
+def benchmark():
+    doc, elements = makeTree(DEPTH, WIDTH)
+
+    Counter.calls = Counter.hops = 0
+    duration = run(elements, uncachedCss)
+    print('Uncached: %d css() calls, %d ancestor hops, %0.3f sec' % (Counter.calls, Counter.hops, duration))
+
+    # Count the calls of the cached Element.css(), where parent.css(name, NOTFOUND) is a hop.
+    css = Element.css
+    def countingCss(e, name, default=None):
+        if default is NOTFOUND:
+            Counter.hops += 1
+        else:
+            Counter.calls += 1
+        return css(e, name, default)
+    Element.css = countingCss
+    try:
+        Counter.calls = Counter.hops = 0
+        duration = run(elements, lambda e, key: e.css(key))
+        print('Cached:   %d css() calls, %d ancestor hops, %0.3f sec' % (Counter.calls, Counter.hops, duration))
+        # Change a style value high in the tree and query again. Only the subtree is invalidated.
+        elements[WIDTH].style['fontSize'] = 14
+        Counter.calls = Counter.hops = 0
+        duration = run(elements, lambda e, key: e.css(key))
+        print('After style change: %d css() calls, %d ancestor hops, %0.3f sec' % (Counter.calls, Counter.hops, duration))
+    finally:
+        Element.css = css
+
+if __name__ == '__main__':
+    benchmark()
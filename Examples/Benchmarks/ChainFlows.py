@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ChainFlows.py
+#
+#     Chain many text boxes by their nextElement names, on one page and across
+#     pages, and follow the chains the way the overflow of text does, finding
+#     the next box by name. Then find elements by name and remove the boxes.
+#     Elements on the pages of a document are found through its element index,
+#     so the time per step should not grow with the number of boxes.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements.element import Element
+from pagebot.elements.pbtextbox import TextBox
+
+BOXES = 1000
+
+def makeDocument(boxes):
+    u"""Answer a document with a chain of boxes on page 1, and a chain of boxes across the
+    other pages, named "Flow" on every page, each page with some other elements."""
+    doc = Document(name='ChainFlows', w=500, h=500, autoPages=boxes + 1)
+    page = doc[1]
+    for n in range(boxes): # All boxes on the first page, each one pointing to the next.
+        group = Element(name='Group%d' % n, parent=page)
+        TextBox(name='Box%d' % n, nextElement='Box%d' % (n + 1), parent=group, w=100, h=100)
+    for pn in range(2, boxes + 2): # Boxes with the same name on the other pages.
+        page = doc[pn]
+        for n in range(10):
+            Element(name='Deco%d' % n, parent=page)
+        TextBox(name='Flow', nextElement='Flow', nextPage=pn + 1, parent=page, w=100, h=100)
+    return doc
+
+def followChains(doc):
+    u"""Follow the chain on page 1 and the chain across pages, finding the next box by name,
+    as TextBox.overflow2Next does. Answer the number of steps and the duration."""
+    t = time()
+    steps = 0
+    page = doc[1]
+    tb = page.getElementByName('Box0')
+    while tb is not None:
+        tb = page.getElementByName(tb.nextElement)
+        steps += 1
+    page = doc[2]
+    tb = page.getElementByName('Flow')
+    while tb is not None and tb.nextPage in doc.pages:
+        page = doc.getPage(tb.nextPage)
+        tb = page.getElementByName(tb.nextElement)
+        steps += 1
+    return steps, time() - t
+
+def findAndRemove(doc, boxes):
+    u"""Find the boxes of page 1 by deepFind and by name, then remove them from their groups.
+    Answer the duration."""
+    t = time()
+    page = doc[1]
+    for n in range(boxes):
+        assert len(page.deepFind('Box%d' % n)) == 1
+    assert len(doc.findElements(name='Flow')) == boxes
+    for n in range(boxes):
+        tb = page.getElementByName('Box%d' % n)
+        tb.parent.removeElement(tb)
+    assert page.getElementByName('Box0') is None
+    return time() - t
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        BOXES = int(sys.argv[1])
+    t = time()
+    doc = makeDocument(BOXES)
+    print('Made %d boxes on one page and %d across pages in %0.2f sec' % (BOXES, BOXES, time() - t))
+    steps, duration = followChains(doc)
+    print('Followed %d flow steps in %0.2f sec: %0.1f steps/sec' % (steps, duration, steps / duration))
+    duration = findAndRemove(doc, BOXES)
+    print('Found and removed %d boxes in %0.2f sec' % (BOXES, duration))
@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ComposePages.py
+#
+#     Compose a galley of Filibuster articles through the two column flow of a
+#     template in the FlatContext. The Composer makes new pages from the template
+#     until all text is placed. Then report the number of pages per second.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.contexts.flatcontext import FlatContext
+from pagebot.contributions.filibuster.blurb import Blurb
+from pagebot.composer import Composer
+from pagebot.document import Document
+from pagebot.elements import newTemplate, newTextBox, newGalley
+
+PAGES = 200 # Approximate number of pages to compose.
+W, H = 595, 842 # Size of the pages.
+PADDING = 50
+GUTTER = 20
+STYLE = dict(fontSize=10, leading=13, hyphenation=True, language='en')
+CHARS_PER_PAGE = 5800 # Estimated number of characters that fit on a page.
+
+def makeTemplate():
+    u"""Answer the template with a flow of two columns."""
+    template = newTemplate(name='Flow', w=W, h=H)
+    cw = (W - 2 * PADDING - GUTTER) / 2
+    ch = H - 2 * PADDING
+    newTextBox('', name='Column1', nextElement='Column2', x=PADDING, y=PADDING,
+        w=cw, h=ch, parent=template)
+    newTextBox('', name='Column2', nextElement='Column1', x=PADDING + cw + GUTTER, y=PADDING,
+        w=cw, h=ch, parent=template)
+    return template
+
+def makeGalley(context, pages):
+    u"""Answer a galley with the Filibuster articles for about the given number of pages."""
+    blurb = Blurb()
+    articles = []
+    length = 0
+    while length < pages * CHARS_PER_PAGE:
+        article = blurb.getBlurb('article', noTags=True)
+        articles.append(article)
+        length += len(article)
+    galley = newGalley()
+    galley.append(context.newString('\n'.join(articles), style=STYLE))
+    return galley
+
+def compose(context, galley):
+    u"""Compose the galley in a new document and answer the number of pages."""
+    doc = Document(w=W, h=H, autoPages=1, template=makeTemplate(), context=context)
+    Composer().compose(galley, doc)
+    return len(doc.pages)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    context = FlatContext()
+    galley = makeGalley(context, PAGES)
+    t = time()
+    pages = compose(context, galley)
+    duration = time() - t
+    print('Composed %d pages in %0.2f sec: %0.1f pages/sec' % (pages, duration, pages / duration))
@@ -0,0 +1,84 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ElementMemory.py
+#
+#     Make many small elements, as data driven catalogues do for table cells,
+#     bullets and glyph markers, and report the bytes of memory per element,
+#     measured by tracemalloc. Elements store their fixed fields in slots, and
+#     make their child list, report and time marks only when they are used.
+#     The time to construct the elements alone is reported too, as the initial
+#     style values are set without stamping the style for each of them.
+#     Both are compared with the figures of the tree before slots and style
+#     stamps, in BASELINE, measured on the same machine.
+#
+from __future__ import print_function
+import sys
+import tracemalloc
+from time import time
+
+from pagebot.elements.element import Element
+from pagebot.elements.pbrect import Rect
+
+ELEMENTS = 100000
+
+# Key is label, value is (seconds to construct ELEMENTS elements, bytes per element)
+# for the tree before slots and style stamps.
+BASELINE = {
+    'Element': (1.94, 3165),
+    'Rect with fill': (2.16, 3165),
+}
+
+def makeElements(makeElement, count):
+    u"""Answer a parent element with count elements, made by makeElement(n)."""
+    parent = Element(w=1000, h=1000)
+    for n in range(count):
+        parent.appendElement(makeElement(n))
+    return parent
+
+def construct(makeElement, count):
+    u"""Answer the best duration of 3 times constructing count elements, without a parent."""
+    durations = []
+    for _ in range(3):
+        t = time()
+        for n in range(count):
+            makeElement(n)
+        durations.append(time() - t)
+    return min(durations)
+
+def measure(makeElement, count):
+    u"""Answer the tuple of the bytes per element and the duration of making count elements.
+    The duration is measured without tracing the memory, which slows down a lot."""
+    t = time()
+    makeElements(makeElement, count)
+    duration = time() - t
+    tracemalloc.start()
+    parent = makeElements(makeElement, count)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size / count, duration
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        ELEMENTS = int(sys.argv[1])
+    for label, makeElement in (
+            ('Element', lambda n: Element(x=n % 100, y=n // 100, w=10, h=10)),
+            ('Rect with fill', lambda n: Rect(x=n % 100, y=n // 100, w=10, h=10, fill=(1, 0, 0))),
+        ):
+        perElement, duration = measure(makeElement, ELEMENTS)
+        print('%s: %d elements in %0.2f sec, %d bytes per element' % (label, ELEMENTS, duration, perElement))
+        baselineDuration, baselinePerElement = BASELINE[label]
+        duration = construct(makeElement, ELEMENTS)
+        print('    constructed in %0.2f sec, baseline %0.2f sec' % (duration, baselineDuration * ELEMENTS / 100000))
+        print('    %d bytes per element, baseline %d bytes' % (perElement, baselinePerElement))
@@ -0,0 +1,74 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ExportSite.py
+#
+#     Export a site of text pages with the SiteView, first as full build, then
+#     incremental without changes, then incremental after changing one page.
+#     Show the time and the number of written and skipped files of each build.
+#     Then compare the time of building the HTML of the pages one by one with
+#     building it by a pool of forked processes, which must answer the same.
+#
+from __future__ import print_function
+import shutil
+import sys
+import tempfile
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import newTextBox
+
+PAGES = 1000
+
+def makeDocument(pages):
+    u"""Answer a document for the SiteView with a text box on each page."""
+    doc = Document(name='ExportSite', viewId='Site', w=800, h=600, autoPages=pages)
+    for pn in range(1, pages + 1):
+        page = doc[pn]
+        page.name = 'page%04d' % pn
+        newTextBox(doc.view.context.newString('Text of page %d' % pn), parent=page, w=400)
+    return doc
+
+def export(doc, path, label):
+    u"""Build the site of doc in path and show the time and the counts of the export."""
+    t = time()
+    doc.build(path)
+    print('%s: %0.2f sec, %s' % (label, time() - t, doc.view.lastExport))
+
+def buildHtml(doc, processes, label):
+    u"""Build the HTML of all pages of doc by the number of processes and show the time.
+    Answer the list of (html, cssFragments) of the pages."""
+    view = doc.view
+    pages = view.getSitePages()
+    t = time()
+    result = view.buildPagesHtml(pages, processes)
+    print('%s: %0.2f sec' % (label, time() - t))
+    return result
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    path = tempfile.mkdtemp()
+    try:
+        doc = makeDocument(PAGES)
+        export(doc, path, 'Full build')
+        doc.view.incremental = True
+        export(doc, path, 'Incremental, no changes')
+        doc[1].elements[0].bs = doc.view.context.newString('Changed text')
+        export(doc, path, 'Incremental, one page changed')
+        serial = buildHtml(doc, None, 'HTML one by one')
+        parallel = buildHtml(doc, 0, 'HTML by pool of all cores')
+        assert serial == parallel
+    finally:
+        shutil.rmtree(path)
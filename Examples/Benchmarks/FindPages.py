@@ -0,0 +1,66 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     FindPages.py
+#
+#     Append pages to a document, then find pages by name and by eId, and ask
+#     the page number and the next page of pages. The document keeps its pages
+#     in a PageIndex, so the time per page and per query should not grow with
+#     the number of pages. Report the appends and queries per second.
+#
+from __future__ import print_function
+import random
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements.pbpage import Page
+
+PAGES = 20000
+QUERIES = 100000
+
+def appendPages(doc, pages):
+    u"""Append the list of pages to doc. Answer the duration."""
+    t = time()
+    for page in pages:
+        doc.appendPage(page)
+    return time() - t
+
+def findPages(doc, pages, queries):
+    u"""Find random pages of doc by name, by eId, by page number and as next page, in turns.
+    Answer the duration."""
+    random.seed(queries)
+    selection = [random.choice(pages) for _ in range(queries)]
+    t = time()
+    for n, page in enumerate(selection):
+        kind = n % 4
+        if kind == 0:
+            assert doc.findPages(name=page.name) == [page]
+        elif kind == 1:
+            assert doc.findPages(eId=page.eId) == [page]
+        elif kind == 2:
+            assert doc.getPageNumber(page)
+        else:
+            doc.nextPage(page, makeNew=False)
+    return time() - t
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    doc = Document(name='FindPages', w=500, h=500, autoPages=0)
+    pages = [Page(name='Page%05d' % n, w=500, h=500) for n in range(PAGES)]
+    duration = appendPages(doc, pages)
+    print('Appended %d pages in %0.2f sec: %0.1f pages/sec' % (PAGES, duration, PAGES / duration))
+    duration = findPages(doc, pages, QUERIES)
+    print('%d queries in %0.2f sec: %0.1f queries/sec' % (QUERIES, duration, QUERIES / duration))
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     FlatTextFlow.py
+#
+#     Flow the text of a book through the text boxes of its pages in the
+#     FlatContext. Each page answers the overflow of its text box, which is the
+#     text of the next page, until all text is placed. Then flow the same text
+#     again, to show the effect of the cached word widths and line breaks.
+#
+from __future__ import print_function
+import sys
+from random import seed, choice, randint
+from time import time
+
+from pagebot.contexts.flatcontext import FlatContext
+
+PAGES = 500 # Approximate number of pages of the book.
+W, H = 360, 560 # Size of the text box on each page.
+STYLE = dict(fontSize=10, leading=13, hyphenation=True, language='en')
+WORDS = ('the', 'apartment', 'building', 'offers', 'housing', 'for', 'many', 'people',
+    'typography', 'is', 'a', 'discipline', 'of', 'composition', 'and', 'reading', 'in',
+    'publishing', 'with', 'automated', 'layouts', 'scripting', 'conditions', 'elements')
+
+def makeText(pages):
+    u"""Answer the text of a book with about the given number of pages."""
+    seed(pages)
+    paragraphs = []
+    for n in range(pages * 6):
+        paragraphs.append(' '.join([choice(WORDS) for _ in range(randint(40, 90))]) + '.')
+    return '\n'.join(paragraphs)
+
+def flow(context, text):
+    u"""Answer the number of pages needed to place all text."""
+    bs = context.newString(text, style=STYLE)
+    pages = 0
+    while bs:
+        pages += 1
+        bs = bs.textOverflow(W, H)
+    return pages
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    context = FlatContext()
+    text = makeText(PAGES)
+    for label in ('first flow', 'cached flow'):
+        t = time()
+        pages = flow(context, text)
+        print('%s: %d pages in %0.2f sec' % (label, pages, time() - t))
@@ -0,0 +1,59 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     FloatElements.py
+#
+#     Place a large number of floating elements on one page and solve their
+#     Float2Top/Float2Left conditions, with and without the spatial index
+#     of the page. Without the index every float query scans all previous
+#     siblings, so the scan is only timed for a smaller number of elements.
+#
+from __future__ import print_function
+import sys
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import newRect
+from pagebot.conditions import Float2Top, Float2Left
+
+ELEMENTS = 5000 # Number of floating elements on the page.
+SCAN_ELEMENTS = 500 # Number of elements to compare with the scan of all siblings.
+
+def makePage(count, useIndex):
+    u"""Answer the document with a single page of count random sized rectangles,
+    floating to top-left."""
+    seed(count) # Same random sizes for both modes.
+    doc = Document(w=2000, h=40000, originTop=True, autoPages=1)
+    page = doc[1]
+    page.spatialIndex = useIndex
+    for n in range(count):
+        newRect(parent=page, w=randint(10, 100), h=randint(10, 100), 
+            conditions=[Float2Top(), Float2Left()])
+    return doc
+
+def solve(count, useIndex):
+    doc = makePage(count, useIndex)
+    t = time()
+    score = doc.solve()
+    duration = time() - t
+    print('%d elements, %s: %0.2f sec (%s)' % (count, {True: 'spatial index', False: 'scan siblings'}[useIndex], duration, score))
+    return [e.xy for e in doc[1].elements]
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        ELEMENTS = int(sys.argv[1])
+    # Check that both modes place the elements at the same positions.
+    assert solve(SCAN_ELEMENTS, False) == solve(SCAN_ELEMENTS, True)
+    solve(ELEMENTS, True)
@@ -0,0 +1,61 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ImportTime.py
+#
+#     Show the time of importing the main PageBot modules in new processes, as
+#     short-lived scripts pay it on every run, compared to their budgets.
+#     The element, view and context classes are imported on first use, so the
+#     time of making a FlatContext and a TextBox is shown too. Exit with 1 if a
+#     module is over budget. Needs Python 3.7+ for python -X importtime.
+#
+from __future__ import print_function
+import sys
+
+from pagebot import getImportTime
+
+# Maximum time in seconds to import these modules, with their bytecode cached. The element, view
+# and context classes are imported on first use, so short-lived scripts only pay for what they use.
+IMPORT_BUDGETS = {
+    'pagebot': 0.03,
+    'pagebot.elements': 0.05,
+    'pagebot.document': 0.1,
+    'pagebot.contributions.filibuster.blurb': 0.1,
+}
+
+MODULES = (
+    'pagebot',
+    'pagebot.elements',
+    'pagebot.document',
+    'pagebot.contributions.filibuster.blurb',
+    'pagebot.contexts.flatcontext', # Imports Flat, when a script uses it.
+    'pagebot.elements.pbtextbox',
+)
+
+if __name__ == '__main__':
+    overBudget = 0
+    for moduleName in MODULES:
+        duration = getImportTime(moduleName)
+        if duration is None:
+            sys.exit('Import times need Python 3.7+')
+        budget = IMPORT_BUDGETS.get(moduleName)
+        if budget is None:
+            print('%s: %0.1f ms' % (moduleName, duration * 1000))
+        else:
+            status = 'OK'
+            if duration > budget:
+                status = 'OVER BUDGET'
+                overBudget += 1
+            print('%s: %0.1f ms (budget %0.1f ms) %s' % (moduleName, duration * 1000, budget * 1000, status))
+    sys.exit(overBudget and 1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     IncrementalSolve.py
+#
+#     Make a document with many pages of floating elements, change a single
+#     element on one page and solve again. The full doc.solve() runs all
+#     conditions of all pages, the incremental solve only the conditions of
+#     the elements that depend on the change.
+#
+from __future__ import print_function
+import sys
+from random import seed, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import newRect
+from pagebot.conditions import Float2Top, Float2Left
+
+PAGES = 400 # Number of pages in the document.
+ELEMENTS = 12 # Number of floating elements on each page.
+EDITS = 5 # Number of edits, each followed by a solve.
+
+def makeDocument(pages, elements):
+    u"""Answer a document with pages of random sized rectangles, floating to top-left."""
+    seed(pages) # Same random sizes for both modes.
+    doc = Document(w=500, h=800, originTop=False, padding=0, autoPages=pages)
+    for pn in range(1, pages+1):
+        page = doc[pn]
+        for n in range(elements):
+            newRect(parent=page, w=randint(50, 200), h=randint(20, 60),
+                conditions=[Float2Top(), Float2Left()])
+    return doc
+
+def solve(incremental):
+    doc = makeDocument(PAGES, ELEMENTS)
+    doc.solve(incremental=incremental) # Initial solve of all pages.
+    t = time()
+    for n in range(EDITS):
+        e = doc[3].elements[n] # Change an element on page 3
+        e.w += 10
+        score = doc.solve(incremental=incremental)
+    duration = time() - t
+    print('%d pages, %d edits, %s: %0.2f sec %s' % (PAGES, EDITS,
+        {True: 'incremental', False: 'full solve'}[incremental], duration, score.report or ''))
+    return [[e.xy for e in doc[pn].elements] for pn in range(1, PAGES+1)]
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    # Check that both modes place the elements at the same positions.
+    assert solve(False) == solve(True)
@@ -0,0 +1,56 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     ParallelExport.py
+#
+#     Export a catalogue of pages as separate PNG files, first by drawing all
+#     pages in the single context of the view, then by a pool of processes
+#     that draw the pages in their own context.
+#
+from __future__ import print_function
+import sys
+from multiprocessing import cpu_count
+from random import seed, random, randint
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import newRect, newOval
+
+PAGES = 64 # Number of pages in the catalogue.
+ELEMENTS = 200 # Number of elements on each page.
+EXPORT_PATH = '_export/ParallelExport%s.png'
+
+def makeDocument(pages, elements):
+    u"""Answer a document with pages of random rectangles and ovals."""
+    seed(pages)
+    doc = Document(w=595, h=842, originTop=False, autoPages=pages)
+    for pn in range(1, pages+1):
+        page = doc[pn]
+        for n in range(elements):
+            newElement = (newRect, newOval)[n % 2]
+            newElement(parent=page, x=randint(0, 500), y=randint(0, 750), w=randint(10, 100),
+                h=randint(10, 100), fill=(random(), random(), random()))
+    return doc
+
+def export(doc, processes):
+    t = time()
+    doc.export(EXPORT_PATH % {None: 'Single', 0: 'Pool'}[processes], processes=processes)
+    return time() - t
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    doc = makeDocument(PAGES, ELEMENTS)
+    print('%d pages, single context: %0.2f sec' % (PAGES, export(doc, None)))
+    print('%d pages, pool of %d processes: %0.2f sec' % (PAGES, cpu_count(), export(doc, 0)))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     TemplatePages.py
+#
+#     Make a book of pages from a template with many elements. The elements of
+#     the template are copied on every page, sharing their style items with the
+#     template until a page changes them. Report the time and the memory of
+#     making the pages, then the time of solving their conditions and changing
+#     an element on every page.
+#
+from __future__ import print_function
+import sys
+import tracemalloc
+from time import time
+
+from pagebot.conditions import Left2Left, Top2Top
+from pagebot.document import Document
+from pagebot.elements import newTemplate, newRect, newTextBox
+
+PAGES = 500
+ELEMENTS = 40 # Number of elements in the template.
+W, H = 595, 842
+
+def makeTemplate(elements):
+    u"""Answer a template with a grid of rectangles and text boxes, some with conditions."""
+    template = newTemplate(name='Catalogue', w=W, h=H)
+    for n in range(elements):
+        x, y = 50 + (n % 5) * 100, 50 + (n // 5) * 90
+        if n % 2:
+            newRect(x=x, y=y, w=90, h=80, fill=(n / elements, 0.5, 0.2), stroke=0, parent=template)
+        else:
+            newTextBox('', name='Text%d' % n, x=x, y=y, w=90, h=80, fontSize=9, parent=template,
+                conditions=[Left2Left(), Top2Top()] if n == 0 else None)
+    return template
+
+def makeBook(template, pages):
+    u"""Answer a new document with the pages made from template."""
+    return Document(w=W, h=H, autoPages=pages, template=template)
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    template = makeTemplate(ELEMENTS)
+    makeBook(template, 2) # Import and initialize, before measuring.
+    tracemalloc.start()
+    t = time()
+    doc = makeBook(template, PAGES)
+    duration = time() - t
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print('%d pages of %d elements: %0.2f sec, %0.1f MB' % (PAGES, ELEMENTS, duration, size / 1000000.0))
+    t = time()
+    score = doc.solve()
+    print('Solve: %0.2f sec (%s)' % (time() - t, score))
+    t = time()
+    for pn in range(1, PAGES + 1):
+        doc[pn].elements[1].fill = (0, 0, 1)
+    print('Change an element on every page: %0.2f sec' % (time() - t))
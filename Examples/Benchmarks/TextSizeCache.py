@@ -0,0 +1,55 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     TextSizeCache.py
+#
+#     Solve the float conditions of many text boxes with elastic height. Every
+#     read of tb.h measures the text, which is answered by the measured sizes
+#     that are cached in the strings and in context.textSizeCache.
+#     The hit/miss counters show how many measurements were avoided.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements import newTextBox
+from pagebot.conditions import Float2Top, Float2Left
+
+PAGES = 20 # Number of pages in the document.
+TEXTBOXES = 40 # Number of text boxes on each page.
+WORDS = ('Lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit')
+
+def makeDocument(pages, textBoxes):
+    u"""Answer a document with pages of elastic text boxes, floating to top-left."""
+    doc = Document(w=595, h=842, originTop=False, autoPages=pages)
+    context = doc.view.context
+    for pn in range(1, pages+1):
+        page = doc[pn]
+        for n in range(textBoxes):
+            s = ' '.join(WORDS[:n % len(WORDS) + 1])
+            bs = context.newString(s, style=dict(fontSize=10 + n % 4))
+            newTextBox(bs, parent=page, w=100 + 20 * (n % 3), h=None,
+                conditions=[Float2Top(), Float2Left()])
+    return doc
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        PAGES = int(sys.argv[1])
+    doc = makeDocument(PAGES, TEXTBOXES)
+    cache = doc.view.context.textSizeCache
+    cache.clear()
+    t = time()
+    doc.solve()
+    print('%d text boxes: %0.2f sec, %s' % (PAGES * TEXTBOXES, time() - t, cache))
@@ -0,0 +1,70 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     TouchGlyphs.py
+#
+#     Touch every glyph of a font, as type specimens do, by asking its bounding
+#     box, which is calculated from the array-backed glyph outline. Then do the
+#     same, also asking the path and the APoint wrappers of glyph.points, which
+#     are only made on request. Before, all glyphs made both to answer their
+#     bounding box. Time and allocated memory are shown for each.
+#
+from __future__ import print_function
+import sys
+import tracemalloc
+from time import time
+
+from pagebot.fonttoolbox.objects.font import Font
+from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+
+FONT_NAME = 'Roboto-Regular'
+
+def openFont(fontPath):
+    u"""Answer a new Font, with the glyf data of all glyphs decompiled, so only the glyphs are measured."""
+    font = Font(fontPath)
+    glyf = font.ttFont['glyf']
+    for glyphName in font.ttFont.getGlyphOrder():
+        glyf[glyphName]
+    return font
+
+def touch(font, path=False, points=False):
+    u"""Answer the glyphs of the font, after asking their bounds and optionally their path and points."""
+    glyphs = []
+    for glyphName in font.ttFont.getGlyphOrder():
+        glyph = font[glyphName]
+        glyph.boundingBox
+        if path:
+            glyph.path
+        if points:
+            glyph.points4
+        glyphs.append(glyph)
+    return glyphs
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        FONT_NAME = sys.argv[1]
+    fontPath = getFontPathOfFont(FONT_NAME)
+    touch(openFont(fontPath)) # Import the modules of the context, before measuring.
+    for label, kwargs in (('bounds', {}), ('bounds and path', dict(path=True)),
+            ('bounds, path and points', dict(path=True, points=True))):
+        font = openFont(fontPath)
+        t = time()
+        glyphs = touch(font, **kwargs)
+        duration = time() - t
+        font = openFont(fontPath)
+        tracemalloc.start() # Measure memory in a separate run, as tracing takes time.
+        touch(font, **kwargs)
+        memory = tracemalloc.get_traced_memory()[0]
+        tracemalloc.stop()
+        print('%s of %d glyphs: %0.2f sec, %0.1f MB' % (label, len(glyphs), duration, memory / 1000000.0))
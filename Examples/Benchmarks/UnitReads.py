@@ -0,0 +1,76 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     UnitReads.py
+#
+#     Read the x, y, w and h of nested elements with plain numbers, pt, %, fr
+#     and em units, as conditions and building the frames do many times for
+#     each page. Then parse unit strings, as setting these values does. Relative
+#     units are resolved once and cached, until an ancestor changes.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.document import Document
+from pagebot.elements.element import Element
+
+READS = 1000000
+PARSES = 100000
+
+POSITIONS = (100, '100pt', '40%', '0.5fr', '4em')
+SIZES = (100, 200, '40%', '0.5fr', '4em') # Absolute units don't resolve relative children yet.
+
+def makeElements(doc):
+    u"""Answer a list of elements on the first page of doc, three levels deep, with their
+    position and size in the different units."""
+    elements = []
+    parent = doc[1]
+    for level in range(3):
+        for position, size in zip(POSITIONS, SIZES):
+            e = Element(x=position, y=position, w=size, h=size, fontSize=12, parent=parent)
+            elements.append(e)
+        parent = e
+    return elements
+
+def readValues(elements, reads):
+    u"""Read x, y, w and h of the elements in turns, reads times. Answer the duration."""
+    t = time()
+    count = 0
+    while count < reads:
+        for e in elements:
+            e.x
+            e.y
+            e.w
+            e.h
+        count += 4 * len(elements)
+    return time() - t
+
+def parseValues(elements, parses):
+    u"""Set the width of the elements to unit strings, parses times. Answer the duration."""
+    values = ['%dpt' % (n % 500) for n in range(100)] + ['%d%%' % n for n in range(100)]
+    t = time()
+    for n in range(parses):
+        elements[n % len(elements)].w = values[n % len(values)]
+    return time() - t
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        READS = int(sys.argv[1])
+    doc = Document(name='UnitReads', w=800, h=600, autoPages=1)
+    elements = makeElements(doc)
+    duration = readValues(elements, READS)
+    print('%d reads in %0.2f sec: %0.1f reads/sec' % (READS, duration, READS / duration))
+    duration = parseValues(elements, PARSES)
+    print('%d unit strings set in %0.2f sec: %0.1f per sec' % (PARSES, duration, PARSES / duration))
@@ -0,0 +1,52 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#
+#     P A G E B O T
+#
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     VariableFontInstances.py
+#
+#     Calculate the instances of a Variable Font for the frames of a weight
+#     animation. Measuring a string only needs the glyphs of the string, while
+#     complete instance fonts are kept in memory for repeated locations.
+#
+from __future__ import print_function
+import sys
+from time import time
+
+from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+from pagebot.fonttoolbox.variablefontinstancer import VariableFontInstancer
+
+FRAMES = 100 # Number of frames of the animation.
+S = 'Variable Fonts'
+
+def getLocations(frames):
+    u"""Answer the list of weight locations for the frames, going up and down again."""
+    return [dict(wght=100 + 800 * (1 - abs(frames - 2 * n) / float(frames))) for n in range(frames)]
+
+def measure(instancer, locations):
+    u"""Answer the list of string widths in all locations."""
+    return [instancer.getStringWidth(S, location) for location in locations]
+
+def instance(instancer, locations):
+    u"""Answer the list of instance fonts of all locations."""
+    return [instancer.getInstance(location) for location in locations]
+
+if __name__ == '__main__':
+    if len(sys.argv) > 1:
+        FRAMES = int(sys.argv[1])
+    locations = getLocations(FRAMES)
+    instancer = VariableFontInstancer(getFontPathOfFont('RobotoDelta-VF'))
+    for label, f in (('measure string', measure), ('measure string again', measure),
+            ('instance fonts', instance), ('instance fonts again', instance)):
+        t = time()
+        f(instancer, locations)
+        print('%s in %d locations: %0.2f sec' % (label, len(locations), time() - t))
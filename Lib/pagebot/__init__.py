@@ -19,10 +19,13 @@ __doc__ = """PageBot module"""
 
 __version__ = '0.8-beta'
 
+import os
 import re
 
 ROOT_PATH = '/'.join(__file__.split('/')[:-1])
 RESOURCES_PATH = ROOT_PATH + '/resources'
+CACHE_PATH = os.path.expanduser('~') + '/.pagebot' # Compiled resources and indices, shared by all processes.
+CACHE_PATH_VARIABLE = 'PAGEBOT_CACHE_PATH' # Environment variable to use another cache folder.
 
 def getRootPath():
     u"""Answer the root path on the platform for the PageBot module."""
@@ -32,6 +35,77 @@ def getResourcesPath():
     u"""Answer the root path on the platform for the PageBot module."""
     return RESOURCES_PATH
 
+def getCachePath():
+    u"""Answer the path of the folder where PageBot keeps compiled resources and indices. This is
+    the folder in the PAGEBOT_CACHE_PATH environment variable, or otherwise ~/.pagebot
+    The folder is created if it does not exist. If it cannot be created or written, e.g. when the
+    home folder is read-only, then answer the temporary folder of getTempCachePath().
+
+    >>> import tempfile
+    >>> saved = os.environ.get(CACHE_PATH_VARIABLE)
+    >>> os.environ[CACHE_PATH_VARIABLE] = path = tempfile.mkdtemp() + '/cache'
+    >>> getCachePath() == path, os.path.isdir(path)
+    (True, True)
+    >>> os.environ[CACHE_PATH_VARIABLE] = os.devnull + '/cache' # Cannot be created.
+    >>> getCachePath() == getTempCachePath(), os.path.isdir(getCachePath())
+    (True, True)
+    >>> if saved is None: del os.environ[CACHE_PATH_VARIABLE]
+    ... else: os.environ[CACHE_PATH_VARIABLE] = saved
+    """
+    path = os.environ.get(CACHE_PATH_VARIABLE) or CACHE_PATH
+    try:
+        if not os.path.exists(path):
+            os.makedirs(path)
+        if os.access(path, os.W_OK):
+            return path
+    except OSError:
+        pass
+    return getTempCachePath()
+
+_tempCachePath = None
+
+def getTempCachePath():
+    u"""Answer the path of a temporary cache folder for this process, for when the cache folder
+    of getCachePath() cannot be used. The folder is created on the first call and removed
+    when the process exits."""
+    global _tempCachePath
+    if _tempCachePath is None:
+        import atexit, shutil, tempfile
+        _tempCachePath = tempfile.mkdtemp(prefix='pagebot')
+        atexit.register(shutil.rmtree, _tempCachePath, True)
+    return _tempCachePath
+
+def getImportTime(moduleName, runs=3):
+    u"""Answer the fastest time in seconds of importing moduleName in runs new Python processes,
+    as reported by python -X importtime, so the start of the interpreter is not included.
+    The bytecode is compiled in a temporary cache folder first. Answer None if the Python version
+    does not report import times (before 3.7). Examples/Benchmarks/ImportTime.py compares the
+    times with the budgets of the main modules.
+
+    >>> t = getImportTime('pagebot.toolbox.units', runs=1)
+    >>> t is None or t > 0
+    True
+    """
+    import shutil, subprocess, sys, tempfile
+    env = dict(os.environ)
+    env.pop('PYTHONDONTWRITEBYTECODE', None)
+    env['PYTHONPYCACHEPREFIX'] = cachePath = tempfile.mkdtemp()
+    env['PYTHONPATH'] = os.pathsep.join([os.path.dirname(ROOT_PATH)] + sys.path)
+    try:
+        times = []
+        for _ in range(runs + 1): # First run compiles the bytecode.
+            output = subprocess.check_output([sys.executable, '-X', 'importtime', '-c', 'import ' + moduleName],
+                stderr=subprocess.STDOUT, env=env).decode()
+            for line in output.splitlines():
+                columns = line.split('|')
+                if len(columns) == 3 and columns[2].strip() == moduleName:
+                    times.append(int(columns[1]) / 1000000.0) # Cumulative time in microseconds.
+        if len(times) <= 1:
+            return None
+        return min(times[1:])
+    finally:
+        shutil.rmtree(cachePath, ignore_errors=True)
+
 # In order to let PageBot scripts and/applications exchange information, without the need to save
 # data in files, the pbglobals module supports the storage of non-persistent information.
 # This way, applications with Vanilla windows can be used as UI for scripts that perform as batch process.
@@ -20,74 +20,220 @@ class Composer(object):
     page-flows that are copied from their templates.
     If necessary elements can be split, new elements can be made on the page and element can be
     reshaped byt width and height, if that results in better placements.
+
+    A flow is a sequence of text boxes, where tb.nextElement is the name of the next box. If the
+    next box is not on the same page (or it is already filled), then the flow continues on the page
+    named by tb.nextPage or otherwise on the next page of the document, which is made from the
+    document template if it does not exist and self.makeNewPage is True.
+
+    >>> from pagebot.contexts.flatcontext import FlatContext
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import newTemplate, newTextBox, newGalley
+    >>> template = newTemplate(name='Flow', w=300, h=400)
+    >>> tb = newTextBox('', name='Column1', nextElement='Column2', x=20, y=20, w=120, h=60, parent=template)
+    >>> tb = newTextBox('', name='Column2', nextElement='Column1', x=160, y=20, w=120, h=60, parent=template)
+    >>> context = FlatContext()
+    >>> doc = Document(w=300, h=400, autoPages=1, template=template, context=context)
+    >>> galley = newGalley()
+    >>> galley.append(context.newString('ABC ' * 100, style=dict(fontSize=12, leading=14)))
+    >>> composer = Composer()
+    >>> page, tb = composer.compose(galley, doc)
+    >>> len(doc.pages), page is doc[4], tb.name, len(tb.bs), tb.getOverflow().asText()
+    (4, True, 'Column1', 16, '')
     """
-    def __init__(self, validators=None, makeNewPage=False):
+    MAX_FLOW_BOXES = 1000 # Maximum number of boxes to pour one string into, as safety for circular flows.
+
+    def __init__(self, validators=None, makeNewPage=True, verbose=False):
         u"""The page, document includes
         the pages that already exist, and it defined the baseStyle for all other cascading styles.
         The style of all document pages and elements may contain conditions that define the weigh
-        value for the quality if their status."""
+        value for the quality if their status.
+        Problems during composition, e.g. text that does not fit in the flow, are added to
+        self.report and only printed if verbose is True."""
         self.makeNewPage = makeNewPage
+        self.verbose = verbose
+        self.report = []
 
-    def compose(self, galley, doc):
-        u"""Compose the galley element, starting with the flowId text box on page.
-        The composer negotiates between what the galley needs a sequential space
-        for its elements, and what the page has to offer.
-        If flowId is omitted, then let the page find the entry point for the first flow."""
-        #print(doc, galley)
-        pass
+    def _report(self, message):
+        self.report.append(message)
+        if self.verbose:
+            print(message)
 
-    def XXXcompose(self, galley, page, flowId=None):
+    def compose(self, galley, doc, page=None, flowId=None):
         u"""Compose the galley element, starting with the flowId text box on page.
         The composer negotiates between what the galley needs a sequential space
         for its elements, and what the page has to offer.
-        If flowId is omitted, then let the page find the entry point for the first flow."""
-        if flowId is None:
-            flows = page.getFlows()
-            assert flows # There must be at least one, otherwise error in template.
-            flowId, _ = sorted(flows.keys()) # Arbitrary which one, if there are multiple entries.
-        tb = page.getElementByName(flowId) # Find the seed flow box on the page, as derived from template.
-        assert tb is not None # Make sure, otherwise there is a template error.
-        fs = None
-        # Keeping overflow of text boxes here while iterating.
-        for element in galley.elements:
-            if not element.isText: # This is a non-text element. Try to find placement.
-                self.tryPlacement(page, tb, element)
+        If page is omitted, then start on the first page of the document.
+        If flowId is omitted, then let the page find the entry point for the first flow.
+        Consecutive text elements of the galley are joined, and poured through the flow boxes
+        as one string. The overflow split of each box is cached in the string, so text boxes and
+        conditions don't need to measure it again. Other elements are moved to the page of the
+        current flow box. The strings of the galley elements are not changed.
+        Answer the (page, tb) tuple of the last filled flow box, or None if there is no flow to
+        start with or the flow ended before the galley was composed. The reason is in self.report.
+
+        >>> from pagebot.document import Document
+        >>> from pagebot.elements import newGalley
+        >>> composer = Composer()
+        >>> doc = Document(w=300, h=400, autoPages=1)
+        >>> composer.compose(newGalley(), doc) is None, composer.report
+        (True, ['No flow text box found on page <Page:default (0, 0)>'])
+        """
+        if page is None:
+            page = doc.getFirstPage()
+        tb = self.getFlowStart(page, flowId)
+        if tb is None:
+            self._report('No flow text box found on page %s' % page)
+            return None
+        bs = None # Joined string of consecutive text elements, not poured yet.
+        for e in list(galley.elements): # Copy the list, as elements can move to pages.
+            if e.isTextBox:
+                if bs is None:
+                    bs = e.bs.copy() # Appending the next elements must not change e.bs
+                else:
+                    bs += e.bs
                 continue
-            if fs is None:
-                fs = element.fs
+            if bs is not None:
+                page, tb = self.pour(bs, doc, page, tb)
+                bs = None
+                if tb is None:
+                    return None
+            self.tryPlacement(page, tb, e)
+        if bs is not None:
+            page, tb = self.pour(bs, doc, page, tb)
+            if tb is None:
+                return None
+        return page, tb
+
+    def composeChapters(self, galleys, doc):
+        u"""Compose the galleys as they are answered by the galleys iterator, e.g. from the generator
+        Typesetter.typesetChapters, so only one chapter needs to be in memory at the same time.
+        Every chapter continues the flow where the previous one stopped. Answer the number of
+        composed galleys.
+
+        >>> composer = Composer()
+        >>> composer.composeChapters(iter([]), None)
+        0
+        """
+        count = 0
+        page = tb = None
+        for galley in galleys:
+            if tb is not None:
+                result = self.compose(galley, doc, page, tb.name)
             else:
-                fs += element.fs
-            # As long as where is text, try to fit into the boxes on the page.
-            # Otherwise go to the next page, following the flow, creating new pages if necessary.
-            for n in range(1000): # Safety here, "while fs:" seems to be a dangerous method.
-                if fs is None:
-                    break
-                overflow = tb.appendString(fs)
-                if fs == overflow:
-                    print(u'NOT ABLE TO PLACE %s' % overflow)
-                    break
-                fs = overflow
-                if fs: # Can be None or empty
-                    # Overflow in this text box, find new from (page, tbFlow)
-                    page, tb = page.getNextFlowBox(tb, self.makeNewPage)
-                    if tb is None: # In case here is overflow, but no next box defined in the flow.
-                        print('Overflow in text, but no next flow column defined. %s' % flowId)
-                        break
-                else:
-                    break
+                result = self.compose(galley, doc)
+            if result is not None:
+                page, tb = result
+            count += 1
+        return count
+
+    def pour(self, bs, doc, page, tb):
+        u"""Pour the string bs into the flow, starting with text box tb on page. If tb already
+        contains text, then bs is appended to a copy of it, as its string can be the cached overflow
+        of the previous box. Answer the (page, tb) of the last filled box, or (page, None) if the
+        flow ended before all text was placed. The remaining text is then noted in self.report.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> from pagebot.elements import newTextBox
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12, leading=14))
+        >>> overflow = bs.getTextOverflow(100, 30)
+        >>> tb = newTextBox(overflow, w=100, h=15)
+        >>> composer = Composer()
+        >>> page, tb = composer.pour(context.newString('DEF', style=dict(fontSize=12)), None, None, tb)
+        >>> tb, bs.getTextOverflow(100, 30) is overflow, overflow.asText()
+        (None, True, 'ABC ABC ABC ABC ')
+        >>> composer.report
+        ['Overflow in text, but no next flow box defined on page None: "ABC DEF"']
+
+        If the next flow box cannot take a single line, then pouring stops instead of making
+        new pages forever.
+
+        >>> from pagebot.document import Document
+        >>> from pagebot.elements import newTemplate
+        >>> template = newTemplate(name='Flow', w=300, h=400)
+        >>> tb = newTextBox('', name='Column', nextElement='Column', x=20, y=20, w=120, h=5, parent=template)
+        >>> doc = Document(w=300, h=400, autoPages=1, template=template, context=context)
+        >>> composer = Composer()
+        >>> page, tb = composer.pour(context.newString('ABC ' * 10, style=dict(fontSize=12)), doc, doc[1], doc[1].getElementByName('Column'))
+        >>> tb, len(doc.pages), composer.report[0].startswith('Overflow in text, flow box Column on page')
+        (None, 2, True)
+        """
+        if tb.bs:
+            joined = tb.bs.copy()
+            joined += bs
+            tb.bs = joined
+        else:
+            tb.bs = bs
+        overflow = tb.getOverflow()
+        boxes = 0
+        while overflow:
+            boxes += 1
+            if boxes > self.MAX_FLOW_BOXES:
+                self._report('Overflow in text, stopped after %d flow boxes on page %s: "%s"' % 
+                    (self.MAX_FLOW_BOXES, page, overflow.asText()))
+                return page, None
+            page, tb = self.getNextFlowBox(doc, page, tb)
+            if tb is None:
+                self._report('Overflow in text, but no next flow box defined on page %s: "%s"' % 
+                    (page, overflow.asText()))
+                return page, None
+            tb.bs = overflow
+            text = overflow.asText()
+            overflow = tb.getOverflow()
+            if overflow and overflow.asText() == text: # Nothing placed, the box is too small.
+                self._report('Overflow in text, flow box %s on page %s is too small: "%s"' % 
+                    (tb.name, page, text))
+                return page, None
+        return page, tb
+
+    def getFlowStart(self, page, flowId=None):
+        u"""Answer the text box with name flowId on page. If flowId is None, then answer the first
+        text box that is not the nextElement of another flow box of the page."""
+        if page is None:
+            return None
+        if flowId is not None:
+            return page.getElementByName(flowId)
+        flows = [e for e in page.elements if e.isTextBox and e.nextElement]
+        nextNames = set([e.nextElement for e in flows])
+        for e in flows:
+            if e.name not in nextNames:
+                return e
+        if flows: # The flow is a circle, start with the first box.
+            return flows[0]
+        return None
+
+    def getNextFlowBox(self, doc, page, tb):
+        u"""Answer the (page, nextBox) tuple of the box that tb is pointing to. This can be an empty
+        box on the same page, or a box on the page named tb.nextPage or otherwise the next page,
+        depending how the page (and probably its template) is defined. New pages are made if
+        self.makeNewPage is True. Answer (page, None) if the box cannot be found."""
+        if not tb.nextElement:
+            return page, None
+        nextBox = page.getElementByName(tb.nextElement)
+        if nextBox is not None and nextBox is not tb and not nextBox.bs:
+            return page, nextBox
+        nextPage = None
+        if isinstance(tb.nextPage, str):
+            nextPage = doc.getPage(tb.nextPage)
+        if nextPage is None or nextPage is page:
+            nextPage = doc.nextPage(page, makeNew=self.makeNewPage)
+        if nextPage is None:
+            return page, None
+        return nextPage, nextPage.getElementByName(tb.nextElement)
 
     def tryPlacement(self, page, tb, element):
         u"""Try to place the element on page, in relation to the current filling of tb.
-        Try to pass on the template-element w/h by doing a proportional resize of the component."""
-        container = page.findPlacementFor(element)
-        if container is not None:
-            # Replace the component on the page. Don't add to the container, because
-            # that will damage the element that come from the template.
-            page.replaceElement(container, element)
+        The element is moved from the galley to the page, where its conditions (if defined) place it
+        on the next doc.solve(). If there is no page, then the element stays in the galley and
+        the failure is noted in self.report."""
+        if page is None:
+            self._report('Could not find placement for element %s.' % element)
         else:
-            print('Could not find placement for element %s.' % element)
-        #else:
-        #    print('TRY TO PLACE', element, element.getSize(), 'on page', page.pageNumber)
+            page.appendElement(element)
 
-    #    Validation, evaludating conditions.
 
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
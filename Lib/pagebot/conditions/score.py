@@ -17,6 +17,7 @@ class Score(object):
     def __init__(self):
         self.result = 0
         self.fails = []
+        self.report = None # Optional SolveReport of the IncrementalSolver.
 
     def __repr__(self):
         return 'Score: %s Fails: %d' % (self.result, len(self.fails))
@@ -0,0 +1,272 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     solver.py
+#
+#     The IncrementalSolver keeps the result of solving the conditions of every
+#     element, together with the style values (of any element) that were read by
+#     the conditions. A next solve only runs the conditions of elements that are
+#     dirty: new elements, elements that changed themselves, elements that got
+#     new siblings and elements that read a style value, the position or size of
+#     another element, or the positions of siblings in a spatial index that
+#     changed since.
+#     Solving repeats until no element is dirty anymore (fixed point) or until
+#     the maximum number of passes is reached.
+#
+from pagebot.style import StyleDict, GEOMETRY, SIBLINGS
+from pagebot.elements.spatialindex import SpatialIndex
+from pagebot.conditions.score import Score
+
+NOTFOUND = object() # Value of style keys that were read, but not defined.
+
+class SolveRecord(object):
+    u"""Result of the last solve of the conditions of an element."""
+    __slots__ = ('element', 'parent', 'conditions', 'epoch', 'reads', 'result', 'fails')
+
+    def __init__(self, element, epoch, reads, score):
+        self.element = element
+        self.parent = element.parent
+        self.conditions = tuple(element.conditions)
+        self.epoch = epoch # StyleDict.epoch after solving.
+        self.reads = reads # List of (styleDictOrElement, [(name, value), ...]) tuples.
+        self.result = score.result
+        self.fails = score.fails
+
+class SolveReport(object):
+    u"""Report of the IncrementalSolver, with the number of solved elements in
+    each pass and the convergence to a fixed point.
+
+    >>> report = SolveReport(maxPasses=10)
+    >>> report.passes = [12, 3, 0]
+    >>> report.converged = True
+    >>> report
+    SolveReport: 3 passes, 15 solved, converged
+    >>> report.solved
+    15
+    """
+    def __init__(self, maxPasses):
+        self.maxPasses = maxPasses
+        self.passes = [] # Number of solved elements for each pass.
+        self.converged = False
+
+    def _get_solved(self):
+        return sum(self.passes)
+    solved = property(_get_solved)
+
+    def __repr__(self):
+        if self.converged:
+            status = 'converged'
+        else:
+            status = 'not converged'
+        return 'SolveReport: %d passes, %d solved, %s' % (len(self.passes), self.solved, status)
+
+class IncrementalSolver(object):
+    u"""Solve the conditions of the elements in the tree of root (a document or an element)
+    incrementally. While solving the conditions of an element, all values that are read
+    from StyleDict instances and all cascading Element.css() values are recorded, as well as
+    reading the position and size of other elements, which can depend on more than their style,
+    e.g. on the text of a Text element. The element only needs to be solved again if one of
+    these values changed, if the element itself changed, or if the list of its siblings changed.
+
+    >>> from pagebot.document import Document
+    >>> from pagebot.elements import newRect
+    >>> from pagebot.conditions import Left2Left, Top2Top, Float2Top
+    >>> doc = Document(w=500, h=500, originTop=False, padding=0, autoPages=1)
+    >>> page = doc[1]
+    >>> e1 = newRect(w=100, h=100, parent=page, conditions=[Left2Left(), Top2Top()])
+    >>> e2 = newRect(w=100, h=50, parent=page, conditions=[Left2Left(), Float2Top()])
+    >>> solver = IncrementalSolver(doc)
+    >>> score = solver.solve()
+    >>> e1.top, e2.top, solver.report
+    (500, 400, SolveReport: 2 passes, 2 solved, converged)
+    >>> score = solver.solve() # Nothing changed, nothing to solve.
+    >>> solver.report
+    SolveReport: 1 passes, 0 solved, converged
+    >>> e1.h = 150 # Solve e1 and e2, which depends on the bottom of e1.
+    >>> score = solver.solve()
+    >>> e2.top, solver.report
+    (350, SolveReport: 2 passes, 2 solved, converged)
+    >>> e3 = newRect(w=100, h=50, parent=page, conditions=[Left2Left(), Float2Top()])
+    >>> score = solver.solve() # New sibling, so all siblings are dirty.
+    >>> e3.top, solver.report
+    (300, SolveReport: 2 passes, 3 solved, converged)
+    >>> e = page.removeElement(e2)
+    >>> score = solver.solve()
+    >>> e3.top, solver.report
+    (350, SolveReport: 2 passes, 2 solved, converged)
+
+    Changing the text of a Text element changes its width, so the element that floats against it
+    is solved again, and the layout is the same as the full solve of the changed document.
+
+    >>> from pagebot.contexts.flatcontext import FlatContext
+    >>> from pagebot.elements.pbtext import Text
+    >>> from pagebot.conditions import Float2Left
+    >>> context = FlatContext()
+    >>> def makeDocument(s):
+    ...     doc = Document(w=500, h=500, originTop=False, padding=0, autoPages=1, context=context)
+    ...     t = Text(context.newString(s, style=dict(fontSize=12)), x=0, y=400, parent=doc[1])
+    ...     e = newRect(x=400, y=400, w=50, h=50, parent=doc[1], conditions=[Float2Left()])
+    ...     return doc, t, e
+    >>> doc, t, e = makeDocument('ABC')
+    >>> score = doc.solve(incremental=True)
+    >>> e.left == t.w
+    True
+    >>> t.bs = context.newString('ABC DEF GHI', style=dict(fontSize=12))
+    >>> score = doc.solve(incremental=True)
+    >>> score.report
+    SolveReport: 2 passes, 1 solved, converged
+    >>> fullDoc, fullT, fullE = makeDocument('ABC DEF GHI')
+    >>> score = fullDoc.solve()
+    >>> (t.x, t.y, t.w, e.x, e.y) == (fullT.x, fullT.y, fullT.w, fullE.x, fullE.y), e.left == t.w
+    (True, True)
+    """
+    MAX_PASSES = 10
+
+    def __init__(self, root, maxPasses=None):
+        self.root = root
+        self.maxPasses = maxPasses or self.MAX_PASSES
+        self.records = {} # Key is id(element), value is the SolveRecord of its last solve.
+        self.report = None # SolveReport of the last self.solve()
+        self._stamps = {} # Cached cascading stamps of elements, valid for self._stampsEpoch
+        self._stampsEpoch = None
+
+    def __repr__(self):
+        return '<%s %d>' % (self.__class__.__name__, len(self.records))
+
+    def reset(self):
+        u"""Forget all recorded results, so the next solve runs all conditions."""
+        self.records = {}
+
+    def _getElements(self):
+        u"""Answer the list of elements in the order that Element.solve and Document.solve
+        would visit them."""
+        getSortedPages = getattr(self.root, 'getSortedPages', None)
+        if getSortedPages is not None: # Document: all pages, sorted by page number.
+            stack = []
+            for pn, pnPages in getSortedPages():
+                stack += pnPages
+        else:
+            stack = [self.root]
+        elements = []
+        stack.reverse()
+        while stack:
+            e = stack.pop()
+            elements.append(e)
+            stack += [child for child in reversed(e.elements) if child.show]
+        return elements
+
+    def _getValue(self, obj, name):
+        if isinstance(obj, StyleDict):
+            return obj.get(name, NOTFOUND)
+        if name == GEOMETRY:
+            return obj.x, obj.y, obj.w, obj.h
+        if name == SIBLINGS: # Any change in the child elements can change what the spatial index answers.
+            return obj.stamp
+        return obj.css(name, NOTFOUND)
+
+    def _getStamp(self, obj):
+        u"""Answer the generation stamp of the last change that can influence the values
+        read from obj. For elements that is the latest change in the cascade of styles of
+        its ancestors, in the tree itself, or in the position and size of obj."""
+        if isinstance(obj, (StyleDict, SpatialIndex)):
+            return obj.stamp
+        if self._stampsEpoch != StyleDict.epoch: # Something changed, cached stamps are invalid.
+            self._stamps = {}
+            self._stampsEpoch = StyleDict.epoch
+        stamp = self._stamps.get(id(obj))
+        if stamp is None:
+            parent = obj.parent
+            stamp = max(obj._styleStamp or 0, getattr(obj, '_changedStamp', 0))
+            if parent is not None:
+                stamp = max(stamp, self._getStamp(parent))
+            self._stamps[id(obj)] = stamp
+        return stamp
+
+    def _isDirty(self, e, record):
+        u"""Answer the boolean flag if e needs to be solved again."""
+        if record.parent is not e.parent or record.conditions != tuple(e.conditions):
+            return True
+        epoch = record.epoch
+        if e._changedStamp > epoch: # Style of e changed after it was solved.
+            return True
+        parent = e.parent
+        if parent is not None and getattr(parent, '_elementsStamp', 0) > epoch:
+            return True # Siblings were added or removed.
+        for obj, values in record.reads:
+            if self._getStamp(obj) <= epoch:
+                continue # Nothing changed that can influence the values of obj.
+            for name, value in values:
+                current = self._getValue(obj, name)
+                if current is not value and current != value:
+                    return True
+        return False
+
+    def _solveElement(self, e):
+        u"""Solve the conditions of e, while recording the style values it reads."""
+        score = Score()
+        reads = {}
+        outerReads = StyleDict.reads
+        StyleDict.reads = reads
+        try:
+            for condition in e.conditions:
+                condition.solve(e, score)
+        finally:
+            StyleDict.reads = outerReads
+            if outerReads is not None: # Nested recording, also add to the outer reads.
+                outerReads.update(reads)
+        # Take the values after solving, so changes that e made to itself are included.
+        # Group the values by the object they were read from, to check their stamp once.
+        values = {}
+        for obj, name in reads.values():
+            if not id(obj) in values:
+                values[id(obj)] = obj, []
+            values[id(obj)][1].append((name, self._getValue(obj, name)))
+        self.records[id(e)] = SolveRecord(e, StyleDict.epoch, list(values.values()), score)
+
+    def solve(self, score=None):
+        u"""Solve all dirty elements, until they reach a fixed point, or until self.maxPasses
+        is reached. Answer the score of all conditions, added to the optional score. The
+        SolveReport is stored in self.report."""
+        if score is None:
+            score = Score()
+        report = self.report = SolveReport(self.maxPasses)
+        records = self.records
+        while len(report.passes) < self.maxPasses:
+            solved = 0
+            eIds = set()
+            for e in self._getElements():
+                if not e.conditions:
+                    continue
+                eId = id(e)
+                eIds.add(eId)
+                record = records.get(eId)
+                if record is None or self._isDirty(e, record):
+                    self._solveElement(e)
+                    solved += 1
+            for eId in list(records.keys()): # Remove elements that are not in the tree anymore.
+                if not eId in eIds:
+                    del records[eId]
+            report.passes.append(solved)
+            if not solved:
+                report.converged = True
+                break
+        for record in records.values():
+            score.result += record.result
+            score.fails += record.fails
+        score.report = report
+        return score
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
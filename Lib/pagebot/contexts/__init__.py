@@ -13,3 +13,35 @@
 #
 #     pagebot/contexts/__init__.py
 #
+#     The context classes are imported on first access (PEP 562), e.g. by
+#     "from pagebot.contexts import FlatContext", so only the libraries of the
+#     contexts that are used get imported. getContext() answers the context
+#     of the platform.
+#
+import importlib
+
+from pagebot.contexts.platform import getContext
+
+# Key is the class name, value is the module that defines it.
+CONTEXT_MODULES = dict(
+    BaseContext='pagebot.contexts.basecontext',
+    DrawBotContext='pagebot.contexts.drawbotcontext', # Needs DrawBot on OSX.
+    FlatContext='pagebot.contexts.flatcontext', # Needs Flat.
+    HtmlContext='pagebot.contexts.htmlcontext',
+    InDesignContext='pagebot.contexts.indesigncontext',
+    SvgContext='pagebot.contexts.svgcontext',
+)
+
+def __getattr__(name):
+    u"""Import the module of the context class on first access.
+
+    >>> import pagebot.contexts
+    >>> from pagebot.contexts import HtmlContext
+    >>> HtmlContext.__name__, hasattr(pagebot.contexts, 'Xyz')
+    ('HtmlContext', False)
+    """
+    moduleName = CONTEXT_MODULES.get(name)
+    if moduleName is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = globals()[name] = getattr(importlib.import_module(moduleName), name)
+    return value
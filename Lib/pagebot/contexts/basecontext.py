@@ -15,6 +15,7 @@
 #
 import os
 from pagebot.style import DISPLAY_BLOCK
+from pagebot.contexts.strings.babelstring import TextSizeCache, FitCache
 
 class BaseContext(object):
     u"""A BaseContext instance combines the specific functions of a platform, 
@@ -30,10 +31,41 @@ class BaseContext(object):
     # To be redefined by inheriting context classes.
     STRING_CLASS = None
     EXPORT_TYPES = None
-    
+
+    TEXT_SIZE_CACHE_SIZE = 1024 # Maximum number of measured text sizes in self.textSizeCache
+    _textSizeCache = None
+    FIT_CACHE_SIZE = 1024 # Maximum number of fitted font sizes in self.fitCache
+    _fitCache = None
+
     def __repr__(self):
         return '<%s>' % self.__class__.__name__
 
+    def _get_textSizeCache(self):
+        u"""Answer the bounded LRU cache of measured text sizes of the strings of this context.
+        Create it, if it does not exist.
+
+        >>> context = BaseContext()
+        >>> context.textSizeCache
+        <TextSizeCache 0/1024 hits=0 misses=0>
+        """
+        if self._textSizeCache is None:
+            self._textSizeCache = TextSizeCache(self.TEXT_SIZE_CACHE_SIZE)
+        return self._textSizeCache
+    textSizeCache = property(_get_textSizeCache)
+
+    def _get_fitCache(self):
+        u"""Answer the bounded LRU cache of font sizes of strings that were fitted on a target
+        width or height. Create it, if it does not exist.
+
+        >>> context = BaseContext()
+        >>> context.fitCache
+        <FitCache 0/1024 hits=0 misses=0>
+        """
+        if self._fitCache is None:
+            self._fitCache = FitCache(self.FIT_CACHE_SIZE)
+        return self._fitCache
+    fitCache = property(_get_fitCache)
+
     
     #   S C R E E N
 
@@ -102,6 +134,17 @@ class BaseContext(object):
             if not os.path.exists(dirPath):
                 os.makedirs(dirPath)
 
+    def getPageFilePath(self, path, index):
+        u"""Answer the file path of the page at index in the pages drawn by PageView.build, if the
+        pages are saved as separate files, named as self.saveDocument names the files of multiple
+        pages. Default is the file name numbered from 1.
+
+        >>> BaseContext().getPageFilePath('_export/Catalogue.png', 11)
+        '_export/Catalogue012.png'
+        """
+        base, extension = os.path.splitext(path)
+        return '%s%03d%s' % (base, index + 1, extension)
+
     #   V A R I A B L E
 
     def Variable(self, ui, globals):
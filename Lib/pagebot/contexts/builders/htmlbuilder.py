@@ -383,6 +383,18 @@ table {
         """Answer the joined content of sel._cssOut."""
         return ''.join(self._cssOut)
 
+    def clearCss(self):
+        u"""Clear the collected CSS, as should be done before building a site, so the CSS of a
+        previous build is not repeated.
+
+        >>> b = HtmlBuilder()
+        >>> b.addCss('body {color: red;}')
+        >>> b.clearCss()
+        >>> b.hasCss()
+        0
+        """
+        self._cssOut = []
+
     def hasCss(self):
         u"""Answer the boolean flag if there is any cumulated CSS in self._cssOut."""
         return len(self._cssOut)
@@ -519,8 +531,11 @@ table {
     def resetHtml(self):
         u"""Reset the output stream, as should be done after each page export.
         It is likely not to reset the CSS, because we want to collect all and
-        write to the single CSS file for the entire site."""
+        write to the single CSS file for the entire site. The indent level and tag stack
+        are reset too, so every page starts the same, independent of the previous one."""
         self._htmlOut = []
+        self._tabLevel = 0
+        self._tagStack = []
 
     def docType(self, s):
         self.write('<!DOCTYPE %s>\n' % s)
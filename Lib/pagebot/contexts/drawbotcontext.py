@@ -106,6 +106,11 @@ class DrawBotContext(BaseContext):
 
     saveImage = saveDocument # Compatible API with DrawBot
 
+    def getPageFilePath(self, path, index):
+        u"""Answer the file path of the page at index, as DrawBot names the files of multiple pages."""
+        base, extension = os.path.splitext(path)
+        return '%s_%d%s' % (base, index + 1, extension)
+
     def newPage(self, w, h):
         u"""Create a new drawbot page.
 
@@ -141,27 +141,26 @@ class FlatContext(BaseContext):
         """
         self.checkExportPath(path) # In case path starts with "_export", make sure that the directories exist.
         extension = path.split('.')[-1]
+        # A single file has the page that was drawn last. Multiple files are numbered by
+        # self.getPageFilePath from 1, as PageView.buildPageFiles names them.
         if extension == 'png':
             if len(self.pages) == 1 or not multiPage:
-                self.pages[0].image(kind='rgba').png(path)
+                self.getPngImage(self.page).png(path)
             else:
-                for n, p in enumerate(self.pages):
-                    pagePath = path.replace('.png', '%03d.png' % n)
-                    p.image(kind='rgb').png(pagePath)
+                for n, p in enumerate(self.getExportPages()):
+                    self.getPngImage(p).png(self.getPageFilePath(path, n))
         elif extension == 'jpg':
             if len(self.pages) == 1 or not multiPage:
-                self.pages[0].image(kind='rgb').jpeg(path)
+                self.page.image(kind='rgb').jpeg(path)
             else:
-                for n, p in enumerate(self.pages):
-                    pagePath = path.replace('.png', '%03d.png' % n)
-                    p.image(kind='rgb').jpeg(pagePath)
+                for n, p in enumerate(self.getExportPages()):
+                    p.image(kind='rgb').jpeg(self.getPageFilePath(path, n))
         elif extension == 'svg':
             if len(self.pages) == 1 or not multiPage:
-                self.pages[0].svg(path)
+                self.page.svg(path)
             else:
-                for n, p in enumerate(self.pages):
-                    pagePath = path.replace('.png', '%03d.png' % n)
-                    p.svg(pagePath)
+                for n, p in enumerate(self.getExportPages()):
+                    p.svg(self.getPageFilePath(path, n))
         elif extension == 'pdf':
             self.doc.pdf(path)
         elif extension == 'gif':
@@ -171,6 +170,51 @@ class FlatContext(BaseContext):
 
     saveImage = saveDocument # Compatible API with DrawBot
 
+    def getPngImage(self, page):
+        u"""Answer the rasterized image of the Flat page for PNG export, with alpha channel.
+        Flat only draws colors of the same kind as the image, so pages drawn with opaque rgb
+        colors are rasterized without alpha.
+
+        >>> context = FlatContext()
+        >>> context.newDocument(100, 100)
+        >>> context.getPngImage(context.page).kind
+        'rgba'
+        >>> context.fill((1, 0, 0, 0.5))
+        >>> context.rect(10, 10, 80, 80)
+        >>> context.getPngImage(context.page).kind
+        'rgba'
+        >>> context.newPage(100, 100)
+        >>> context.fill((1, 0, 0))
+        >>> context.rect(10, 10, 80, 80)
+        >>> context.getPngImage(context.page).kind
+        'rgb'
+        """
+        try:
+            return page.image(kind='rgba')
+        except ValueError: # Flat raises on colors of another kind.
+            return page.image(kind='rgb')
+
+    def getExportPages(self):
+        u"""Answer the list of pages that are saved as separate files. The first page, made by
+        self.newDocument, is skipped if nothing was drawn on it, as PageView.build draws every
+        page of the document in a page made by self.newPage.
+
+        >>> context = FlatContext()
+        >>> context.newDocument(100, 100)
+        >>> context.newPage(100, 100)
+        >>> context.getExportPages() == context.pages[1:]
+        True
+        >>> context = FlatContext()
+        >>> context.newDocument(100, 100)
+        >>> context.rect(10, 10, 80, 80)
+        >>> context.newPage(100, 100)
+        >>> context.getExportPages() == context.pages
+        True
+        """
+        if len(self.pages) > 1 and not self.pages[0].items:
+            return self.pages[1:]
+        return self.pages
+
     def newPage(self, w, h, units='pt'):
         u"""Other page sizes than default in self.doc, are ignored in Flat.
 
@@ -316,50 +360,72 @@ class FlatContext(BaseContext):
         self._fontSize = fontSize
 
     def textBox(self, bs, rect):
+        u"""Draw the lines of the FlatString bs that fit in rect, as broken by bs.getTextLayout(w).
+
+        >>> w = h = 500
+        >>> context = FlatContext()
+        >>> context.newDocument(w, h)
+        >>> context.newPage(w, h)
+        >>> bs = context.newString('ABC ' * 100, style=dict(fontSize=12))
+        >>> context.textBox(bs, (10, 10, 200, 100))
+        >>> len(context.page.items) # Lines that fit in the box.
+        7
+        >>> bs = context.newString('Hello ', style=dict(fontSize=12))
+        >>> bs += context.newString('WORLD', style=dict(fontSize=72, textFill=(1, 0, 0)))
+        >>> context.newPage(w, h)
+        >>> context.textBox(bs, (10, 10, 400, 100)) # One line, each span drawn in its own style.
+        >>> spans = [item.layout.paragraphs[0].spans[0] for item in context.page.items]
+        >>> [(span.string, span.style.size) for span in spans], [round(item.x, 2) for item in context.page.items]
+        ([('Hello ', 12.0), ('WORLD', 72.0)], [10.0, 40.58])
+        """
         x, y, w, h = rect
-        placedText = self.page.place(bs.s)
-        placedText.position(x, y)
+        styles = bs.getRunStyles() # Font, size, leading and color of each run of the Flat text.
+        strikes = {} # Key is span style id, value is Flat strike of that style.
+        layout = bs.getTextLayout(w)
+        for line in layout.getFittingLines(h):
+            for runIndex, dx, s in layout.getLineRuns(line):
+                style = styles[runIndex]
+                strike = strikes.get(id(style))
+                if strike is None:
+                    strike = strikes[id(style)] = self.b.strike(style.font)
+                    strike.style = style
+                # Flat places the baseline of a single line text at leading distance below y.
+                placedText = self.page.place(strike.text(s))
+                placedText.position(x + dx, y + line.y - style.leading)
 
     def textSize(self, bs, w=None, h=None):
         u"""Answer the size tuple (w, h) of the current text. Answer (0, 0) if there is no text defined.
         Answer the height of the string if the width w is given.
 
-        >>> w = h = 500
         >>> context = FlatContext()
-        >>> context.newDocument(w, h)
-        >>> context.newPage(w, h)
         >>> style = dict(font='Roboto-Regular', fontSize=12)
         >>> bs = context.newString('ABC ' * 100, style=style)
-        >>> t = context.page.place(bs.s)
-        >>> t = t.frame(0, 0, w, h)
-        >>> t.overflow()
-        False
-        >>> bs = context.newString('ABC ' * 100000, style=style)
-        >>> t = context.page.place(bs.s)
-        >>> t = t.frame(0, 0, w, h)
-        >>> t.overflow()
-        True
-        >>> lines = t.lines()
-        >>> len(lines)
-        35
+        >>> tw, th = context.textSize(bs, w=500)
+        >>> tw <= 500, round(th, 2) # 6 lines of text.
+        (True, 85.06)
+        >>> context.textSize(context.newString('', style=style))
+        (0, 0)
         """
-        # FIXME! This is a totally wrong boilerplate for now!
-
-        #t = placedtext(bs.s)
-        if not bs.s:
+        if not bs.asText():
             return (0, 0)
-        elif w is None:
-            return (100, 100)
-        else:
-            return (w, w/len(bs))
+        return bs.textSize(w=w, h=h)
 
     def textOverflow(self, bs, bounds, align=LEFT):
         u"""Answer the overflowing of from the box (0, 0, w, h) as new FlatString
         in the current context."""
-        return FlatString(self.b.textOverflow(bs.s, bounds, align), self)
+        _, _, w, h = bounds
+        return bs.textOverflow(w, h, align)
 
     def textBoxBaseLines(self, txt, box):
-        raise NotImplementedError()
+        u"""Answer the list of (x, y) positions of the baselines of the FlatString txt in the box.
+
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 100, style=dict(fontSize=12))
+        >>> len(context.textBoxBaseLines(bs, (0, 0, 200, 100)))
+        7
+        """
+        x, y, w, h = box
+        return txt.baseLines(x, y, w, h)
 
     #   I M A G E
 
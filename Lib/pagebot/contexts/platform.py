@@ -13,6 +13,8 @@
 #
 #     pagebot/contexts/platform.py
 #
+import multiprocessing
+import sys
 
 DEFAULT_CONTEXT = None
 MAMP_PATH = None
@@ -39,6 +41,27 @@ def getContext():
             raise NotImplementedError('Cannot decide on the platform context.')
     return DEFAULT_CONTEXT
 
+def getForkContext():
+    u"""Answer the multiprocessing context that forks the current process, for the pools of
+    workers that inherit the document or the font, so they don't need to be pickled. Answer None
+    if the platform cannot fork, or if AppKit is loaded (e.g. running in DrawBot), because it is
+    not safe to fork a process that uses Cocoa. Then the caller should do the work serially.
+
+    >>> mp = getForkContext()
+    >>> mp is None or hasattr(mp, 'Pool')
+    True
+    """
+    if 'AppKit' in sys.modules:
+        return None
+    try:
+        return multiprocessing.get_context('fork')
+    except AttributeError: # Python 2 always forks on posix platforms.
+        if sys.platform == 'win32':
+            return None
+        return multiprocessing
+    except ValueError: # No forking on this platform.
+        return None
+
 def getMampPath():
     if MAMP_PATH is None:
         getContext() # Make sure MAMP_PATH is initialized depending on current type of context.
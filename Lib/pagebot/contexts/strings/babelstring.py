@@ -13,11 +13,80 @@
 #
 #     babelstring.py
 #
+from collections import OrderedDict
+
+from pagebot.style import LEFT
+
+class LRUCache(object):
+    u"""Bounded LRU cache, removing the least recently used values when maxSize is exceeded.
+    The hits and misses counters show the effect of caching.
+
+    >>> cache = LRUCache(maxSize=2)
+    >>> cache.get('a') is None
+    True
+    >>> cache.set('a', (100, 20))
+    >>> cache.set('b', (100, 40))
+    >>> cache.get('a')
+    (100, 20)
+    >>> cache.set('c', (100, 60)) # Removes the least recently used 'b'
+    >>> cache.get('b') is None, cache.get('a')
+    (True, (100, 20))
+    >>> cache
+    <LRUCache 2/2 hits=2 misses=2>
+    """
+    def __init__(self, maxSize=1024):
+        self.maxSize = maxSize
+        self.hits = 0
+        self.misses = 0
+        self._values = OrderedDict()
+
+    def __repr__(self):
+        return '<%s %d/%d hits=%d misses=%d>' % (self.__class__.__name__, len(self._values), 
+            self.maxSize, self.hits, self.misses)
+
+    def __len__(self):
+        return len(self._values)
+
+    def get(self, key):
+        u"""Answer the cached value of key and make it the most recently used. Answer None
+        if it does not exist."""
+        value = self._values.pop(key, None)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+            self._values[key] = value # Move to the end, as most recently used.
+        return value
+
+    def set(self, key, value):
+        self._values[key] = value
+        while len(self._values) > self.maxSize:
+            self._values.popitem(last=False) # Remove the least recently used.
+
+    def clear(self):
+        u"""Clear the cache and the counters."""
+        self._values = OrderedDict()
+        self.hits = self.misses = 0
+
+class TextSizeCache(LRUCache):
+    u"""Bounded LRU cache of measured (w, h) text sizes, shared by all BabelString instances of
+    a context, see BabelString.textSize. The key is made from the string content, style, font path
+    and the (w, h) of the measurement."""
+
+class FitCache(LRUCache):
+    u"""Bounded LRU cache of the font sizes of strings that were fitted on a target width or
+    height, shared by all strings of a context. The key is made from the text, font, style,
+    target (w, h) and pixelFit flag, see DrawBotString._getFitKey. The value is the font size."""
 
 class BabelString(object):
     u"""BabelString is the base class of various types of (formatted) string representations 
     needed for different builder classes."""
 
+    _textSizes = None # Measured sizes of this string, key is (w, h). Reset by self.textChanged()
+    _textOverflows = None # Overflow strings of this string, key is (w, h, align). Reset by self.textChanged()
+    _textSizeKey = None # Cached content and style part of the key in context.textSizeCache
+    _isComposite = False # Set to True when strings were appended, possibly with other styles.
+
     def __init__(self, s, context, style=None):
         self.s = s # Enclose the Flat/Drawbot/html string in this wrapper.
         self.style = style # Optional style to set the context parameters.
@@ -35,6 +104,7 @@ class BabelString(object):
         for n in range(d-1):
             s += self.s
         self.s = s
+        self.textChanged()
         # Something to do with the html? 
         return self
 
@@ -47,6 +117,118 @@ class BabelString(object):
             self.s += s.s
         except (TypeError, AttributeError):
             self.s += s # Convert to babel string, whatever it is.
+        self.textChanged(composite=True)
+
+    def copy(self):
+        u"""Answer a new string of the same class, with the content and style of self, that can be
+        changed, e.g. by appending, without changing self. Appending makes a new wrapped string,
+        so the copy can share it with self.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC', style=dict(fontSize=12))
+        >>> bs1 = bs.copy()
+        >>> bs1 += 'DEF'
+        >>> bs.asText(), bs1.asText(), bs1.style == bs.style, bs1.style is bs.style
+        ('ABC', 'ABCDEF', True, False)
+        """
+        style = self.style
+        if style is not None:
+            style = style.copy()
+        bs = self.__class__(self.s, self.context, style=style)
+        bs._isComposite = self._isComposite
+        return bs
+
+    def textChanged(self, composite=False):
+        u"""Reset the cached text sizes of self. To be called for every change of the string
+        or its style. If composite is True, then parts of the string may have other styles
+        than self.style, so the size cannot be shared with other strings in the context."""
+        self._textSizes = self._textSizeKey = self._textOverflows = None
+        if composite:
+            self._isComposite = True
+
+    def _getTextSizeKey(self):
+        u"""Answer the content and style key of self, to share measured text sizes with other
+        strings of the context. Answer None if self is composed from multiple styles."""
+        if self._isComposite:
+            return None
+        if self._textSizeKey is None:
+            style = self.style or {}
+            font = style.get('font')
+            self._textSizeKey = (self.__class__.__name__, self.asText(), getattr(font, 'path', font),
+                tuple(sorted((name, repr(value)) for name, value in style.items())))
+        return self._textSizeKey
+
+    def textSize(self, w=None, h=None):
+        u"""Answer the (w, h) size for a given width or height, with the current text. Measured
+        sizes are cached in self and in the bounded context.textSizeCache, so strings with the same
+        content and style don't need to be measured again. The cache of self is reset by
+        self.textChanged(), e.g. when appending to the string.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> from pagebot.contexts.strings.flatstring import FlatString
+        >>> context = FlatContext()
+        >>> context.textSizeCache.clear()
+        >>> bs = FlatString('ABC', context, style=dict(fontSize=12))
+        >>> bs.textSize(w=100), bs.textSize(w=100) # Second call is cached in bs.
+        ((23.115234375, 14.0625), (23.115234375, 14.0625))
+        >>> context.textSizeCache
+        <TextSizeCache 1/1024 hits=1 misses=1>
+        >>> bs = FlatString('ABC', context, style=dict(fontSize=12))
+        >>> size = bs.textSize(w=100) # Same content and style, cached in the context.
+        >>> context.textSizeCache
+        <TextSizeCache 1/1024 hits=2 misses=1>
+        """
+        key = w, h
+        sizes = self._textSizes
+        if sizes is None:
+            sizes = self._textSizes = {}
+        elif key in sizes:
+            self.context.textSizeCache.hits += 1
+            return sizes[key]
+        cache = self.context.textSizeCache
+        contextKey = self._getTextSizeKey()
+        if contextKey is None:
+            size = None
+            cache.misses += 1
+        else:
+            contextKey += key
+            size = cache.get(contextKey)
+        if size is None:
+            size = self._measureTextSize(w, h)
+            if contextKey is not None:
+                cache.set(contextKey, size)
+        sizes[key] = size
+        return size
+
+    def _measureTextSize(self, w=None, h=None):
+        u"""Answer the measured (w, h) size of the string. To be redefined by inheriting classes."""
+        raise NotImplementedError
+
+    def getTextOverflow(self, w, h, align=LEFT):
+        u"""Answer the cached result of self.textOverflow(w, h, align), so text boxes, conditions and
+        the Composer can ask for the overflow split of the same box size without measuring the text
+        again. The cache is reset by self.textChanged(). The answered string is shared by the cache,
+        so callers that change it, e.g. by appending, must do that on self.getTextOverflow(w, h).copy().
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12))
+        >>> overflow = bs.getTextOverflow(100, 30)
+        >>> overflow.asText(), overflow is bs.getTextOverflow(100, 30)
+        ('ABC ABC ABC ABC ', True)
+        >>> bs += ' DEF'
+        >>> bs.getTextOverflow(100, 30).asText()
+        'ABC ABC ABC ABC  DEF'
+        """
+        key = w, h, align
+        overflows = self._textOverflows
+        if overflows is None:
+            overflows = self._textOverflows = {}
+        elif key in overflows:
+            return overflows[key]
+        overflow = overflows[key] = self.textOverflow(w, h, align)
+        return overflow
 
     def type(self):
         u"""Answer the id of the class, in case a caller wants to know what kind of 
@@ -26,10 +26,46 @@ except (ImportError, AttributeError):
 
 #from pagebot.contexts.basecontext import BaseContext # TODO: Solve this
 from pagebot.contexts.strings.babelstring import BabelString
-from pagebot.style import css, NO_COLOR, LEFT, DEFAULT_FONT_SIZE, DEFAULT_FONT_PATH
+from pagebot.style import css, NO_COLOR, LEFT, DEFAULT_FONT_SIZE, DEFAULT_FONT_PATH, TextStyle
 from pagebot.toolbox.future import chr
 from pagebot.fonttoolbox.objects.font import getFont, getInstance
 
+FIT_ITERATIONS = 24 # Maximum number of measurements to fit a string on a target width or height.
+FIT_PRECISION = 0.001 # Stop fitting if the range of possible font sizes is smaller than this.
+
+def fitFontSize(measure, fontSize, target, tolerance, maxIterations=FIT_ITERATIONS):
+    u"""Answer the largest font size for which measure(fontSize) fits target, within tolerance.
+    The measured width or height is assumed to grow with the font size. Starting at the estimated
+    fontSize, the solver keeps the range between the largest size that fits and the smallest size
+    that is too large. It takes secant steps inside that range, kept away from its ends, so
+    the range always gets smaller. The answered size never measures larger than target.
+
+    >>> fitFontSize(lambda fontSize: fontSize * 3.2 + 10, 100, 300, 0.1) # Linear with margin
+    90.625
+    >>> fontSize = fitFontSize(lambda fontSize: fontSize ** 1.5, 10, 1000, 0.1)
+    >>> 1000 - 0.1 <= fontSize ** 1.5 <= 1000
+    True
+    """
+    lo, loSize = 0, 0 # Largest font size that fits and its measured size.
+    hi = hiSize = None # Smallest font size that is too large and its measured size.
+    for _ in range(maxIterations):
+        size = measure(fontSize)
+        if size > target:
+            hi, hiSize = fontSize, size
+        else:
+            lo, loSize = fontSize, size
+            if target - size <= tolerance:
+                break
+        if hi is None: # No upper limit yet, scale up by at least 10%
+            fontSize *= max(float(target) / size, 1.1) if size else 2
+        elif hi - lo < FIT_PRECISION:
+            break
+        else: # Secant step, at least 10% away from the ends of the range.
+            margin = (hi - lo) * 0.1
+            fontSize = lo + (hi - lo) * (target - loSize) / (hiSize - loSize)
+            fontSize = min(max(fontSize, lo + margin), hi - margin)
+    return lo
+
 def pixelBounds(fs):
     u"""Answer the pixel-bounds rectangle of the text, if formatted by the option (w, h).
     Note that @by can be a negative value, if there is text (e.g. overshoot) below the baseline.
@@ -107,6 +143,7 @@ class DrawBotString(BabelString):
         elif isinstance(s, DrawBotString):
             s = s.s
         self._s = s
+        self.textChanged()
     s = property(_get_s, _set_s)
 
     def _get_font(self):
@@ -116,6 +153,7 @@ class DrawBotString(BabelString):
         if fontName is not None:
             self.context.font(fontName)
         self.style['font'] = fontName
+        self.textChanged()
     font = property(_get_font, _set_font)
 
     def _get_fontSize(self):
@@ -125,15 +163,16 @@ class DrawBotString(BabelString):
         if fontSize is not None:
             self.context.fontSize(fontSize)
         self.style['fontSize'] = fontSize
+        self.textChanged()
     fontSize = property(_get_fontSize, _set_fontSize)
 
     def asText(self):
         return u'%s' % self.s #  Convert to text
 
-    def textSize(self, w=None, h=None):
+    def _measureTextSize(self, w=None, h=None):
         u"""Answer the (w, h) size for a given width, with the current text, measured from bottom em-size
-        to top-emsize (including ascender+ and descender+) and the string width (including margins)."""
-        # TODO: Add in case w is defined.
+        to top-emsize (including ascender+ and descender+) and the string width (including margins).
+        Called by self.textSize, that caches the measured sizes."""
         return self.context.textSize(self, w=w, h=h)
 
     def bounds(self):
@@ -191,6 +230,7 @@ class DrawBotString(BabelString):
     def appendGlyph(self, *glyphNames):
         u"""Append a glyph by his glyph name using the current font. Multiple glyph names are possible."""
         self.s.appendGlyph(glyphNames)
+        self.textChanged(composite=True)
 
     MARKER_PATTERN = '==%s@%s=='
     FIND_FS_MARKERS = re.compile('\=\=([a-zA-Z0-9_\:\.]*)\@([^=]*)\=\=')
@@ -239,6 +279,17 @@ class DrawBotString(BabelString):
         return h * fontSize / (th-ty)
 
     FITTING_TOLERANCE = 3
+    FIT_TOLERANCE = 0.1 # Default tolerance in points of fitting the fontSize on a target width or height.
+
+    @classmethod
+    def _getFitKey(cls, t, e, style, w, h, pixelFit):
+        u"""Answer the key of the fitted fontSize in context.fitCache. Answer None if the fit depends
+        on the style of element e or on a stack of styles, as these may change."""
+        if e is not None or not isinstance(style, dict):
+            return None
+        font = style.get('font')
+        return (t, getattr(font, 'path', font), w, h, pixelFit,
+            tuple(sorted((name, repr(value)) for name, value in style.items())))
 
     @classmethod
     def fitString(cls, t, context, e=None, style=None, w=None, h=None, useXTRA=True, pixelFit=True):
@@ -356,6 +407,7 @@ class DrawBotString(BabelString):
         their existence, so they can inherit from previous style formats in the string.
         If target width *w* or height *h* is defined, then *fontSize* is scaled to make the string fit *w* or *h*.
         In that case the pixelFit flag defines if the current width or height comes from the pixel image of em size.
+        If *style* is a TextStyle, e.g. made by e.getTextStyle(style), then its values are used directly.
 
         >>> from pagebot.contexts.drawbotcontext import DrawBotContext
         >>> from pagebot.fonttoolbox.objects.font import findFont
@@ -378,6 +430,8 @@ class DrawBotString(BabelString):
         # Get the drawBotBuilder, no need to check, we already must be in context here.
         if t is None:
             t = ''
+        if isinstance(style, TextStyle): # Compiled style values, no need to search the ancestors of e.
+            e = None
 
         b = context.b
         b.hyphenation(css('hyphenation', e, style)) # TODO: Should be text attribute, not global
@@ -486,24 +540,39 @@ class DrawBotString(BabelString):
 
         newt = fs + t # Format plain string t onto new formatted fs.
 
-        if w is not None: # There is a target width defined, calculate again with the fontSize ratio correction.
-            # We use the enclosing pixel bounds instead of the context.textSide(newt) here, because it is much
-            # more consistent for tracked text. context.textSize will add space to the right of the string.
+        newS = None
+        if w is not None or h is not None: # There is a target width or height, solve the fitting fontSize.
+            # We use the enclosing pixel bounds instead of the context.textSide(newt) for the first estimate,
+            # because it is much more consistent for tracked text. context.textSize will add space to the
+            # right of the string.
+            fitKey = cls._getFitKey(t, e, style, w, h, pixelFit)
             style = copy(style)
-            style['fontSize'] = cls._newFitWidthString(newt, context, sFontSize, w, pixelFit)
-            newS = cls.newString(t, context, style=style)
-            # Test the width we got by linear interpolation. Scale back if still too large.
-            # Iterate until it really fits.
-            while newS.textSize()[0] > w and style['fontSize']:
-                style['fontSize'] -= 0.1 # Incremental decrease the size until it fits
+            fontSize = None
+            if fitKey is not None:
+                fontSize = context.fitCache.get(fitKey)
+            if fontSize is None: # Not cached, solve the fontSize.
+                fitStrings = {} # Strings that were made while fitting, key is fontSize.
+                def measure(fontSize):
+                    style['fontSize'] = fontSize
+                    bs = fitStrings[fontSize] = cls.newString(t, context, style=style)
+                    if w is not None:
+                        return bs.textSize()[0]
+                    if pixelFit:
+                        _, ty, _, th = pixelBounds(bs.s)
+                        return th - ty
+                    return bs.textSize()[1]
+                if w is not None:
+                    fontSize = cls._newFitWidthString(newt, context, sFontSize, w, pixelFit)
+                else:
+                    fontSize = cls._newFitHeightString(newt, context, sFontSize, h, pixelFit)
+                fontSize = fitFontSize(measure, fontSize, w if w is not None else h,
+                    css('fitTolerance', e, style, cls.FIT_TOLERANCE))
+                newS = fitStrings.get(fontSize)
+                if fitKey is not None:
+                    context.fitCache.set(fitKey, fontSize)
+            style['fontSize'] = fontSize
+            if newS is None:
                 newS = cls.newString(t, context, style=style)
-
-        elif h is not None: # There is a target height defined, calculate again with the fontSize ratio correction.
-            # We use the enclosing pixel bounds instead of the context.textSide(newt) here, because it is much
-            # more consistent for tracked text. context.textSize will add space to the right of the string.
-            style = copy(style)
-            style['fontSize'] = cls._newFitHeightString(newt, context, sFontSize, h, pixelFit)
-            newS = cls.newString(t, context, style=style)
         else:
             newS = cls(newt, context, style)
         # Store any aajust fitting parameters in the string, in case the caller wants to know.
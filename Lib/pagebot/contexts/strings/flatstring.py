@@ -20,9 +20,15 @@ import os
 import re
 
 from pagebot.contexts.strings.babelstring import BabelString
-from pagebot.style import css, LEFT, DEFAULT_FONT_SIZE, DEFAULT_FONT_PATH
+from pagebot.contexts.strings.textlayout import TextLayout, getFontMetrics
+from pagebot.style import css, LEFT, NO_COLOR, DEFAULT_FONT_SIZE, DEFAULT_FONT_PATH
 DEFAULT_LEADING = 0
 
+# Key is font path, value is the opened Flat font, as parsing the font file is expensive.
+flatFonts = {}
+# Key is opened Flat font, value is its font path, to find the metrics of the font of a span.
+flatFontPaths = {}
+
 class FlatString(BabelString):
 
     BABEL_STRING_TYPE = 'flat'
@@ -48,6 +54,12 @@ class FlatString(BabelString):
             style = {}
         self.style = style
 
+    _text = None # Cached plain text of self. Reset by self.textChanged()
+    _textLayout = None # Cached TextLayout of self. Reset by self.textChanged()
+    _textLayoutBox = None # (w, h) of the cached self._textLayout
+    _runs = None # Cached list of layout runs of the spans of self. Reset by self.textChanged()
+    _runStyles = None # Cached list of the Flat styles of self._runs
+
     def _get_s(self):
         u"""Answer the embedded Flat equivalent of a OSX FormattedString by property, to enforce 
         checking type of the string."""
@@ -56,6 +68,7 @@ class FlatString(BabelString):
         if isinstance(s, str):
             s = s # TODO: Change to Flat equivalent of FormattedString.
         self._s = s
+        self.textChanged()
     s = property(_get_s, _set_s)
 
     def _get_font(self):
@@ -65,6 +78,7 @@ class FlatString(BabelString):
         if fontName is not None:
             self.context.font(fontName)
         self.style['font'] = fontName
+        self.textChanged()
     font = property(_get_font, _set_font)
 
     def _get_fontSize(self):
@@ -74,6 +88,7 @@ class FlatString(BabelString):
         if fontSize is not None:
             self.context.font(fontSize)
         self.style['fontSize'] = fontSize
+        self.textChanged()
     fontSize = property(_get_fontSize, _set_fontSize)
 
     def __len__(self):
@@ -82,12 +97,10 @@ class FlatString(BabelString):
         >>> from pagebot.contexts.flatcontext import FlatContext
         >>> context = FlatContext()
         >>> fs = FlatString('ABC', context)
-        >>> fs
-        ABC
         >>> len(fs)
         3
         """
-        return len(str(self.s))
+        return len(self.asText())
 
     def asText(self):
         u"""Answer as unicode string.
@@ -99,33 +112,246 @@ class FlatString(BabelString):
         'ABC'
         >>> fs.asText()
         'ABC'
+        >>> fs = context.newString('ABC\\nDEF')
+        >>> fs.asText()
+        'ABC\\nDEF'
+        """
+        if self._text is None:
+            paragraphs = getattr(self.s, 'paragraphs', None)
+            if paragraphs is None: # Not a Flat text instance.
+                self._text = u'%s' % self.s
+            else:
+                self._text = u'\n'.join([u''.join([span.string for span in paragraph.spans])
+                    for paragraph in paragraphs])
+        return self._text
+
+    @classmethod
+    def getFontPath(cls, style):
+        u"""Answer the font path of the style, or DEFAULT_FONT_PATH if it does not exist."""
+        font = style.get('font')
+        if font is not None and not isinstance(font, str):
+            font = font.path
+        if font is None or not os.path.exists(font):
+            font = DEFAULT_FONT_PATH
+        return font
+
+    def getSpans(self):
+        u"""Answer the list of Flat spans of all paragraphs of self. Answer an empty list if
+        self.s is not a Flat text instance."""
+        paragraphs = getattr(self.s, 'paragraphs', None)
+        if paragraphs is None:
+            return []
+        return [span for paragraph in paragraphs for span in paragraph.spans]
+
+    def getRuns(self):
+        u"""Answer the list of (start, end, metrics, fontSize, leading) runs of the text of
+        self for its TextLayout, where a run is a sequence of spans with the same Flat style.
+        Answer None if self.s is not a Flat text instance.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC', style=dict(fontSize=12))
+        >>> bs += context.newString('DEF\\nGHI', style=dict(fontSize=24))
+        >>> [(start, end, fontSize) for start, end, _, fontSize, _ in bs.getRuns()]
+        [(0, 3, 12.0), (3, 10, 24.0)]
+        >>> [style.size for style in bs.getRunStyles()]
+        [12.0, 24.0]
+        """
+        if self._runs is None:
+            paragraphs = getattr(self.s, 'paragraphs', None)
+            if paragraphs is None:
+                return None
+            runs = []
+            styles = []
+            start = 0
+            for paragraph in paragraphs:
+                for span in paragraph.spans:
+                    style = span.style
+                    end = start + len(span.string)
+                    if styles and style is styles[-1]: # Same strike, continue the run.
+                        runs[-1] = runs[-1][:1] + (end,) + runs[-1][2:]
+                    else:
+                        fontPath = flatFontPaths.get(style.font) or self.getFontPath(self.style)
+                        runs.append((start, end, getFontMetrics(fontPath), style.size, style.leading))
+                        styles.append(style)
+                    start = end
+                start += 1 # Newline between the paragraphs.
+            self._runs = runs
+            self._runStyles = styles
+        return self._runs
+
+    def getRunStyles(self):
+        u"""Answer the list of Flat styles of the runs of self.getRuns()."""
+        self.getRuns()
+        return self._runStyles or []
+
+    def getTextLayout(self, w=None, h=None):
+        u"""Answer the TextLayout of self, with the lines broken for width w. Without w,
+        each paragraph is a single line. If h is defined, the layout stops after the
+        first line that does not fit. The layout of the last (w, h) is kept in self, until
+        the text changes. Each span is measured with its own font, fontSize and leading.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12))
+        >>> layout = bs.getTextLayout(100)
+        >>> layout, layout is bs.getTextLayout(100)
+        (<TextLayout 4 lines>, True)
+        >>> layout.lines[0]
+        <TextLine y=11.13 w=75.3 "ABC ABC ABC">
+        >>> bs.getTextLayout(100, 20)
+        <TextLayout 2 lines>
+        >>> bs = context.newString('Hello ', style=dict(fontSize=12))
+        >>> bs += context.newString('WORLD', style=dict(fontSize=72))
+        >>> layout = bs.getTextLayout()
+        >>> metrics = layout.metrics
+        >>> layout.w == metrics.getWidth('Hello ', 12) + metrics.getWidth('WORLD', 72)
+        True
+        >>> round(layout.w, 1), round(layout.h, 1)
+        (274.4, 84.4)
         """
-        return str(self.s) # TODO: To be changed to Flat string behavior.
+        layout = self._textLayout
+        if layout is None or self._textLayoutBox != (w, h):
+            style = self.style
+            fontSize = style.get('fontSize', DEFAULT_FONT_SIZE)
+            layout = TextLayout(self.asText(), getFontMetrics(self.getFontPath(style)),
+                fontSize, w=w, h=h, leading=style.get('leading', DEFAULT_LEADING),
+                hyphenation=style.get('hyphenation', True), language=style.get('language'),
+                runs=self.getRuns())
+            self._textLayout = layout
+            self._textLayoutBox = w, h
+        return layout
 
-    def textSize(self, w=None, h=None):
-        u"""Answer the (w, h) size for a given width, with the current text."""
-        return 100, 20
-        # TODO: Make this work in Flat same as in DrawBot
-        #return self.b.textSize(s)
+    def textChanged(self, composite=False):
+        u"""Reset the cached text sizes and text layout of self."""
+        BabelString.textChanged(self, composite)
+        self._text = self._textLayout = self._runs = self._runStyles = None
+
+    def _measureTextSize(self, w=None, h=None):
+        u"""Answer the (w, h) size for a given width, with the current text. The width is the
+        width of the longest line, the height is from the top of the first line to the
+        descender of the last line.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12))
+        >>> bs._measureTextSize(100)
+        (75.298828125, 56.66250000000001)
+        >>> bs._measureTextSize() # Single line
+        (257.94140625, 14.0625)
+        """
+        layout = self.getTextLayout(w)
+        return layout.w, layout.h
 
     def textOverflow(self, w, h, align=LEFT):
-        # TODO: Make this work in Flat same as in DrawBot
-        # TODO: Some stuff needs to get here.
-        return ''
+        u"""Answer the text that does not fit in the box (w, h) as new FlatString with the
+        style of self. The spans of the overflow keep their own style. Answer an empty
+        FlatString if all text fits.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12))
+        >>> bs.textOverflow(100, 30).asText() # 2 lines of 3 words fit.
+        'ABC ABC ABC ABC '
+        >>> overflow = bs.textOverflow(100, 60)
+        >>> overflow.__class__ is bs.__class__, overflow.asText()
+        (True, '')
+        >>> bs = context.newString('Hello ', style=dict(fontSize=12))
+        >>> bs += context.newString('WORLD', style=dict(fontSize=72))
+        >>> overflow = bs.textOverflow(100, 20)
+        >>> overflow.asText(), [(span.string, span.style.size) for span in overflow.getSpans()]
+        ('WORLD', [('WORLD', 72.0)])
+        """
+        layout = self.getTextLayout(w, h)
+        overflowStart = layout.getOverflowStart(h)
+        paragraphs = getattr(self.s, 'paragraphs', None)
+        if paragraphs is None: # Not a Flat text instance, make a new one.
+            return self.newString(layout.getOverflow(h), self.context, style=self.style)
+        if overflowStart is None: # All text fits, answer an empty string with the style of the last span.
+            span = paragraphs[-1].spans[-1]
+            paragraph = paragraphs[-1].__class__([span.__class__(span.style, u'')])
+            overflow = self.__class__(self.context.b.text([paragraph]), self.context, style=self.style)
+            overflow._text = u''
+            overflow._setRunsFrom(self, len(self.asText()))
+            return overflow
+        # Keep the Flat paragraphs that did not start yet, only make a new one for the broken paragraph,
+        # with the parts of its spans from offset.
+        paragraphIndex, offset = overflowStart
+        paragraph = paragraphs[paragraphIndex]
+        spans = []
+        start = 0
+        for span in paragraph.spans:
+            end = start + len(span.string)
+            if end > offset:
+                if start >= offset:
+                    spans.append(span)
+                else:
+                    spans.append(span.__class__(span.style, span.string[offset - start:]))
+            start = end
+        if not spans: # Empty paragraph, keep its last span.
+            spans = paragraph.spans[-1:]
+        text = self.context.b.text([paragraph.__class__(spans)] + paragraphs[paragraphIndex+1:])
+        overflow = self.__class__(text, self.context, style=self.style)
+        overflow._text = layout.getOverflow(h)
+        overflow._setRunsFrom(self, layout.paragraphStarts[paragraphIndex] + offset)
+        return overflow
+
+    def _setRunsFrom(self, bs, start):
+        u"""Set the runs of self to the runs of bs from index start in its text, as self is the
+        overflow of bs. Long texts that flow through many boxes then don't collect the runs of all
+        their spans again for every box."""
+        runs = []
+        styles = []
+        for (runStart, runEnd, metrics, fontSize, leading), style in zip(bs.getRuns(), bs.getRunStyles()):
+            if runEnd > start or runEnd == start and not runs and runEnd == len(bs.asText()):
+                runs.append((max(runStart - start, 0), runEnd - start, metrics, fontSize, leading))
+                styles.append(style)
+        self._runs = runs
+        self._runStyles = styles
+
+    def baseLines(self, x, y, w, h=None):
+        u"""Answer the list of (x, y) baseline positions of the lines that fit in the box
+        (x, y, w, h), with y of the first baseline below the top of the box.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC ' * 10, style=dict(fontSize=12))
+        >>> bs.baseLines(10, 20, 100, 30)
+        [(10, 31.1328125), (10, 45.3328125)]
+        """
+        return [(x, y + baseline) for baseline in self.getTextLayout(w, h).getBaselines(h)]
 
     def append(self, s):
-        u"""Append string or FlatString to self."""
-        # TODO: Make this to work.
-        #try:
-        #    self.s += s.s
-        #except TypeError:
-        #    self.s += repr(s) # Convert to babel string, whatever it is.
+        u"""Append string or FlatString to self. The first paragraph of s continues the last
+        paragraph of self, the other paragraphs of s are added. Plain strings get the style of self.
+        The paragraphs are not changed in place, as they can be shared with overflow strings.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> bs = context.newString('ABC', style=dict(fontSize=12))
+        >>> bs += context.newString('DEF\\nGHI', style=dict(fontSize=14))
+        >>> bs += 'JKL'
+        >>> bs.asText(), len(bs.s.paragraphs)
+        ('ABCDEF\\nGHIJKL', 2)
+        """
+        if not isinstance(s, FlatString):
+            s = self.newString(u'%s' % s, self.context, style=self.style)
+        paragraphs = getattr(self.s, 'paragraphs', None)
+        sParagraphs = getattr(s.s, 'paragraphs', None)
+        if paragraphs is None or sParagraphs is None: # Not both Flat text instances.
+            self.s = u'%s%s' % (self.asText(), s.asText())
+        else:
+            paragraph = paragraphs[-1]
+            paragraph = paragraph.__class__(list(paragraph.spans) + list(sParagraphs[0].spans))
+            self.s = self.context.b.text(paragraphs[:-1] + [paragraph] + sParagraphs[1:])
+        self.textChanged(composite=True)
 
     MARKER_PATTERN = '==%s@%s=='
     FIND_FS_MARKERS = re.compile('\=\=([a-zA-Z0-9_\:\.]*)\@([^=]*)\=\=')
 
     def appendMarker(self, markerId, arg):
         u"""Append an invisible marker string."""
+        self.textChanged(composite=True)
 
     def findMarkers(self, reCompiled=None):
         u"""Answer a dictionary of markers with their arguments in self.s."""
@@ -144,6 +370,10 @@ class FlatString(BabelString):
         >>> context = FlatContext()
         >>> bs = FlatString.newString('AAA', context, style=dict(fontSize=30))
         >>> #bs.s.lines()
+        >>> bs = FlatString.newString('AAA', context, style=dict(textFill=(1, 0, 0)))
+        >>> color = bs.getSpans()[0].style.color
+        >>> color.r, color.g, color.b
+        (255, 0, 0)
         """
         if style is None:
             style = {}
@@ -162,15 +392,20 @@ class FlatString(BabelString):
         # using Tal's https://github.com/typesupply/compositor
         # This needs to be installed, in case PageBot is running outside of DrawBot.
 
-        font = style.get('font')
-        if font is not None and not isinstance(font, str):
-            font = font.path
-        if font is None or not os.path.exists(font):
-            font = DEFAULT_FONT_PATH
-        flatFont = context.b.font.open(font)
+        fontPath = cls.getFontPath(style)
+        flatFont = flatFonts.get(fontPath)
+        if flatFont is None:
+            flatFont = flatFonts[fontPath] = context.b.font.open(fontPath)
+            flatFontPaths[flatFont] = fontPath
         strike = context.b.strike(flatFont)
         strike.size(style.get('fontSize', DEFAULT_FONT_SIZE),
             style.get('leading', DEFAULT_LEADING), units='pt')
+        textFill = css('textFill', e, style)
+        if textFill is not None and textFill is not NO_COLOR:
+            context.save()
+            context.fill(textFill) # Convert to the Flat color.
+            strike.color(context._fill)
+            context.restore()
         #if w is not None:
         #    strike.width = w
         return cls(strike.text(s), context=context, style=style) # Make real Flat flavor BabelString here.
@@ -0,0 +1,463 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     textlayout.py
+#
+#     Line breaking and text measurement for contexts that have no text layout
+#     engine of their own, such as Flat. Advance widths come from the hmtx table
+#     of the font, kerning from the same Kerning reader as Font.kerning.
+#     Paragraphs are broken greedily into lines, words that do not fit are
+#     hyphenated with the dictionaries of pagebot.toolbox.hyphenation.
+#     Widths of words (glyph runs) are cached per font and the line breaks of
+#     paragraphs are cached per (text, font, fontSize, width, language), so
+#     flowing the same text again through boxes of the same width is cheap.
+#
+import re
+
+from fontTools.misc.py23 import unichr
+from fontTools.ttLib import TTFont
+from pagebot.contexts.strings.babelstring import LRUCache
+from pagebot.fonttoolbox.kerning import Kerning
+from pagebot.toolbox.hyphenation import hyphenate
+
+WORDS = re.compile(r'\S+')
+WORD_PARTS = re.compile(r'^(\W*)(.*?)(\W*)$') # Leading punctuation, word, trailing punctuation.
+HYPHEN = u'-'
+
+# Key is font path, value is FontMetrics instance.
+fontMetrics = {}
+# Shared cache of paragraph line breaks, key is (text, fontPath, fontSize, w, hyphenation, language)
+paragraphCache = LRUCache(maxSize=4096)
+
+def getFontMetrics(path):
+    u"""Answer the cached FontMetrics instance of the font at path.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> metrics = getFontMetrics(getFontPathOfFont('Roboto-Regular'))
+    >>> metrics is getFontMetrics(metrics.path)
+    True
+    """
+    metrics = fontMetrics.get(path)
+    if metrics is None:
+        metrics = fontMetrics[path] = FontMetrics(path)
+    return metrics
+
+class FontMetrics(object):
+    u"""Horizontal metrics of a font file in font units: the advance width of every
+    character, the kerning of glyph pairs and the hhea ascender and descender.
+    Widths of words are cached, as they repeat a lot in running text.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> metrics = FontMetrics(getFontPathOfFont('Roboto-Regular'))
+    >>> metrics
+    <FontMetrics Roboto-Regular.ttf>
+    >>> metrics.unitsPerEm, metrics.ascender, metrics.descender
+    (2048, 1900, -500)
+    >>> metrics.getWidth('To') < metrics.getWidth('T') + metrics.getWidth('o') # Kerned pair
+    True
+    >>> metrics.getWidth('Hello', 12) == metrics.getWidth('Hello') * 12 / 2048
+    True
+    """
+    MAX_WIDTHS = 100000 # Maximum number of cached word widths.
+
+    def __init__(self, path):
+        self.path = path
+        ttFont = TTFont(path, lazy=True)
+        self.unitsPerEm = ttFont['head'].unitsPerEm
+        self.ascender = ttFont['hhea'].ascent
+        self.descender = ttFont['hhea'].descent
+        hmtx = ttFont['hmtx'].metrics
+        self.defaultAdvance = hmtx[ttFont.getGlyphOrder()[0]][0] # Width of .notdef
+        self.glyphNames = {} # Key is character, value is glyph name.
+        self.advances = {} # Key is character, value is advance width.
+        for unicode, glyphName in (ttFont.getBestCmap() or {}).items():
+            c = unichr(unicode)
+            self.glyphNames[c] = glyphName
+            self.advances[c] = hmtx[glyphName][0]
+        self.kerning = Kerning(ttFont)
+        self._widths = {}
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.path.split('/')[-1])
+
+    def getWidth(self, s, fontSize=None):
+        u"""Answer the kerned width of string s, in font units or scaled to fontSize."""
+        width = self._widths.get(s)
+        if width is None:
+            if len(self._widths) >= self.MAX_WIDTHS:
+                self._widths = {}
+            advances = self.advances
+            defaultAdvance = self.defaultAdvance
+            width = sum([advances.get(c, defaultAdvance) for c in s])
+            if len(s) > 1 and self.kerning:
+                glyphNames = self.glyphNames
+                width += sum(self.kerning.kernSequence([glyphNames.get(c) for c in s]))
+            self._widths[s] = width
+        if fontSize is None:
+            return width
+        return width * fontSize / self.unitsPerEm
+
+class TextLine(object):
+    u"""Line of a TextLayout. Start and end are the indices of the line in the text,
+    s is the string to show, including a hyphen if the line ends in a broken word.
+    The baseline y is measured from the top of the layout, going down. Descender is
+    the (negative) largest descender of the runs in the line. Paragraph is the index
+    of the paragraph that the line is part of."""
+    __slots__ = ('s', 'start', 'end', 'w', 'y', 'descender', 'hyphenated', 'paragraph')
+
+    def __init__(self, s, start, end, w, y, descender=0, hyphenated=False, paragraph=0):
+        self.s = s
+        self.start = start
+        self.end = end
+        self.w = w
+        self.y = y
+        self.descender = descender
+        self.hyphenated = hyphenated
+        self.paragraph = paragraph
+
+    def __repr__(self):
+        return '<%s y=%s w=%s "%s">' % (self.__class__.__name__, round(self.y, 2), round(self.w, 2), self.s)
+
+class TextLayout(object):
+    u"""Layout of text in lines of width w (or unlimited if w is None), for the font
+    of metrics at fontSize. Paragraphs are separated by newlines. The first baseline
+    is at the ascender, following baselines are at leading distance.
+    If leading is 0 or None, then it is 1.1*fontSize + 1, the same as Flat uses.
+    If h is defined, then the layout stops at the first line that does not fit, so
+    flowing a long text through boxes only breaks the lines that are needed.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> metrics = getFontMetrics(getFontPathOfFont('Roboto-Regular'))
+    >>> s = 'The apartment building offers housing\\nfor many people.'
+    >>> layout = TextLayout(s, metrics, 10, w=100)
+    >>> for line in layout.lines: print(line)
+    <TextLine y=9.28 w=92.4 "The apartment build-">
+    <TextLine y=21.28 w=80.49 "ing offers housing">
+    <TextLine y=33.28 w=74.6 "for many people.">
+    >>> layout.h == layout.lines[-1].y + 500 * 10 / 2048
+    True
+    >>> layout.getOverflow(30) # Only 2 lines fit.
+    'for many people.'
+    >>> layout.getOverflow(20)
+    'ing offers housing\\nfor many people.'
+    >>> layout.getOverflow(100)
+    ''
+    >>> layout.getBaselines(30)
+    [9.27734375, 21.27734375]
+    >>> TextLayout(s, metrics, 10, w=100, hyphenation=False).lines[0]
+    <TextLine y=9.28 w=65.52 "The apartment">
+    >>> layout = TextLayout(s, metrics, 10) # Unlimited width, lines are paragraphs.
+    >>> len(layout.lines), round(layout.w, 2)
+    (2, 170.13)
+    >>> layout = TextLayout(s, metrics, 10, w=100, h=20) # Stop after the first line that does not fit.
+    >>> len(layout.lines), layout.getOverflow(20), layout.getOverflowStart(20)
+    (2, 'ing offers housing\\nfor many people.', (0, 19))
+
+    Runs are (start, end, metrics, fontSize, leading) tuples of the parts of the text
+    that have their own font, fontSize or leading. Each line gets the largest ascender,
+    descender and leading of the runs in it.
+
+    >>> s = 'Hello WORLD'
+    >>> runs = [(0, 6, metrics, 12, 14.2), (6, 11, metrics, 72, 80.2)]
+    >>> layout = TextLayout(s, metrics, 12, runs=runs)
+    >>> round(layout.w, 1), round(layout.h, 1)
+    (274.4, 84.4)
+    >>> round(layout.w, 1) == round(metrics.getWidth('Hello ', 12) + metrics.getWidth('WORLD', 72), 1)
+    True
+    >>> [(runIndex, round(x, 2), s) for runIndex, x, s in layout.getLineRuns(layout.lines[0])]
+    [(0, 0, 'Hello '), (1, 30.58, 'WORLD')]
+    >>> layout = TextLayout(s, metrics, 12, w=100, runs=runs)
+    >>> [(line.s, round(line.y, 2)) for line in layout.lines]
+    [('Hello', 11.13), ('WORLD', 91.33)]
+    """
+    def __init__(self, text, metrics, fontSize, w=None, h=None, leading=None, hyphenation=True, language=None,
+            runs=None):
+        self.text = text
+        self.metrics = metrics
+        self.fontSize = fontSize
+        self.leading = leading or 1.1*fontSize + 1
+        self.hyphenation = hyphenation
+        self.language = language or 'en'
+        self.lines = []
+        self.paragraphStarts = [] # Index in text of each paragraph that has lines in the layout.
+        self.w = 0 # Width of the longest line.
+        scale = float(fontSize) / metrics.unitsPerEm
+        self.ascender = metrics.ascender * scale
+        self.descender = metrics.descender * scale # Negative value.
+        if runs is None:
+            runs = [(0, len(text), metrics, fontSize, self.leading)]
+        self.runs = runs
+        self._fontRuns = self._getFontRuns(runs)
+        self._layout(w, h)
+
+    def _getFontRuns(self, runs):
+        u"""Answer the list of runs, where adjacent runs with the same metrics, fontSize and
+        leading are merged, so they are measured as one string, including their kerning."""
+        fontRuns = []
+        for start, end, metrics, fontSize, leading in runs:
+            if fontRuns:
+                _, prevEnd, prevMetrics, prevFontSize, prevLeading = fontRuns[-1]
+                if prevMetrics is metrics and prevFontSize == fontSize and prevLeading == leading:
+                    fontRuns[-1] = fontRuns[-1][0], end, metrics, fontSize, leading
+                    continue
+            fontRuns.append((start, end, metrics, fontSize, leading))
+        return fontRuns
+
+    def _getParagraphRuns(self, start, end):
+        u"""Answer the font runs of the paragraph from start to end in the text, with
+        their indices relative to the paragraph. A paragraph without text gets the run of
+        the text before it."""
+        fontRuns = self._fontRuns
+        if len(fontRuns) == 1:
+            _, _, metrics, fontSize, leading = fontRuns[0]
+            return [(0, end - start, metrics, fontSize, leading)]
+        paragraphRuns = []
+        for runStart, runEnd, metrics, fontSize, leading in fontRuns:
+            if runEnd > start and runStart < end:
+                paragraphRuns.append((max(runStart, start) - start, min(runEnd, end) - start,
+                    metrics, fontSize, leading))
+        if not paragraphRuns:
+            runStart, runEnd, metrics, fontSize, leading = fontRuns[0]
+            for run in fontRuns:
+                if run[0] > start:
+                    break
+                runStart, runEnd, metrics, fontSize, leading = run
+            paragraphRuns.append((0, end - start, metrics, fontSize, leading))
+        return paragraphRuns
+
+    def _getLineMetrics(self, runs, start, end):
+        u"""Answer the (ascender, descender, leading) of the line from start to end in the
+        paragraph with runs, as the largest values of the runs in the line."""
+        lineRuns = [run for run in runs if run[0] < end and run[1] > start] or runs[:1] # Empty line has first run.
+        ascender = descender = leading = None
+        for _, _, metrics, fontSize, runLeading in lineRuns:
+            scale = float(fontSize) / metrics.unitsPerEm
+            if ascender is None:
+                ascender, descender, leading = metrics.ascender * scale, metrics.descender * scale, runLeading
+            else:
+                ascender = max(ascender, metrics.ascender * scale)
+                descender = min(descender, metrics.descender * scale)
+                leading = max(leading, runLeading)
+        return ascender, descender, leading
+
+    def _layout(self, w, h):
+        text = self.text
+        y = None
+        start = 0
+        singleRun = len(self._fontRuns) == 1
+        if singleRun:
+            lineMetrics = self.ascender, self.descender, self.leading
+        while start <= len(text):
+            end = text.find('\n', start)
+            if end == -1:
+                end = len(text)
+            paragraph = text[start:end]
+            paragraphIndex = len(self.paragraphStarts)
+            self.paragraphStarts.append(start)
+            runs = self._getParagraphRuns(start, end)
+            for lineStart, lineEnd, lineWidth, hyphenated in self._getParagraphLines(paragraph, runs, w):
+                s = paragraph[lineStart:lineEnd]
+                if hyphenated:
+                    s += HYPHEN
+                if not singleRun:
+                    lineMetrics = self._getLineMetrics(runs, lineStart, lineEnd)
+                ascender, descender, leading = lineMetrics
+                if y is None:
+                    y = ascender # First baseline.
+                else:
+                    y += leading
+                self.lines.append(TextLine(s, start + lineStart, start + lineEnd, lineWidth, y, descender,
+                    hyphenated, paragraphIndex))
+                self.w = max(self.w, lineWidth)
+                if h is not None and y - descender > h:
+                    return # This line does not fit, no need to continue.
+            start = end + 1
+
+    def __repr__(self):
+        return '<%s %d lines>' % (self.__class__.__name__, len(self.lines))
+
+    def _get_h(self):
+        u"""Answer the height of the text, from the top of the first line to the descender of
+        the last line."""
+        if not self.lines:
+            return 0
+        line = self.lines[-1]
+        return line.y - line.descender
+    h = property(_get_h)
+
+    def _getParagraphLines(self, paragraph, runs, w):
+        u"""Answer the cached list of (start, end, width, hyphenated) tuples of the lines
+        of the paragraph."""
+        key = (paragraph, tuple([(start, end, metrics.path, fontSize) for start, end, metrics, fontSize, _ in runs]),
+            w, self.hyphenation, self.language)
+        lines = paragraphCache.get(key)
+        if lines is None:
+            lines = self._breakParagraph(paragraph, runs, w)
+            paragraphCache.set(key, lines)
+        return lines
+
+    def _getWidth(self, paragraph, runs, start, end, hyphenated=False):
+        u"""Answer the width of paragraph[start:end] with the fonts of runs, including a
+        hyphen in the font of the last character if hyphenated."""
+        if len(runs) == 1:
+            _, _, metrics, fontSize, _ = runs[0]
+            s = paragraph[start:end]
+            if hyphenated:
+                s += HYPHEN
+            return metrics.getWidth(s, fontSize)
+        width = 0
+        for runStart, runEnd, metrics, fontSize, _ in runs:
+            if runStart < end and runEnd > start:
+                pieceEnd = min(runEnd, end)
+                s = paragraph[max(runStart, start):pieceEnd]
+                if hyphenated and pieceEnd == end:
+                    s += HYPHEN
+                width += metrics.getWidth(s, fontSize)
+        return width
+
+    def _getSpaceWidth(self, runs, index):
+        u"""Answer the width of a space in the run at index of the paragraph."""
+        for _, runEnd, metrics, fontSize, _ in runs:
+            if index < runEnd:
+                break
+        return metrics.getWidth(u' ', fontSize)
+
+    def _breakParagraph(self, paragraph, runs, w):
+        u"""Answer the list of (start, end, width, hyphenated) tuples of the lines of the
+        paragraph, broken greedily to fit width w. Words that are too long for the rest of
+        the line are hyphenated, if possible. Words that are too long for a single line
+        keep overflowing the line width."""
+        getWidth = self._getWidth
+        singleRun = len(runs) == 1
+        _, _, metrics, fontSize, _ = runs[0]
+        getWordWidth = metrics.getWidth # Words of a single run are measured directly, as it is the most common.
+        spaceWidth = self._getSpaceWidth(runs, 0)
+        lines = []
+        lineStart = lineEnd = None
+        lineWidth = 0
+        for match in WORDS.finditer(paragraph):
+            wordStart, wordEnd = match.span()
+            if singleRun:
+                wordWidth = getWordWidth(match.group(), fontSize)
+            else:
+                wordWidth = getWidth(paragraph, runs, wordStart, wordEnd)
+            if lineStart is None: # First word of the paragraph.
+                lineStart, lineEnd, lineWidth = wordStart, wordEnd, wordWidth
+                continue
+            if not singleRun:
+                spaceWidth = self._getSpaceWidth(runs, wordStart - 1)
+            if w is None or lineWidth + spaceWidth + wordWidth <= w:
+                lineEnd = wordEnd
+                lineWidth += spaceWidth + wordWidth
+                continue
+            if self.hyphenation:
+                # Try to fit the first syllables of the word in the rest of the line.
+                split = self._hyphenate(paragraph, runs, wordStart, wordEnd, w - lineWidth - spaceWidth)
+                if split is not None:
+                    prefixLength, prefixWidth = split
+                    lines.append((lineStart, wordStart + prefixLength, lineWidth + spaceWidth + prefixWidth, True))
+                    lineStart = wordStart + prefixLength
+                    lineEnd = wordEnd
+                    lineWidth = getWidth(paragraph, runs, lineStart, wordEnd)
+                    continue
+            lines.append((lineStart, lineEnd, lineWidth, False))
+            lineStart, lineEnd, lineWidth = wordStart, wordEnd, wordWidth
+        if lineStart is None: # Empty paragraph, still takes a line.
+            lines.append((0, 0, 0, False))
+        else:
+            lines.append((lineStart, lineEnd, lineWidth, False))
+        return lines
+
+    def _hyphenate(self, paragraph, runs, wordStart, wordEnd, w):
+        u"""Answer the (length, width) tuple of the longest start of the word from wordStart
+        to wordEnd in paragraph that fits in w, including the hyphen. Answer None if the word
+        cannot be hyphenated or if no start fits."""
+        if w <= 0:
+            return None
+        head, core, _ = WORD_PARTS.match(paragraph[wordStart:wordEnd]).groups()
+        if not core:
+            return None
+        hyphenated = hyphenate(core, self.language)
+        if not hyphenated or not HYPHEN in hyphenated:
+            return None
+        syllables = hyphenated.split(HYPHEN)
+        length = len(head)
+        result = None
+        for syllable in syllables[:-1]:
+            length += len(syllable)
+            width = self._getWidth(paragraph, runs, wordStart, wordStart + length, hyphenated=True)
+            if width > w:
+                break
+            result = length, width
+        return result
+
+    def getLineRuns(self, line):
+        u"""Answer the list of (runIndex, x, s) tuples of the parts of line, where runIndex
+        is the index of the run in self.runs, x is the position of s from the start of the
+        line. A hyphen is added to the last part of a hyphenated line."""
+        runs = self.runs
+        if len(runs) == 1:
+            return [(0, 0, line.s)]
+        paragraphStart = self.paragraphStarts[line.paragraph]
+        paragraph = self.text[paragraphStart:line.end]
+        fontRuns = self._getParagraphRuns(paragraphStart, line.end)
+        start, end = line.start - paragraphStart, line.end - paragraphStart
+        lineRuns = []
+        for runIndex, (runStart, runEnd, _, _, _) in enumerate(runs):
+            runStart = max(runStart - paragraphStart, start)
+            runEnd = min(runEnd - paragraphStart, end)
+            if runStart < runEnd:
+                s = paragraph[runStart:runEnd]
+                if line.hyphenated and runEnd == end:
+                    s += HYPHEN
+                x = self._getWidth(paragraph, fontRuns, start, runStart)
+                lineRuns.append((runIndex, x, s))
+        return lineRuns
+
+    def getFittingLines(self, h=None):
+        u"""Answer the list of lines that fit in height h, including their descender."""
+        if h is None:
+            return self.lines
+        fitting = []
+        for line in self.lines:
+            if line.y - line.descender > h:
+                break
+            fitting.append(line)
+        return fitting
+
+    def getOverflowStart(self, h):
+        u"""Answer the (paragraphIndex, offset) tuple of the first line that does not fit in
+        height h, where offset is the index in the paragraph. Answer None if all text fits."""
+        fitting = self.getFittingLines(h)
+        if len(fitting) == len(self.lines):
+            return None
+        line = self.lines[len(fitting)]
+        return line.paragraph, line.start - self.paragraphStarts[line.paragraph]
+
+    def getOverflow(self, h):
+        u"""Answer the text that does not fit in height h. Answer an empty string if all
+        text fits."""
+        fitting = self.getFittingLines(h)
+        if len(fitting) == len(self.lines):
+            return ''
+        return self.text[self.lines[len(fitting)].start:]
+
+    def getBaselines(self, h=None):
+        u"""Answer the list of baseline y positions of the lines that fit in height h,
+        measured from the top of the layout."""
+        return [line.y for line in self.getFittingLines(h)]
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
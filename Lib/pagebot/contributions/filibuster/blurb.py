@@ -55,10 +55,25 @@ class Blurb(object):
         """
         return self.writer.keywords
 
-blurb = Blurb() # Make the single instance of Blurb.
+_blurb = None # The single instance of Blurb, made on first use.
+
+def getBlurb():
+    u"""Answer the single instance of Blurb. It is made on first use, as it builds the writer
+    from all content modules."""
+    global _blurb
+    if _blurb is None:
+        _blurb = Blurb()
+    return _blurb
+
+def __getattr__(name):
+    u"""Answer the single instance for "from pagebot.contributions.filibuster.blurb import blurb"
+    (PEP 562), so importing this module does not make it."""
+    if name == 'blurb':
+        return getBlurb()
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
 
 if __name__ == '__main__':
-    w = blurb
+    w = getBlurb()
     for t in w.getBlurbTypes():
         print(t, w.getBlurb(t))
 
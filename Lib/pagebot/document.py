@@ -17,9 +17,12 @@
 import copy
 from pagebot.stylelib import styleLib # Library with named, predefined style dicts.
 from pagebot.conditions.score import Score
+from pagebot.conditions.solver import IncrementalSolver
+from pagebot.elements.elementindex import ElementIndex, getTreePath
 from pagebot.elements.pbpage import Page, Template
-from pagebot.elements.views import viewClasses, defaultViewClass
-from pagebot.style import getRootStyle, TOP, BOTTOM
+from pagebot.elements.views import viewClasses, DEFAULT_VIEWID
+from pagebot.pageindex import PageIndex
+from pagebot.style import getRootStyle, StyleDict, TOP, BOTTOM
 from pagebot.toolbox.transformer import obj2StyleId
 
 class Document(object):
@@ -52,7 +55,7 @@ class Document(object):
     """    
     PAGE_CLASS = Page # Allow inherited versions of the Page class.
     
-    DEFAULT_VIEWID = defaultViewClass.viewId
+    DEFAULT_VIEWID = DEFAULT_VIEWID
 
     def __init__(self, styles=None, theme=None, viewId=None, name=None, title=None, pages=None, autoPages=1, 
             template=None, templates=None, originTop=True, startPage=1, w=None, h=None, 
@@ -74,7 +77,8 @@ class Document(object):
         self.name = name or title or 'Untitled'
         self.title = title or self.name
 
-        self.pages = {} # Key is pageNumber, Value is row list of pages: self.pages[pn][index] = page
+        self.pages = PageIndex() # Key is pageNumber, Value is row list of pages: self.pages[pn][index] = page
+        self.elementIndex = ElementIndex() # Elements on the pages by eId, name and class name.
         for page in pages or []: # In case there are pages defined on init, add them.
             self.appendPage(page, startPage)
 
@@ -98,6 +102,8 @@ class Document(object):
             lib = {}
         self._lib = lib
 
+        self._solver = None # Optional IncrementalSolver, created by self.solver when needed.
+
         # Document (w, h) size is default from page, but will modified by the type of display mode. 
         if autoPages:
             self.makePages(pageCnt=autoPages, pn=startPage, w=self.w, h=self.h, **kwargs)
@@ -167,9 +173,8 @@ class Document(object):
             pn, index = pnIndex, 0 # Default is left page on pn row.
         return self.pages[pn][index]
     def __setitem__(self, pn, page):
-        if not pn in self.pages:
-            self.pages[pn] = []
-        self.pages[pn].append(page)
+        self.pages.append(pn, page)
+        self.elementIndex.add(page)
    
     def _get_ancestors(self):
         u"""Root of the chain of element properties, searching upward in the ancestors tree.
@@ -315,7 +320,22 @@ class Document(object):
         for name, v in kwargs.items():
             if name in rootStyle: # Only overwrite existing values.
                 rootStyle[name] = v 
-        return rootStyle
+        # Changes in the root style need to be noticed by cached css values of elements.
+        return StyleDict(rootStyle)
+
+    def _get_styleStamp(self):
+        u"""Answer the generation stamp of the latest change in self.rootStyle, as root of
+        the cascading css values of all elements. Answer None if the root style was replaced
+        by a plain dictionary, so element caches cannot be validated.
+
+        >>> doc = Document(name='TestDoc')
+        >>> stamp = doc._styleStamp
+        >>> doc.rootStyle['fontSize'] = 123
+        >>> doc._styleStamp > stamp
+        True
+        """
+        return getattr(self.rootStyle, 'stamp', None)
+    _styleStamp = property(_get_styleStamp)
 
     def applyStyle(self, style):
         u"""Apply the key-value of the style onto the self.rootStyle. This overwrites existing style
@@ -707,8 +727,8 @@ class Document(object):
         """
         if page.isPage:
             page.setParent(self) # Set parent as weakref, without calling self.appendElement again.
-            if self.pages.keys():
-                pn = max(self.pages.keys())+1
+            if self.pages.maxPn is not None:
+                pn = self.pages.maxPn+1
             else:
                 pn = startPage
             self[pn] = page
@@ -717,6 +737,46 @@ class Document(object):
     
     appendElement = appendPage
 
+    def elementRenamed(self, page, oldName):
+        u"""Called by page after its name changed from oldName, to update the page index
+        and the element index."""
+        self.pages.rename(page, oldName, page.name)
+        self.elementIndex.rename(page)
+
+    def getElement(self, eId):
+        u"""Answer the element with eId on any of the pages, or the page with eId. Answer None
+        if it cannot be found.
+
+        >>> from pagebot.elements.element import Element
+        >>> doc = Document(autoPages=3)
+        >>> e = Element(parent=doc[2])
+        >>> doc.getElement(e.eId) is e, doc.getElement(doc[3].eId) is doc[3], doc.getElement('FalseId')
+        (True, True, None)
+        """
+        return self.elementIndex.get(eId)
+
+    def findElements(self, name=None, cls=None):
+        u"""Answer the list of elements on all pages with name and/or with exact class cls, which
+        is a class or a class name. The elements are in order of their pages, and in depth-first
+        order on each page.
+
+        >>> from pagebot.elements.element import Element
+        >>> from pagebot.elements.pbrect import Rect
+        >>> doc = Document(autoPages=3)
+        >>> e3 = Rect(name='Box', parent=doc[3])
+        >>> e1 = Element(name='Box', parent=doc[1])
+        >>> e2 = Rect(name='Box', parent=e1)
+        >>> doc.findElements(name='Box') == [e1, e2, e3], doc.findElements(name='Box', cls=Rect) == [e2, e3]
+        (True, True)
+        >>> doc.findElements(cls='Rect') == [e2, e3]
+        True
+        """
+        index = self.elementIndex
+        def getOrder(e):
+            page = index.getPage(e)
+            return self.pages.getPosition(page) or (), getTreePath(e, page)
+        return sorted(index.findElements(name=name, cls=cls), key=getOrder)
+
     def getPage(self, pnOrName, index=0):
         u"""Answer the page at (pn, index). Otherwise search for a page with this name. 
         Raise index errors if it does not exist."""
@@ -741,18 +801,16 @@ class Document(object):
         return self.pages[pn]
 
     def findPages(self, eId=None, name=None, pattern=None, pageSelection=None):
-        u"""Various ways to find pages from their attributes."""
-        pages = []
-        for pn, pnPages in sorted(self.pages.items()):
-            if not pageSelection is None and not pn in pageSelection:
-                continue
-            for page in pnPages: # List of pages with identical pn
-                if eId == page.eId:
-                    return [page]
-                if (name is not None and name == page.name) or \
-                       pattern is not None and page.name is not None and pattern in page.name:
-                    pages.append(page)
-        return pages
+        u"""Various ways to find pages from their attributes. Answer the list of pages in page order.
+
+        >>> doc = Document(name='TestDoc', autoPages=10)
+        >>> doc[3].name = doc[7].name = 'Chapter'
+        >>> [doc.getPageNumber(page) for page in doc.findPages(name='Chapter')]
+        ['3', '7']
+        >>> doc.findPages(eId=doc[5].eId) == [doc[5]], doc.findPages(name='Chapter', pageSelection=[7]) == [doc[7]]
+        (True, True)
+        """
+        return self.pages.findPages(eId=eId, name=name, pattern=pattern, pageSelection=pageSelection)
 
     def isLeft(self):
         u"""This is reached for e.isleft() queries, when elements are not placed on a page.
@@ -779,10 +837,10 @@ class Document(object):
         >>> doc.isLeftPage(page)
         True
         """
-        for pn, pnPages in self.pages.items():
-            if page in pnPages:
-                return pn % 2 == 0 
-        return False # Page not found
+        position = self.pages.getPosition(page)
+        if position is None:
+            return False # Page not found
+        return position[0] % 2 == 0
 
     def isRightPage(self, page):
         u"""Answer the boolean flag if the page is currently defined as a left page. 
@@ -796,10 +854,10 @@ class Document(object):
         >>> doc.isRightPage(page)
         False
         """
-        for pn, pnPages in self.pages.items():
-            if page in pnPages:
-                return pn % 2 == 1
-        return False # Page not found
+        position = self.pages.getPosition(page)
+        if position is None:
+            return False # Page not found
+        return position[0] % 2 == 1
 
     def newPage(self, pn=None, template=None, w=None, h=None, name=None, **kwargs):
         u"""Create a new page with size (self.w, self.h) unless defined otherwise. 
@@ -852,13 +910,9 @@ class Document(object):
         >>> doc.getPageNumber(next)
         '5'
         """
-        found = False
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, pg in enumerate(pnPages):
-                if found:
-                    return pg
-                if pg.eId == page.eId:
-                    found = True
+        pg = self.pages.nextPage(page)
+        if pg is not None:
+            return pg
         # Not found, create new one?
         if makeNew:
             return self.newPage()
@@ -867,36 +921,20 @@ class Document(object):
     def getPageNumber(self, page):
         u"""Answer a string with the page number pn, if the page can be found. If the page has index > 0:
         then answer page format "pn-index". pn and index are incremented by 1.
-        TODO: Make a reversed table if this squential search shows to be slow in the future with large docs.
         """
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, pg in enumerate(pnPages):
-                if pg is page:
-                    if index:
-                        return '%d-%d' % (pn, index)
-                    return '%d' % (pn)
-        return ''
+        return self.pages.getPageNumber(page)
 
     def getFirstPage(self):
         u"""Answer the list of pages with the lowest sorted page.y. Answer empty list if there are no pages."""
-        for pn, pnPages in sorted(self.pages.items()):
-            for index, page in enumerate(pnPages):
-                return page
-        return None
+        return self.pages.first
 
     def getLastPage(self):
-        u"""Answer last page with the highest sorted page.y. Answer empty list if there are no pages."""
-        pn = sorted(self.pages.keys())[-1]
-        return self.pages[pn][-1]
+        u"""Answer last page with the highest sorted page.y. Answer None if there are no pages."""
+        return self.pages.last
 
     def getSortedPages(self, pageSelection=None):
         u"""Answer the dynamic list of pages, sorted by y, x and index."""
-        pages = [] # List of (pn, pnPages) tuples of pages with the same page number.
-        for pn, pnPages in sorted(self.pages.items()):
-            if pageSelection is not None and not pn in pageSelection:
-                continue
-            pages.append((pn, pnPages))
-        return pages
+        return self.pages.getSortedPages(pageSelection) # List of (pn, pnPages) tuples of pages with the same page number.
 
     def getMaxPageSizes(self, pageSelection=None):
         u"""Answer the (w, h, d) size of all pages together. If the optional pageSelection is defined (set of y-values),
@@ -927,22 +965,43 @@ class Document(object):
 
     #   C O N D I T I O N S
 
-    def solve(self, score=None):
+    def solve(self, score=None, incremental=False):
         u"""Evaluate the content of all pages to return the total sum of conditions solving.
         If necessary, the builder for solving specific text conditions, such as
         run length of text and overflow of text boxes, is found by the current self.view.b.
+        If incremental is True, then use self.solver to only solve the elements that changed
+        since the previous incremental solve, or that depend on changed values, repeating until
+        a fixed point is reached. The report of the passes is stored in score.report.
 
         >>> doc = Document(name='TestDoc', w=300, h=400, autoPages=2, padding=(30, 40, 50, 60))
         >>> score = doc.solve()
         >>> score
         Score: 0 Fails: 0
+        >>> score = doc.solve(incremental=True)
+        >>> score, score.report
+        (Score: 0 Fails: 0, SolveReport: 1 passes, 0 solved, converged)
         """
-        score = Score()
-        for pn, pnPages in sorted(self.pages.items()):
+        if score is None:
+            score = Score()
+        if incremental:
+            return self.solver.solve(score)
+        for pn, pnPages in self.pages.items(): # Sorted by page number.
             for page in pnPages: # List of pages with identical pn, step through the pages.
                 page.solve(score)
         return score
 
+    def _get_solver(self):
+        u"""Answer the IncrementalSolver of self. Create it if it does not exist.
+
+        >>> doc = Document(name='TestDoc')
+        >>> doc.solver is doc.solver
+        True
+        """
+        if self._solver is None:
+            self._solver = IncrementalSolver(self)
+        return self._solver
+    solver = property(_get_solver)
+
     #   V I E W S
 
     def getView(self, viewId=None, create=True):
@@ -986,8 +1045,10 @@ class Document(object):
     
     #   D R A W I N G  &  B U I L D I N G
 
-    def build(self, path=None, pageSelection=None, multiPage=True):
+    def build(self, path=None, pageSelection=None, multiPage=True, processes=None):
         u"""Build the document as website, using the document.view for export.
+        If processes is defined, the view may build the pages in parallel, e.g. the
+        PageView renders png, jpg and svg pages by a pool of processes.
 
         >>> doc = Document(name='TestDoc', w=300, h=400, autoPages=1, padding=(30, 40, 50, 60))
         >>> doc.view # PageView is default.
@@ -997,9 +1058,12 @@ class Document(object):
         >>> doc.view
         <SiteView:Site (0, 0)>
         """
-        self.view.build(path, pageSelection=pageSelection, multiPage=multiPage)
+        if processes is None:
+            self.view.build(path, pageSelection=pageSelection, multiPage=multiPage)
+        else:
+            self.view.build(path, pageSelection=pageSelection, multiPage=multiPage, processes=processes)
 
-    def export(self, path=None, multiPage=True):
+    def export(self, path=None, multiPage=True, processes=None):
         u"""Export the document as website, using the document.view for export.
 
         >>> from pagebot.elements import newRect
@@ -1012,7 +1076,7 @@ class Document(object):
         <PageView:Page (0, 0)>
         >>> doc.export('_export/TestExportDoc.pdf')        
         """
-        self.build(path=path, multiPage=multiPage)
+        self.build(path=path, multiPage=multiPage, processes=processes)
 
 if __name__ == "__main__":
     import doctest
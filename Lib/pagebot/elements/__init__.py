@@ -16,28 +16,59 @@
 #     New Elements to be added
 #     Graphs, Maps, 3Dto2DContainers.
 #
-from pagebot.elements.element import Element
-# Simple elements
-from pagebot.elements.pbtext import Text
-from pagebot.elements.pbtextbox import TextBox
-from pagebot.elements.pbrect import Rect
-from pagebot.elements.pbgroup import Group
-from pagebot.elements.pbline import Line
-from pagebot.elements.pbruler import Ruler
-from pagebot.elements.pbpolygon import Polygon
-from pagebot.elements.pboval import Oval
-# Page elements
-from pagebot.elements.pbimage import Image
-from pagebot.elements.pbgalley import Galley
-from pagebot.elements.pbpage import Page, Template
-from pagebot.elements.pbplacer import Placer # Place holder element, typically for Templates.
-# Path and mask elements
-from pagebot.elements.paths.pbpath import Path
-from pagebot.elements.paths.glyphpath import GlyphPath
-# Table elements
-from pagebot.elements.pbtable import Table
-# Views
-from pagebot.elements.views import viewClasses
+#     The element and view classes are imported on first access (PEP 562), e.g.
+#     by "from pagebot.elements import TextBox" or by the newTextBox() shortcut,
+#     so scripts only import the modules (and contexts) of the elements they use.
+#
+import importlib
+
+# Key is the public name, value is the module that defines it.
+ELEMENT_MODULES = dict(
+    Element='pagebot.elements.element',
+    # Simple elements
+    Text='pagebot.elements.pbtext',
+    TextBox='pagebot.elements.pbtextbox',
+    Rect='pagebot.elements.pbrect',
+    Group='pagebot.elements.pbgroup',
+    Line='pagebot.elements.pbline',
+    Ruler='pagebot.elements.pbruler',
+    Polygon='pagebot.elements.pbpolygon',
+    Oval='pagebot.elements.pboval',
+    # Page elements
+    Image='pagebot.elements.pbimage',
+    Galley='pagebot.elements.pbgalley',
+    Page='pagebot.elements.pbpage',
+    Template='pagebot.elements.pbpage',
+    Placer='pagebot.elements.pbplacer', # Place holder element, typically for Templates.
+    # Path and mask elements
+    Path='pagebot.elements.paths.pbpath',
+    GlyphPath='pagebot.elements.paths.glyphpath',
+    # Table elements
+    Table='pagebot.elements.pbtable',
+    # Views
+    viewClasses='pagebot.elements.views',
+)
+
+def __getattr__(name):
+    u"""Import the module that defines name on first access and keep the value as global
+    of this module, so next access is direct.
+
+    >>> import subprocess, sys
+    >>> script = 'import sys, pagebot.elements; print(sorted(m for m in ("flat", "pagebot.elements.element", "pagebot.elements.views") if m in sys.modules))'
+    >>> subprocess.check_output([sys.executable, '-c', script]).decode().strip()
+    '[]'
+    >>> from pagebot.elements import TextBox, viewClasses
+    >>> TextBox.__name__, 'Page' in viewClasses
+    ('TextBox', True)
+    >>> import pagebot.elements
+    >>> hasattr(pagebot.elements, 'Xyz')
+    False
+    """
+    moduleName = ELEMENT_MODULES.get(name)
+    if moduleName is None:
+        raise AttributeError('module %r has no attribute %r' % (__name__, name))
+    value = globals()[name] = getattr(importlib.import_module(moduleName), name)
+    return value
 
 #   S H O R T  C U T S  F O R  C H I L D  E L E M E N T S  G E N E R A T O R S
 
@@ -46,6 +77,7 @@ def newView(viewId, **kwargs):
     But since they inherit from Element, they also can be used as placable elements.
     Make sure to define the right parent (likely to be a Page or Template).
     """
+    from pagebot.elements.views import viewClasses
     return viewClasses[viewId](**kwargs)
 
 def newPage(**kwargs):
@@ -54,16 +86,19 @@ def newPage(**kwargs):
     Make sure to define the right parent (likely to be a Page or Template).
     Embed the page in a View element, to control appearance, such as cropmarks.
     """
+    from pagebot.elements.pbpage import Page
     return Page(**kwargs)
 
 def newTemplate(**kwargs):
     u"""In most cases views are initialized as dictionary by the Document class.
     But since they inherit from Element, they also can be used as placable elements.
     """
+    from pagebot.elements.pbpage import Template
     return Template(**kwargs)
 
 def newPlacer(**kwargs):
     u"""Placer occupying a space on Page or Template. Is not visible exported documets."""
+    from pagebot.elements.pbplacer import Placer
     return Placer(**kwargs)
 
 def newColPlacer(cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -74,6 +109,7 @@ def newColPlacer(cx=None, cy=None, cw=None, ch=None, **kwargs):
 
 def newTextBox(bs='', point=None, **kwargs):
     u"""Caller must supply formatted string. Note that w and h can also be defined in the style."""
+    from pagebot.elements.pbtextbox import TextBox
     return TextBox(bs, point=point, **kwargs)
 
 def newColTextBox(bs='', cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -87,6 +123,7 @@ def newText(bs='', point=None, **kwargs):
     style combinations. But in case the defined font is a Variable Font, then we can use the
     width and height to interpolate a font that fits the space for the given string and weight.
     Caller must supply formatted string. Support both (x, y) and x, y as position."""
+    from pagebot.elements.pbtext import Text
     return Text(bs, point=point, **kwargs)
 
 def newColText(bs='', cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -100,6 +137,7 @@ def newColText(bs='', cx=None, cy=None, cw=None, ch=None, **kwargs):
 def newRect(point=None, **kwargs):
     u"""Draw the rectangle. Note that w and h can also be defined in the style. In case h is omitted,
     a square is drawn."""
+    from pagebot.elements.pbrect import Rect
     return Rect(point=point, **kwargs)
 
 def newColRect(cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -110,6 +148,7 @@ def newColRect(cx=None, cy=None, cw=None, ch=None, **kwargs):
 def newGroup(point=None, **kwargs):
     u"""Create a new group. Note that w and h can also be defined in the style. In case h is omitted,
     a square is drawn."""
+    from pagebot.elements.pbgroup import Group
     return Group(point=point, **kwargs)
 
 def newColGroup(cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -120,6 +159,7 @@ def newColGroup(cx=None, cy=None, cw=None, ch=None, **kwargs):
 def newOval(point=None, **kwargs):
     u"""Draw the oval. Note that w and h can also be defined in the style. In case h is omitted,
     a circle is drawn."""
+    from pagebot.elements.pboval import Oval
     return Oval(point=point, **kwargs)
 
 def newColOval(cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -128,6 +168,7 @@ def newColOval(cx=None, cy=None, cw=None, ch=None, **kwargs):
     return e
 
 def newLine(point=None, **kwargs):
+    from pagebot.elements.pbline import Line
     return Line(point=point, **kwargs)
 
 def newColLine(cx=None, cy=None, cw=None, ch=None, **kwargs):
@@ -136,6 +177,7 @@ def newColLine(cx=None, cy=None, cw=None, ch=None, **kwargs):
     return e
 
 def newPolygon(point=None, **kwargs):
+    from pagebot.elements.pbpolygon import Polygon
     return Polygon(point=point, **kwargs)
 
 def newImage(path, point=None, **kwargs):
@@ -144,6 +186,7 @@ def newImage(path, point=None, **kwargs):
     If the image is drawn with an empty path, a missingImage cross-frame is shown.
     The optional imo attribute is an ImageObject() with filters in place.
     The Image element is answered for convenience of the caller."""
+    from pagebot.elements.pbimage import Image
     return Image(path, point=point, **kwargs)
 
 def newColImage(path, cx=None, cy=None, cw=None, ch=None, parent=None, **kwargs):
@@ -157,9 +200,13 @@ def newColImage(path, cx=None, cy=None, cw=None, ch=None, parent=None, **kwargs)
 
 def newTable(cols=1, rows=1, **kwargs):
     u"""Answer a new Table instanec."""
+    from pagebot.elements.pbtable import Table
     return Table(rows=rows, cols=cols, **kwargs)
 
 def newGalley(**kwargs):
     u"""Answer a new Galley instance."""
+    from pagebot.elements.pbgalley import Galley
     return Galley(**kwargs)
 
+# Names of "from pagebot.elements import *", which imports all element classes.
+__all__ = sorted(ELEMENT_MODULES.keys()) + sorted(name for name in globals() if name.startswith('new'))
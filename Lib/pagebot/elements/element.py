@@ -18,14 +18,15 @@ from __future__ import division
 
 import weakref
 import copy
+from collections import OrderedDict
 from pagebot.contexts.platform import getContext
-from pagebot.toolbox.units import Unit, getUnits, fr, perc, em
+from pagebot.toolbox.units import Unit, RelativeUnit, getUnits, fr, perc, em
 
 from pagebot.conditions.score import Score
 from pagebot.toolbox.columncalc import x2cx, cx2x, y2cy, cy2y, z2cz, cz2z
 from pagebot.toolbox.transformer import point3D, pointOffset, uniqueID
-from pagebot.style import (makeStyle, getRootStyle, MIDDLE, CENTER, RIGHT, TOP, BOTTOM,
-                           LEFT, FRONT, BACK, XALIGNS, YALIGNS, ZALIGNS,
+from pagebot.style import (makeStyle, getRootStyle, StyleDict, newStyleEpoch, newTextStyle, MIDDLE, CENTER, RIGHT, TOP, BOTTOM,
+                           GEOMETRY, LEFT, FRONT, BACK, XALIGNS, YALIGNS, ZALIGNS,
                            MIN_WIDTH, MAX_WIDTH, MIN_HEIGHT, MAX_HEIGHT,
                            MIN_DEPTH, MAX_DEPTH, DEFAULT_WIDTH,
                            DEFAULT_HEIGHT, DEFAULT_DEPTH, XXXL,
@@ -33,19 +34,53 @@ from pagebot.style import (makeStyle, getRootStyle, MIDDLE, CENTER, RIGHT, TOP,
                            OUTLINE)
 from pagebot.toolbox.transformer import asFormatted, uniqueID
 from pagebot.toolbox.timemark import TimeMark
+try:
+    from types import MappingProxyType
+except ImportError: # Python 2
+    MappingProxyType = dict
+
+# Marker for cascading css values that cannot be found in any of the ancestor styles.
+# Used as default in parent.css(name, NOTFOUND), to keep cached missing values apart
+# from values that are defined as None in the root style.
+NOTFOUND = object()
+
+# Keys of the root style, used by Element.getFlattenedStyle().
+ROOT_STYLE_KEYS = tuple(getRootStyle().keys())
+
+# Shared empty list of child elements and dictionary of their eIds, for all elements without
+# children. They are replaced by a new list and ordered dictionary when the first child is appended.
+# The ordered dictionary keeps the order of the child elements, so they are removed in O(1). The
+# list of child elements is then set to None and made again from it when it is needed.
+NO_ELEMENTS = ()
+NO_EIDS = MappingProxyType({})
+
+# Slots of Element that Element.copy() copies by value. The others are set to default.
+COPIED_SLOTS = ('_context', '_name', '_t', '_template', '_tm0', '_tm1', '_isLeftPage',
+    '_isRightPage', 'cssClass', 'title', 'description', 'keyWords', 'language',
+    'prevElement', 'nextElement', 'prevPage', 'nextPage', 'drawBefore', 'drawAfter',
+    'framePath')
 
 class Element(object):
 
+    # All fields of Element instances are stored in slots, without a __dict__ for each instance.
+    # Memory counts when catalogues make hundreds of thousands of elements. Inheriting classes
+    # that don't define their own __slots__ get a __dict__ for their attributes.
+    __slots__ = ('_parent', '_context', '_name', '_eId', '_elements', '_eIds', '_style', '_t',
+        '_template', '_tm0', '_tm1', '_timeMarks', '_report', '_cssCache', '_cssEpoch',
+        '_unitCache', '_textStyles', '_treeStamp', '_changedStamp', '_elementsStamp', '_isLeftPage',
+        '_isRightPage', '_spatialIndex', 'conditions', 'cssClass', 'cssId', 'title', 'description',
+        'keyWords', 'language', 'prevElement', 'nextElement', 'prevPage', 'nextPage', 'drawBefore',
+        'drawAfter', 'framePath', '__weakref__')
+
     # Initialize the default Element behavior flags.
-    # These flags can be overwritten by inheriting classes, or dynamically in instances,
-    # e.g. where the settings of TextBox.nextBox and TextBox.nextPage define if a TextBox
-    # instance can operate as a flow.
+    # These flags can be overwritten by inheriting classes.
     isText = False
     isTextBox = False
-    isFlow = False # Value is True if self.next if defined.
     isPage = False # Set to True by Page-like elements.
     isView = False
 
+    timeKeys = INTERPOLATING_TIME_KEYS # List of names of style entries that can interpolate in time.
+
     def __init__(self, point=None, x=0, y=0, z=0, w=DEFAULT_WIDTH, h=DEFAULT_HEIGHT, d=DEFAULT_DEPTH,
             t=0, parent=None, context=None, name=None, cssClass=None, cssId=None, title=None, 
             description=None, keyWords=None, 
@@ -107,15 +142,32 @@ class Element(object):
         """
         assert point is None or isinstance(point, (tuple, list))
 
+        self._parent = None # Weakref to the parent element, set by self.setParent(parent)
+        self._spatialIndex = None # Optional SpatialIndex on the child elements, set by self.spatialIndex = True
+        self._changedStamp = 0 # Style epoch of the last change of self, see self._changed()
+        self._elementsStamp = 0 # Style epoch of the last change in the list of child elements.
+
         # Optionally set the property for elements that need their own context. 
         # Mostly these are only set for views (which are also Elements)
         # If None the property will query parent --> root document --> view.
         self.context = context
 
-        # Initilialize self._elements and self._eIds
-        self.clearElements()
-
-        self.style = makeStyle(style, **kwargs) # Make default style for t == 0 from args
+        # Initilialize self._elements and self._eIds, shared until the first child is appended.
+        # The change is stamped when self.template is set below.
+        self._elements = NO_ELEMENTS
+        self._eIds = NO_EIDS
+
+        # Cache of cascading css values, inherited from the ancestors. Validated by self.css()
+        # against the generation stamps of the ancestor styles and the parent tree.
+        self._cssCache = None # Made by self.css() when the first value is inherited.
+        self._cssEpoch = 0 # StyleDict.epoch for which the self._cssCache was last validated.
+        self._unitCache = None # Resolved x, y, w and h values, made by self._cacheUnit()
+        self._textStyles = None # Cached TextStyle bundles, key is id(style). Made by self.getTextStyle()
+        self._treeStamp = newStyleEpoch() # Stamp of the last change in the parent of self.
+
+        # Make default style for t == 0 from args. While building, the style is a plain dict. At the end of
+        # construction it is made into a StyleDict, that is stamped once and calls self._changed() only once.
+        self._style = dict(makeStyle(style, **kwargs))
         # Initialize style values that are not supposed to inherite from parent styles.
         # Always store point in style as separate (x, y, z) values. Missing values are 0
         # Note that position, w, h, d, padding and margin are not inherited by style.
@@ -148,10 +200,8 @@ class Element(object):
         # Boundary timemarks, where self._tm0.t <= t <= self._tm1.t, with expanded styles.
         self._tm0 = 0 #DateTime.beginningOfTime
         self._tm1 = XXXL #None # Boundary timemarks, where self._tm0.t <= t <= self._tm1.t, with expanded styles.
-        # The default timeMarks between from DateTime.beginningOfTime to infinite.
-        self.timeMarks = [TimeMark(self._tm0, {}), TimeMark(self._tm1, {})] # Default TimeMarks from t == 0 until infinite of time.
+        self._timeMarks = None # Default timeMarks are made by self.timeMarks when they are used.
         self.t = t # Initialize self.style from t = 0
-        self.timeKeys = INTERPOLATING_TIME_KEYS # List of names of style entries that can interpolate in time.
 
         if padding is not None:
             self.padding = padding # Expand by property
@@ -163,12 +213,11 @@ class Element(object):
         self.cssId = cssId # Optional id name. Ignored if None.
 
         # Generic naming and title. 
-        self.name = name # Optional name of an element. Used as base for # id in case of HTML/CSS export.
+        self._name = name # Optional name of an element. Used as base for # id in case of HTML/CSS export.
         self.title = title or name # Optional to make difference between title name, style property
         self._eId = uniqueID(self) # Direct set property with guaranteed unique persistent value.
         
         # Element tree
-        self._parent = None # Preset, so it exists for checking when appending parent.
         if parent is not None:
             # Add and set weakref to parent element or None, if it is the root. Caller must add self to its elements separately.
             self.parent = parent # Set referecnes in both directions. Remove any previous parent links
@@ -177,7 +226,7 @@ class Element(object):
         if not conditions is None and not isinstance(conditions, (list, tuple)): # Allow singles
             conditions = [conditions]
         self.conditions = conditions # Explicitedly stored local in element, not inheriting from ancesters. Can be None.
-        self.report = [] # Area for conditions and drawing methods to report errors and warnings.
+        self._report = None # Made by self.report when conditions or drawing report errors and warnings.
         # Optional description of this element or its content. Otherwise None. Can be string or BabelString
         self.description = description
         self.keyWords = keyWords # Optional used for web pages
@@ -192,8 +241,11 @@ class Element(object):
         # Copy relevant info from template: w, h, elements, style, conditions, next, prev, nextPage
         # Initialze self.elements, add template elements and values, copy elements if defined.
         self.applyTemplate(template, elements)
-        # Initialize the default Element behavior tags, in case this is a flow.
-        self.isFlow = not None in (prevElement, nextElement, nextPage)
+        # Now the element is built, let the style call self._changed() for further changes.
+        style = StyleDict(self._style) # Copies all items and touches the style once.
+        style.owner = weakref.ref(self)
+        self._style = style
+        self._changed() # Single change for all initial values.
 
     def __repr__(self):
         u"""Object as string.
@@ -277,11 +329,11 @@ class Element(object):
             self.nextPage = template.nextPage
             # Copy style items
             for  name, value in template.style.items():
-                self.style[name] = value
+                self._style[name] = value
             # Copy condition list. Does not have to be deepCopy, condition instances are multi-purpose.
             self.conditions = copy.copy(template.conditions)
-            for e in template.elements:
-                self.appendElement(e.copy(parent=self))
+            for e in template.elements: # Copies share the style items of the template elements.
+                self.appendElement(e.copy())
     template = property(_get_template, _set_template)
 
     #   E L E M E N T S
@@ -301,8 +353,8 @@ class Element(object):
         return self.get(eIdOrName)
 
     def __setitem__(self, eId, e):
-        if not e in self.elements:
-            self.elements.append(e)
+        if e.parent is not self:
+            self.appendElement(e)
         self._eIds[eId] = e
 
     def _get_eId(self):
@@ -317,17 +369,79 @@ class Element(object):
         return self._eId
     eId = property(_get_eId)
 
+    def _get_name(self):
+        u"""Answer the optional name of the element. If the name changes, then the parent is
+        called by parent.elementRenamed(self, oldName), so it can update its index of names.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(autoPages=2)
+        >>> page = doc[2]
+        >>> page.name = 'Back'
+        >>> doc.getPage('Back') is page
+        True
+        """
+        return self._name
+    def _set_name(self, name):
+        oldName = self._name
+        self._name = name
+        if name != oldName:
+            parent = self.parent
+            if parent is not None:
+                parent.elementRenamed(self, oldName)
+    name = property(_get_name, _set_name)
+
+    def elementRenamed(self, e, oldName):
+        u"""Called by child element e after its name changed from oldName. Update the element
+        index of the document, if self is in it. The Document also updates its page index.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(autoPages=1)
+        >>> e = Element(name='Old', parent=doc[1])
+        >>> e.name = 'New'
+        >>> doc[1].getElementByName('New') is e, doc[1].getElementByName('Old')
+        (True, None)
+        """
+        index = self.elementIndex
+        if index is not None:
+            index.rename(e)
+
+    def _get_elementIndex(self):
+        u"""Answer the ElementIndex of the document, if self is on one of its pages. Otherwise
+        answer None, e.g. for elements that are not placed yet and for the elements of templates.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(autoPages=1)
+        >>> e = Element()
+        >>> e.elementIndex is None
+        True
+        >>> i = doc[1].appendElement(e)
+        >>> e.elementIndex is doc.elementIndex
+        True
+        """
+        doc = self.doc
+        if doc is not None:
+            index = doc.elementIndex
+            if self._eId in index:
+                return index
+        return None
+    elementIndex = property(_get_elementIndex)
+
     def _get_elements(self):
         u"""Property to get/set elements to parent self.
 
         >>> e = Element()
-        >>> len(e), len(e.elements)
-        (0, 0)
+        >>> len(e), e.elements
+        (0, [])
         >>> e.elements = (Element(), Element(), Element())
         >>> len(e), len(e.elements)
         (3, 3)
         """
-        return self._elements
+        elements = self._elements
+        if elements is NO_ELEMENTS: # Answer a new list, the shared empty one is never answered.
+            return []
+        if elements is None: # An element was removed, make the list again in the order of self._eIds.
+            elements = self._elements = self._getOrderedElements()
+        return elements
     def _set_elements(self, elements):
         self.clearElements() # Clear all existing child elements of self.
         for e in elements:
@@ -424,6 +538,9 @@ class Element(object):
         """
         if self.name == name:
             return self
+        index = self.elementIndex
+        if index is not None: # On a page of a document, answer from its element index.
+            return index.getElementByName(self, name)
         for e in self.elements:
             found = e.getElementByName(name) # Don't search on next page yet.
             if found is not None:
@@ -449,6 +566,11 @@ class Element(object):
         assert name or pattern
         if result is None:
             result = []
+        if pattern is None:
+            index = self.elementIndex
+            if index is not None: # On a page of a document, answer from its element index.
+                result.extend(index.deepFind(self, name))
+                return result
         for e in self.elements:
             if pattern is not None and pattern in e.name: # Simple pattern match
                 result.append(e)
@@ -494,12 +616,64 @@ class Element(object):
         >>> len(e)
         0
         """
-        self._elements = []
-        self._eIds = {}
+        if self._eIds:
+            index = self.elementIndex
+            if index is not None:
+                for e in self.elements:
+                    index.remove(e)
+        self._elements = NO_ELEMENTS # Shared until the first child is appended.
+        self._eIds = NO_EIDS
+        self._elementsChanged()
+
+    def _allocElements(self):
+        u"""Make the list of child elements and the dictionary of their eIds, if self still
+        has the shared empty ones. Called before the first child is added.
+
+        >>> e = Element()
+        >>> e._elements is NO_ELEMENTS
+        True
+        >>> i = e.appendElement(Element())
+        >>> e._elements is NO_ELEMENTS, len(e._elements), len(e._eIds)
+        (False, 1, 1)
+        """
+        if self._elements is NO_ELEMENTS:
+            self._elements = []
+            self._eIds = OrderedDict()
+
+    def _getOrderedElements(self):
+        u"""Answer a new list of the child elements in the order of self._eIds. Elements that
+        are also stored under another eId by self[eId] = e are answered once.
+
+        >>> e1, e2, e3 = Element(), Element(), Element()
+        >>> e = Element(elements=[e1, e2, e3])
+        >>> e['Alias'] = e1
+        >>> e._getOrderedElements() == [e1, e2, e3]
+        True
+        """
+        elements = []
+        ids = set()
+        for e in self._eIds.values():
+            if id(e) not in ids:
+                ids.add(id(e))
+                elements.append(e)
+        return elements
 
     def copy(self, parent=None):
         u"""Answer a full copy of self, where the "unique" fields are set to default.
-        Also perform a deep copy on all child elements.
+        Also perform a copy on all child elements. The style is copied on write: the copy
+        shares the style items with self, until one of both changes a value. This way
+        applying a template with many elements to many pages does not copy all styles.
+        Attributes of inheriting classes are copied shallow: containers are copied, other
+        values are shared, unless the inheriting class copies them, as TextBox.copy() does.
+        Attributes that refer to child elements of self refer to their copies.
+
+        >>> from pagebot.elements.pbgalley import Galley
+        >>> from pagebot.elements.pbtextbox import TextBox
+        >>> galley = Galley()
+        >>> i = galley.appendElement(TextBox('Hello', w=100))
+        >>> copyGalley = galley.copy()
+        >>> copyGalley.lastTextBox is copyGalley.elements[0], galley.lastTextBox is galley.elements[0]
+        (True, True)
 
         >>> e1 = Element(name='Child', w=100)
         >>> e = Element(name='Parent', elements=[e1], w=200)
@@ -510,37 +684,57 @@ class Element(object):
         (False, False)
         >>> copyE.name == e.name, copyE.w == e.w == 200, copyE['Child'].w == e['Child'].w == 100 # Values are copied
         (True, True, True)
+        >>> copyE.w = 300 # Changing the copy does not change the original, and the other way around.
+        >>> e['Child'].h = 50
+        >>> copyE.w, e.w, copyE['Child'].h, e['Child'].h
+        (300, 200, 100, 50)
+        >>> copyE.eId != e.eId, copyE['Child'].parent is copyE
+        (True, True)
         """
-        # This also initializes the child element tree as empty list.
-        # Style is supposed to be a deep-copyable dictionary.
-        # self._eId is automatically created, guaranteed unique Id for every element.
-        # Ignore original **kwargs, as these values are supposed to be in style now.
-        # Inheriting classes are responsible to add their own specific values.
-        e = self.__class__(x=self.x, y=self.y, z=self.z, w=self.w, h=self.h, d=self.d,
-            t=self.t, # Copy type frame.
-            parent=parent, # Allow to keep reference to current parent context and style.
-            context=self._context, # Copy local context, None most cases, where reference to parent->doc context is required.
-            name=self.name, cssClass=self.cssClass, #cssId is not copied.
-            title=self.title, description=self.description, language=self.language,
-            style=copy.deepcopy(self.style), # Style is supposed to be a deep-copyable dictionary.
-            conditions=copy.deepcopy(self.conditions), # Conditions may be modified by the element of ascestors.
-            framePath=self.framePath,
-            elements=None, # Will be copied separately, if there are child elements
-            template=self.template, 
-            nextElement=self.nextElement, 
-            prevElement=self.prevElement,
-            nextPage=self.nextPage, 
-            prevPage=self.prevPage,
-            padding=self.padding, # Copies all padding values at once
-            margin=self.margin, # Copies all margin values at once,
-            borders=self.borders, # Copies all borders at once.
-            shadow=self.shadow, # Needs to be copied?
-            gradient=self.gradient, # Needs to be copied?
-            drawBefore=self.drawBefore,
-            drawAfter=self.drawAfter)
+        # Make the new instance without calling the constructor of its class, copying the
+        # fixed fields and the attributes of inheriting classes. Lists, dictionaries and sets
+        # are copied, other attribute values are shared with self. Inheriting classes are
+        # responsible to copy their own mutable values, e.g. TextBox.copy() copies the string.
+        e = self.__class__.__new__(self.__class__)
+        for name in COPIED_SLOTS:
+            setattr(e, name, getattr(self, name))
+        if hasattr(self, '__dict__'): # Attributes of inheriting classes without their own slots.
+            for name, value in self.__dict__.items():
+                if isinstance(value, (list, dict, set)): # Don't share mutable containers of attributes.
+                    value = copy.copy(value)
+                e.__dict__[name] = value
+
+        # The "unique" fields and the caches are set to default, as the constructor does.
+        e._parent = None
+        e._spatialIndex = None # Made again when needed, for the children of e.
+        e._changedStamp = e._elementsStamp = 0
+        e._eId = uniqueID(e) # Guaranteed unique Id for every element.
+        e._elements = NO_ELEMENTS
+        e._eIds = NO_EIDS
+        e._cssCache = None
+        e._cssEpoch = 0
+        e._unitCache = None
+        e._textStyles = None
+        e._treeStamp = newStyleEpoch()
+        e._timeMarks = None
+        e._report = None
+        e.cssId = None # cssId is not copied.
+        e._style = None
+        e.style = self._style.copyOnWrite() # Style items are shared until one of both changes.
+        # Condition instances don't keep state, so they can be shared, as for templates.
+        e.conditions = copy.copy(self.conditions)
+
+        if parent is not None:
+            e.parent = parent # Allow to keep reference to current parent context and style.
         # Now do the same for each child element and append it to self.
+        copies = {} # Key is id(child), value is the copy of the child.
         for child in self.elements:
-            e.appendElement(child.copy()) # Add the element to child list and update self._eId dictionary
+            childCopy = copies[id(child)] = child.copy()
+            e.appendElement(childCopy) # Add the element to child list and update self._eId dictionary
+        if copies and hasattr(e, '__dict__'): # Attributes that refer to children, e.g. Image.caption, refer to the copies.
+            for name, value in list(e.__dict__.items()):
+                if isinstance(value, Element) and id(value) in copies:
+                    e.__dict__[name] = copies[id(value)]
         return e
 
     def setElementByIndex(self, e, index):
@@ -563,9 +757,23 @@ class Element(object):
         if index < 0:
             return None # Don't accept.
         if index < len(self.elements):
-            self.elements[index] = e
-            if self.eId:
-                self._eIds[e.eId] = e
+            eParent = e.parent
+            if eParent is not None:
+                eParent.removeElement(e)
+                if index >= len(self.elements): # e was child of self, before index.
+                    return self.appendElement(e)
+            elements = self.elements
+            oldE = elements[index]
+            oldE.setParent(None)
+            elements[index] = e
+            e.setParent(self)
+            # Make the ordered dictionary again, as e takes the place of oldE.
+            self._eIds = OrderedDict([(child.eId, child) for child in elements])
+            elementIndex = self.elementIndex
+            if elementIndex is not None:
+                elementIndex.remove(oldE)
+                elementIndex.add(e, elementIndex.getPage(self))
+            self._elementsChanged()
             return index
         return self.appendElement(e)
 
@@ -588,31 +796,119 @@ class Element(object):
         eParent = e.parent
         if not eParent is None:
             eParent.removeElement(e) # Remove from current parent, if there is one.
-        self._elements.append(e) # Possibly add to self again, will move it to the top of the element stack.
+        self._allocElements()
+        self._eIds[e.eId] = e # Stored by unique element id, the order is the order of the elements.
+        if self._elements is not None: # Otherwise made again from self._eIds when needed.
+            self._elements.append(e) # Possibly add to self again, will move it to the top of the element stack.
         e.setParent(self) # Set parent of element without calling this method again.
-        if e.eId: # Store the element by unique element id, if it is defined.
-            self._eIds[e.eId] = e
-        return len(self._elements)-1 # Answer the element index for e.
+        elementIndex = self.elementIndex
+        if elementIndex is not None: # Self is on a page of a document, add e and its offspring.
+            elementIndex.add(e, elementIndex.getPage(self))
+        index = len(self.elements)-1
+        self._elementsChanged(e, index)
+        return index # Answer the element index for e.
 
     def removeElement(self, e):
         u"""If the element is placed in self, then remove it. Don't touch the position.
+        Removing is O(1): e is deleted from the ordered dictionary self._eIds. If e is not the
+        last element, then the list of child elements is made again when it is needed, so
+        removing many elements in a row costs one pass over the remaining elements.
 
         >>> e1 = Element(name='Child1')
         >>> e2 = Element(name='Child2')
         >>> e3 = Element(name='Child3')
         >>> e = Element(name='Parent', elements=[e1, e2, e3])
+        >>> elements = e.elements
         >>> removedE = e.removeElement(e2)
         >>> e.elements[0] is e1, e.elements[1] is e3, e2.parent is None
         (True, True, True)
+        >>> len(elements), e.appendElement(e2), e.elements[-1] is e2 # The answered list is not changed.
+        (3, 2, True)
         """
         assert e.parent is self
+        elementIndex = self.elementIndex
+        if elementIndex is not None:
+            elementIndex.remove(e)
         e.setParent(None) # Unlink the parent reference of e
         if e.eId in self._eIds:
             del self._eIds[e.eId]
-        if e in self._elements:
-            self._elements.remove(e)
+            elements = self._elements
+            if elements is not None:
+                if elements[-1] is e: # Moving the last element, as flows and layouts mostly do.
+                    elements.pop()
+                else: # Made again in the order of self._eIds, when needed.
+                    self._elements = None
+        self._elementsChanged() # Order of the elements changed.
         return e # Answer the unlinked elements for convenience of the caller.
 
+    def _get_spatialIndex(self):
+        u"""Answer the optional SpatialIndex on the margin boxes of the child elements.
+        Set to True to make the float conditions and self.getElementsAtPoint() use the
+        index, instead of scanning all child elements. Answer None if not set.
+
+        >>> e = Element()
+        >>> e.spatialIndex is None
+        True
+        >>> e.spatialIndex = True
+        >>> e.spatialIndex
+        <SpatialIndex>
+        >>> e.spatialIndex = False
+        >>> e.spatialIndex is None
+        True
+        >>> from pagebot.document import Document
+        >>> doc = Document(w=500, h=500, autoPages=1, originTop=True)
+        >>> page = doc[1]
+        >>> e1 = Element(x=0, y=0, w=100, h=100, parent=page)
+        >>> e2 = Element(x=200, y=0, w=100, h=50, parent=page)
+        >>> e3 = Element(x=50, y=300, w=100, h=100, parent=page)
+        >>> page.spatialIndex = True
+        >>> e3.getFloatTopSide() # Bottom of e1
+        100
+        >>> e1.h = 150 # Index is updated for changed elements.
+        >>> e3.getFloatTopSide()
+        150
+        >>> e3.x = 250 # Now e2 is above e3
+        >>> e3.getFloatTopSide(), e3.getFloatLeftSide(), e3.getFloatRightSide()
+        (50, 0, 500)
+        >>> page.getElementsAtPoint((200, 0)) == [e2]
+        True
+        """
+        return self._spatialIndex
+    def _set_spatialIndex(self, flag):
+        if not flag:
+            self._spatialIndex = None
+        elif self._spatialIndex is None:
+            from pagebot.elements.spatialindex import SpatialIndex
+            self._spatialIndex = SpatialIndex(self)
+    spatialIndex = property(_get_spatialIndex, _set_spatialIndex)
+
+    def _getSiblingIndex(self):
+        u"""Answer the SpatialIndex of the parent, if it exists. Otherwise answer None."""
+        parent = self.parent
+        if parent is None:
+            return None
+        return getattr(parent, '_spatialIndex', None)
+
+    def _elementsChanged(self, e=None, index=None):
+        u"""Called when the list of child elements changed. If e is defined, then it was
+        appended at index. Stamp the change and update the optional spatial index."""
+        self._elementsStamp = newStyleEpoch()
+        if self._spatialIndex is not None:
+            if e is None:
+                self._spatialIndex.reset()
+            else:
+                self._spatialIndex.elementAppended(e, index)
+
+    def _changed(self):
+        u"""Called when the local style of self changed, which may change its position 
+        or size. Stamp the change and notify the optional spatial index of the parent."""
+        self._changedStamp = newStyleEpoch()
+        if self._eIds: # Cascading and relative values of the child elements may change.
+            StyleDict.cascadeEpoch = self._changedStamp
+        index = self._getSiblingIndex()
+        if index is not None:
+            index.elementChanged(self)
+
     def _get_show(self):
         u"""Set flag for drawing or interpretation with conditional.
 
@@ -634,7 +930,7 @@ class Element(object):
         """
         return self.css('show', True)
     def _set_show(self, showFlag):
-        self.style['show'] = showFlag # Hiding rest of css for this value.
+        self._style['show'] = showFlag # Hiding rest of css for this value.
     show = property(_get_show, _set_show)
 
     #   C H I L D  E L E M E N T  P O S I T I O N S
@@ -653,6 +949,8 @@ class Element(object):
         >>> e.getElementsAtPoint((20, None)) == [e1, e2] # Find both on wildcard y
         True
         """
+        if self._spatialIndex is not None:
+            return self._spatialIndex.getElementsAtPoint(point)
         elements = []
         px, py, pz = point3D(point)
         for e in self.elements:
@@ -702,6 +1000,16 @@ class Element(object):
 
     #   F L O W
 
+    def _get_isFlow(self):
+        u"""Answer the boolean flag if self is part of a flow, with its prevElement, nextElement
+        and nextPage defined.
+
+        >>> Element().isFlow, Element(prevElement='A', nextElement='B', nextPage=2).isFlow
+        (False, True)
+        """
+        return not None in (self.prevElement, self.nextElement, self.nextPage)
+    isFlow = property(_get_isFlow)
+
     # If the element is part of a flow, then answer the squence.
 
     def NOTNOW_getFlows(self):
@@ -777,7 +1085,7 @@ class Element(object):
         """
         return self.css('baselineGrid')
     def _set_baselineGrid(self, baselineGrid):
-        self.style['baselineGrid'] = baselineGrid
+        self._style['baselineGrid'] = baselineGrid
     baselineGrid = property(_get_baselineGrid, _set_baselineGrid)
 
     def _get_baselineGridStart(self):
@@ -795,7 +1103,7 @@ class Element(object):
         """
         return self.css('baselineGridStart')
     def _set_baselineGridStart(self, baselineGridStart):
-        self.style['baselineGridStart'] = baselineGridStart
+        self._style['baselineGridStart'] = baselineGridStart
     baselineGridStart = property(_get_baselineGridStart, _set_baselineGridStart)
 
     # Text conditions, always True for non-text elements.
@@ -822,10 +1130,131 @@ class Element(object):
 
     # Answer the cascaded style value, looking up the chain of ancestors, until style value is defined.
 
+    def _get_style(self):
+        u"""Answer the local style dictionary of self. Setting the style makes it a StyleDict,
+        so any change in it can be noticed by the cached css values of self and its children.
+
+        >>> e = Element(fontSize=12)
+        >>> isinstance(e.style, StyleDict), e.style['fontSize']
+        (True, 12)
+        >>> e.style = dict(fontSize=14)
+        >>> isinstance(e.style, StyleDict), e.css('fontSize')
+        (True, 14)
+        """
+        return self._style
+    def _set_style(self, style):
+        if not isinstance(style, StyleDict):
+            style = StyleDict(style or {})
+        style.owner = weakref.ref(self)
+        self._style = style
+        style.touch() # Replacing the dict is a change too, even if it had an older stamp.
+    style = property(_get_style, _set_style)
+
+    def _get_styleStamp(self):
+        u"""Answer the generation stamp of the latest change in the local style of self or
+        in its parent relation. Used to validate cached css values of child elements."""
+        return max(self._style.stamp, self._treeStamp)
+    _styleStamp = property(_get_styleStamp)
+
+    def _isCssCacheValid(self, epoch=None):
+        u"""Answer the boolean flag if none of the ancestors changed their style or
+        parent since the cached css values of self were validated, or since the
+        optional epoch. The ancestors are only checked if some change since epoch
+        can change cascading values, as noted in StyleDict.cascadeEpoch. Changes in
+        elements without children, such as new elements, don't.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(w=500, h=500, autoPages=1)
+        >>> e = Element(fontSize=12, parent=doc[1])
+        >>> child = Element(parent=e)
+        >>> child.css('fontSize'), child._isCssCacheValid()
+        (12, True)
+        >>> epoch = StyleDict.cascadeEpoch
+        >>> other = Element(w=100, parent=doc[1]) # Building other elements is not a cascading change.
+        >>> other.w = 200
+        >>> StyleDict.cascadeEpoch == epoch, child._isCssCacheValid()
+        (True, True)
+        >>> e.style['fontSize'] = 14 # Changing the style of an element with children is.
+        >>> StyleDict.cascadeEpoch > epoch, child._isCssCacheValid(), child.css('fontSize')
+        (True, False, 14)
+        """
+        if epoch is None:
+            epoch = self._cssEpoch
+        if self._treeStamp > epoch: # Parent of self changed.
+            return False
+        if StyleDict.cascadeEpoch <= epoch: # No change in any ancestor style or tree since epoch.
+            return True
+        parent = self.parent
+        while parent is not None:
+            stamp = getattr(parent, '_styleStamp', None)
+            if stamp is None or stamp > epoch:
+                return False
+            parent = parent.parent
+        return True
+
+    def _isUnitCacheValid(self, epoch):
+        u"""Answer the boolean flag if neither self nor any of its ancestors changed their style,
+        their parent or otherwise their size since the epoch."""
+        if self._changedStamp > epoch or self._treeStamp > epoch:
+            return False
+        if StyleDict.cascadeEpoch <= epoch: # Changes of ancestors set the cascade epoch too.
+            return True
+        parent = self.parent
+        while parent is not None:
+            if getattr(parent, '_changedStamp', 0) > epoch:
+                return False
+            stamp = getattr(parent, '_styleStamp', None)
+            if stamp is None or stamp > epoch:
+                return False
+            parent = parent.parent
+        return True
+
+    def _getCachedUnit(self, name):
+        u"""Answer the cached resolved value of the style value name, e.g. a percentage of
+        the parent width, or the width clipped by the parent. Answer NOTFOUND if it is not cached,
+        or if self or one of its ancestors changed. The cache is not used while the solver records
+        the style values that are read.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(w=500, h=500, autoPages=1)
+        >>> e = Element(x='10%', w='50%', parent=doc[1])
+        >>> e.x, e.w, e._getCachedUnit('x'), e._getCachedUnit('w')
+        (50.0, 250.0, 50.0, 250.0)
+        >>> doc[1].w = 400 # Changing the parent invalidates the cached values of the children.
+        >>> e._getCachedUnit('w') is NOTFOUND, e.x, e.w
+        (True, 40.0, 200.0)
+        >>> e.x = '20%'
+        >>> e._getCachedUnit('x') is NOTFOUND, e.x
+        (True, 80.0)
+        """
+        cache = self._unitCache
+        if cache is None or StyleDict.reads is not None:
+            return NOTFOUND
+        cached = cache.get(name)
+        if cached is None:
+            return NOTFOUND
+        epoch, value = cached
+        if epoch != StyleDict.epoch: # Some style changed somewhere, check if it is one of ours.
+            if not self._isUnitCacheValid(epoch):
+                del cache[name]
+                return NOTFOUND
+            cache[name] = StyleDict.epoch, value
+        return value
+
+    def _cacheUnit(self, name, value):
+        u"""Store the resolved value of the style value name in the cache. Answer the value."""
+        if self._unitCache is None:
+            self._unitCache = {}
+        self._unitCache[name] = StyleDict.epoch, value
+        return value
+
     def css(self, name, default=None):
         u"""In case we are looking for a plain css value, cascading from the main ancestor styles
         of self, then follow the parent links until document or root, if self does not contain
         the requested value.
+        Values inherited from the ancestors are cached in self. The cache is validated by 
+        generation stamps, so a change in the style of any ancestor (or in the parent tree) 
+        only invalidates the cached values of the elements below it.
 
         >>> from pagebot.document import Document
         >>> doc = Document()
@@ -835,12 +1264,81 @@ class Element(object):
         24
         >>> e.css('rLeading') # Find value in root style
         1.2
-        """
-        if name in self.style and self.style[name] is not None:
-            return self.style[name]
-        if self.parent is not None:
-            return self.parent.css(name, default)
-        return default
+        >>> child = Element(parent=e)
+        >>> child.css('fontSize'), child.css('rLeading') # Cached values from ancestors
+        (24, 1.2)
+        >>> e.style['fontSize'] = 12 # Changing the parent style invalidates the cached values.
+        >>> child.css('fontSize')
+        12
+        >>> doc.rootStyle['rLeading'] = 1.4 # Same for changes in the root style.
+        >>> child.css('rLeading')
+        1.4
+        >>> child.css('notExistingValue', 'Default')
+        'Default'
+        >>> other = Element(fontSize=36)
+        >>> other.appendElement(child) # Changing the parent also invalidates the cache.
+        0
+        >>> child.css('fontSize'), child.css('rLeading', 1.1)
+        (36, 1.1)
+        """
+        value = self._style.get(name) # Local value has priority, no need for caching.
+        if value is not None:
+            return value
+        reads = StyleDict.reads
+        if reads is not None: # Record reading the cascading value, e.g. by the IncrementalSolver.
+            reads[(id(self), name)] = self, name
+        parent = self.parent
+        if parent is None:
+            return default
+        epoch = StyleDict.epoch
+        if self._cssEpoch != epoch: # Some style changed somewhere, check if it is one of ours.
+            if not self._isCssCacheValid():
+                self._cssCache = None
+            self._cssEpoch = epoch
+        cache = self._cssCache
+        if cache is None:
+            cache = self._cssCache = {}
+        if name in cache:
+            value = cache[name]
+        else: # Inheriting cascading value, which will be cached in the parent too.
+            value = cache[name] = parent.css(name, NOTFOUND)
+        if value is NOTFOUND:
+            return default
+        return value
+
+    def getTextStyle(self, style=None):
+        u"""Answer the TextStyle bundle of the style (stack) and the cascading text style values of self,
+        to be used as style for newString. The bundle is made once for each style and cached in self,
+        until the style of self or its ancestors change, or the style changes if it is a StyleDict.
+        Changes in a plain dict style are not noticed, so such styles should not change after use.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document()
+        >>> e = Element(fontSize=24, parent=doc[1])
+        >>> style = dict(tracking=0.1)
+        >>> textStyle = e.getTextStyle(style)
+        >>> textStyle['fontSize'], textStyle['tracking'], textStyle['rLeading']
+        (24, 0.1, 1.2)
+        >>> e.getTextStyle(style) is textStyle
+        True
+        >>> doc.rootStyle['rLeading'] = 1.4 # Changes in the ancestor styles make a new bundle.
+        >>> e.getTextStyle(style)['rLeading']
+        1.4
+        """
+        textStyles = self._textStyles
+        if textStyles is None:
+            textStyles = self._textStyles = {}
+        key = id(style)
+        cached = textStyles.get(key)
+        if cached is not None:
+            cachedStyle, epoch, textStyle = cached
+            if cachedStyle is style and self._style.stamp <= epoch and self._isCssCacheValid(epoch) and \
+                    getattr(style, 'stamp', 0) <= epoch:
+                return textStyle
+        epoch = StyleDict.epoch
+        textStyle = newTextStyle(self, style)
+        textStyles[key] = style, epoch, textStyle
+        return textStyle
 
     def getNamedStyle(self, styleName):
         u"""In case we are looking for a named style (e.g. used by the Typesetter to build a stack
@@ -871,7 +1369,7 @@ class Element(object):
         ((0.1, 0.2, 0.3), 10.0, 1.2, 'left', 1.2)
         """
         flattenedStyle = {} # Create a dict with all keys from root style and values from self.css()
-        for key in getRootStyle().keys():
+        for key in ROOT_STYLE_KEYS:
             flattenedStyle[key] = self.css(key)
         return flattenedStyle
 
@@ -970,6 +1468,9 @@ class Element(object):
         if parent is not None:
             parent = weakref.ref(parent)
         self._parent = parent # Can be None if self needs to be unlinked from a parent tree. E.g. when moving it.
+        self._treeStamp = newStyleEpoch() # Cascading css values may have changed.
+        if self._eIds: # Also for the offspring of self.
+            StyleDict.cascadeEpoch = self._treeStamp
 
     def _get_parent(self):
         u"""Answer the parent of the element, if it exists, by weakref reference. Answer None of there
@@ -983,7 +1484,11 @@ class Element(object):
             #assert not self in parent.ancestors, '[%s.%s] Cannot set one of the children "%s" as parent.' % (self.__class__.__name__, self.name, parent)
             parent.appendElement(self)
         else:
-            self._parent = None
+            parent = self.parent
+            if isinstance(parent, Element): # Remove from the elements of parent and its element index.
+                parent.removeElement(self)
+            else:
+                self.setParent(None)
     parent = property(_get_parent, _set_parent)
 
     def _get_siblings(self):
@@ -1087,11 +1592,11 @@ class Element(object):
         return self.css('gridX')
     def _set_gridX(self, gridX):
         if self.isLeftPage():
-            self.style['gridL'] = gridX  # Save locally, blocking CSS parent scope for this param.
+            self._style['gridL'] = gridX  # Save locally, blocking CSS parent scope for this param.
         elif self.isRightPage():
-            self.style['gridR'] = gridX
+            self._style['gridR'] = gridX
         else:
-            self.style['gridX'] = gridX
+            self._style['gridX'] = gridX
     gridX = property(_get_gridX, _set_gridX)
 
     def _get_gridY(self):
@@ -1106,7 +1611,7 @@ class Element(object):
         """
         return self.css('gridY')
     def _set_gridY(self, gridY):
-        self.style['gridY'] = gridY  # Save locally, blocking CSS parent scope for this param.
+        self._style['gridY'] = gridY  # Save locally, blocking CSS parent scope for this param.
     gridY = property(_get_gridY, _set_gridY)
 
     def _get_gridZ(self):
@@ -1121,7 +1626,7 @@ class Element(object):
         """
         return self.css('gridZ')
     def _set_gridZ(self, gridZ):
-        self.style['gridZ'] = gridZ  # Save locally, blocking CSS parent scope for this param.
+        self._style['gridZ'] = gridZ  # Save locally, blocking CSS parent scope for this param.
     gridZ = property(_get_gridZ, _set_gridZ)
 
     def getGridColumns(self):
@@ -1271,15 +1776,23 @@ class Element(object):
         >>> child.x
         250.0
         """
-        x = self.ux # Direct from style. Not CSS lookup.
-        if isinstance(x, (fr, perc)):
-            assert self.parent is not None, 'Relative values only allowed if parent is set: %s' % x
-            x = x.asPt(self.parent.w) # In case percentage or fraction, answer value in relation to self.parent.w
-        elif isinstance(x, em):
-            x = x.asPt(self.css('fontSize'))
-        return x 
+        reads = StyleDict.reads
+        if reads is not None: # Record reading the geometry of self, e.g. by the IncrementalSolver.
+            reads[(id(self), GEOMETRY)] = self, GEOMETRY
+        x = self._style['x'] # Direct from style. Not CSS lookup.
+        if not isinstance(x, RelativeUnit): # Plain numbers and absolute units, such as pt.
+            return x
+        value = self._getCachedUnit('x')
+        if value is NOTFOUND:
+            if isinstance(x, (fr, perc)):
+                assert self.parent is not None, 'Relative values only allowed if parent is set: %s' % x
+                value = x.asPt(self.parent.w) # In case percentage or fraction, answer value in relation to self.parent.w
+            else: # em
+                value = x.asPt(self.css('fontSize'))
+            self._cacheUnit('x', value)
+        return value
     def _set_x(self, x):
-        self.style['x'] = getUnits(x)
+        self._style['x'] = getUnits(x)
     x = property(_get_x, _set_x)
 
     def _get_ux(self):
@@ -1290,7 +1803,7 @@ class Element(object):
         >>> e.ux
         22%
         """
-        return self.style['x']
+        return self._style['x']
     ux = property(_get_ux, _set_x) # Setting is same as self.x
 
     def _get_y(self):
@@ -1309,15 +1822,23 @@ class Element(object):
         >>> child.y # 40% of 500 dynamic calculation
         200
         """
-        y = self.uy # Direct from style. Not CSS lookup.
-        if isinstance(y, (fr, perc)):
-            assert self.parent is not None, 'Relative values only allowed if parent is set: %s' % y
-            y = y.asPt(self.parent.h) # In case percentage or fraction, answer value in relation to self.parent.h
-        elif isinstance(y, em):
-            y = y.asPt(self.css('fontSize'))
-        return y
+        reads = StyleDict.reads
+        if reads is not None: # Record reading the geometry of self, e.g. by the IncrementalSolver.
+            reads[(id(self), GEOMETRY)] = self, GEOMETRY
+        y = self._style['y'] # Direct from style. Not CSS lookup.
+        if not isinstance(y, RelativeUnit): # Plain numbers and absolute units, such as pt.
+            return y
+        value = self._getCachedUnit('y')
+        if value is NOTFOUND:
+            if isinstance(y, (fr, perc)):
+                assert self.parent is not None, 'Relative values only allowed if parent is set: %s' % y
+                value = y.asPt(self.parent.h) # In case percentage or fraction, answer value in relation to self.parent.h
+            else: # em
+                value = y.asPt(self.css('fontSize'))
+            self._cacheUnit('y', value)
+        return value
     def _set_y(self, y):
-        self.style['y'] = getUnits(y)
+        self._style['y'] = getUnits(y)
     y = property(_get_y, _set_y)
 
     def _get_uy(self):
@@ -1328,7 +1849,7 @@ class Element(object):
         >>> e.uy
         22%
         """
-        return self.style['y']
+        return self._style['y']
     uy = property(_get_uy, _set_y) # Setting is same as self.y
 
     def _get_z(self):
@@ -1355,7 +1876,7 @@ class Element(object):
             z = z.asPt(self.css('fontSize'))
         return z
     def _set_z(self, z):
-        self.style['z'] = getUnits(z)
+        self._style['z'] = getUnits(z)
     z = property(_get_z, _set_z)
 
     def _get_uz(self):
@@ -1366,7 +1887,7 @@ class Element(object):
         >>> e.uz
         22%
         """ 
-        return self.style['z']
+        return self._style['z']
     uz = property(_get_uz, _set_z) # Setting is same as self.z
 
     def _get_xy(self):
@@ -1468,6 +1989,39 @@ class Element(object):
         #    self._tm0, self._tm1 = self.getExpandedTimeMarks(t)
     t = property(_get_t, _set_t)
 
+    def _get_timeMarks(self):
+        u"""Answer the list of TimeMark instances of self, sorted by their t. The default
+        TimeMarks, from t == 0 until infinite of time, are made the first time they are used.
+
+        >>> e = Element()
+        >>> len(e.timeMarks), e.timeMarks[0].t
+        (2, 0)
+        """
+        if self._timeMarks is None:
+            self._timeMarks = [TimeMark(self._tm0, {}), TimeMark(self._tm1, {})]
+        return self._timeMarks
+    def _set_timeMarks(self, timeMarks):
+        self._timeMarks = timeMarks
+    timeMarks = property(_get_timeMarks, _set_timeMarks)
+
+    def _get_report(self):
+        u"""Answer the list where conditions and drawing methods report errors and warnings.
+        The list is made when it is used for the first time.
+
+        >>> e = Element()
+        >>> e.report
+        []
+        >>> e.report.append('Warning')
+        >>> e.report
+        ['Warning']
+        """
+        if self._report is None:
+            self._report = []
+        return self._report
+    def _set_report(self, report):
+        self._report = report
+    report = property(_get_report, _set_report)
+
     def appendTimeMark(self, tm):
         assert isinstance(tm, TimeMark)
         self.timeMarks.append(tm)
@@ -1847,25 +2401,25 @@ class Element(object):
         """
         return self.css('borderTop')
     def _set_borderTop(self, border):
-        self.style['borderTop'] = self._borderDict(border)
+        self._style['borderTop'] = self._borderDict(border)
     borderTop = property(_get_borderTop, _set_borderTop)
 
     def _get_borderRight(self):
         return self.css('borderRight')
     def _set_borderRight(self, border):
-        self.style['borderRight'] = self._borderDict(border)
+        self._style['borderRight'] = self._borderDict(border)
     borderRight = property(_get_borderRight, _set_borderRight)
 
     def _get_borderBottom(self):
         return self.css('borderBottom')
     def _set_borderBottom(self, border):
-        self.style['borderBottom'] = self._borderDict(border)
+        self._style['borderBottom'] = self._borderDict(border)
     borderBottom = property(_get_borderBottom, _set_borderBottom)
 
     def _get_borderLeft(self):
         return self.css('borderLeft')
     def _set_borderLeft(self, border):
-        self.style['borderLeft'] = self._borderDict(border)
+        self._style['borderLeft'] = self._borderDict(border)
     borderLeft = property(_get_borderLeft, _set_borderLeft)
 
     # Alignment types, defines where the origin of the element is located.
@@ -1883,19 +2437,19 @@ class Element(object):
     def _get_xAlign(self): # Answer the type of x-alignment. For compatibility allow align and xAlign as equivalents.
         return self._validateXAlign(self.css('xAlign'))
     def _set_xAlign(self, xAlign):
-        self.style['xAlign'] = self._validateXAlign(xAlign) # Save locally, blocking CSS parent scope for this param.
+        self._style['xAlign'] = self._validateXAlign(xAlign) # Save locally, blocking CSS parent scope for this param.
     xAlign = property(_get_xAlign, _set_xAlign)
 
     def _get_yAlign(self): # Answer the type of x-alignment.
         return self._validateYAlign(self.css('yAlign'))
     def _set_yAlign(self, yAlign):
-        self.style['yAlign'] = self._validateYAlign(yAlign) # Save locally, blocking CSS parent scope for this param.
+        self._style['yAlign'] = self._validateYAlign(yAlign) # Save locally, blocking CSS parent scope for this param.
     yAlign = property(_get_yAlign, _set_yAlign)
 
     def _get_zAlign(self): # Answer the type of x-alignment.
         return self._validateZAlign(self.css('zAlign'))
     def _set_zAlign(self, zAlign):
-        self.style['zAlign'] = self._validateZAlign(zAlign) # Save locally, blocking CSS parent scope for this param.
+        self._style['zAlign'] = self._validateZAlign(zAlign) # Save locally, blocking CSS parent scope for this param.
     zAlign = property(_get_zAlign, _set_zAlign)
 
     # Position by column + gutter size index.
@@ -1954,38 +2508,38 @@ class Element(object):
     def _get_cw(self): # Column width
         return self.css('cw')
     def _set_cw(self, cw):
-        self.style['cw'] = cw
+        self._style['cw'] = cw
     cw = property(_get_cw, _set_cw)
 
     def _get_ch(self): # Column height (row height)
         return self.css('ch')
     def _set_ch(self, ch):
-        self.style['ch'] = ch
+        self._style['ch'] = ch
     ch = property(_get_ch, _set_ch)
 
     def _get_cd(self): # Column depth (slice?)
         return self.css('cd')
     def _set_cd(self, cd):
-        self.style['cd'] = cd
+        self._style['cd'] = cd
     cd = property(_get_cd, _set_cd)
 
 
     def _get_gw(self): # Gutter width
         return self.css('gw', 0)
     def _set_gw(self, gw):
-        self.style['gw'] = gw # Set local.
+        self._style['gw'] = gw # Set local.
     gw = property(_get_gw, _set_gw)
 
     def _get_gh(self): # Gutter height
         return self.css('gh', 0)
     def _set_gh(self, gh):
-        self.style['gh'] = gh # Set local
+        self._style['gh'] = gh # Set local
     gh = property(_get_gh, _set_gh)
 
     def _get_gd(self): # Gutter depth
         return self.css('gd', 0)
     def _set_gd(self, gd):
-        self.style['gd'] = gd
+        self._style['gd'] = gd
     gd = property(_get_gd, _set_gd)
 
     def _get_gutter(self): # Tuple of (w, h) gutters
@@ -2072,7 +2626,7 @@ class Element(object):
         return self.css('bleedTop', 0)
     def _set_bleedTop(self, bleed):
         assert isinstance(bleed, (int, float))
-        self.style['bleedTop'] = bleed
+        self._style['bleedTop'] = bleed
     bleedTop = property(_get_bleedTop, _set_bleedTop)
 
     def _get_bleedBottom(self):
@@ -2081,7 +2635,7 @@ class Element(object):
         return self.css('bleedBottom', 0)
     def _set_bleedBottom(self, bleed):
         assert isinstance(bleed, (int, float))
-        self.style['bleedBottom'] = bleed
+        self._style['bleedBottom'] = bleed
     bleedBottom = property(_get_bleedBottom, _set_bleedBottom)
 
     def _get_bleedLeft(self):
@@ -2090,7 +2644,7 @@ class Element(object):
         return self.css('bleedLeft', 0)
     def _set_bleedLeft(self, bleed):
         assert isinstance(bleed, (int, float))
-        self.style['bleedLeft'] = bleed
+        self._style['bleedLeft'] = bleed
     bleedLeft = property(_get_bleedLeft, _set_bleedLeft)
 
     def _get_bleedRight(self):
@@ -2099,7 +2653,7 @@ class Element(object):
         return self.css('bleedRight', 0)
     def _set_bleedRight(self, bleed):
         assert isinstance(bleed, (int, float))
-        self.style['bleedRight'] = bleed
+        self._style['bleedRight'] = bleed
     bleedRight = property(_get_bleedRight, _set_bleedRight)
 
     # Absolute positions
@@ -2183,14 +2737,20 @@ class Element(object):
         >>> child.w
         45.0
         """
-        w = self.uw # Get uninterpreted unit instance if it exists.
-        if isinstance(w, (fr, perc)):
-            w = w.asPt(self.parent.w) # In case percentage or fraction, answer value in relation to self.parent
-        elif isinstance(w, em):
-            w = w.asPt(self.css('fontSize'))
-        return min(self.maxW, max(self.minW, w, MIN_WIDTH)) # From self.style, don't inherit.
+        reads = StyleDict.reads
+        if reads is not None: # Record reading the geometry of self, e.g. by the IncrementalSolver.
+            reads[(id(self), GEOMETRY)] = self, GEOMETRY
+        value = self._getCachedUnit('w') # The width is clipped by the width of the parent.
+        if value is NOTFOUND:
+            w = self.uw # Get uninterpreted unit instance if it exists.
+            if isinstance(w, (fr, perc)):
+                w = w.asPt(self.parent.w) # In case percentage or fraction, answer value in relation to self.parent
+            elif isinstance(w, em):
+                w = w.asPt(self.css('fontSize'))
+            value = self._cacheUnit('w', min(self.maxW, max(self.minW, w, MIN_WIDTH))) # From self.style, don't inherit.
+        return value
     def _set_w(self, w):
-        self.style['w'] = getUnits(w or DEFAULT_WIDTH) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['w'] = getUnits(w or DEFAULT_WIDTH) # Overwrite element local style from here, parent css becomes inaccessable.
     w = property(_get_w, _set_w)
 
     def _get_uw(self):
@@ -2207,7 +2767,7 @@ class Element(object):
         >>> e.uw
         220
         """
-        return self.style['w']
+        return self._style['w']
     uw = property(_get_uw, _set_w) # Setting same as self.w
 
     def _get_mw(self): # Width, including margins
@@ -2225,7 +2785,7 @@ class Element(object):
         """
         return self.w + self.ml + self.mr # Add margins to width
     def _set_mw(self, w):
-        self.style['w'] = max(0, w - self.ml - self.mr) # Cannot become < 0
+        self._style['w'] = max(0, w - self.ml - self.mr) # Cannot become < 0
     mw = property(_get_mw, _set_mw)
 
     def _get_h(self):
@@ -2257,14 +2817,20 @@ class Element(object):
         >>> child.h
         45.0
         """
-        h = self.uh
-        if isinstance(h, (fr, perc)):
-            h = h.asPt(self.parent.h) # In case percentage or fraction, answer value in relation to self.parent
-        elif isinstance(h, em):
-            h = h.asPt(self.css('fontSize'))
-        return min(self.maxH, max(self.minH, h, MIN_HEIGHT)) # From self.style, don't inherit.
+        reads = StyleDict.reads
+        if reads is not None: # Record reading the geometry of self, e.g. by the IncrementalSolver.
+            reads[(id(self), GEOMETRY)] = self, GEOMETRY
+        value = self._getCachedUnit('h') # The height is clipped by the height of the parent.
+        if value is NOTFOUND:
+            h = self.uh
+            if isinstance(h, (fr, perc)):
+                h = h.asPt(self.parent.h) # In case percentage or fraction, answer value in relation to self.parent
+            elif isinstance(h, em):
+                h = h.asPt(self.css('fontSize'))
+            value = self._cacheUnit('h', min(self.maxH, max(self.minH, h, MIN_HEIGHT))) # From self.style, don't inherit.
+        return value
     def _set_h(self, h):
-        self.style['h'] = getUnits(h or DEFAULT_HEIGHT) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['h'] = getUnits(h or DEFAULT_HEIGHT) # Overwrite element local style from here, parent css becomes inaccessable.
     h = property(_get_h, _set_h)
 
     def _get_uh(self):
@@ -2281,7 +2847,7 @@ class Element(object):
         >>> e.uh
         220
         """
-        return self.style['h']
+        return self._style['h']
     uh = property(_get_uh, _set_h) # Setting same as self.h
     
     def _get_mh(self): # Height, including margins
@@ -2299,7 +2865,7 @@ class Element(object):
         """
         return self.h + self.mt + self.mb # Add margins to height
     def _set_mh(self, h):
-        self.style['h'] = max(0, h - self.mt - self.mb) # Cannot become < 0
+        self._style['h'] = max(0, h - self.mt - self.mb) # Cannot become < 0
     mh = property(_get_mh, _set_mh)
 
     def _get_d(self):
@@ -2325,7 +2891,7 @@ class Element(object):
             d = d.asPt(self.css('fontSize'))
         return min(self.maxD, max(self.minD, d, MIN_DEPTH)) # From self.style, don't inherit.
     def _set_d(self, d):
-        self.style['d'] = getUnits(d or MIN_DEPTH) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['d'] = getUnits(d or MIN_DEPTH) # Overwrite element local style from here, parent css becomes inaccessable.
     d = property(_get_d, _set_d)
 
     def _get_ud(self):
@@ -2342,7 +2908,7 @@ class Element(object):
         >>> e.ud
         220
         """
-        return self.style['d']
+        return self._style['d']
     ud = property(_get_ud, _set_d) # Setting same as self.d
     
     def _get_md(self): # Depth, including margin front and margin back in z-axis.
@@ -2360,7 +2926,7 @@ class Element(object):
         """
         return self.d + self.mzb + self.mzf # Add front and back margins to depth
     def _set_md(self, d):
-        self.style['d'] = max(0, d - self.mzf - self.mzb) # Cannot become < 0, behind viewer?
+        self._style['d'] = max(0, d - self.mzf - self.mzb) # Cannot become < 0, behind viewer?
     md = property(_get_md, _set_md)
 
     # Margin properties
@@ -2481,7 +3047,7 @@ class Element(object):
             mt = mt.asPt(self.css('fontSize'))
         return mt # From self.style, don't inherit.
     def _set_mt(self, mt):
-        self.style['mt'] = getUnits(mt or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['mt'] = getUnits(mt or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
     mt = property(_get_mt, _set_mt)
 
     def _get_umt(self):
@@ -2497,7 +3063,7 @@ class Element(object):
         >>> e.umt
         220
         """
-        return self.style['mt']
+        return self._style['mt']
     umt = property(_get_umt, _set_mt) # Setting same as self.mt
 
 
@@ -2524,7 +3090,7 @@ class Element(object):
             mb = mb.asPt(self.css('fontSize'))
         return mb
     def _set_mb(self, mb):
-        self.style['mb'] = getUnits(mb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['mb'] = getUnits(mb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     mb = property(_get_mb, _set_mb)
 
     def _get_umb(self):
@@ -2540,7 +3106,7 @@ class Element(object):
         >>> e.umb
         220
         """
-        return self.style['mb']
+        return self._style['mb']
     umb = property(_get_umb, _set_mb) # Setting same as self.mb
 
     def _get_ml(self): # Margin left
@@ -2566,7 +3132,7 @@ class Element(object):
             ml = ml.asPt(self.css('fontSize'))
         return ml
     def _set_ml(self, ml):
-        self.style['ml'] = getUnits(ml or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['ml'] = getUnits(ml or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     ml = property(_get_ml, _set_ml)
 
     def _get_uml(self):
@@ -2582,7 +3148,7 @@ class Element(object):
         >>> e.uml
         220
         """
-        return self.style['ml']
+        return self._style['ml']
     uml = property(_get_uml, _set_ml) # Setting same as self.ml
 
 
@@ -2609,7 +3175,7 @@ class Element(object):
             mr = mr.asPt(self.css('fontSize'))
         return mr
     def _set_mr(self, mr):
-        self.style['mr'] = getUnits(mr or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['mr'] = getUnits(mr or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     mr = property(_get_mr, _set_mr)
 
     def _get_umr(self):
@@ -2625,7 +3191,7 @@ class Element(object):
         >>> e.umr
         220
         """
-        return self.style['mr']
+        return self._style['mr']
     umr = property(_get_umr, _set_mr) # Setting same as self.mr
 
 
@@ -2652,7 +3218,7 @@ class Element(object):
             mzf = mzf.asPt(self.css('fontSize'))
         return mzf
     def _set_mzf(self, mzf):
-        self.style['mzf'] = getUnits(mzf or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['mzf'] = getUnits(mzf or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     mzf = property(_get_mzf, _set_mzf)
 
     def _get_umzf(self):
@@ -2668,7 +3234,7 @@ class Element(object):
         >>> e.umzf
         220
         """
-        return self.style['mzf']
+        return self._style['mzf']
     umzf = property(_get_umzf, _set_mzf) # Setting same as self.mzf
 
 
@@ -2695,7 +3261,7 @@ class Element(object):
             mzb = mzb.asPt(self.css('fontSize'))
         return mzb
     def _set_mzb(self, mzb):
-        self.style['mzb'] = getUnits(mzb or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['mzb'] = getUnits(mzb or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
     mzb = property(_get_mzb, _set_mzb)
 
     def _get_umzb(self):
@@ -2711,7 +3277,7 @@ class Element(object):
         >>> e.umzb
         220
         """
-        return self.style['mzb']
+        return self._style['mzb']
     umzb = property(_get_umzb, _set_mzb) # Setting same as self.mzb
 
     # Padding properties
@@ -2837,7 +3403,7 @@ class Element(object):
             pt = pt.asPt(self.css('fontSize'))
         return pt
     def _set_pt(self, pt):
-        self.style['pt'] = getUnits(pt or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pt'] = getUnits(pt or 0)  # Overwrite element local style from here, parent css becomes inaccessable.
     pt = property(_get_pt, _set_pt)
 
     def _get_upt(self):
@@ -2885,7 +3451,7 @@ class Element(object):
             pb = pb.asPt(self.css('fontSize'))
         return pb
     def _set_pb(self, pb):
-        self.style['pb'] = getUnits(pb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pb'] = getUnits(pb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     pb = property(_get_pb, _set_pb)
 
     def _get_upb(self):
@@ -2933,7 +3499,7 @@ class Element(object):
             pl = pl.asPt(self.css('fontSize'))
         return pl
     def _set_pl(self, pl):
-        self.style['pl'] = getUnits(pl or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pl'] = getUnits(pl or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     pl = property(_get_pl, _set_pl)
 
     def _get_upl(self):
@@ -2982,7 +3548,7 @@ class Element(object):
             pr = pr.asPt(self.css('fontSize'))
         return pr
     def _set_pr(self, pr):
-        self.style['pr'] = getUnits(pr or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pr'] = getUnits(pr or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     pr = property(_get_pr, _set_pr)
 
     def _get_upr(self):
@@ -3027,7 +3593,7 @@ class Element(object):
             pzf = pzf.asPt(self.css('fontSize'))
         return pzf
     def _set_pzf(self, pzf):
-        self.style['pzf'] = getUnits(pzf or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pzf'] = getUnits(pzf or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     pzf = property(_get_pzf, _set_pzf)
 
     def _get_upzf(self):
@@ -3072,7 +3638,7 @@ class Element(object):
             pzb = pzb.asPt(self.css('fontSize'))
         return pzb
     def _set_pzb(self, pzb):
-        self.style['pzb'] = getUnits(pzb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
+        self._style['pzb'] = getUnits(pzb or 0) # Overwrite element local style from here, parent css becomes inaccessable.
     pzb = property(_get_pzb, _set_pzb)
 
     def _get_upzb(self):
@@ -3143,7 +3709,7 @@ class Element(object):
         """
         return self.css('frameDuration')
     def _set_frameDuration(self, frameDuration):
-        self.style['frameDuration'] = frameDuration # Overwrite as local value.
+        self._style['frameDuration'] = frameDuration # Overwrite as local value.
     frameDuration = property(_get_frameDuration, _set_frameDuration)
 
     def _get_originTop(self):
@@ -3164,11 +3730,11 @@ class Element(object):
         return self.css('originTop')
     def _set_originTop(self, flag):
         if flag:
-            self.style['originTop'] = True # Overwrite element local style from here, parent css becomes inaccessable.
-            self.style['yAlign'] = TOP
+            self._style['originTop'] = True # Overwrite element local style from here, parent css becomes inaccessable.
+            self._style['yAlign'] = TOP
         else:
-            self.style['originTop'] = False
-            self.style['yAlign'] = BOTTOM
+            self._style['originTop'] = False
+            self._style['yAlign'] = BOTTOM
     originTop = property(_get_originTop, _set_originTop)
 
     def _get_size(self):
@@ -3264,25 +3830,25 @@ class Element(object):
     def _get_shadow(self):
         return self.css('shadow')
     def _set_shadow(self, shadow):
-        self.style['shadow'] = shadow
+        self._style['shadow'] = shadow
     shadow = property(_get_shadow, _set_shadow)
 
     def _get_textShadow(self):
         return self.css('textShadow')
     def _set_textShadow(self, textShadow):
-        self.style['textShadow'] = textShadow
+        self._style['textShadow'] = textShadow
     textShadow = property(_get_textShadow, _set_textShadow)
 
     def _get_gradient(self):
         return self.css('gradient')
     def _set_gradient(self, gradient):
-        self.style['gradient'] = gradient
+        self._style['gradient'] = gradient
     gradient = property(_get_gradient, _set_gradient)
 
     def _get_textGradient(self):
         return self.css('textGradient')
     def _set_textGradient(self, textGradient):
-        self.style['textGradient'] = textGradient
+        self._style['textGradient'] = textGradient
     textGradient = property(_get_textGradient, _set_textGradient)
 
     def _get_box3D(self):
@@ -3503,19 +4069,19 @@ class Element(object):
     def _get_minW(self):
         return self.css('minW') or MIN_WIDTH
     def _set_minW(self, minW): # Clip values
-        self.style['minW'] = max(MIN_WIDTH, min(MAX_WIDTH, minW)) # Set on local style, shielding parent self.css value.
+        self._style['minW'] = max(MIN_WIDTH, min(MAX_WIDTH, minW)) # Set on local style, shielding parent self.css value.
     minW = property(_get_minW, _set_minW)
 
     def _get_minH(self):
         return self.css('minH') or MIN_HEIGHT
     def _set_minH(self, minH):
-        self.style['minH'] = max(MIN_HEIGHT, min(MAX_HEIGHT, minH)) # Set on local style, shielding parent self.css value.
+        self._style['minH'] = max(MIN_HEIGHT, min(MAX_HEIGHT, minH)) # Set on local style, shielding parent self.css value.
     minH = property(_get_minH, _set_minH)
 
     def _get_minD(self): # Set/get the minimal depth, in case the element has 3D dimensions.
         return self.css('minD') or MIN_DEPTH
     def _set_minD(self, minD):
-        self.style['minD'] = max(MIN_DEPTH, min(MAX_DEPTH, minD)) # Set on local style, shielding parent self.css value.
+        self._style['minD'] = max(MIN_DEPTH, min(MAX_DEPTH, minD)) # Set on local style, shielding parent self.css value.
     minD = property(_get_minD, _set_minD)
 
     def getMinSize(self):
@@ -3570,7 +4136,7 @@ class Element(object):
             maxW = maxW or self.parent.w
         return maxW or MAX_WIDTH # Unless defined local, take current parent.w as maxW
     def _set_maxW(self, maxW):
-        self.style['maxW'] = max(MIN_WIDTH, min(MAX_WIDTH, maxW)) # Set on local style, shielding parent self.css value.
+        self._style['maxW'] = max(MIN_WIDTH, min(MAX_WIDTH, maxW)) # Set on local style, shielding parent self.css value.
     maxW = property(_get_maxW, _set_maxW)
 
     def _get_maxH(self):
@@ -3579,7 +4145,7 @@ class Element(object):
             maxH = maxH or self.parent.h
         return maxH or MAX_HEIGHT # Unless defined local, take current parent.w as maxH
     def _set_maxH(self, maxH):
-        self.style['maxH'] = max(MIN_HEIGHT, min(MAX_HEIGHT, maxH)) # Set on local style, shielding parent self.css value.
+        self._style['maxH'] = max(MIN_HEIGHT, min(MAX_HEIGHT, maxH)) # Set on local style, shielding parent self.css value.
     maxH = property(_get_maxH, _set_maxH)
 
     def _get_maxD(self):
@@ -3588,7 +4154,7 @@ class Element(object):
             maxD = maxD or self.parent.d
         return maxD or MAX_DEPTH # Unless defined local, take current parent.w as maxD
     def _set_maxD(self, maxD):
-        self.style['maxD'] = max(MIN_DEPTH, min(MAX_DEPTH, maxD)) # Set on local style, shielding parent self.css value.
+        self._style['maxD'] = max(MIN_DEPTH, min(MAX_DEPTH, maxD)) # Set on local style, shielding parent self.css value.
     maxD = property(_get_maxD, _set_maxD)
 
     def getMaxSize(self):
@@ -3615,21 +4181,21 @@ class Element(object):
         return self.css('scaleX', 1)
     def _set_scaleX(self, scaleX):
         assert scaleX != 0
-        self.style['scaleX'] = scaleX # Set on local style, shielding parent self.css value.
+        self._style['scaleX'] = scaleX # Set on local style, shielding parent self.css value.
     scaleX = property(_get_scaleX, _set_scaleX)
 
     def _get_scaleY(self):
         return self.css('scaleX', 1)
     def _set_scaleY(self, scaleY):
         assert scaleY != 0
-        self.style['scaleY'] = scaleY # Set on local style, shielding parent self.css value.
+        self._style['scaleY'] = scaleY # Set on local style, shielding parent self.css value.
     scaleY = property(_get_scaleY, _set_scaleY)
 
     def _get_scaleZ(self):
         return self.css('scaleZ', 1)
     def _set_scaleZ(self, scaleZ):
         assert scaleZ != 0
-        self.style['scaleZ'] = scaleZ # Set on local style, shielding parent self.css value.
+        self._style['scaleZ'] = scaleZ # Set on local style, shielding parent self.css value.
     scaleZ = property(_get_scaleZ, _set_scaleZ)
 
     def getFloatTopSide(self, previousOnly=True, tolerance=0):
@@ -3637,6 +4203,9 @@ class Element(object):
         This means we are just looking at the vertical projection between (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available space, includes the margins of the elements."""
+        index = self._getSiblingIndex()
+        if index is not None:
+            return index.getFloatTopSide(self, previousOnly, tolerance)
         if self.originTop:
             y = 0
         else:
@@ -3657,6 +4226,9 @@ class Element(object):
         This means we are just looking at the vertical projection of (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available space, includes the margins of the elements."""
+        index = self._getSiblingIndex()
+        if index is not None:
+            return index.getFloatBottomSide(self, previousOnly, tolerance)
         if self.originTop:
             y = self.parent.h
         else:
@@ -3677,6 +4249,9 @@ class Element(object):
         This means we are just looking at the horizontal projection of (self.top, self.bottom).
         Note that the x may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available space, includes the margins of the elements."""
+        index = self._getSiblingIndex()
+        if index is not None:
+            return index.getFloatLeftSide(self, previousOnly, tolerance)
         x = 0
         for e in self.parent.elements: # All elements that share self.parent, except self.
             if previousOnly and e is self: # Only look at siblings that are previous in the list.
@@ -3697,6 +4272,9 @@ class Element(object):
         This means we are just looking at the vertical projection of (self.left, self.right).
         Note that the y may be outside the parent box. Only elements with identical z-value are compared.
         Comparison of available space, includes the margins of the elements."""
+        index = self._getSiblingIndex()
+        if index is not None and self.originTop:
+            return index.getFloatRightSide(self, previousOnly, tolerance)
         x = self.parent.w
         for e in self.parent.elements: # All elements that share self.parent, except self.
             if previousOnly and e is self: # Only look at siblings that are previous in the list.
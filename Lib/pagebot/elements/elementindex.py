@@ -0,0 +1,206 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     elementindex.py
+#
+#     Implements the index of a document on the elements of its pages, by eId,
+#     by name and by class name. The elements keep it up to date when they are
+#     appended, removed or renamed, so finding elements by name, as the text
+#     flows do for every overflow step, does not need to walk the page trees.
+#
+
+def getTreePath(e, root):
+    u"""Answer the tuple of indices of the elements from root down to e, as in
+    root.elements[i0].elements[i1]... The paths of elements sort in depth-first order
+    of the tree. Answer None if e is not in the tree of root. Walking up stops at the page.
+
+    >>> from pagebot.elements.element import Element
+    >>> e1 = Element()
+    >>> e2 = Element(elements=[Element(), e1])
+    >>> root = Element(elements=[Element(), e2])
+    >>> getTreePath(e1, root), getTreePath(root, root), getTreePath(root, e1)
+    ((1, 1), (), None)
+    """
+    path = []
+    while e is not root:
+        parent = e.parent
+        if parent is None or e.isPage:
+            return None
+        path.append(parent.elements.index(e))
+        e = parent
+    path.reverse()
+    return tuple(path)
+
+class ElementIndex(object):
+    u"""Index of the elements on the pages of a document, by eId, by name and by class name.
+    For every element, the index keeps the page it is on, so named elements are found per page.
+    Elements are added and removed with their offspring.
+
+    >>> from pagebot.elements.element import Element
+    >>> from pagebot.elements.pbpage import Page
+    >>> page = Page(name='Page')
+    >>> e1 = Element(name='Box')
+    >>> e2 = Element(name='Group', elements=[Element(name='Box'), e1])
+    >>> i = page.appendElement(e2)
+    >>> index = ElementIndex()
+    >>> index.add(page)
+    >>> len(index), e1.eId in index, index.get(e1.eId) is e1, index.getPage(e1) is page
+    (4, True, True, True)
+    >>> [e.name for e in index.findElements(name='Box')], len(index.findElements(cls=Element))
+    (['Box', 'Box'], 3)
+    >>> index.getElementByName(page, 'Box') is e2.elements[0], index.getElementByName(e1, 'Box')
+    (True, None)
+    >>> e1.name = 'Other' # Elements don't call the index, set up here without a document.
+    >>> index.rename(e1)
+    >>> index.findElements(name='Other') == [e1], len(index.deepFind(page, 'Box'))
+    (True, 1)
+    >>> index.remove(e2)
+    >>> len(index), index.get(e1.eId), index.findElements(name='Box')
+    (1, None, [])
+    """
+    def __init__(self):
+        self._elements = {} # Key is eId, value is tuple (element, page, indexed name). A page is on itself.
+        self._names = {} # Key is name, value is dictionary {page.eId: {eId: element}}
+        self._classes = {} # Key is class name, value is dictionary {eId: element}
+
+    def __repr__(self):
+        return '<%s %d elements>' % (self.__class__.__name__, len(self._elements))
+
+    def __len__(self):
+        return len(self._elements)
+
+    def __contains__(self, eId):
+        return eId in self._elements
+
+    def add(self, e, page=None):
+        u"""Add e with all its offspring to self, as elements on page. If page is None, then e is a page."""
+        if page is None:
+            page = e
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            eId = e.eId
+            if eId in self._elements:
+                self._discard(eId)
+            name = e.name
+            self._elements[eId] = e, page, name
+            if name is not None:
+                self._names.setdefault(name, {}).setdefault(page.eId, {})[eId] = e
+            self._classes.setdefault(e.__class__.__name__, {})[eId] = e
+            stack.extend(e.elements)
+
+    def remove(self, e):
+        u"""Remove e with all its offspring from self. Elements that are not in self are ignored."""
+        stack = [e]
+        while stack:
+            e = stack.pop()
+            self._discard(e.eId)
+            stack.extend(e.elements)
+
+    def _discard(self, eId):
+        entry = self._elements.pop(eId, None)
+        if entry is None:
+            return
+        e, page, name = entry
+        if name is not None:
+            self._discardName(eId, page, name)
+        elements = self._classes[e.__class__.__name__]
+        del elements[eId]
+        if not elements:
+            del self._classes[e.__class__.__name__]
+
+    def _discardName(self, eId, page, name):
+        pages = self._names[name]
+        elements = pages[page.eId]
+        del elements[eId]
+        if not elements:
+            del pages[page.eId]
+            if not pages:
+                del self._names[name]
+
+    def rename(self, e):
+        u"""Update the name of e in self, after it changed."""
+        entry = self._elements.get(e.eId)
+        if entry is None:
+            return
+        eId = e.eId
+        _, page, name = entry
+        if name is not None:
+            self._discardName(eId, page, name)
+        name = e.name
+        self._elements[eId] = e, page, name
+        if name is not None:
+            self._names.setdefault(name, {}).setdefault(page.eId, {})[eId] = e
+
+    def get(self, eId):
+        u"""Answer the element with eId. Answer None if it is not in self."""
+        entry = self._elements.get(eId)
+        if entry is None:
+            return None
+        return entry[0]
+
+    def getPage(self, e):
+        u"""Answer the page that e is on. Answer None if e is not in self."""
+        entry = self._elements.get(e.eId)
+        if entry is None:
+            return None
+        return entry[1]
+
+    def findElements(self, name=None, cls=None):
+        u"""Answer the list of elements on all pages with name and/or with exact class cls, which
+        is a class or a class name. The order of the elements is undefined."""
+        if name is not None:
+            elements = []
+            for pageElements in self._names.get(name, {}).values():
+                elements.extend(pageElements.values())
+            if cls is not None:
+                if not isinstance(cls, str):
+                    cls = cls.__name__
+                elements = [e for e in elements if e.__class__.__name__ == cls]
+            return elements
+        if cls is not None:
+            if not isinstance(cls, str):
+                cls = cls.__name__
+            return list(self._classes.get(cls, {}).values())
+        return []
+
+    def deepFind(self, root, name):
+        u"""Answer the list of elements with name in the offspring of root, in depth-first order,
+        as root.deepFind(name) answers them. Root must be in self."""
+        page = self._elements[root.eId][1]
+        candidates = self._names.get(name, {}).get(page.eId)
+        if not candidates:
+            return []
+        if root is page and len(candidates) == 1: # Most common for flows, no need for the tree path.
+            return [e for e in candidates.values() if e is not root]
+        found = []
+        for e in candidates.values():
+            path = getTreePath(e, root)
+            if path: # Not None and not root itself.
+                found.append((path, e))
+        found.sort(key=lambda pathElement: pathElement[0])
+        return [e for _, e in found]
+
+    def getElementByName(self, root, name):
+        u"""Answer the first element with name in the offspring of root, in depth-first order.
+        Answer None if there is none. Root must be in self."""
+        found = self.deepFind(root, name)
+        if found:
+            return found[0]
+        return None
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
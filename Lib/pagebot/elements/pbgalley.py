@@ -63,14 +63,20 @@ class Galley(Element):
         eParent = e.parent
         if not eParent is None: 
             eParent.removeElement(e) # Remove from current parent, if there is one.
-        self._elements.append(e) # Possibly add to self again, will move it to the top of the element stack.
+        self._allocElements()
+        self._eIds[e.eId] = e # Stored by unique element id, the order is the order of the elements.
+        if self._elements is not None: # Otherwise made again from self._eIds when needed.
+            self._elements.append(e) # Possibly add to self again, will move it to the top of the element stack.
         e.setParent(self) # Set parent of element without calling this method again.
-        if e.eId: # Store the element by unique element id, if it is defined.
-            self._eIds[e.eId] = e
+        elementIndex = self.elementIndex
+        if elementIndex is not None: # Self is on a page of a document, add e and its offspring.
+            elementIndex.add(e, elementIndex.getPage(self))
         # If this is a text box, then set self.lastTextBox
         if e.isTextBox:
             self.lastTextBox = e
-        return len(self._elements)-1 # Answer the element index for e.
+        index = len(self.elements)-1
+        self._elementsChanged(e, index)
+        return index # Answer the element index for e.
 
     def getSize(self):
         u"""Answer the enclosing rectangle of all elements in the galley."""
@@ -101,7 +107,7 @@ class Galley(Element):
     def newTextBox(self, fs, html=None):
         u"""Create a new *self.TEXTBOX_CLASS* instance, filled with the *fs* FormattedString.
         Append the element to *self* (also setting self.lastTextBox) and answer the element."""
-        tb = self.TEXTBOX_CLASS('', parent=self, html=html)
+        tb = self.TEXTBOX_CLASS(fs, parent=self, html=html)
         self.appendElement(tb) # Will set the self.lastTextBox by local self.appendElement(tb)
         return tb
 
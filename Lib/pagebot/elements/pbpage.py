@@ -14,7 +14,6 @@
 #
 #     page.py
 #
-import weakref
 from pagebot.elements.element import Element
 from pagebot.toolbox.transformer import pointOffset
 from pagebot.style import ORIGIN
@@ -285,9 +284,7 @@ class Template(Page):
     def _set_parent(self, parent):
         u"""Set the parent of the template. Don't call self.appendParent here, as we don't want the 
         parent to add self to the page/element list. Just a simple reference, to connect to styles, etc."""
-        if parent is not None:
-            parent = weakref.ref(parent)
-        self._parent = parent
+        self.setParent(parent) # Set weakref and stamp the change for cached css values.
     parent = property(_get_parent, _set_parent)
 
  
@@ -96,6 +96,15 @@ class TextBox(Element):
         self.style['h'] = h # If None, then self.h is elastic defined by content
     h = property(_get_h, _set_h)
 
+    def _get_bs(self):
+        u"""Answer the BabelString of self. Setting the string may change an elastic height,
+        so the optional spatial index of the parent is notified."""
+        return self._bs
+    def _set_bs(self, bs):
+        self._bs = bs
+        self._changed()
+    bs = property(_get_bs, _set_bs)
+
     def _get_textLines(self):
         if self._textLines is None:
             return []
@@ -138,15 +147,19 @@ class TextBox(Element):
 
     def copy(self, parent=None):
         u"""Answer a full copy of self, where the "unique" fields are set to default.
-        Also perform a deep copy on all child elements.
+        Also perform a deep copy on all child elements. The copy gets its own copy of the
+        string, so changing one of both strings does not change the other.
 
-        >>> e = TextBox('Hello world', name='Child', w=100)
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> context = FlatContext()
+        >>> e = TextBox(context.newString('Hello world'), name='Child', w=100)
         >>> copyE = e.copy() # Copy the element attribute, including the string of self.
-        >>> #copyE.bs # TODO: Needs development and testing
-        Hello world
+        >>> copyE.bs += ' and more'
+        >>> copyE.bs is e.bs, e.bs.asText(), copyE.bs.asText()
+        (False, 'Hello world', 'Hello world and more')
         """
         e = Element.copy(self, parent=parent)
-        e.bs = self.bs # Copy the string separately.
+        e.bs = self.bs.copy() # Copy the string separately, so changing it does not change self.
         return e
 
     # BabelString support, answering the structure that holds strings for all builder types.
@@ -229,7 +242,7 @@ class TextBox(Element):
             w = self.w-self.pr-self.pl
         if h is None:
             h = self.h-self.pt-self.pb
-        return self.bs.textOverflow(w, h, LEFT)
+        return self.bs.getTextOverflow(w, h, LEFT)
 
     def NOTNOW_getBaselinePositions(self, y=0, w=None, h=None):
         u"""Answer the list vertical baseline positions, relative to y (default is 0)
@@ -270,7 +283,7 @@ class TextBox(Element):
         if the overflow marker needs to be drawn.
         Note: There is currently not a test if text actually went into the next element. It's just
         checking if there is a name defined, not if it exists or is already filled by another flow."""
-        return self.nextElement is None and self.getOverflow() != ''
+        return self.nextElement is None and len(self.getOverflow()) > 0 # Overflow can be an empty string instance.
 
     def overflow2Next(self):
         u"""Try to fix if there is overflow."""
@@ -0,0 +1,444 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     spatialindex.py
+#
+#     Optional index on the margin boxes of the child elements of a parent,
+#     to answer the float and hit-test queries of siblings without scanning
+#     all elements of the parent.
+#
+import weakref
+from random import random
+
+from pagebot.style import StyleDict, SIBLINGS
+from pagebot.toolbox.transformer import point3D
+from pagebot.toolbox.units import Unit
+
+def asPt(v):
+    u"""Answer v as plain number in points if it is a Unit, so it can be a dictionary
+    key and it compares with plain numbers in the index. Other values are answered unchanged.
+
+    >>> from pagebot.toolbox.units import pt, mm
+    >>> asPt(pt(20)), asPt(mm(10)) == mm(10).asPt(), asPt(12), asPt(None)
+    (20, True, 12, None)
+    """
+    if isinstance(v, Unit):
+        return v.asPt()
+    return v
+
+class IntervalNode(object):
+    u"""Node of the IntervalTree. Besides its own interval (lo, hi), order and the
+    two values, the node keeps the aggregates of its subtree, used to skip
+    subtrees that cannot overlap or cannot improve the current answer."""
+    __slots__ = ('key', 'lo', 'hi', 'order', 'values', 'priority', 'left', 'right',
+        'maxHi', 'minOrder', 'maxValues', 'minValues')
+
+    def __init__(self, key, lo, hi, order, values):
+        self.key = key
+        self.lo = lo
+        self.hi = hi
+        self.order = order
+        self.values = values # Tuple of 2 values.
+        self.priority = random()
+        self.left = self.right = None
+        self.update()
+
+    def update(self):
+        u"""Update the aggregates of the subtree from the node and its children."""
+        maxHi = self.hi
+        minOrder = self.order
+        max0 = min0 = self.values[0]
+        max1 = min1 = self.values[1]
+        for child in (self.left, self.right):
+            if child is not None:
+                if child.maxHi > maxHi:
+                    maxHi = child.maxHi
+                if child.minOrder < minOrder:
+                    minOrder = child.minOrder
+                cMax0, cMax1 = child.maxValues
+                cMin0, cMin1 = child.minValues
+                if cMax0 > max0:
+                    max0 = cMax0
+                if cMax1 > max1:
+                    max1 = cMax1
+                if cMin0 < min0:
+                    min0 = cMin0
+                if cMin1 < min1:
+                    min1 = cMin1
+        self.maxHi = maxHi
+        self.minOrder = minOrder
+        self.maxValues = max0, max1
+        self.minValues = min0, min1
+
+class IntervalTree(object):
+    u"""Balanced (treap) interval tree, sorted by the low side of the intervals.
+    Every interval has an order (the index of the element in its parent) and a tuple
+    of 2 values. Queries answer the max or min value of all intervals that overlap
+    with a given interval, optionally limited to intervals with a lower order.
+    Insert and remove are O(log n). Queries visit the most promising subtrees first
+    and skip all subtrees that cannot overlap or cannot improve the current answer.
+
+    >>> tree = IntervalTree()
+    >>> tree.insert('a', 0, 10, 0, (100, 200))
+    >>> tree.insert('b', 20, 30, 1, (110, 150))
+    >>> tree.insert('c', 5, 25, 2, (120, 130))
+    >>> len(tree)
+    3
+    >>> tree.query(8, 9, index=1) # Max value[1] of intervals overlapping (8, 9)
+    200
+    >>> tree.query(8, 9, index=1, useMax=False)
+    130
+    >>> tree.query(8, 9, index=1, limit=2) # Only intervals with order < 2
+    200
+    >>> tree.query(10, 20, index=0) # Closed intervals include touching sides.
+    120
+    >>> tree.query(10, 20, index=0, strict=True, useMax=False)
+    120
+    >>> tree.query(40, 50) is None
+    True
+    >>> tree.remove('c')
+    >>> tree.query(8, 9, index=1, useMax=False)
+    200
+    >>> len(tree)
+    2
+    """
+    def __init__(self):
+        self.root = None
+        self.nodes = {} # Key is the unique key of the interval, value is the node.
+
+    def __len__(self):
+        return len(self.nodes)
+
+    def _split(self, node, sortKey):
+        u"""Split the subtree of node in two trees, with nodes < sortKey and >= sortKey."""
+        if node is None:
+            return None, None
+        if (node.lo, node.order) < sortKey:
+            left, right = self._split(node.right, sortKey)
+            node.right = left
+            node.update()
+            return node, right
+        left, right = self._split(node.left, sortKey)
+        node.left = right
+        node.update()
+        return left, node
+
+    def _merge(self, left, right):
+        u"""Merge the two subtrees, where all nodes in left sort before the nodes in right."""
+        if left is None:
+            return right
+        if right is None:
+            return left
+        if left.priority > right.priority:
+            left.right = self._merge(left.right, right)
+            left.update()
+            return left
+        right.left = self._merge(left, right.left)
+        right.update()
+        return right
+
+    def insert(self, key, lo, hi, order, values):
+        u"""Insert the interval (lo, hi) with order and values for unique key.
+        Replace the existing interval if the key already exists. The (lo, order)
+        combination is supposed to be unique."""
+        if key in self.nodes:
+            self.remove(key)
+        node = self.nodes[key] = IntervalNode(key, lo, hi, order, values)
+        left, right = self._split(self.root, (lo, order))
+        self.root = self._merge(self._merge(left, node), right)
+
+    def remove(self, key):
+        u"""Remove the interval of key. Ignore if it does not exist."""
+        node = self.nodes.pop(key, None)
+        if node is not None:
+            self.root = self._remove(self.root, node, (node.lo, node.order))
+
+    def _remove(self, root, node, sortKey):
+        if root is node:
+            return self._merge(root.left, root.right)
+        if sortKey < (root.lo, root.order):
+            root.left = self._remove(root.left, node, sortKey)
+        else:
+            root.right = self._remove(root.right, node, sortKey)
+        root.update()
+        return root
+
+    def query(self, lo, hi, index=0, useMax=True, strict=False, limit=None):
+        u"""Answer the max (or min if useMax is False) of values[index] of all intervals
+        that overlap with (lo, hi). If strict is True, intervals that only touch
+        don't overlap. If limit is defined, only intervals with order < limit are
+        used. Answer None if there are no matching intervals."""
+        best = None
+        stack = [self.root]
+        while stack:
+            node = stack.pop()
+            if node is None:
+                continue
+            if limit is not None and node.minOrder >= limit:
+                continue # No node in this subtree is early enough.
+            if node.maxHi < lo or (strict and node.maxHi == lo):
+                continue # No interval in this subtree reaches lo.
+            if best is not None:
+                if useMax and node.maxValues[index] <= best:
+                    continue # Nothing to improve in this subtree.
+                if not useMax and node.minValues[index] >= best:
+                    continue
+            if strict:
+                overlaps = node.lo < hi and node.hi > lo
+            else:
+                overlaps = node.lo <= hi and node.hi >= lo
+            if overlaps and (limit is None or node.order < limit):
+                value = node.values[index]
+                if best is None or (useMax and value > best) or (not useMax and value < best):
+                    best = value
+            left = node.left
+            # Right subtree only if its intervals can start before hi.
+            if node.lo < hi or (not strict and node.lo == hi):
+                right = node.right
+            else:
+                right = None
+            # Visit the most promising subtree first, to skip more of the other one.
+            if left is not None and right is not None:
+                if useMax:
+                    leftFirst = left.maxValues[index] >= right.maxValues[index]
+                else:
+                    leftFirst = left.minValues[index] <= right.minValues[index]
+                if leftFirst:
+                    stack.append(right)
+                    stack.append(left)
+                else:
+                    stack.append(left)
+                    stack.append(right)
+            else:
+                stack.append(left or right)
+        return best
+
+class SpatialIndex(object):
+    u"""Index on the margin boxes of the child elements of parent, bucketed by their
+    z-position. It answers the queries of Element.getFloatTopSide, getFloatBottomSide,
+    getFloatLeftSide, getFloatRightSide and getElementsAtPoint in logarithmic time
+    instead of scanning all siblings.
+    The index is updated lazily: children notify the index when their style (and
+    therefore their position or size) changes, and these elements are updated before
+    the next query. A change in the list of elements or in the style of one of the
+    ancestors makes the index rebuild on the next query.
+    Positions and sizes in units, such as pt(20) or mm(10), are indexed and queried
+    as plain numbers in points.
+
+    >>> from pagebot.elements.element import Element
+    >>> from pagebot.toolbox.units import pt, mm
+    >>> parent = Element(w=500, h=500)
+    >>> e1 = Element(x=pt(20), y=pt(30), w=100, h=50, parent=parent)
+    >>> e2 = Element(x=mm(10), y=40, w=pt(100), h=50, parent=parent)
+    >>> e3 = Element(x=200, y=pt(30), w=100, h=50, parent=parent)
+    >>> scanned = e3.getFloatLeftSide(), e3.getFloatTopSide(), e2.getFloatRightSide()
+    >>> parent.spatialIndex = True
+    >>> (e3.getFloatLeftSide(), e3.getFloatTopSide(), e2.getFloatRightSide()) == scanned
+    True
+    >>> parent.getElementsAtPoint((pt(20), pt(30))) == [e1], parent.getElementsAtPoint((20, 30)) == [e1]
+    (True, True)
+    >>> parent.getElementsAtPoint((None, 30)) == [e1, e3], parent.getElementsAtPoint((mm(10), None)) == [e2]
+    (True, True)
+    """
+    def __init__(self, parent):
+        self._parent = weakref.ref(parent)
+        self.reset()
+
+    def __repr__(self):
+        return '<%s>' % self.__class__.__name__
+
+    def _get_parent(self):
+        return self._parent()
+    parent = property(_get_parent)
+
+    def reset(self):
+        u"""Force the index to rebuild on the next query, e.g. if the order of
+        the child elements changed."""
+        self.stamp = StyleDict.epoch # Epoch of the last change, answered as value of recorded SIBLINGS reads.
+        self._valid = False
+        self._epoch = None # StyleDict.epoch of the last rebuild or ancestor check.
+        self._dirty = {} # Key is eId, value is element.
+        self._entries = {} # Key is eId, value is (order, z, point).
+        self._xTrees = {} # Key is z, value is IntervalTree on (mLeft, mRight) with values (mTop, mBottom).
+        self._yTrees = {} # Key is z, value is IntervalTree on (mTop, mBottom) with values (mLeft, mRight).
+        self._points = {} # Key is (x, y, z) point, value is set of eIds.
+        self._axes = ({}, {}, {}) # Key is x, y or z value, value is set of eIds.
+        self._elements = {} # Key is eId, value is element.
+
+    def elementChanged(self, e):
+        u"""Called by child element e if its style changed. The entry of e will be
+        updated on the next query."""
+        self.stamp = StyleDict.epoch
+        if self._valid:
+            self._dirty[e.eId] = e
+
+    def elementAppended(self, e, order):
+        u"""Called by the parent when e was appended as last element, with order as index."""
+        self.stamp = StyleDict.epoch
+        if self._valid:
+            self._entries[e.eId] = (order, None, None)
+            self._dirty[e.eId] = e
+
+    def _ancestorsChanged(self):
+        u"""Answer the boolean flag if the parent or one of its ancestors changed style
+        or parent, since the last check. That may change the alignment, relative units
+        or em-units of any of the child elements."""
+        epoch = StyleDict.epoch
+        if self._epoch == epoch:
+            return False
+        parent = self.parent
+        while parent is not None:
+            stamp = getattr(parent, '_styleStamp', None)
+            if stamp is None or stamp > self._epoch:
+                return True
+            parent = parent.parent
+        self._epoch = epoch
+        return False
+
+    def _update(self):
+        u"""Update the index, making it reflect the current positions and sizes of the
+        child elements. If reads are recorded in StyleDict.reads, e.g. by the IncrementalSolver,
+        then record that the answer of the query depends on all child elements."""
+        reads = StyleDict.reads
+        if reads is not None:
+            reads[(id(self), SIBLINGS)] = self, SIBLINGS
+        if not self._valid or self._ancestorsChanged():
+            self.reset()
+            self._epoch = StyleDict.epoch
+            for order, e in enumerate(self.parent.elements):
+                self._index(e, order)
+            self._valid = True
+        elif self._dirty:
+            dirty = self._dirty
+            self._dirty = {}
+            for eId, e in dirty.items():
+                self._unindex(eId)
+                self._index(e, self._entries[eId][0])
+
+    def _index(self, e, order):
+        eId = e.eId
+        z = asPt(e.z)
+        mLeft, mRight, mTop, mBottom = asPt(e.mLeft), asPt(e.mRight), asPt(e.mTop), asPt(e.mBottom)
+        if z not in self._xTrees:
+            self._xTrees[z] = IntervalTree()
+            self._yTrees[z] = IntervalTree()
+        self._xTrees[z].insert(eId, mLeft, mRight, order, (mTop, mBottom))
+        self._yTrees[z].insert(eId, min(mTop, mBottom), max(mTop, mBottom), order, (mLeft, mRight))
+        point = tuple([asPt(v) for v in point3D(e.point)])
+        self._points.setdefault(point, set()).add(eId)
+        for axis, value in zip(self._axes, point):
+            axis.setdefault(value, set()).add(eId)
+        self._entries[eId] = (order, z, point)
+        self._elements[eId] = e
+
+    def _unindex(self, eId):
+        order, z, point = self._entries.get(eId, (None, None, None))
+        if point is None: # Not indexed yet
+            return
+        self._xTrees[z].remove(eId)
+        self._yTrees[z].remove(eId)
+        self._points[point].discard(eId)
+        for axis, value in zip(self._axes, point):
+            axis[value].discard(eId)
+
+    def _query(self, yAxis, e, lo, hi, index, useMax, strict, previousOnly, tolerance):
+        u"""Answer the best value of the siblings of e in the x-trees (or y-trees if yAxis 
+        is True), within the z-tolerance."""
+        self._update()
+        lo, hi = asPt(lo), asPt(hi)
+        if yAxis:
+            trees = self._yTrees
+        else:
+            trees = self._xTrees
+        if previousOnly:
+            limit = self._entries[e.eId][0]
+        else:
+            limit = None
+        best = None
+        z = asPt(e.z)
+        for tz, tree in trees.items():
+            if abs(tz - z) > tolerance:
+                continue
+            value = tree.query(lo, hi, index, useMax, strict, limit)
+            if value is not None and (best is None or (useMax and value > best) or (not useMax and value < best)):
+                best = value
+        return best
+
+    def getFloatTopSide(self, e, previousOnly=True, tolerance=0):
+        u"""Answer the same as e.getFloatTopSide(previousOnly, tolerance)."""
+        parent = self.parent
+        if e.originTop:
+            y = self._query(False, e, e.mLeft, e.mRight, 1, True, False, previousOnly, tolerance)
+            if y is None:
+                return 0
+            return max(0, y)
+        y = self._query(False, e, e.mLeft, e.mRight, 1, False, False, previousOnly, tolerance)
+        if y is None:
+            return parent.h
+        return min(parent.h, y)
+
+    def getFloatBottomSide(self, e, previousOnly=True, tolerance=0):
+        u"""Answer the same as e.getFloatBottomSide(previousOnly, tolerance)."""
+        parent = self.parent
+        if e.originTop:
+            y = self._query(False, e, e.mLeft, e.mRight, 0, False, False, previousOnly, tolerance)
+            if y is None:
+                return parent.h
+            return min(parent.h, y)
+        y = self._query(False, e, e.mLeft, e.mRight, 0, True, False, previousOnly, tolerance)
+        if y is None:
+            return 0
+        return max(0, y)
+
+    def getFloatLeftSide(self, e, previousOnly=True, tolerance=0):
+        u"""Answer the same as e.getFloatLeftSide(previousOnly, tolerance)."""
+        mTop, mBottom = e.mTop, e.mBottom
+        x = self._query(True, e, min(mTop, mBottom), max(mTop, mBottom), 1, True, True, previousOnly, tolerance)
+        if x is None:
+            return 0
+        return max(0, x)
+
+    def getFloatRightSide(self, e, previousOnly=True, tolerance=0):
+        u"""Answer the same as e.getFloatRightSide(previousOnly, tolerance), for elements with
+        originTop set to True."""
+        w = self.parent.w
+        x = self._query(True, e, e.mTop, e.mBottom, 0, False, False, previousOnly, tolerance)
+        if x is None:
+            return w
+        return min(w, x)
+
+    def getElementsAtPoint(self, point):
+        u"""Answer the same as parent.getElementsAtPoint(point), in the order of the elements."""
+        self._update()
+        p = [asPt(v) for v in point3D(point)]
+        if None not in p:
+            eIds = self._points.get(tuple(p), set())
+        else:
+            eIds = None
+            for axis, value in zip(self._axes, p):
+                if value is None:
+                    continue
+                found = axis.get(value, set())
+                if eIds is None:
+                    eIds = set(found)
+                else:
+                    eIds &= found
+            if eIds is None: # All wildcards
+                eIds = self._entries.keys()
+        return [self._elements[eId] for eId in sorted(eIds, key=lambda eId: self._entries[eId][0])]
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
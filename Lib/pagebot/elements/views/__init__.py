@@ -13,18 +13,68 @@
 #
 #     __init__.py
 #
-# Page views
-from pagebot.elements.views.pageview import PageView
-# Website views
-from pagebot.elements.views.siteview import SiteView # Saves in local docs/ folder. Create if it does not exist.
-from pagebot.elements.views.mampview import MampView # Saves in local Applications/MAMP/htdocs directory
-from pagebot.elements.views.gitview import GitView # Saves in local position, so git works as website server.
-
-viewClasses = {
-	PageView.viewId: PageView,
-	MampView.viewId: MampView,
-	GitView.viewId: GitView,
-	SiteView.viewId: SiteView,
+#     The view modules are imported when their class is used for the first time,
+#     by viewClasses[viewId] or as attribute of this module (PEP 562), so importing
+#     a document does not import the contexts of all views.
+#
+import importlib
+try:
+    from collections.abc import Mapping
+except ImportError: # Python 2
+    from collections import Mapping
+
+# Key is viewId, value is the (module, className) tuple of the view class.
+VIEW_MODULES = {
+    'Page': ('pagebot.elements.views.pageview', 'PageView'), # Page views
+    # Website views
+    'Site': ('pagebot.elements.views.siteview', 'SiteView'), # Saves in local docs/ folder. Create if it does not exist.
+    'Mamp': ('pagebot.elements.views.mampview', 'MampView'), # Saves in local Applications/MAMP/htdocs directory
+    'Git': ('pagebot.elements.views.gitview', 'GitView'), # Saves in local position, so git works as website server.
 }
+DEFAULT_VIEWID = 'Page'
+
+class ViewClasses(Mapping):
+    u"""Dictionary of the view classes by viewId, that imports the module of a view class
+    when it is used for the first time.
+
+    >>> sorted(viewClasses.keys())
+    ['Git', 'Mamp', 'Page', 'Site']
+    >>> viewClasses['Site'].__name__, 'Git' in viewClasses, 'Xyz' in viewClasses
+    ('SiteView', True, False)
+    >>> from pagebot.elements.views import PageView, defaultViewClass
+    >>> viewClasses['Page'] is PageView is defaultViewClass
+    True
+    """
+    def __init__(self, viewModules):
+        self.viewModules = viewModules
+        self._viewClasses = {}
+
+    def __getitem__(self, viewId):
+        viewClass = self._viewClasses.get(viewId)
+        if viewClass is None:
+            moduleName, className = self.viewModules[viewId]
+            viewClass = self._viewClasses[viewId] = getattr(importlib.import_module(moduleName), className)
+        return viewClass
+
+    def __iter__(self):
+        return iter(self.viewModules)
+
+    def __len__(self):
+        return len(self.viewModules)
+
+viewClasses = ViewClasses(VIEW_MODULES)
+
+def __getattr__(name):
+    u"""Answer the view class by its class name, or the defaultViewClass, importing its module
+    on first access."""
+    if name == 'defaultViewClass':
+        return viewClasses[DEFAULT_VIEWID]
+    for viewId, (_, className) in VIEW_MODULES.items():
+        if name == className:
+            return viewClasses[viewId]
+    raise AttributeError('module %r has no attribute %r' % (__name__, name))
 
-defaultViewClass = PageView
\ No newline at end of file
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
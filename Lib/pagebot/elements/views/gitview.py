@@ -27,7 +27,7 @@ class GitView(SiteView):
     
     #   B U I L D  H T M L  /  C S S
 
-    def build(self, path=None, pageSelection=None, multiPage=True):
+    def build(self, path=None, pageSelection=None, multiPage=True, processes=None):
 
         doc = self.doc
 
@@ -35,24 +35,23 @@ class GitView(SiteView):
         if not sitePath.endswith('/'):
             sitePath += '/'
             
-        b = self.b # Get builder from self.doc.context of this view.
+        export = self.newSiteExport(sitePath)
         #doc.build_css(self) # Make doc build the main/overall CSS.
-        for pn, pages in doc.pages.items():
-            for page in pages:
-                b.resetHtml()
-
-                hook = 'build_' + b.PB_ID
-                getattr(page, hook)(self, ORIGIN) # Typically calling page.build_drawBot or page.build_flat
-
-                fileName = page.name
-                if not fileName:
-                    fileName = self.DEFAULT_HTML_FILE
-                if not fileName.lower().endswith('.html'):
-                    fileName += '.html'
- 
-                b.writeHtml(sitePath + fileName)
-        # Write all collected CSS into one file
-        #b.writeCss(self.DEFAULT_CSS_PATH)
+        cssFragments = []
+        if self.cssCode:
+            cssFragments.append(self.cssCode)
+        pages = self.getSitePages()
+        for page, (html, css) in zip(pages, self.buildPagesHtml(pages, processes)):
+            cssFragments += css
+            fileName = page.name
+            if not fileName:
+                fileName = self.DEFAULT_HTML_FILE
+            if not fileName.lower().endswith('.html'):
+                fileName += '.html'
+
+            export.writeText(fileName, html)
+        self.writeSiteCss(export, cssFragments) # Write all collected CSS into one file.
+        self.finishSiteExport(export)
 
     def getUrl(self, name):
         return 'http://%s/%s' % (name, self.DEFAULT_HTML_FILE)
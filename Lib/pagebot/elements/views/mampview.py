@@ -30,12 +30,17 @@ class MampView(SiteView):
     # There is a free demo version can be installed.
     MAMP_SHOP_URL = 'https://www.mamp.info/en/' 
     LOCAL_HOST_URL = 'http://localhost:8888/%s/%s'
-    SITE_ROOT_PATH = getMampPath()
+    SITE_ROOT_PATH = None # Depends on the platform context, so answered by getMampPath() on creation.
+
+    def __init__(self, **kwargs):
+        SiteView.__init__(self, **kwargs)
+        self.siteRootPath = getMampPath()
 
     #   B U I L D  H T M L  /  C S S
 
-    def build(self, path=None, pageSelection=None, multiPage=True):
-        """
+    def build(self, path=None, pageSelection=None, multiPage=True, processes=None):
+        """Build the site in the MAMP folder. If processes is defined, then the HTML of the pages
+        is built in parallel, see SiteView.buildPagesHtml.
 
         >>> from pagebot.contributions.filibuster.blurb import Blurb
         >>> article = Blurb().getBlurb('da_text') # Answer random text of design article
@@ -54,6 +59,10 @@ class MampView(SiteView):
         >>> page.elements[0].cssId
         'Banner'
         >>> doc.export() # Export as website and open it as running in Mamp
+        >>> view.incremental = True # Only write the files that changed.
+        >>> doc.export()
+        >>> view.lastExport.written, view.lastExport.skipped > 0
+        (0, True)
         >>> #Try to open in a browser, assuming that there is a running local Mamp server.
         >>> result = os.system('open %s' % (view.LOCAL_HOST_URL % (doc.name, page.url)))
         """
@@ -66,51 +75,44 @@ class MampView(SiteView):
 
         if path is None:
             path = rootPath + siteName + '/'
-            if os.path.exists(path): # In case of using default path, it's safe to delete.
+            if os.path.exists(path) and not self.incremental: # In case of using default path, it's safe to delete.
                 if self.verbose:
                     print('[MampView.build] Deleting %s' % path)
                 shutil.rmtree(path)
         else: # Make sure it is not there. Remove manually otherwise.
-            assert path and not os.path.exists(path), '[MampView.build] Export site path "%s" exists: delete manually' % (path)
+            assert path and (self.incremental or not os.path.exists(path)), '[MampView.build] Export site path "%s" exists: delete manually' % (path)
             if not path.endswith('/'):
                 path += '/'
+        # Writes only changed files in incremental mode, otherwise all.
+        export = self.newSiteExport(path)
 
         # Copy resources to output
         for resourcePath in self.resourcePaths:
-            dstPath = path
-            if os.path.isdir(resourcePath):
-                dstPath += resourcePath.split('/')[-1] + '/'
             if self.verbose:
-                print('[MampView.build] Copy %s --> %s' % (resourcePath, dstPath))
-            # TODO: Fails in Travis.
-            shutil.copytree(resourcePath, dstPath)
+                print('[MampView.build] Copy %s --> %s' % (resourcePath, path))
+            if os.path.isdir(resourcePath):
+                export.copyTree(resourcePath, resourcePath.rstrip('/').split('/')[-1])
+            else:
+                export.copyFile(resourcePath, resourcePath.split('/')[-1])
 
-        b = self.b # Get builder from self.doc.context of this view.
-        
+        cssFragments = []
         if self.cssCode:
             # Add info CSS as a start.
-            b.addCss(self.cssCode)
-
-        for pn, pages in doc.pages.items():
-            for page in pages:
-                b.resetHtml()
-                # Building for HTML, try the hook. Otherwise call by main page.build.
-                hook = 'build_' + b.PB_ID # E.g. page.build_html()
-                getattr(page, hook)(self, ORIGIN) # Typically calling page.build_html
-
-                fileName = (page.fileName or page.title or page.name).replace(' ','_')
-                if not fileName.lower().endswith('.html'):
-                    fileName += '.html'
-                if self.doExport: # View flag to avoid writing, in case of testing.
-                    if not os.path.exists(path):
-                        os.makedirs(path)
-                    b.writeHtml(path + fileName)
-        
-        # Write all collected CSS into one file at destination
-        if b.hasCss():
-            if not os.path.exists(path):
-                os.makedirs(path)
-            b.writeCss(path + self.cssPath)
+            cssFragments.append(self.cssCode)
+
+        pages = self.getSitePages()
+        for page, (html, css) in zip(pages, self.buildPagesHtml(pages, processes)):
+            cssFragments += css
+            fileName = (page.fileName or page.title or page.name).replace(' ','_')
+            if not fileName.lower().endswith('.html'):
+                fileName += '.html'
+            if self.doExport: # View flag to avoid writing, in case of testing.
+                export.writeText(fileName, html)
+
+        # Write all collected CSS of the pages into one file at destination, without duplicates.
+        self.writeSiteCss(export, cssFragments)
+
+        self.finishSiteExport(export)
 
     def getUrl(self, name):
         u"""Answer the local URL for Mamp Pro to find the copied website."""
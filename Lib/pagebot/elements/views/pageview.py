@@ -21,10 +21,23 @@ from random import random
 from datetime import datetime
 from math import atan2, radians, degrees, cos, sin
 
+from pagebot.contexts.platform import getForkContext
 from pagebot.elements.views.baseview import BaseView
 from pagebot.style import NO_COLOR, RIGHT
 from pagebot.toolbox.transformer import *
 
+_buildView = None # (view, pages) that are rendered by the forked processes of PageView.buildPageFiles
+
+def _buildPageFile(job):
+    u"""Render a single page in a forked worker process, in a new context, and save it as file."""
+    index, path, w, h = job
+    view, pages = _buildView
+    context = view.context = view.context.__class__() # New context for every page, nothing shared with other workers.
+    context.newDocument(w, h) # Same as PageView.build does for the serial build.
+    view.buildPage(pages[index], w, h)
+    context.saveDocument(path, multiPage=False) # Saves the page that was drawn.
+    return path
+
 class PageView(BaseView):
     u"""The PageView is contains the parameters to export the pages as documents.
     A View is just another kind of container, kept by document to make a certain presentation
@@ -33,9 +46,13 @@ class PageView(BaseView):
 
     MIN_PADDING = 20 # Minimum padding needed to show meta info. Otherwise truncated to 0 and not showing meta info.
     EXPORT_PATH = '_export/' # Default path for local document export, that does not commit documents to Github.
+    PAGE_FILE_EXTENSIONS = ('png', 'jpg', 'svg') # Export formats that save every page in a separate file.
 
-    def build(self, path=None, pageSelection=None, multiPage=True):
+    def build(self, path=None, pageSelection=None, multiPage=True, processes=None):
         u"""Draw the selected pages. pageSelection is an optional set of y-pageNumbers to draw.
+        If processes is defined and the path exports to a separate file for each page (png,
+        jpg or svg), then the pages are rendered in parallel by a pool of processes, each
+        drawing in its own context. Set processes to 0 to use all available cores.
 
         >>> view = PageView(name='MyPageView')
         >>> view.w, view.h, view.name # Size is initialze to default.
@@ -48,74 +65,26 @@ class PageView(BaseView):
         if path.startswith(self.EXPORT_PATH) and not os.path.exists(self.EXPORT_PATH):
             os.makedirs(self.EXPORT_PATH)
 
-        context = self.context # Get current context and builder from doc. Can be DrawBot or Flat
-
         # Find the maximum document page size to this in all page sizes of the document.
         w, h, _ = self.doc.getMaxPageSizes(pageSelection)
 
-        # Make sure that canvas is empty, there may have been another document building in this context.
-        context.newDrawing()
-
-        context.newDocument(w, h) # Allow the context to create a new document and page canvas.
-        for pn, pages in self.doc.getSortedPages():
-            #if pageSelection is not None and not page.y in pageSelection:
-            #    continue
-
-            # TODO: Some options here for layout of the combined pages, depending on the spread view option.
-            # self.showSpreadPages # Show even/odd pages as spread, as well as pages that share the same pagenumber.
-            # self.showSpreadMiddleAsGap # Show the spread with single crop marks. False glues pages togethers as in real spread.
-
-            # Create a new DrawBot viewport page to draw template + page, if not already done.
-            # In case the document is oversized, then make all pages the size of the document, so the
-            # pages can draw their crop-marks. Otherwise make DrawBot pages of the size of each page.
-            # Size depends on the size of the larges pages + optional decument padding.
-            page = pages[0] # TODO: make this work for pages that share the same page number
-            pw, ph = w, h  # Copy from main (w, h), since they may be altered.
-
-            if self.pl > self.MIN_PADDING and \
-               self.pt > self.MIN_PADDING and \
-               self.pb > self.MIN_PADDING and \
-               self.pr > self.MIN_PADDING:
-                pw += self.pl + self.pr
-                ph += self.pt + self.pb
-                if self.originTop:
-                    origin = self.pl, self.pt, 0
-                else:
-                    origin = self.pl, self.pb, 0
-            else:
-                pw = page.w # No padding defined, follow the size of the page.
-                ph = page.h
-                origin = (0, 0, 0)
-
-            context.newPage(pw, ph) #  Make page in context, actual page may be smaller if showing cropmarks.
-            # If page['frameDuration'] is set and saving as movie or animated gif,
-            # then set the global frame duration.
-            context.frameDuration(page.frameDuration) # Set the duration of this page, in case exporting GIF
+        # TODO: make this work for pages that share the same page number
+        pages = [pnPages[0] for pn, pnPages in self.doc.getSortedPages(pageSelection)]
 
-            # View may have defined a background
-            fillColor = self.style.get('fill')
-            if fillColor is not NO_COLOR:
-                context.setFillColor(fillColor)
-                context.rect(0, 0, pw, ph)
+        if processes is not None and multiPage and len(pages) > 1 and \
+                path.split('.')[-1].lower() in self.PAGE_FILE_EXTENSIONS:
+            if self.buildPageFiles(path, pages, w, h, processes):
+                return
+            # Otherwise no forking possible on this platform, build in a single context.
 
-            if self.drawBefore is not None: # Call if defined
-                self.drawBefore(page, self, origin)
-
-            # Use the (docW, docH) as offset, in case cropmarks need to be displayed.
-            # Recursively call all elements in the tree to build themselves.
-            # Note that is independent from the context. If there is a difference, the elements should
-            # make the switch themselves.
-            page.buildChildElements(self, origin)
-
-            self.drawPageMetaInfo(page, origin)
+        context = self.context # Get current context and builder from doc. Can be DrawBot or Flat
 
-            if self.drawAfter is not None: # Call if defined
-                self.drawAfter(page, self, origin)
+        # Make sure that canvas is empty, there may have been another document building in this context.
+        context.newDrawing()
 
-            # Self.infoElements now may have collected elements needed info to be drawn, after all drawing is done.
-            # So the info boxes don't get covered by regular page content.
-            for e in self.elementsNeedingInfo.values():
-                self._drawElementsNeedingInfo()
+        context.newDocument(w, h) # Allow the context to create a new document and page canvas.
+        for page in pages:
+            self.buildPage(page, w, h)
 
         u"""Export the document to fileName for all pages in sequential order.
         If pageSelection is defined, it must be a list with page numbers to
@@ -144,6 +113,136 @@ class PageView(BaseView):
 
         context.saveDocument(path, multiPage=multiPage)
 
+    def buildPage(self, page, w, h):
+        u"""Draw the page in a new page of the current context, where (w, h) is the maximum
+        size of all pages that are drawn.
+
+        >>> from pagebot.document import Document
+        >>> doc = Document(w=300, h=400, autoPages=1)
+        >>> view = doc.getView()
+        >>> view.buildPage(doc[1], 300, 400)
+        """
+        context = self.context
+        # TODO: Some options here for layout of the combined pages, depending on the spread view option.
+        # self.showSpreadPages # Show even/odd pages as spread, as well as pages that share the same pagenumber.
+        # self.showSpreadMiddleAsGap # Show the spread with single crop marks. False glues pages togethers as in real spread.
+
+        # Create a new DrawBot viewport page to draw template + page, if not already done.
+        # In case the document is oversized, then make all pages the size of the document, so the
+        # pages can draw their crop-marks. Otherwise make DrawBot pages of the size of each page.
+        # Size depends on the size of the larges pages + optional decument padding.
+        pw, ph = w, h  # Copy from main (w, h), since they may be altered.
+
+        if self.pl > self.MIN_PADDING and \
+           self.pt > self.MIN_PADDING and \
+           self.pb > self.MIN_PADDING and \
+           self.pr > self.MIN_PADDING:
+            pw += self.pl + self.pr
+            ph += self.pt + self.pb
+            if self.originTop:
+                origin = self.pl, self.pt, 0
+            else:
+                origin = self.pl, self.pb, 0
+        else:
+            pw = page.w # No padding defined, follow the size of the page.
+            ph = page.h
+            origin = (0, 0, 0)
+
+        context.newPage(pw, ph) #  Make page in context, actual page may be smaller if showing cropmarks.
+        # If page['frameDuration'] is set and saving as movie or animated gif,
+        # then set the global frame duration.
+        context.frameDuration(page.frameDuration) # Set the duration of this page, in case exporting GIF
+
+        # View may have defined a background
+        fillColor = self.style.get('fill')
+        if fillColor is not NO_COLOR:
+            context.setFillColor(fillColor)
+            context.rect(0, 0, pw, ph)
+
+        if self.drawBefore is not None: # Call if defined
+            self.drawBefore(page, self, origin)
+
+        # Use the (docW, docH) as offset, in case cropmarks need to be displayed.
+        # Recursively call all elements in the tree to build themselves.
+        # Note that is independent from the context. If there is a difference, the elements should
+        # make the switch themselves.
+        page.buildChildElements(self, origin)
+
+        self.drawPageMetaInfo(page, origin)
+
+        if self.drawAfter is not None: # Call if defined
+            self.drawAfter(page, self, origin)
+
+        # Self.infoElements now may have collected elements needed info to be drawn, after all drawing is done.
+        # So the info boxes don't get covered by regular page content.
+        for e in self.elementsNeedingInfo.values():
+            self._drawElementsNeedingInfo()
+
+    def getPageFilePath(self, path, index):
+        u"""Answer the file path for the page at index, if the pages are exported as separate
+        files. Same naming as the multi-page export of the context.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> view = PageView(context=FlatContext())
+        >>> view.getPageFilePath('_export/Catalogue.png', 11)
+        '_export/Catalogue012.png'
+        """
+        return self.context.getPageFilePath(path, index)
+
+    def buildPageFiles(self, path, pages, w, h, processes=0):
+        u"""Render the pages in parallel by a pool of forked processes. Each worker draws
+        its pages in a new context of the same class as self.context and saves every page
+        in its own file, named by self.getPageFilePath(path, index). Forked workers inherit
+        the document, so nothing needs to be pickled, except the page indices.
+        Answer False if the platform cannot fork, so the caller needs to build sequentially.
+        The files are the same as the serial build of the pages makes.
+
+        >>> import shutil, tempfile
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> from pagebot.document import Document
+        >>> from pagebot.elements import newRect
+        >>> path = tempfile.mkdtemp()
+        >>> doc = Document(w=100, h=100, autoPages=3, context=FlatContext())
+        >>> for pn in range(1, 4):
+        ...     e = newRect(x=pn*10, y=10, w=50, h=50, fill=(1, 0, pn/3), parent=doc[pn])
+        >>> doc.build(os.path.join(path, 'serial', 'Page.png'))
+        >>> doc.build(os.path.join(path, 'parallel', 'Page.png'), processes=2)
+        >>> serial = sorted(os.listdir(os.path.join(path, 'serial')))
+        >>> parallel = sorted(os.listdir(os.path.join(path, 'parallel')))
+        >>> serial == parallel, parallel
+        (True, ['Page001.png', 'Page002.png', 'Page003.png'])
+        >>> def read(folder, fileName):
+        ...     with open(os.path.join(path, folder, fileName), 'rb') as f:
+        ...         return f.read()
+        >>> [read('serial', fileName) == read('parallel', fileName) for fileName in parallel]
+        [True, True, True]
+        >>> len(set(read('parallel', fileName) for fileName in parallel)) # Each page draws its own rect.
+        3
+        >>> shutil.rmtree(path)
+        """
+        global _buildView
+        mp = getForkContext()
+        if mp is None:
+            return False
+
+        folder = path2ParentPath(path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        jobs = [(index, self.getPageFilePath(path, index), w, h) for index in range(len(pages))]
+        _buildView = self, pages
+        try:
+            pool = mp.Pool(processes or None) # None uses all cores.
+            try:
+                for _ in pool.imap_unordered(_buildPageFile, jobs):
+                    pass
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _buildView = None
+        return True
+
     #   D R A W I N G  P A G E  M E T A  I N F O
 
     def drawPageMetaInfo(self, page, origin):
@@ -20,8 +20,33 @@
 import os
 
 from pagebot import getRootPath
+from pagebot.contexts.platform import getForkContext
 from pagebot.elements.views.htmlview import HtmlView
 from pagebot.style import ORIGIN
+from pagebot.toolbox.siteexport import SiteExport
+
+_buildSiteView = None # (view, pages) of which the HTML is built by the forked processes of SiteView.buildPagesHtml
+
+def _buildPageHtml(index):
+    u"""Build the HTML of a single page in a forked worker process, with its own builder."""
+    view, pages = _buildSiteView
+    view.context.b = view.b.__class__() # New builder for every page, nothing shared with other workers.
+    return view.buildPageHtml(pages[index])
+
+def mergeCss(cssFragments):
+    u"""Answer the list of CSS fragments without duplicates, in order of their first occurrence.
+    Pages that add the same CSS, e.g. by their cssCode, then appear once in the stylesheet.
+
+    >>> mergeCss(['body {}', 'h1 {}', 'body {}', 'p {}', 'h1 {}'])
+    ['body {}', 'h1 {}', 'p {}']
+    """
+    merged = []
+    seen = set()
+    for css in cssFragments:
+        if css not in seen:
+            seen.add(css)
+            merged.append(css)
+    return merged
 
 class SiteView(HtmlView):
     
@@ -33,13 +58,18 @@ class SiteView(HtmlView):
     CSS_PATH = 'style.css'
 
     def __init__(self, resourcePaths=None, cssCode=None, cssPath=None, cssUrls=None, jsUrls=None, webFontUrls=None,
-        **kwargs):
-        u"""Abstract class for views that build websites."""
+        incremental=False, **kwargs):
+        u"""Abstract class for views that build websites. If incremental is True, then the build
+        only writes the files that changed since the previous build of the site, as recorded in
+        its manifest of content hashes, and removes the files that are not exported anymore."""
         HtmlView.__init__(self, **kwargs)
 
         # Url's and paths
         self.siteRootPath = self.SITE_ROOT_PATH
 
+        self.incremental = incremental
+        self.lastExport = None # SiteExport of the last build, with the counts of written and skipped files.
+
         if resourcePaths is None:
             rp = getRootPath() + '/elements/web/simplesite/resources/'
             resourcePaths = (rp+'js', rp+'images', rp+'fonts', rp+'css') # Directories to be copied to Mamp.        
@@ -62,9 +92,10 @@ class SiteView(HtmlView):
         )
 
 
-    def build(self, path=None, pageSelection=None, multiPage=True):
+    def build(self, path=None, pageSelection=None, multiPage=True, processes=None):
         """
-        Default building to non-website media.
+        Default building to non-website media. If processes is defined, then the HTML of the
+        pages is built in parallel, see self.buildPagesHtml.
 
         >>> from pagebot.document import Document
         >>> doc = Document(name='TestDoc', viewId='Site', w=300, h=400, padding=(30, 40, 50, 60))
@@ -74,11 +105,18 @@ class SiteView(HtmlView):
         >>> page = doc[1]
         >>> page.name = 'index' # Home page is index.
         >>> page.cssClass ='MyGeneratedPage'
+        >>> page.cssCode = 'div.page {margin: 0;}'
         >>> doc.build('/tmp/PageBot/SiteView_docTest')
         >>> len(view.b._htmlOut) > 0 # Check that there is actual generated HTML output (_htmlOut is a list).
         True
         >>> 'class="MyGeneratedPage"' in ''.join(view.b._htmlOut) # Page div contains this class attribute.
         True
+        >>> 'div.page' in open('/tmp/PageBot/SiteView_docTest/style.css').read() # Merged CSS of the pages.
+        True
+        >>> view.incremental = True
+        >>> doc.build('/tmp/PageBot/SiteView_docTest')
+        >>> view.lastExport # Nothing changed since the previous build.
+        <SiteExport 0 written, 2 skipped, 0 removed>
         """
         doc = self.doc 
 
@@ -89,25 +127,105 @@ class SiteView(HtmlView):
         if not os.path.exists(path):
             os.makedirs(path)
 
-        b = self.b # Get builder from self.doc.context of this view.
+        export = self.newSiteExport(path)
         # SOLVE THIS LATER
         #self.build_css(self) # Make doc build the main/overall CSS, based on all page styles.
-        for pn, pages in doc.pages.items():
-            for page in pages:
-                b.resetHtml()
-                # Building for HTML, try the hook. Otherwise call by main page.build.
-                hook = 'build_' + b.PB_ID # E.g. page.build_html()
-                getattr(page, hook)(self, ORIGIN) # Typically calling page.build_html
-
-                fileName = page.name
-                if not fileName:
-                    fileName = self.DEFAULT_HTML_FILE
-                if not fileName.lower().endswith('.html'):
-                    fileName += '.html'
-                if self.doExport: # View flag to avoid writing, in case of testing.
-                    b.writeHtml(path + fileName)
-        # Write all collected CSS into one file
-        #b.writeCss(self.DEFAULT_CSS_PATH)
+        cssFragments = []
+        if self.cssCode:
+            cssFragments.append(self.cssCode)
+        pages = self.getSitePages()
+        for page, (html, css) in zip(pages, self.buildPagesHtml(pages, processes)):
+            cssFragments += css
+            fileName = page.name
+            if not fileName:
+                fileName = self.DEFAULT_HTML_FILE
+            if not fileName.lower().endswith('.html'):
+                fileName += '.html'
+            if self.doExport: # View flag to avoid writing, in case of testing.
+                export.writeText(fileName, html)
+        self.writeSiteCss(export, cssFragments)
+        self.finishSiteExport(export)
+
+    def getSitePages(self):
+        u"""Answer the list of all pages of the document, in the order they are exported."""
+        return [page for _, pages in self.doc.pages.items() for page in pages]
+
+    def buildPageHtml(self, page):
+        u"""Build the page with the builder of self.context, starting with empty HTML and CSS.
+        Answer the tuple (html, cssFragments) of the page."""
+        b = self.b # Get builder from self.doc.context of this view.
+        b.resetHtml()
+        b.clearCss()
+        # Building for HTML, try the hook. Otherwise call by main page.build.
+        hook = 'build_' + b.PB_ID # E.g. page.build_html()
+        getattr(page, hook)(self, ORIGIN) # Typically calling page.build_html
+        return b.getHtml(), list(b._cssOut)
+
+    def buildPagesHtml(self, pages, processes=None):
+        u"""Answer the list of (html, cssFragments) tuples of the pages, in page order. If processes
+        is not None, then the pages are built in parallel by a pool of forked processes, each with
+        its own builder, default one per core. Forked workers inherit the document, so only the
+        page index and the resulting strings are pickled. The results are the same as building
+        the pages one by one, which is also done if the process cannot fork, see getForkContext.
+
+        >>> from pagebot.document import Document
+        >>> from pagebot.elements import newTextBox
+        >>> doc = Document(name='TestDoc', viewId='Site', w=300, h=400, autoPages=3)
+        >>> view = doc.view
+        >>> for pn in range(1, 4):
+        ...     page = doc[pn]
+        ...     page.cssCode = 'div.page {margin: %dpx;}' % (pn % 2)
+        ...     e = newTextBox(view.context.newString('Text of page %d' % pn), parent=page)
+        >>> pages = view.getSitePages()
+        >>> serial = view.buildPagesHtml(pages)
+        >>> view.buildPagesHtml(pages, processes=2) == serial
+        True
+        >>> [len(css) for _, css in serial], len(mergeCss(sum([css for _, css in serial], [])))
+        ([1, 1, 1], 2)
+        """
+        global _buildSiteView
+        mp = None
+        if processes is not None and len(pages) > 1:
+            mp = getForkContext()
+        if mp is None:
+            return [self.buildPageHtml(page) for page in pages]
+
+        _buildSiteView = self, pages
+        try:
+            pool = mp.Pool(processes or None) # None uses all cores.
+            try:
+                chunkSize = max(1, len(pages) // (4 * (processes or mp.cpu_count())))
+                return pool.map(_buildPageHtml, range(len(pages)), chunkSize)
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _buildSiteView = None
+
+    def writeSiteCss(self, export, cssFragments):
+        u"""Write the CSS fragments of the site, as collected from self.cssCode and the pages,
+        without duplicates into self.cssPath of the export."""
+        b = self.b # Get builder from self.doc.context of this view.
+        b.clearCss()
+        for css in mergeCss(cssFragments):
+            b.addCss(css)
+        if b.hasCss() and self.doExport: # View flag to avoid writing, in case of testing.
+            export.writeText(self.cssPath, b.getCss())
+
+    def newSiteExport(self, path):
+        u"""Answer a new SiteExport to write the files of the site in the folder path, in
+        incremental mode if self.incremental is True."""
+        return SiteExport(path, incremental=self.incremental)
+
+    def finishSiteExport(self, export):
+        u"""Remove the stale files of the export, save its manifest and keep it as self.lastExport
+        to report the counts of written and skipped files."""
+        if self.doExport:
+            export.finish()
+        self.lastExport = export
+        if self.verbose:
+            print('[%s.build] %s: %d written (%d linked), %d skipped, %d removed' % (self.__class__.__name__,
+                export.path, export.written, export.linked, export.skipped, export.removed))
 
     def getUrl(self, name):
         u"""Answer the local URL for Mamp Pro to find the copied website."""
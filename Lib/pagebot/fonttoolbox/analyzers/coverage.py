@@ -0,0 +1,134 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     coverage.py
+#
+#     Implements a coverage bitmap of a glyph, rasterized once from its flattened
+#     contours at a resolution of unitsPerPixel, with nonzero winding as
+#     TrueType does. Black/white tests of points and lines are then answered by
+#     indexing the boolean array, instead of asking the path of the glyph for
+#     every single point. Needs numpy.
+#
+from math import floor, ceil, sqrt
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+UNITS_PER_PIXEL = 4 # Default resolution of the coverage bitmap in font units.
+
+class GlyphCoverage(object):
+    u"""Boolean coverage bitmap of the contours, rasterized once. Pixel (row, col) is black if
+    its center (x0 + col * unitsPerPixel, y0 + row * unitsPerPixel) is inside the contours or
+    on the outline. Points are tested on the nearest pixel, so points on the outline are black.
+    The bitmap has a white border, so tests outside the bitmap are clipped onto white.
+
+    >>> square = [(0, 0), (0, 100), (100, 100), (100, 0)]
+    >>> hole = [(25, 25), (75, 25), (75, 75), (25, 75)] # Reversed direction.
+    >>> coverage = GlyphCoverage([square, hole], unitsPerPixel=5)
+    >>> coverage
+    <GlyphCoverage 23x23 5 units/pixel>
+    >>> coverage.onBlack((10, 10)), coverage.onBlack((50, 50)), coverage.onBlack((-10, 50))
+    (True, False, False)
+    >>> coverage.spanBlack((10, 10), (90, 10)), coverage.spanBlack((10, 50), (90, 50))
+    (True, False)
+    >>> coverage.spanWhite((30, 50), (70, 50)), coverage.spanWhite((-50, -50), (200, -50))
+    (True, True)
+    >>> coverage.onBlack((0, 50)), coverage.onBlack((100, 100)), coverage.onBlack((25, 50))
+    (True, True, True)
+    >>> int(coverage.mask.sum()) # Black pixels: 21*21 - 9*9
+    360
+    >>> GlyphCoverage([]).onBlack((0, 0))
+    False
+    """
+    def __init__(self, contours, unitsPerPixel=UNITS_PER_PIXEL):
+        self.unitsPerPixel = unitsPerPixel
+        self.x0 = self.y0 = 0
+        self.mask = numpy.zeros((0, 0), dtype=bool)
+        contours = [contour for contour in contours if len(contour) > 2]
+        if contours:
+            self._rasterize(contours)
+
+    def __repr__(self):
+        rows, cols = self.mask.shape
+        return '<%s %dx%d %s units/pixel>' % (self.__class__.__name__, cols, rows, self.unitsPerPixel)
+
+    def _rasterize(self, contours):
+        u"""Fill self.mask by scanlines through the pixel centers. For each row, the crossings of
+        the edges add their direction (+1 up, -1 down) at the first pixel right of the crossing,
+        so the cumulative sum along the row is the winding number of each pixel. The bitmap is
+        closed: the rows and columns are filled with both the lower and upper end of edges and
+        crossings included, and or-ed together, so pixels on the outline are black too."""
+        upp = float(self.unitsPerPixel)
+        points = [numpy.array(contour, dtype=float) for contour in contours]
+        p1 = numpy.concatenate(points)
+        p2 = numpy.concatenate([numpy.roll(p, -1, axis=0) for p in points]) # Edges close the contours.
+        (minX, minY), (maxX, maxY) = p1.min(axis=0), p1.max(axis=0)
+        self.x0 = x0 = (floor(minX / upp) - 1) * upp
+        self.y0 = y0 = (floor(minY / upp) - 1) * upp
+        cols = int(ceil((maxX - x0) / upp)) + 2
+        rows = int(ceil((maxY - y0) / upp)) + 2
+
+        edges = p1[:, 1] != p2[:, 1] # Horizontal edges never cross a scanline.
+        x1, y1 = p1[edges, 0], p1[edges, 1]
+        x2, y2 = p2[edges, 0], p2[edges, 1]
+        ys = (y0 + numpy.arange(rows) * upp)[:, None]
+        self.mask = numpy.zeros((rows, cols), dtype=bool)
+        for up, down in (((y1 <= ys) & (y2 > ys), (y2 <= ys) & (y1 > ys)), # Lower ends included.
+                ((y1 < ys) & (y2 >= ys), (y2 < ys) & (y1 >= ys))): # Upper ends included.
+            direction = up.astype(int) - down
+            row, edge = numpy.nonzero(direction)
+            xs = (x1[edge] + (ys[row, 0] - y1[edge]) * (x2[edge] - x1[edge]) / (y2[edge] - y1[edge]) - x0) / upp
+            for col in (numpy.ceil(xs), numpy.floor(xs) + 1): # Crossing on a pixel is black at left and right.
+                winding = numpy.zeros((rows, cols + 1), dtype=int)
+                numpy.add.at(winding, (row, numpy.clip(col.astype(int), 0, cols)), direction[row, edge])
+                self.mask |= numpy.cumsum(winding, axis=1)[:, :cols] != 0
+
+    def getPixels(self, xs, ys):
+        u"""Answer the boolean array of the pixels nearest to the arrays of coordinates xs and ys.
+        Coordinates outside the bitmap are clipped onto its white border."""
+        rows, cols = self.mask.shape
+        if not rows:
+            return numpy.zeros(len(xs), dtype=bool)
+        c = numpy.rint((numpy.asarray(xs, dtype=float) - self.x0) / self.unitsPerPixel).astype(int)
+        r = numpy.rint((numpy.asarray(ys, dtype=float) - self.y0) / self.unitsPerPixel).astype(int)
+        return self.mask[r.clip(0, rows - 1), c.clip(0, cols - 1)]
+
+    def onBlack(self, p):
+        u"""Answer the boolean flag if the single point (x, y) is on black."""
+        return bool(self.getPixels([p[0]], [p[1]])[0])
+
+    def getSpan(self, p0, p1, step=None):
+        u"""Answer the boolean array of the pixels on the line between p0 and p1, excluding
+        the end points, sampled at least once per pixel (or per step if that is smaller)."""
+        dx = p1[0] - p0[0]
+        dy = p1[1] - p0[1]
+        step = min(step or self.unitsPerPixel, self.unitsPerPixel)
+        n = int(sqrt(dx*dx + dy*dy) / step) + 2 # Always sample the middle of short lines.
+        t = numpy.arange(1, n) / float(n)
+        return self.getPixels(p0[0] + t * dx, p0[1] + t * dy)
+
+    def spanBlack(self, p0, p1, step=None):
+        u"""Answer the boolean flag if the line between p0 and p1 runs entirely on black."""
+        return bool(self.getSpan(p0, p1, step).all())
+
+    def spanWhite(self, p0, p1, step=None):
+        u"""Answer the boolean flag if the line between p0 and p1 runs entirely on white."""
+        return not self.getSpan(p0, p1, step).any()
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
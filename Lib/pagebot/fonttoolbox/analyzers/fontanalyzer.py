@@ -16,13 +16,41 @@
 #     Implements a PageBot font analyzer class to get info from beyond a TTFont.
 #
 import weakref
+from pagebot.contexts.platform import getForkContext
 from pagebot.toolbox.transformer import path2FontName
 
+_analyzeFont = None # Font of the forked workers of FontAnalyzer.analyzeGlyphs
+
+def _analyzeGlyph(glyphName):
+    u"""Worker of FontAnalyzer.analyzeGlyphs, answering the findings of the glyph."""
+    return glyphName, _analyzeFont.analyzer.analyzeGlyph(glyphName)
+
 class FontAnalyzer(object):
+    u"""The FontAnalyzer answers the findings for the font, as derived from the glyph analyzers
+    of characteristic glyphs. If self.unitsPerPixel is defined, then all glyph analyzers test
+    black and white on a coverage bitmap at that resolution, which does not need DrawBotContext.
+
+    >>> from pagebot.fonttoolbox.objects.font import findFont
+    >>> f = findFont('Roboto-Regular')
+    >>> f.analyzer.unitsPerPixel = 4
+    >>> f['H'].analyzer.unitsPerPixel
+    4
+    >>> sorted(f.analyzer.stems.keys()), sorted(f.analyzer.bars.keys())
+    ([193], [157])
+    >>> findings = f.analyzer.analyzeGlyphs(['H', 'I', 'space'], processes=2)
+    >>> findings['H']['bars'], findings['I']['stems'], findings['space']
+    ([157], [193], {'stems': [], 'roundStems': [], 'bars': [], 'roundBars': []})
+    >>> findings == f.analyzer.analyzeGlyphs(['H', 'I', 'space'])
+    True
+    """
+    UNITS_PER_PIXEL = None # Default resolution of glyph coverage bitmaps. None uses the glyph path.
 
-    def __init__(self, font):
+    def __init__(self, font, unitsPerPixel=None):
         u"""Initially the variable font instance is equal to the original."""
         self.font = font
+        if unitsPerPixel is None:
+            unitsPerPixel = self.UNITS_PER_PIXEL
+        self._unitsPerPixel = unitsPerPixel
         self.reset()
 
     def __repr__(self):
@@ -52,6 +80,57 @@ class FontAnalyzer(object):
         # Cached bars
         self._bars = None
 
+    # self.unitsPerPixel
+    def _get_unitsPerPixel(self):
+        return self._unitsPerPixel
+    def _set_unitsPerPixel(self, unitsPerPixel):
+        u"""Set the resolution of the coverage bitmaps of all glyph analyzers, that don't have
+        their own. Existing findings of the font are cleared."""
+        self._unitsPerPixel = unitsPerPixel
+        self.reset()
+    unitsPerPixel = property(_get_unitsPerPixel, _set_unitsPerPixel)
+
+    #   G L Y P H S
+
+    def analyzeGlyph(self, glyphName):
+        u"""Answer the dictionary with the sorted sizes of stems, round stems, bars and round
+        bars that the analyzer finds in the glyph. The dictionary only contains plain values,
+        so it can be answered by another process."""
+        analyzer = self[glyphName]
+        return dict(stems=sorted(analyzer.stems.keys()), roundStems=sorted(analyzer.roundStems.keys()),
+            bars=sorted(analyzer.bars.keys()), roundBars=sorted(analyzer.roundBars.keys()))
+
+    def analyzeGlyphs(self, glyphNames=None, processes=None):
+        u"""Answer the dictionary with the self.analyzeGlyph findings for each of the glyph names,
+        default all glyphs of the font. If processes is not None, then the glyphs are analyzed in
+        parallel by a pool of forked processes, 0 for one per core. Forked workers inherit the font,
+        so only the glyph names and the findings need to be pickled. By default, or if the process
+        cannot fork (see getForkContext), the glyphs are analyzed sequentially."""
+        global _analyzeFont
+        if glyphNames is None:
+            glyphNames = self.font.keys()
+        glyphNames = list(glyphNames)
+        mp = None
+        if processes is not None and len(glyphNames) > 1:
+            mp = getForkContext()
+        if mp is None:
+            return dict([(glyphName, self.analyzeGlyph(glyphName)) for glyphName in glyphNames])
+
+        findings = {}
+        _analyzeFont = self.font
+        try:
+            pool = mp.Pool(processes or None) # None uses all cores.
+            try:
+                chunkSize = max(1, len(glyphNames) // (4 * (processes or mp.cpu_count())))
+                for glyphName, glyphFindings in pool.imap_unordered(_analyzeGlyph, glyphNames, chunkSize):
+                    findings[glyphName] = glyphFindings
+            finally:
+                pool.close()
+                pool.join()
+        finally:
+            _analyzeFont = None
+        return findings
+
     #   S T E M S
 
     def _get_stems(self):
@@ -92,3 +171,7 @@ class FontAnalyzer(object):
         return self._bars
     bars = property(_get_bars)
 
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -26,6 +26,7 @@ from pagebot.toolbox.transformer import asInt
 from pagebot.fonttoolbox.analyzers.apointcontextlist import Vertical, Horizontal
 from pagebot.fonttoolbox.analyzers.stems import Stem, Bar, Counter, VerticalCounter
 from pagebot.fonttoolbox.analyzers.apointcontext import APointContext
+from pagebot.fonttoolbox.analyzers.coverage import GlyphCoverage, numpy
 
 SPANSTEP = 4
 
@@ -40,8 +41,10 @@ class GlyphAnalyzer(object):
     COUNTER_CLASS = Counter
     VERTICAL_COUNTER_CLASS = VerticalCounter
 
-    def __init__(self, glyph):
+    def __init__(self, glyph, unitsPerPixel=None):
         self.glyph = glyph # Set weakref to glyph
+        # If not None, black/white tests use the coverage bitmap at this resolution.
+        self._unitsPerPixel = unitsPerPixel
         self.reset()
 
     def reset(self):
@@ -70,6 +73,8 @@ class GlyphAnalyzer(object):
         # User defined dimensions, overruling automatic analyzer dimensions (UFO only)
         self._dimensions = None
 
+        self._coverage = None # Coverage bitmap, rasterized on first black/white test.
+
     def _get_name(self):
         return self.glyph.name
     name = property(_get_name)
@@ -100,6 +105,51 @@ class GlyphAnalyzer(object):
     def __repr__(self):
         return '<Analyzer of %s[%s]>' % (self.font.info.fullName, self.name)
 
+    # self.unitsPerPixel
+    def _get_unitsPerPixel(self):
+        u"""Answer the resolution of the coverage bitmap in font units per pixel. If not defined
+        for this analyzer, then answer the value of the font analyzer. If None, then the
+        black/white tests ask the path of the glyph for every point, which only works
+        in DrawBotContext."""
+        if self._unitsPerPixel is None:
+            parent = self.parent
+            if parent is not None:
+                return parent.unitsPerPixel
+        return self._unitsPerPixel
+    def _set_unitsPerPixel(self, unitsPerPixel):
+        self._unitsPerPixel = unitsPerPixel
+        self.reset() # Findings may change with the resolution.
+    unitsPerPixel = property(_get_unitsPerPixel, _set_unitsPerPixel)
+
+    # self.coverage
+    def _get_coverage(self):
+        u"""Answer the GlyphCoverage bitmap of the glyph at self.unitsPerPixel. It is
+        rasterized once from the flattened contours. Answer None if there is no resolution
+        defined or if numpy is not installed.
+
+        >>> from pagebot.fonttoolbox.objects.font import findFont
+        >>> f = findFont('Roboto-Regular')
+        >>> analyzer = f['H'].analyzer
+        >>> analyzer.coverage is None
+        True
+        >>> analyzer.unitsPerPixel = 8
+        >>> analyzer.coverage
+        <GlyphCoverage 143x185 8 units/pixel>
+        >>> analyzer.coverage is analyzer.coverage
+        True
+        >>> analyzer.onBlack((250, 200)), analyzer.onBlack((700, 200)), analyzer.onBlack((700, 750))
+        (True, False, True)
+        >>> analyzer.spanBlack((200, 750), (1250, 750)), analyzer.spanWhite((400, 200), (1000, 200))
+        (True, True)
+        """
+        unitsPerPixel = self.unitsPerPixel
+        if unitsPerPixel is None or numpy is None:
+            return None
+        if self._coverage is None or self._coverage.unitsPerPixel != unitsPerPixel:
+            self._coverage = GlyphCoverage(self.glyph.flattenedContours, unitsPerPixel)
+        return self._coverage
+    coverage = property(_get_coverage)
+
     #   M E T R I C S
 
     def _get_width(self):
@@ -172,7 +222,7 @@ class GlyphAnalyzer(object):
         u"""The findVerticals method answers a list of verticals."""
         self._verticals = verticals = {}
 
-        for pc in sorted(self.glyph.pointContexts):
+        for pc in self.glyph.pointContexts: # In point order, APointContext has no ordering.
             if pc.isVertical():
                 if not pc.x in verticals:
                     verticals[pc.x] = self.VERTICAL_CLASS()
@@ -193,7 +243,7 @@ class GlyphAnalyzer(object):
         main point is on curve."""
         self._horizontals = horizontals = {}
 
-        for pc in sorted(self.glyph.pointContexts):
+        for pc in self.glyph.pointContexts: # In point order, APointContext has no ordering.
             if pc.isHorizontal():
                 if not pc.y in horizontals:
                     horizontals[pc.y] = self.HORIZONTAL_CLASS()
@@ -219,6 +269,9 @@ class GlyphAnalyzer(object):
 
     def onBlack(self, p):
         u"""Answers the boolean flag is the single point (x, y) is on black."""
+        coverage = self.coverage
+        if coverage is not None:
+            return coverage.onBlack(p)
         return self.glyph.onBlack(p)
 
     def spanBlack(self, p0, p1, step=SPANSTEP):
@@ -227,7 +280,11 @@ class GlyphAnalyzer(object):
         of the glyph. If step is smaller than the distance between the points,
         then just check in the middle of the line.  The method does not check
         on the end points of the segment, allowing to test these separate
-        through self.onBlack or self.coveredInBlack."""
+        through self.onBlack or self.coveredInBlack.
+        If there is a coverage bitmap, then all pixels of the line are tested at once."""
+        coverage = self.coverage
+        if coverage is not None:
+            return coverage.spanBlack(p0, p1, step)
         dx = p1[0] - p0[0]
         dy = p1[1] - p0[1]
         distance = dx*dx + dy*dy # Save sqrt time, compare with square of step
@@ -244,9 +301,13 @@ class GlyphAnalyzer(object):
         u"""The <b>spanWhite</b> method answers the boolean flag if the number
         of recursive steps between <i>pc0</i> and <i>pc1</i> are all on white
         area of the glyph. If step is smaller than the distance between the
-        points, then just check in the middle of the line.  """
+        points, then just check in the middle of the line.
+        If there is a coverage bitmap, then all pixels of the line are tested at once."""
+        coverage = self.coverage
+        if coverage is not None:
+            return coverage.spanWhite(p0, p1, step)
         dx = p1[0] - p0[0]
-        dy = p1[1] - p1[1]
+        dy = p1[1] - p0[1]
         distance = dx*dx + dy*dy # Save sqrt time, compare with square of step
         m = p0[0] + dx/2, p0[1] + dy/2
         result = self.onWhite(m) # Just take the middle of this small distance.
@@ -316,7 +377,7 @@ class GlyphAnalyzer(object):
         self._allHorizontalCounters = horizontalCounters = {} # Space between all neighboring stems, running over white only.
 
         verticals = self.verticals
-        checked = set() # Store what we checked, to avoid doubles in the loops
+        checked = set() # Store what we checked, to avoid doubles in the loops. Index is per contour.
 
         for _, vertical1 in sorted(verticals.items()): # x1, vertical1
             for _, vertical2 in sorted(verticals.items()): # x2, vertical2
@@ -331,10 +392,10 @@ class GlyphAnalyzer(object):
                         if pc0 is pc1:
                             continue
                         # Skip if we already examined this one.
-                        if (pc0.index, pc1.index) in checked:
+                        if ((pc0.contourIndex, pc0.index), (pc1.contourIndex, pc1.index)) in checked:
                             continue
-                        checked.add((pc0.index, pc1.index))
-                        checked.add((pc1.index, pc0.index))
+                        checked.add(((pc0.contourIndex, pc0.index), (pc1.contourIndex, pc1.index)))
+                        checked.add(((pc1.contourIndex, pc1.index), (pc0.contourIndex, pc0.index)))
                         # Test if the y values are in range so this can be seen as stem pair
                         # and test if this pair is spanning a black space and the lines are
                         # not entirely covered in black.
@@ -605,7 +666,7 @@ class GlyphAnalyzer(object):
         self._allVerticalCounters = allVerticalCounters = {} # Space between all neighboring stems, running over white only.
 
 
-        checked = set() # Store what we checked, to avoid doubles in the loops
+        checked = set() # Store what we checked, to avoid doubles in the loops. Index is per contour.
         dimensions = self.dimensions
         if dimensions:
             for dimension in dimensions: # UFO only, needs to be written.
@@ -629,10 +690,10 @@ class GlyphAnalyzer(object):
                             if pc0 is pc1:
                                 continue
                             # Skip if we already examined this one.
-                            if (pc0.index, pc1.index) in checked:
+                            if ((pc0.contourIndex, pc0.index), (pc1.contourIndex, pc1.index)) in checked:
                                 continue
-                            checked.add((pc0.index, pc1.index))
-                            checked.add((pc1.index, pc0.index))
+                            checked.add(((pc0.contourIndex, pc0.index), (pc1.contourIndex, pc1.index)))
+                            checked.add(((pc1.contourIndex, pc1.index), (pc0.contourIndex, pc0.index)))
                             # Test if the y values are in range so this can be seen as stem pair
                             # and test if this pair is spanning a black space and not covered in black.
                             if self.isBar(pc0, pc1):
@@ -828,3 +889,8 @@ class GlyphAnalyzer(object):
     minX = property(_get_minX)
 
 
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -0,0 +1,368 @@
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     fontindex.py
+#
+#     Persistent index of the font files on the platform, so processes don't
+#     need to walk all font folders and open all font files at startup.
+#     The index keeps the file listing of every folder by its modification
+#     time and the metadata of every font file by its modification time and
+#     size. Only changed folders are listed again and only new or changed font
+#     files are opened. The index is saved as JSON in the PageBot cache folder.
+#
+import os
+import json
+
+from fontTools.ttLib import TTFont, TTLibError
+from pagebot import getCachePath
+from pagebot.fonttoolbox.objects.fontinfo import FontInfo
+from pagebot.toolbox.transformer import path2FontName
+from pagebot.style import FONT_WEIGHT_MATCHES, FONT_WIDTH_MATCHES, FONT_ITALIC_MATCHES
+
+FONT_INDEX_VERSION = 1 # Increment if the format changes, to ignore older index files.
+
+def getCharRanges(codes):
+    u"""Answer the sorted unicodes as compact list of [first, last] ranges.
+
+    >>> getCharRanges([65, 66, 67, 32, 97, 98])
+    [[32, 32], [65, 67], [97, 98]]
+    """
+    ranges = []
+    for code in sorted(codes):
+        if ranges and ranges[-1][1] == code - 1:
+            ranges[-1][1] = code
+        else:
+            ranges.append([code, code])
+    return ranges
+
+class FontRecord(object):
+    u"""Metadata of a font file in the FontIndex. It answers the same info and matching
+    methods as Font, so families can find their fonts without opening the font files.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getTestFontsPath
+    >>> path = getTestFontsPath() + '/google/roboto/Roboto-BlackItalic.ttf'
+    >>> record = FontRecord.fromPath(path)
+    >>> record
+    <FontRecord Roboto-BlackItalic>
+    >>> record.info.familyName == 'Roboto', record.info.weightClass, record.info.widthClass
+    (True, 900, 5)
+    >>> record.isItalic(), record.weightMatch('Black'), record.match(name='Robo', weight='Light')
+    (1, 1.0, 0.5)
+    >>> record.hasCharacters(u'ABC'), record.hasCharacters(u'一')
+    (True, False)
+    """
+    ATTRIBUTES = ('path', 'mtime', 'size', 'familyName', 'styleName', 'fullName', 'weightClass',
+        'widthClass', 'italicAngle', 'axes', 'charRanges')
+
+    def __init__(self, path, mtime=None, size=None, familyName=None, styleName=None, fullName=None,
+            weightClass=None, widthClass=None, italicAngle=0, axes=None, charRanges=None):
+        self.path = path
+        self.mtime = mtime # Modification time and size of the file, when the record was made.
+        self.size = size
+        self.familyName = familyName
+        self.styleName = styleName or ''
+        self.fullName = fullName or ''
+        self.weightClass = weightClass
+        self.widthClass = widthClass
+        self.italicAngle = italicAngle
+        self.axes = axes or {} # Key is axis tag, value is (minValue, defaultValue, maxValue)
+        self.charRanges = charRanges or [] # Sorted list of [first, last] unicodes.
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, path2FontName(self.path) or self.fullName)
+
+    @classmethod
+    def fromPath(cls, path):
+        u"""Answer a new FontRecord with the metadata read from the font file at path.
+        Answer None if the file cannot be opened as font."""
+        try:
+            stat = os.stat(path)
+            ttFont = TTFont(path, lazy=True)
+            info = FontInfo(ttFont)
+            if 'fvar' in ttFont:
+                axes = dict((a.axisTag, (a.minValue, a.defaultValue, a.maxValue)) for a in ttFont['fvar'].axes)
+            else:
+                axes = {}
+            return cls(path, mtime=stat.st_mtime, size=stat.st_size, familyName=info.familyName,
+                styleName=info.styleName, fullName=info.fullName, weightClass=info.weightClass,
+                widthClass=info.widthClass, italicAngle=info.italicAngle, axes=axes,
+                charRanges=getCharRanges((ttFont.getBestCmap() or {}).keys()))
+        except (TTLibError, KeyError, AssertionError, IOError, OSError): # Not a valid font file.
+            return None
+
+    @classmethod
+    def fromDict(cls, d):
+        record = cls(**d)
+        record.axes = dict((tag, tuple(values)) for tag, values in record.axes.items())
+        return record
+
+    def asDict(self):
+        return dict((name, getattr(self, name)) for name in self.ATTRIBUTES)
+
+    def _get_info(self):
+        u"""Answer self, as it has the same attributes as the FontInfo of a Font."""
+        return self
+    info = property(_get_info)
+
+    def isCurrent(self, stat):
+        u"""Answer the boolean flag if the record still matches the file with os.stat result."""
+        return self.mtime == stat.st_mtime and self.size == stat.st_size
+
+    def hasCharacters(self, characters):
+        u"""Answer the boolean flag if the font contains all unicodes of the characters."""
+        for c in characters:
+            code = ord(c)
+            for first, last in self.charRanges:
+                if first <= code <= last:
+                    break
+            else:
+                return False
+        return True
+
+    #   M A T C H I N G  (Same as Font)
+
+    def nameMatch(self, pattern):
+        u"""Answer level of matching between pattern and the font file name or fullName."""
+        fontName = path2FontName(self.path)
+        if not isinstance(pattern, (list, tuple)):
+            pattern = [pattern]
+        for part in pattern:
+            if not (part in fontName or part in self.fullName):
+                return 0
+        return 1.0
+
+    def weightMatch(self, weight):
+        u"""Answer level of matching for the (abbreviated) weight name or number."""
+        if isinstance(weight, (float, int)):
+            if self.weightClass in FONT_WEIGHT_MATCHES.get(weight, []):
+                return 1.0
+        else:
+            fileName = path2FontName(self.path)
+            for w in FONT_WEIGHT_MATCHES.get(weight, []):
+                if not isinstance(w, (float, int)) and (w in fileName or w in self.styleName):
+                    return 1.0
+        return 0
+
+    def widthMatch(self, width):
+        u"""Answer level of matching for the (abbreviated) width name or number."""
+        if isinstance(width, (float, int)):
+            w = self.widthClass
+            if w <= 100: # Normalize to 1000
+                w *= 100
+            if w in FONT_WIDTH_MATCHES.get(width, []):
+                return 1.0
+        else:
+            fileName = path2FontName(self.path)
+            for w in FONT_WIDTH_MATCHES.get(width, []):
+                if not isinstance(w, (float, int)) and (w in fileName or w in self.styleName):
+                    return 1.0
+        return 0
+
+    def isItalic(self):
+        u"""Answer the boolean flag if this font should be considered to be italic."""
+        if self.italicAngle:
+            return 1
+        for altName in FONT_ITALIC_MATCHES.keys():
+            if altName in path2FontName(self.path) or altName in self.styleName:
+                return 1.0
+        return 0
+
+    def match(self, name=None, weight=None, width=None, italic=None):
+        u"""Answer a value between 0 and 1 to the amount that self matches the defined parameters."""
+        matches = []
+        if name is not None:
+            matches.append(self.nameMatch(name))
+        if weight is not None:
+            matches.append(self.weightMatch(weight))
+        if width is not None:
+            matches.append(self.widthMatch(width))
+        if italic is not None:
+            matches.append(italic == self.isItalic())
+        if not matches:
+            return 0
+        return sum(matches)/len(matches)
+
+class FontIndex(object):
+    u"""Persistent index of folders and font files. The folders are listed again only if
+    their modification time changed, font files are read again only if their modification
+    time or size changed. Call self.save() to store changes, which is done by
+    getFontIndex().collectFontPaths().
+
+    >>> import tempfile
+    >>> from pagebot.fonttoolbox.fontpaths import getTestFontsPath
+    >>> path = tempfile.mkdtemp() + '/fontindex.json'
+    >>> index = FontIndex(path)
+    >>> fontPaths = index.collectFontPaths(getTestFontsPath() + '/google/roboto')
+    >>> len(fontPaths), index.changed, index.opened
+    (38, True, 0)
+    >>> record = index.getRecord(fontPaths['Roboto-Bold'])
+    >>> record.weightClass
+    700
+    >>> index.opened # Fonts are opened on the first request of their record.
+    1
+    >>> index.save()
+    >>> index = FontIndex(path) # Read from file, nothing to list or to open.
+    >>> fontPaths = index.collectFontPaths(getTestFontsPath() + '/google/roboto')
+    >>> records = index.getRecords(fontPaths.values())
+    >>> len(records), index.changed, index.opened
+    (38, True, 37)
+    >>> index.save()
+    >>> index = FontIndex(path)
+    >>> records = index.getRecords(index.collectFontPaths(getTestFontsPath() + '/google/roboto').values())
+    >>> len(records), index.changed, index.opened
+    (38, False, 0)
+    """
+    def __init__(self, path=None):
+        if path is None:
+            path = getCachePath() + '/fontindex.json'
+        self.path = path
+        self.folders = {} # Key is folder path, value is [mtime, [(path, isFolder), ...]]
+        self.records = {} # Key is font path, value is FontRecord, or None if it is not a valid font.
+        self.changed = False # Set to True if the index needs to be saved.
+        self.opened = 0 # Number of font files opened since creation of self.
+        self.read()
+
+    def __repr__(self):
+        return '<%s %d folders %d fonts>' % (self.__class__.__name__, len(self.folders), len(self.records))
+
+    def read(self):
+        u"""Read the index from self.path. Ignore the file if it cannot be read or if it has
+        another version."""
+        try:
+            f = open(self.path)
+            try:
+                data = json.load(f)
+            finally:
+                f.close()
+        except (IOError, OSError, ValueError):
+            return
+        if data.get('version') != FONT_INDEX_VERSION:
+            return
+        self.folders = data['folders']
+        for path, d in data['records'].items():
+            if d is None:
+                self.records[path] = None
+            else:
+                self.records[path] = FontRecord.fromDict(d)
+
+    def save(self):
+        u"""Write the index to self.path if it changed. The file is written under a temporary
+        name and then renamed, so other processes never read an incomplete index. If the file
+        cannot be written, then the index is only kept in memory, and self.changed stays True.
+
+        >>> import os
+        >>> index = FontIndex(os.devnull + '/fontindex.json') # Cannot be written.
+        >>> index.changed = True
+        >>> index.save()
+        >>> index.changed
+        True
+        """
+        if not self.changed:
+            return
+        records = {}
+        for path, record in self.records.items():
+            if record is not None:
+                record = record.asDict()
+            records[path] = record
+        tmpPath = '%s.%d.tmp' % (self.path, os.getpid())
+        try:
+            folder = os.path.dirname(self.path)
+            if not os.path.exists(folder):
+                os.makedirs(folder)
+            f = open(tmpPath, 'w')
+            try:
+                json.dump(dict(version=FONT_INDEX_VERSION, folders=self.folders, records=records), f)
+            finally:
+                f.close()
+            os.rename(tmpPath, self.path)
+        except (IOError, OSError):
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            return
+        self.changed = False
+
+    def _collectFolder(self, path, collectedFontPaths):
+        try:
+            mtime = os.stat(path).st_mtime
+        except OSError: # Folder does not exist (anymore).
+            return
+        folder = self.folders.get(path)
+        if folder is None or folder[0] != mtime:
+            # New or changed folder, list it again.
+            entries = [] # List of (path, isFolder) in the order of os.listdir
+            for fileName in os.listdir(path):
+                filePath = path + '/' + fileName
+                if os.path.isdir(filePath):
+                    entries.append((filePath, True))
+                elif path2FontName(filePath) is not None:
+                    entries.append((filePath, False))
+            folder = self.folders[path] = [mtime, entries]
+            self.changed = True
+        # Keep the listing order, as later files with the same name overwrite earlier ones.
+        for filePath, isFolder in folder[1]:
+            if isFolder:
+                self._collectFolder(filePath, collectedFontPaths)
+            else:
+                collectedFontPaths[path2FontName(filePath)] = filePath
+
+    def collectFontPaths(self, path, collectedFontPaths=None):
+        u"""Add the font paths in the folder path and its sub folders to the dictionary
+        collectedFontPaths, with the font name as key. Answer the dictionary."""
+        if collectedFontPaths is None:
+            collectedFontPaths = {}
+        if os.path.isdir(path):
+            self._collectFolder(path, collectedFontPaths)
+        else:
+            fontName = path2FontName(path)
+            if fontName is not None and os.path.exists(path):
+                collectedFontPaths[fontName] = path
+        return collectedFontPaths
+
+    def getRecord(self, path):
+        u"""Answer the FontRecord of the font file at path, reading the font if it is new or
+        changed. Answer None if the file does not exist or is not a valid font."""
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+        if path in self.records:
+            record = self.records[path]
+            if record is None or record.isCurrent(stat):
+                return record
+        record = self.records[path] = FontRecord.fromPath(path)
+        self.opened += 1
+        self.changed = True
+        return record
+
+    def getRecords(self, paths):
+        u"""Answer the list of valid FontRecord instances for the font paths."""
+        records = []
+        for path in paths:
+            record = self.getRecord(path)
+            if record is not None:
+                records.append(record)
+        return records
+
+FONT_INDEX = None
+
+def getFontIndex():
+    u"""Answer the FontIndex of the platform, read from the PageBot cache folder."""
+    global FONT_INDEX
+    if FONT_INDEX is None:
+        FONT_INDEX = FontIndex()
+    return FONT_INDEX
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -15,9 +15,9 @@
 #
 import os
 
-from pagebot.toolbox.transformer import path2FontName
 from pagebot import getResourcesPath
 from pagebot.style import DEFAULT_FONT_PATH
+from pagebot.fonttoolbox.fontindex import getFontIndex
 
 #   P A T H S
 
@@ -62,25 +62,12 @@ def getFontPathOfFont(font, default=None):
         font = default or DEFAULT_FONT_PATH
     return font
 
-def _recursivelyCollectFontPaths(path, collectedFontPaths):
-    u"""Recursive helper function for getFontPaths. If the fileName already exists in the fontPaths, then ignore."""
-    if os.path.exists(path):
-        if os.path.isdir(path):
-            for fileName in os.listdir(path):
-                dirPath = path + '/' + fileName
-                _recursivelyCollectFontPaths(dirPath, collectedFontPaths)
-        else:
-            fontName = path2FontName(path) # File name without extension used as key, works for Flat and DrawBot.
-            # If fontName is None, it does not have the right extension.
-            # Note that files with the same file name will be overwritten, we expect them to be unique in the OS.
-            if fontName is not None:
-                collectedFontPaths[fontName] = path
-
 def getFontPaths(extraPaths=None):
     u"""Answer a dictionary with all available font paths on the platform, key is the single file name.
     A typical example return for MaxOS the font paths available in directories (e.g. for user Petr):
         ('/Library/Fonts', '/Users/petr/Library/Fonts', '/Users/petr/git/PageBot/Fonts')
     In this order, "local" defined fonts with the same file name, will overwrite the "deeper" located font files.
+    The listings of the folders are kept in the persistent FontIndex, so only changed folders are listed again.
 
     >>> import os
     >>> os.path.exists(TEST_FONTS_PATH + '/fontbureau/Amstelvar-Roman-VF.ttf')
@@ -103,6 +90,7 @@ def getFontPaths(extraPaths=None):
         FONT_PATHS = {}  # Force (new) initialization
 
     if not FONT_PATHS:
+        fontIndex = getFontIndex()
 
         # If forced or initial call, get collect the font paths on this platform
         if os.name == 'posix':
@@ -114,7 +102,7 @@ def getFontPaths(extraPaths=None):
 
             for path in paths:
                 if os.path.exists(path):
-                    _recursivelyCollectFontPaths(path, FONT_PATHS)
+                    fontIndex.collectFontPaths(path, FONT_PATHS)
         elif os.name in ('nt', 'os2', 'ce', 'java', 'riscos'):
             # Add other typical Windows font folders here to look at.
             pass
@@ -123,13 +111,15 @@ def getFontPaths(extraPaths=None):
 
         # Add PageBot repository fonts, they always exist in this context.
         # But they can be overwritten by fonts with the same (file) name in the extraPaths.
-        _recursivelyCollectFontPaths(TEST_FONTS_PATH, FONT_PATHS)
+        fontIndex.collectFontPaths(TEST_FONTS_PATH, FONT_PATHS)
 
         if extraPaths is not None:
             if not isinstance(extraPaths, (list, tuple)):
                 extraPaths = [extraPaths]
             for extraPath in extraPaths:
-                _recursivelyCollectFontPaths(extraPath, FONT_PATHS)
+                fontIndex.collectFontPaths(extraPath, FONT_PATHS)
+
+        fontIndex.save()
 
     return FONT_PATHS
 
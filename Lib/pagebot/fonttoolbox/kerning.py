@@ -0,0 +1,271 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     kerning.py
+#
+#     Compact kerning of a font, read from the PairPos subtables of the GPOS
+#     kern feature (or from the old kern table). Class kerning keeps the ClassDef
+#     maps and an array with a value for each (leftClass, rightClass), so the
+#     kerning of a glyph pair is answered without expanding the classes into
+#     glyph pairs. As in OpenType layout, the values of the lookups are added,
+#     and inside a lookup the first subtable that applies to the pair wins.
+#     The subtables are only read when the kerning is used for the first time.
+#
+from array import array
+
+from fontTools.ttLib import TTFont
+
+KERN_FEATURE = 'kern'
+PAIR_POS = 2 # GPOS lookup type of pair adjustment.
+EXTENSION_POS = 9 # GPOS lookup type of extension subtables.
+
+def getXAdvance(valueRecord):
+    u"""Answer the horizontal advance adjustment of the GPOS value record, or 0 if not defined.
+
+    >>> getXAdvance(None)
+    0
+    """
+    if valueRecord is None:
+        return 0
+    return getattr(valueRecord, 'XAdvance', None) or 0
+
+class PairKerning(object):
+    u"""Glyph pair kerning of a PairPos format 1 subtable (or of the kern table), with a
+    dictionary of right glyph names and values for each left glyph.
+
+    >>> kerning = PairKerning({'T': {'o': -120}})
+    >>> kerning.get('T', 'o'), kerning.get('T', 'a'), kerning.get('A', 'o')
+    (-120, None, None)
+    """
+    __slots__ = ('pairs',)
+
+    def __init__(self, pairs):
+        self.pairs = pairs # Key is left glyph name, value is dict of right glyph name and value.
+
+    def get(self, left, right):
+        u"""Answer the kerning value of the pair, or None if the subtable does not apply to it."""
+        rights = self.pairs.get(left)
+        if rights is None:
+            return None
+        return rights.get(right)
+
+    def items(self):
+        u"""Answer the generator of ((left, right), value) of all pairs."""
+        for left, rights in self.pairs.items():
+            for right, value in rights.items():
+                yield (left, right), value
+
+class ClassKerning(object):
+    u"""Class kerning of a PairPos format 2 subtable. The value of the pair is stored in an array
+    at leftClass * class2Count + rightClass. Right glyphs that are not in a class are in class 0.
+
+    >>> kerning = ClassKerning(set(['T', 'V']), {'V': 1}, {'o': 1}, 2, 2, [0, -100, 0, -80])
+    >>> kerning.get('T', 'o'), kerning.get('V', 'o'), kerning.get('V', 'x'), kerning.get('A', 'o')
+    (-100, -80, 0, None)
+    >>> sorted(kerning.items())
+    [(('T', 'o'), -100), (('V', 'o'), -80)]
+    """
+    __slots__ = ('coverage', 'classDef1', 'classDef2', 'class1Count', 'class2Count', 'values')
+
+    def __init__(self, coverage, classDef1, classDef2, class1Count, class2Count, values):
+        self.coverage = coverage # Set of all left glyph names.
+        self.classDef1 = classDef1 # Key is left glyph name, value is class index.
+        self.classDef2 = classDef2 # Key is right glyph name, value is class index.
+        self.class1Count = class1Count
+        self.class2Count = class2Count
+        self.values = array('h', values)
+
+    def get(self, left, right):
+        u"""Answer the kerning value of the pair, or None if the subtable does not apply to it."""
+        if left not in self.coverage:
+            return None
+        return self.values[self.classDef1.get(left, 0) * self.class2Count + self.classDef2.get(right, 0)]
+
+    def items(self):
+        u"""Answer the generator of ((left, right), value) of all pairs with a value, expanding the
+        classes. Right glyphs of class 0 are only answered if they are explicitly in the ClassDef."""
+        rightClasses = {}
+        for right, class2 in self.classDef2.items():
+            rightClasses.setdefault(class2, []).append(right)
+        class2Count = self.class2Count
+        values = self.values
+        for left in self.coverage:
+            offset = self.classDef1.get(left, 0) * class2Count
+            for class2, rights in rightClasses.items():
+                value = values[offset + class2]
+                if value:
+                    for right in rights:
+                        yield (left, right), value
+
+class Kerning(object):
+    u"""Kerning of a font, answering the value of glyph pairs without expanding class kerning.
+    The ttFont can be a TTFont instance or a font path.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getTestFontsPath, getFontPathOfFont
+    >>> kerning = Kerning(getTestFontsPath() + '/djr/bungee/Bungee-Regular.ttf')
+    >>> kerning
+    <Kerning 1 lookups>
+    >>> kerning.kern('T', 'O'), kerning.kern('A', 'V'), kerning.kern('H', 'H')
+    (-5, -10, 0)
+    >>> kerning.kernSequence(['A', 'V', 'A', 'T'])
+    [-10, -10, -40]
+    >>> kerning[('A', 'V')], ('A', 'V') in kerning, ('H', 'H') in kerning
+    (-10, True, False)
+    >>> kerning.get(('A', 'V')), kerning.get(('H', 'H')), kerning.get(('H', 'H'), 0)
+    (-10, None, 0)
+    >>> len(kerning), len(kerning.keys()) # Expanded glyph pairs.
+    (22827, 22827)
+    >>> kerning = Kerning(getFontPathOfFont('RobotoDelta-VF')) # No kern feature.
+    >>> bool(kerning), kerning.kern('T', 'o')
+    (False, 0)
+    """
+    def __init__(self, ttFont):
+        if not isinstance(ttFont, TTFont):
+            ttFont = TTFont(ttFont, lazy=True)
+        self.ttFont = ttFont
+        self._lookups = None # Lazy list of lookups, each a list of subtables.
+
+    def __repr__(self):
+        return '<%s %d lookups>' % (self.__class__.__name__, len(self.lookups))
+
+    def __bool__(self):
+        return bool(self.lookups)
+    __nonzero__ = __bool__
+
+    def _get_lookups(self):
+        u"""Answer the list of lookups, each a list of PairKerning/ClassKerning subtables. The
+        subtables are read when this property is used for the first time."""
+        if self._lookups is None:
+            self._lookups = self._readGPOS() or self._readKernTable()
+        return self._lookups
+    lookups = property(_get_lookups)
+
+    def _readGPOS(self):
+        u"""Answer the lookups of the GPOS kern feature, in lookup order."""
+        if 'GPOS' not in self.ttFont:
+            return []
+        table = self.ttFont['GPOS'].table
+        if table.FeatureList is None or table.LookupList is None:
+            return []
+        lookupIndices = set()
+        for featureRecord in table.FeatureList.FeatureRecord:
+            if featureRecord.FeatureTag == KERN_FEATURE:
+                lookupIndices.update(featureRecord.Feature.LookupListIndex)
+        lookups = []
+        for lookupIndex in sorted(lookupIndices):
+            lookup = table.LookupList.Lookup[lookupIndex]
+            subtables = []
+            for subtable in lookup.SubTable:
+                if lookup.LookupType == EXTENSION_POS:
+                    if subtable.ExtensionLookupType != PAIR_POS:
+                        continue
+                    subtable = subtable.ExtSubTable
+                elif lookup.LookupType != PAIR_POS:
+                    continue
+                if subtable.Format == 1:
+                    subtables.append(self._readPairPos(subtable))
+                elif subtable.Format == 2:
+                    subtables.append(self._readClassPairPos(subtable))
+            if subtables:
+                lookups.append(subtables)
+        return lookups
+
+    def _readPairPos(self, subtable):
+        u"""Answer the PairKerning of the PairPos format 1 subtable."""
+        pairs = {}
+        for left, pairSet in zip(subtable.Coverage.glyphs, subtable.PairSet):
+            pairs[left] = dict([(record.SecondGlyph, getXAdvance(record.Value1))
+                for record in pairSet.PairValueRecord])
+        return PairKerning(pairs)
+
+    def _readClassPairPos(self, subtable):
+        u"""Answer the ClassKerning of the PairPos format 2 subtable."""
+        values = []
+        for class1Record in subtable.Class1Record:
+            values.extend([getXAdvance(class2Record.Value1) for class2Record in class1Record.Class2Record])
+        return ClassKerning(set(subtable.Coverage.glyphs), subtable.ClassDef1.classDefs,
+            subtable.ClassDef2.classDefs, subtable.Class1Count, subtable.Class2Count, values)
+
+    def _readKernTable(self):
+        u"""Answer the lookups of the old kern table, if there is one."""
+        if 'kern' not in self.ttFont:
+            return []
+        pairs = {}
+        for kernTable in self.ttFont['kern'].kernTables:
+            if getattr(kernTable, 'format', None) != 0:
+                continue
+            for (left, right), value in kernTable.kernTable.items():
+                pairs.setdefault(left, {})[right] = value
+        if not pairs:
+            return []
+        return [[PairKerning(pairs)]]
+
+    def kern(self, left, right):
+        u"""Answer the kerning value of the glyph pair (left, right) in font units."""
+        value = 0
+        for subtables in self.lookups:
+            for subtable in subtables:
+                v = subtable.get(left, right)
+                if v is not None:
+                    value += v
+                    break
+        return value
+
+    def kernSequence(self, glyphNames):
+        u"""Answer the list of kerning values between each pair of consecutive glyph names."""
+        kern = self.kern
+        return [kern(left, right) for left, right in zip(glyphNames[:-1], glyphNames[1:])]
+
+    #   Dictionary compatible access, where the key is the glyph pair.
+
+    def __getitem__(self, pair):
+        return self.kern(*pair)
+
+    def get(self, pair, default=None):
+        u"""Answer the kerning value of the glyph pair. Answer default if the pair is not kerned,
+        as the dictionary of the expanded kerning pairs does."""
+        return self.kern(*pair) or default
+
+    def __contains__(self, pair):
+        return self.kern(*pair) != 0
+
+    def __len__(self):
+        u"""Answer the number of kerned glyph pairs. Note that this expands class kerning into
+        glyph pairs, as self.items() does, so it is slow for large fonts."""
+        return len(self.items())
+
+    def __iter__(self):
+        return iter(self.keys())
+
+    def items(self):
+        u"""Answer the list of ((left, right), value) for all kerned pairs. Note that this expands
+        class kerning into glyph pairs, so it is slow for large fonts. Use self.kern instead."""
+        pairs = {}
+        for subtables in reversed(self.lookups):
+            lookupPairs = {}
+            for subtable in reversed(subtables): # First subtable wins inside the lookup.
+                for pair, value in subtable.items():
+                    lookupPairs[pair] = value
+            for pair, value in lookupPairs.items():
+                pairs[pair] = pairs.get(pair, 0) + value
+        return [(pair, value) for pair, value in pairs.items() if value]
+
+    def keys(self):
+        u"""Answer the list of all kerned pairs. See self.items()."""
+        return [pair for pair, _ in self.items()]
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -17,6 +17,7 @@
 #
 import os
 from pagebot.fonttoolbox.fontpaths import getFontPaths
+from pagebot.fonttoolbox.fontindex import getFontIndex, FontRecord
 from pagebot.fonttoolbox.objects.font import Font, getFont
 from pagebot.toolbox.transformer import path2FamilyName
 
@@ -27,6 +28,8 @@ def getFamilies(familyPaths=None, useFontInfo=True, useFileName=True, force=Fals
     the families from all aviable font paths found in the by the context.
     The flag useFontInfo defines if the familyName, styleName) should be taken from the font.info
     or guess from the font file name.
+    The family names are taken from the records in the persistent FontIndex, so font files are
+    only opened if they are new or changed. The Font instances are created when they are needed.
 
     >>> families = getFamilies()
     >>> 'Roboto' in families
@@ -45,19 +48,18 @@ def getFamilies(familyPaths=None, useFontInfo=True, useFileName=True, force=Fals
     if force:
         FAMILIES = {}
     if not FAMILIES: # If forced or not initialized yet
-        for fontPath in getFontPaths().values():
-            font = getFont(fontPath)
-            if font is not None:
-                #print(font.path.split('/')[-1], repr(font.info.familyName), repr(font.info.styleName))
-                familyName = None
-                if useFontInfo:
-                    familyName = font.info.familyName
-                if not familyName and useFileName:
-                    familyName = path2FamilyName(font.path)
-                if familyName:
-                    if familyName not in FAMILIES:
-                        FAMILIES[familyName] = Family(familyName)
-                    FAMILIES[familyName].addFont(font)
+        fontIndex = getFontIndex()
+        for record in fontIndex.getRecords(getFontPaths().values()):
+            familyName = None
+            if useFontInfo:
+                familyName = record.familyName
+            if not familyName and useFileName:
+                familyName = path2FamilyName(record.path)
+            if familyName:
+                if familyName not in FAMILIES:
+                    FAMILIES[familyName] = Family(familyName)
+                FAMILIES[familyName].addFont(record)
+        fontIndex.save()
     return FAMILIES
 
 def getFamily(familyName, useFontInfo=True, useFileName=True):
@@ -103,7 +105,8 @@ class Family(object):
         >>> family = Family(familyName, fontPath)
         """
         self.name = name or 'Untitled'
-        self.fonts = {} # Key is unique font file path. Value is Font instances.
+        self._fonts = {} # Key is unique font file path. Value is Font instance, or None if not opened yet.
+        self.records = {} # Key is unique font file path. Value is FontRecord from the FontIndex.
         if fonts is not None:
             self.addFonts(fonts) # Try to figure out what these are, and add them
 
@@ -113,7 +116,7 @@ class Family(object):
 
     def __len__(self):
         u"""Answer the length of the family, as the amount of fonts."""
-        return len(self.fonts)
+        return len(self._fonts)
 
     def __contains__(self, fontPath):
         u"""Answer the boolean flag if there is a Font instance with path fontPath.
@@ -126,7 +129,7 @@ class Family(object):
         >>> path in family
         True
         """
-        return fontPath in self.fonts
+        return fontPath in self._fonts
 
     def __getitem__(self, fontPath):
         u"""Answer the Font instance by this fontPath.
@@ -141,7 +144,27 @@ class Family(object):
         >>> family.fonts[path].path == path
         True
         """
-        return self.fonts[fontPath]
+        if not fontPath in self._fonts:
+            raise KeyError(fontPath)
+        return self._getFont(fontPath)
+
+    def _getFont(self, fontPath):
+        u"""Answer the Font instance of fontPath, opening the font file if it was added as FontRecord."""
+        font = self._fonts.get(fontPath)
+        if font is None:
+            font = self._fonts[fontPath] = getFont(fontPath)
+        return font
+
+    def _get_fonts(self):
+        u"""Answer the dictionary of all Font instances of the family, with font path as key.
+        Fonts that were added as FontRecord are opened here."""
+        fonts = {}
+        for fontPath in self._fonts.keys():
+            font = self._getFont(fontPath)
+            if font is not None:
+                fonts[fontPath] = font
+        return fonts
+    fonts = property(_get_fonts)
 
     def keys(self):
         u"""Answer the paths of fonts, which are the keys in self.fonts.
@@ -154,7 +177,7 @@ class Family(object):
         >>> family.keys()[0] == path
         True
         """
-        return self.fonts.keys()
+        return self._fonts.keys()
 
     def addFonts(self, fontsOrPaths):
         u"""And the fonts to the family. This can be a list of Font instances, a list of font names or
@@ -195,22 +218,25 @@ class Family(object):
         """
         font = None
         if isinstance(fontOrPath, self.FONT_CLASS):
-            self.fonts[fontOrPath.path] = font = fontOrPath
+            self._fonts[fontOrPath.path] = font = fontOrPath
+        elif isinstance(fontOrPath, FontRecord): # Font file is opened when needed.
+            self.records[fontOrPath.path] = font = fontOrPath
+            self._fonts.setdefault(fontOrPath.path, None)
         elif os.path.isdir(fontOrPath):
             for fileName in os.listdir(fontOrPath):
                 if not fontOrPath.endswith('/'):
                     fontOrPath += '/'
                 filePath = fontOrPath + fileName
-                if not filePath in self.fonts: # Only create if not already there.
+                if self._fonts.get(filePath) is None: # Only create if not already there.
                     font = getFont(filePath)
                     if font is not None:
-                        self.fonts[filePath] = font # Not recursive, this just folder.
+                        self._fonts[filePath] = font # Not recursive, this just folder.
                 else: # Font exists, just return it
-                    font = self.fonts[filePath]
+                    font = self._fonts[filePath]
         else:
             font = getFont(fontOrPath)
             if font is not None:
-                self.fonts[fontOrPath] = font
+                self._fonts[fontOrPath] = font
         return font
 
     def getFonts(self):
@@ -339,15 +365,21 @@ class Family(object):
         return self._findFont(weight=400, width=5, italic=italic)
 
     def _findFont(self, name=None, weight=None, width=None, italic=False):
-        u"""Private method to find the font closest to the defined parameters."""
+        u"""Private method to find the font closest to the defined parameters. Fonts that were
+        added as FontRecord are matched on their record, only the matching font is opened."""
         match = 0
-        matchingFont = None
-        for font in self.fonts.values():
-            thisMatch = font.match(name=name, weight=weight, width=width, italic=italic)
+        matchingPath = None
+        for fontPath in self._fonts.keys():
+            fontOrRecord = self.records.get(fontPath) or self._getFont(fontPath)
+            if fontOrRecord is None:
+                continue
+            thisMatch = fontOrRecord.match(name=name, weight=weight, width=width, italic=italic)
             if thisMatch > match:
-                matchingFont = font
+                matchingPath = fontPath
                 match = thisMatch
-        return matchingFont
+        if matchingPath is None:
+            return None
+        return self._getFont(matchingPath)
 
     def findFont(self, name=None, weight=None, width=None, italic=False):
         u"""Answer the font that is the closest match on name, weight as name or weight as number,
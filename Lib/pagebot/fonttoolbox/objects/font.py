@@ -25,21 +25,14 @@
 import os
 from fontTools.misc.py23 import *
 from fontTools.ttLib import TTFont, TTLibError
-from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
-from fontTools.varLib import _GetCoordinates, _SetCoordinates
-from fontTools.varLib.models import supportScalar, normalizeLocation
-
-try:
-    from fontTools.varLib.iup import iup_delta
-except:
-    from fontTools.varLib.mutator import iup_delta
 
 from pagebot.toolbox.transformer import path2FontName, path2Extension#, asFormatted
 from pagebot.fonttoolbox.analyzers.fontanalyzer import FontAnalyzer
 from pagebot.fonttoolbox.objects.glyph import Glyph
 from pagebot.fonttoolbox.objects.fontinfo import FontInfo
+from pagebot.fonttoolbox.variablefontinstancer import getVariableFontInstancer
 
-from pagebot.contributions.adobe.kerndump.getKerningPairsFromOTF import OTFKernReader
+from pagebot.fonttoolbox.kerning import Kerning
 from pagebot.style import FONT_WEIGHT_MATCHES, FONT_WIDTH_MATCHES, FONT_ITALIC_MATCHES
 
 def isFontPath(fontPath):
@@ -248,8 +241,6 @@ def makeInstance(pathOrVarFont, location, dstPath=None, normalize=True, cached=T
     instanceName = ""
     if isinstance(pathOrVarFont, Font):
         pathOrVarFont = pathOrVarFont.path
-    varFont = Font(pathOrVarFont, lazy=lazy)
-    ttFont = varFont.ttFont
 
     for k, v in sorted(location.items()):
         # TODO better way to normalize the location name to (0, 1000)
@@ -258,7 +249,7 @@ def makeInstance(pathOrVarFont, location, dstPath=None, normalize=True, cached=T
         instanceName += "-%s%s" % (k, v)
 
     if dstPath is None:
-        targetFileName = '.'.join(varFont.path.split('/')[-1].split('.')[:-1]) + instanceName + '.ttf'
+        targetFileName = '.'.join(pathOrVarFont.split('/')[-1].split('.')[:-1]) + instanceName + '.ttf'
         targetDirectory = getInstancePath()
         if not targetDirectory.endswith('/'):
             targetDirectory += '/'
@@ -267,80 +258,12 @@ def makeInstance(pathOrVarFont, location, dstPath=None, normalize=True, cached=T
         dstPath = targetDirectory + targetFileName
 
     if not cached or not os.path.exists(dstPath):
-        # Instance does not exist as file. Create it.
-
-        # Set the instance name IDs in the name table
-        platforms=((1, 0, 0), (3, 1, 0x409)) # Macintosh and Windows
-        for platformID, platEncID, langID in platforms:
-            familyName = ttFont['name'].getName(1, platformID, platEncID, langID) # 1 Font Family name
-            if not familyName:
-                continue
-            familyName = familyName.toUnicode() # NameRecord to unicode string
-            styleName = unicode(instanceName) # TODO make sure this works in any case
-            fullFontName = " ".join([familyName, styleName])
-            postscriptName = fullFontName.replace(" ", "-")
-            ttFont['name'].setName(styleName, 2, platformID, platEncID, langID) # 2 Font Subfamily name
-            ttFont['name'].setName(fullFontName, 4, platformID, platEncID, langID) # 4 Full font name
-            ttFont['name'].setName(postscriptName, 6, platformID, platEncID, langID) # 6 Postscript name for the font
-            # Other important name IDs
-            # 3 Unique font identifier (e.g. Version 0.000;NONE;Promise Bold Regular)
-            # 25 Variables PostScript Name Prefix
-
-        fvar = ttFont['fvar']
-        axes = {a.axisTag:(a.minValue,a.defaultValue,a.maxValue) for a in fvar.axes}
+        # Instance does not exist as file. Create it from the deltas of the variable font,
+        # that are converted only once. Recently used instances are kept in memory.
         # TODO Apply avar
-        # TODO Round to F2Dot14?
-        loc = normalizeLocation(location, axes)
-        # Location is normalized now
-        #print("Normalized location:", loc)
-
-        gvar = ttFont['gvar']
-        glyf = ttFont['glyf']
-        # get list of glyph names in gvar sorted by component depth
-        glyphNames = sorted(
-            gvar.variations.keys(),
-            key=lambda name: (
-                glyf[name].getCompositeMaxpValues(glyf).maxComponentDepth
-                if glyf[name].isComposite() else 0,
-                name))
-        for glyphName in glyphNames:
-            variations = gvar.variations[glyphName]
-            coordinates,_ = _GetCoordinates(ttFont, glyphName)
-            origCoords, endPts = None, None
-            for var in variations:
-                scalar = supportScalar(loc, var.axes)#, ot=True)
-                if not scalar: continue
-                delta = var.coordinates
-                if None in delta:
-                    if origCoords is None:
-                        origCoords,control = _GetCoordinates(ttFont, glyphName)
-                        endPts = control[1] if control[0] >= 1 else list(range(len(control[1])))
-                    delta = iup_delta(delta, origCoords, endPts)
-                coordinates += GlyphCoordinates(delta) * scalar
-            _SetCoordinates(ttFont, glyphName, coordinates)
-
-        # Interpolate cvt
-
-        if 'cvar' in ttFont:
-            cvar = ttFont['cvar']
-            cvt = ttFont['cvt ']
-            deltas = {}
-            for var in cvar.variations:
-                scalar = supportScalar(loc, var.axes)
-                if not scalar: continue
-                for i, c in enumerate(var.coordinates):
-                    if c is not None:
-                        deltas[i] = deltas.get(i, 0) + scalar * c
-            for i, delta in deltas.items():
-                cvt[i] += int(round(delta))
-
-        #print("Removing variable tables")
-        for tag in ('avar','cvar','fvar','gvar','HVAR','MVAR','VVAR','STAT'):
-            if tag in ttFont:
-                del ttFont[tag]
-
-        #print("Saving instance font", outFile)
-        varFont.save(dstPath)
+        ttFont = getVariableFontInstancer(pathOrVarFont).getInstance(location, styleName=instanceName)
+        #print("Saving instance font", dstPath)
+        ttFont.save(dstPath)
 
     # Answer instance.
     return Font(dstPath, lazy=lazy)
@@ -833,18 +756,21 @@ class Font(object):
     features = property(_get_features)
 
     def _get_kerning(self):
-        u"""Answer the (expanded) kerning table of the font.
+        u"""Answer the Kerning instance of the font. Class kerning is not expanded into glyph
+        pairs, use f.kerning.kern(glyphName1, glyphName2) to get the value of a pair.
 
         >>> from pagebot.toolbox.transformer import *
         >>> from pagebot.fonttoolbox.fontpaths import getTestFontsPath
         >>> fontPath = getTestFontsPath()
         >>> path = fontPath + '/djr/bungee/Bungee-Regular.ttf'
         >>> f = getFont(path, lazy=False)
-        >>> len(f.kerning.keys())
+        >>> f.kerning.kern('A', 'V'), f.kerning[('A', 'T')]
+        (-10, -40)
+        >>> len(f.kerning.keys()) # Expanded into glyph pairs.
         22827
         """
         if self._kerning is None: # Lazy read.
-            self._kerning = OTFKernReader(self.path).kerningPairs
+            self._kerning = Kerning(self.ttFont)
         return self._kerning
     kerning =  property(_get_kerning)
 
@@ -16,9 +16,13 @@
 #
 #     Implements a PageBot font classes to get info from a TTFont.
 #
-import sys
 import weakref
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 # Use default drawing context for generating the glyphs path.
 # This is independent from the current main context, e.g. HtmlContext.
 from pagebot.fonttoolbox.analyzers import GlyphAnalyzer, APointContext
@@ -29,6 +33,7 @@ from pagebot.fonttoolbox.analyzers.acomponent import AComponent
 
 C = 0.5
 F = 2.0 / 3.0
+SCALED_COMPONENT_OFFSET = 0x0800 # Flag of glyf components, offset is in the transformed space.
 
 class AxisDeltas(object):
     u"""Hold the list of axis parts with their minValue, defaultValue, maxValue and list of deltas."""
@@ -46,6 +51,186 @@ class AxisDeltas(object):
     def __getitem__(self, key):
         return self.deltas[key]
 
+class GlyphOutline(object):
+    u"""Array-backed outline of a glyph, with the (x, y) coordinates, the point flags and the
+    index of the last point of each contour. Composite glyphs are resolved into the transformed
+    coordinates of their components. With NumPy the values are arrays, so bounds and transforms
+    are vectorized, and the points of the quadratic curves are calculated together when flattening.
+    Otherwise lists are used. No point objects are made, see Glyph.points for these.
+
+    >>> outline = GlyphOutline([(0, 0), (100, 0), (100, 100), (50, 150), (0, 100)], [1, 1, 1, 0, 1], [4])
+    >>> len(outline), outline.boundingBox
+    (5, (0, 0, 100, 150))
+    >>> outline.transform((2, 0, 0, 1, 10, 0)).boundingBox
+    (10, 0, 210, 150)
+    >>> outline.getContourSegments(0)[-2:]
+    [((100, 100), (50, 150), (0, 100)), ((0, 100), None, (0, 0))]
+    >>> outline.flatten(steps=2)
+    [[(0, 0), (100, 0), (100, 100), (50.0, 125.0), (0.0, 100.0)]]
+    >>> outline = GlyphOutline([(0, 0), (100, 0), (100, 100), (0, 100)], [0, 0, 0, 0], [3])
+    >>> outline.getContourSegments(0)[0] # Implied on-curve points only.
+    ((0.0, 50.0), (0, 0), (50.0, 0.0))
+    """
+    __slots__ = ('coordinates', 'flags', 'endPtsOfContours')
+
+    def __init__(self, coordinates, flags, endPtsOfContours):
+        if numpy is not None:
+            coordinates = numpy.array(coordinates).reshape(-1, 2)
+            flags = numpy.array(flags, dtype=numpy.uint8)
+            endPtsOfContours = numpy.array(endPtsOfContours, dtype=int)
+        else:
+            coordinates = [tuple(p) for p in coordinates]
+            flags = list(flags)
+            endPtsOfContours = list(endPtsOfContours)
+        self.coordinates = coordinates # (x, y) of all points.
+        self.flags = flags # Flags of all points, bit 0 is on-curve.
+        self.endPtsOfContours = endPtsOfContours # Index of the last point of each contour.
+
+    @classmethod
+    def fromTTGlyph(cls, ttGlyph, glyfTable):
+        u"""Answer a new GlyphOutline from the fontTools glyf glyph, including its components."""
+        coordinates, endPtsOfContours, flags = ttGlyph.getCoordinates(glyfTable)
+        if numpy is not None: # Read the array of GlyphCoordinates at once, keep integers if possible.
+            coordinates = numpy.array(coordinates.array, dtype=float)
+            if numpy.array_equal(coordinates, numpy.round(coordinates)):
+                coordinates = coordinates.astype(int)
+        return cls(coordinates, flags, endPtsOfContours)
+
+    @classmethod
+    def join(cls, outlines):
+        u"""Answer a new GlyphOutline with the contours of all outlines, e.g. of the components
+        of a composite glyph.
+
+        >>> outline = GlyphOutline([(0, 0), (100, 0), (0, 100)], [1, 1, 1], [2])
+        >>> outline = GlyphOutline.join([outline, outline.transform((1, 0, 0, 1, 200, 0))])
+        >>> len(outline), [int(endPt) for endPt in outline.endPtsOfContours], outline.boundingBox
+        (6, [2, 5], (0, 0, 300, 100))
+        """
+        coordinates = []
+        flags = []
+        endPtsOfContours = []
+        offset = 0
+        for outline in outlines:
+            coordinates.append(outline.coordinates)
+            flags.append(outline.flags)
+            endPtsOfContours.append([offset + int(endPt) for endPt in outline.endPtsOfContours])
+            offset += len(outline)
+        if numpy is not None and outlines:
+            return cls(numpy.concatenate(coordinates), numpy.concatenate(flags), sum(endPtsOfContours, []))
+        return cls(sum(coordinates, []), sum(flags, []), sum(endPtsOfContours, []))
+
+    def __len__(self):
+        return len(self.coordinates)
+
+    def _get_boundingBox(self):
+        u"""Answer the (minX, minY, maxX, maxY) of all points, or None if there are no points."""
+        if not len(self.coordinates):
+            return None
+        if numpy is not None:
+            return tuple(self.coordinates.min(axis=0).tolist() + self.coordinates.max(axis=0).tolist())
+        xs = [x for x, _ in self.coordinates]
+        ys = [y for _, y in self.coordinates]
+        return min(xs), min(ys), max(xs), max(ys)
+    boundingBox = property(_get_boundingBox)
+
+    def transform(self, t):
+        u"""Answer a new GlyphOutline with the coordinates transformed by the affine matrix
+        t = (xx, xy, yx, yy, dx, dy), in the same order as path.transform."""
+        xx, xy, yx, yy, dx, dy = t
+        if numpy is not None:
+            coordinates = self.coordinates.dot(numpy.array([(xx, xy), (yx, yy)])) + (dx, dy)
+        else:
+            coordinates = [(xx * x + yx * y + dx, xy * x + yy * y + dy) for x, y in self.coordinates]
+        return self.__class__(coordinates, self.flags, self.endPtsOfContours)
+
+    def getContourSegments(self, contourIndex):
+        u"""Answer the list of quadratic (p0, p1, p2) segments of the contour, starting at an
+        on-curve point and ending where it started. For straight segments p1 is None. The implied
+        on-curve points between consecutive off-curve points are added."""
+        start = 0
+        if contourIndex:
+            start = int(self.endPtsOfContours[contourIndex-1]) + 1
+        end = int(self.endPtsOfContours[contourIndex]) + 1
+        points = self.coordinates[start:end]
+        if numpy is not None:
+            points = [tuple(p) for p in points.tolist()]
+        onCurve = [bool(flag & 1) for flag in self.flags[start:end]]
+        if not points:
+            return []
+        if True in onCurve: # Start the contour with an on-curve point.
+            first = onCurve.index(True)
+            points = points[first:] + points[:first]
+            onCurve = onCurve[first:] + onCurve[:first]
+        else: # Only off-curve points, start on the implied point between the last and the first.
+            (x0, y0), (x1, y1) = points[-1], points[0]
+            points = [((x0 + x1) / 2.0, (y0 + y1) / 2.0)] + points
+            onCurve = [True] + onCurve
+        segments = []
+        p0 = points[0]
+        control = None
+        for p, pOnCurve in zip(points[1:] + points[:1], onCurve[1:] + onCurve[:1]):
+            if pOnCurve:
+                segments.append((p0, control, p))
+                p0 = p
+                control = None
+            elif control is None:
+                control = p
+            else: # Two off-curve points, add the implied on-curve point between them.
+                m = ((control[0] + p[0]) / 2.0, (control[1] + p[1]) / 2.0)
+                segments.append((p0, control, m))
+                p0 = m
+                control = p
+        return segments
+
+    def draw(self, path):
+        u"""Draw the outline in path, converting the quadratic curves into cubics."""
+        for contourIndex in range(len(self.endPtsOfContours)):
+            segments = self.getContourSegments(contourIndex)
+            if not segments:
+                continue
+            path.moveTo(segments[0][0])
+            if segments[-1][1] is None: # Closing straight line is drawn by closePath.
+                segments = segments[:-1]
+            for (p0x, p0y), p1, p2 in segments:
+                if p1 is None:
+                    path.lineTo(p2)
+                else:
+                    (p1x, p1y), (p2x, p2y) = p1, p2
+                    path.curveTo((p0x + (p1x - p0x) * F, p0y + (p1y - p0y) * F),
+                        (p2x + (p1x - p2x) * F, p2y + (p1y - p2y) * F), p2)
+            path.closePath()
+
+    def flatten(self, steps=8):
+        u"""Answer the list of contours, where each contour is the list of (x, y) points of the
+        straight segments and of the quadratic curves divided into steps parts."""
+        contours = []
+        for contourIndex in range(len(self.endPtsOfContours)):
+            segments = self.getContourSegments(contourIndex)
+            if not segments:
+                continue
+            curves = [segment for segment in segments if segment[1] is not None]
+            if curves and numpy is not None:
+                # Points of all curves of the contour at once, in shape (curves, steps, 2).
+                t = (numpy.arange(1, steps + 1) / float(steps))[:, None]
+                p0, p1, p2 = [numpy.array(p)[:, None, :] for p in zip(*curves)]
+                curvePoints = iter(((1 - t)**2 * p0 + 2 * (1 - t) * t * p1 + t**2 * p2).tolist())
+            else:
+                curvePoints = None
+            contour = [segments[0][0]]
+            for (p0x, p0y), p1, p2 in segments:
+                if p1 is None:
+                    contour.append(p2)
+                elif curvePoints is not None:
+                    contour.extend([tuple(p) for p in next(curvePoints)])
+                else:
+                    (p1x, p1y), (p2x, p2y) = p1, p2
+                    for step in range(1, steps + 1):
+                        t = step / float(steps)
+                        a, b, c = (1 - t)**2, 2 * (1 - t) * t, t**2
+                        contour.append((a * p0x + b * p1x + c * p2x, a * p0y + b * p1y + c * p2y))
+            contours.append(contour[:-1]) # Last point is the start point.
+        return contours
+
 class Glyph(object):
     u"""The Glyph class wraps the glyph structure of a TrueType Font and
     extracts data from the raw glyph such as point sequence and type.
@@ -84,6 +269,7 @@ class Glyph(object):
         self.font = font # Stored as weakref
         self.dirty = True # Mark that we need initialization or something changed in the points.
 
+        self._outline = None # Array-backed GlyphOutline, for bounds, path and flattening.
         self._analyzer = None # Installed upon request
         self._points = None # Same as self.points property with added 4 spacing points in TTF style.
         self._points4 = None
@@ -109,91 +295,53 @@ class Glyph(object):
             len(self.coordinates), len(self.endPtsOfContours), len(self.components))
 
     def __getitem__(self, contourIndex):
-        if self._contours is None:
-            self._initialize()
-        return self._contours[contourIndex]
-
-    def _initialize(self):
-        u"""Initializes the cached data, such as self.points, self.contour,
-        self.components and self.path, as side effect of drawing the path image.
+        return self.contours[contourIndex]
 
-        TODO: Separate path creation from initialize, so we no longer need self.context here.
-        """
+    def _clean(self):
+        u"""If the glyph is dirty, then reset all cached data, so it is created again from the
+        coordinates when requested."""
+        if self.dirty:
+            self._outline = self._boundingBox = None
+            self._points = self._points4 = self._pointContexts = self._contours = self._segments = None
+            self._components = None
+            self._path = self._flattenedPath = self._flattenedContours = None
+            self.dirty = False
 
+    def _initialize(self):
+        u"""Initializes the APoint wrappers of the coordinates in self.points, self.points4,
+        self.contours and self.segments. These are only made when requested, as bounds,
+        path and flattened contours are calculated from self.outline."""
+        self._clean()
+        minX, minY, maxX, maxY = self.boundingBox
         self._points = []
-        self._points4 = [] # Same as self.points property with added 4 spacing points in TTF style.
         self._contours = []
         self._segments = []
-        self._boundingBox = None
-        components = self.components
 
         coordinates = self.coordinates # Get list from the font.
         flags = self.flags
         endPtsOfContours = set(self.endPtsOfContours)
-        openContour = False
+        openContour = None
         openSegment = None
-        currentOnCurve = None
-        p0 = None
-
-        minX = minY = sys.maxsize # Store bounding box as we process the coordinate.
-        maxX = maxY = -sys.maxsize
-
-        if coordinates or components:
-            self._path = self.context.newPath()
-
-        for component in components:
-            componentName = component.baseGlyph
-            if componentName in self.font.keys():
-                componentPath = self.font[componentName].path
-                componentPath.transform((1, 0, 0, 1, component.x, component.y))
-                self._path.appendPath(componentPath)
-                componentPath.transform((1, 0, 0, 1, -component.x, -component.y))
-
 
         for index, (x, y) in enumerate(coordinates):
-            minX = min(x, minX)
-            maxX = max(x, maxX)
-            minY = min(y, minY)
-            maxY = max(y, maxY)
-
             # Create APoint, to store weakref to self and index for altering the coordinate and onCurve
-            p = APoint((x, y), flags[index], self, index)
+            p = APoint((x, y), flags[index] & 1, self, index)
             self._points.append(p)
 
             if not openContour:
-                assert self._path is not None
-                self._path.moveTo((x, y))
-                p0 = p
-                currentOnCurve = p
                 openContour = []
                 self._contours.append(openContour)
-
             openContour.append(p)
 
             if not openSegment:
                 openSegment = ASegment()
                 self._segments.append(openSegment)
-
             openSegment.append(p)
 
-            # If there is an open segment, it may contain multiple
-            # quadratics. Split into cubics.
-
-            if index in endPtsOfContours and openContour:
-                # End of contour.
-                if openSegment:
-                    if not p.onCurve:
-                        openSegment.append(p0)
-
-                    currentOnCurve = self._drawSegment(currentOnCurve, openSegment, self._path)
-
-                self._path.closePath()
+            if index in endPtsOfContours:
                 openContour = None
                 openSegment = None
-
             elif p.onCurve:
-                # Inside contour.
-                currentOnCurve = self._drawSegment(currentOnCurve, openSegment, self._path)
                 openSegment = None
 
         # Add 4 spacing points, as default in TTF. No index, as they cannot be written back.
@@ -204,41 +352,64 @@ class Glyph(object):
             APoint((maxX, 0), glyph=self),
             APoint((0, maxY), glyph=self)
         ]
-        self._boundingBox = (minX, minY, maxX, maxY)
-        self.dirty = False # All cleaned up.
+        self.dirty = False # Setting APoint.onCurve marked the glyph as dirty.
 
     def update(self):
         u"""Update the font if it became dirty by changing cooridinates.
         Otherwise ignore.  Note that in case the caller cache points, contours,
         components, etc. these are no longer valid."""
-        if self.dirty:
-            self._initialize()
+        self._clean()
+
+    def _get_outline(self):
+        u"""Answer the array-backed GlyphOutline of the glyph, including its components.
+
+        >>> from pagebot.fonttoolbox.objects.font import findFont
+        >>> f = findFont('Roboto-Regular') # Keep font alive to glyph.font weakref
+        >>> outline = f['aacute'].outline
+        >>> len(outline), len(outline.endPtsOfContours), f['aacute'].boundingBox
+        (52, 3, (109, -20, 1002, 1536))
+        """
+        self._clean()
+        if self._outline is None:
+            ttGlyph = self.ttGlyph
+            components = getattr(ttGlyph, 'components', None) or []
+            if components and not [c for c in components if not hasattr(c, 'x') or c.flags & SCALED_COMPONENT_OFFSET]:
+                # Join the cached outlines of the components. Point matched or scaled offset
+                # components are left to fontTools.
+                outlines = []
+                for component in components:
+                    (xx, xy), (yx, yy) = getattr(component, 'transform', ((1, 0), (0, 1)))
+                    outline = self.font[component.glyphName].outline
+                    outlines.append(outline.transform((xx, xy, yx, yy, component.x, component.y)))
+                self._outline = GlyphOutline.join(outlines)
+            else:
+                self._outline = GlyphOutline.fromTTGlyph(ttGlyph, self.font.ttFont['glyf'])
+        return self._outline
+    outline = property(_get_outline)
 
     def _get_flattenedPath(self):
         u"""Answer the flattened DrawBotContext NSBezier path."""
+        self._clean()
         if self._flattenedPath is None and self.path is not None:
-            self._flattenedPath = context.bezierPathByFlatteningPath(self.path)
+            self._flattenedPath = self.context.bezierPathByFlatteningPath(self.path)
         return self._flattenedPath
     flattenedPath = property(_get_flattenedPath)
 
     def _get_flattenedContours(self):
-        u"""Answer the flattened NSBezier path As contour list [contour,
-        contour, ...] where contours are lists of point2D() points.
-
-        TODO: Needs to get DrawBotContext reference, and Flex equivalent."""
+        u"""Answer the flattened outline as contour list [contour, contour, ...] where contours
+        are lists of point2D() points. The quadratic curves are divided by self.outline, so this
+        works in all contexts.
+
+        >>> from pagebot.fonttoolbox.objects.font import findFont
+        >>> f = findFont('Roboto-Regular') # Keep font alive to glyph.font weakref
+        >>> contours = f['H'].flattenedContours
+        >>> len(contours), contours[0]
+        (3, [(1120, 830), (1120, 673), (332, 673), (332, 830)])
+        """
+        self._clean()
         if self._flattenedContours is None:
-            contour = []
-            self._flattenedContours = [contour]
-            flatPath = self.flattenedPath
-            if flatPath is not None: # In case self.path could not be created.
-                for index in range(flatPath.elementCount()): # Typical NSBezierPath size + index call.
-                    p = flatPath.elementAtIndex_associatedPoints_(index)[1]
-                    if p:
-                        contour.append((p[0].x, p[0].y)) # Make point2D() tuples, no need to add point type, all onCurve.
-                    else:
-                        contour = []
-                        self._flattenedContours.append(contour)
-        return self._flattenedContours # Can still be None.
+            self._flattenedContours = self.outline.flatten()
+        return self._flattenedContours
     flattenedContours = property(_get_flattenedContours)
 
     def getAxisDeltas(self):
@@ -260,56 +431,6 @@ class Glyph(object):
                     self._axisDeltas[axisName][tuple(axes[axisName])] = rawDelta.coordinates
         return self._axisDeltas
 
-    def _drawSegment(self, cp, segment, path):
-        u"""Draws the Segment instance into the path. It may contain multiple
-        quadratics. Split into cubics and lines."""
-
-        if len(segment) == 1:
-            # Straight line.
-            p1 = segment.points[-1]
-            path.lineTo((p1.x, p1.y))
-            cp = p1
-
-        elif len(segment) == 2:
-            # Converts quadratic curve to cubic.
-            p1, p2 = segment.points
-            self._drawQuadratic2Cubic(cp.x, cp.y, p1.x, p1.y, p2.x, p2.y, path)
-            cp = p2
-
-        else:
-            # Handles implied on-curve points.
-            for n in range(len(segment)-1):
-                p0 = cp # Previous oncurve.
-                p1 = segment.points[n] # next offcurve.
-                p2 = segment.points[n+1] # offcurve or last point.
-
-                if n < len(segment) - 2:
-                    # Implied point.
-                    m = APoint((p1.x + (p2.x - p1.x) / 2, p1.y + (p2.y - p1.y) / 2), True)
-                else:
-                    # Last (oncurve) point.
-                    m = p2
-
-                self._drawQuadratic2Cubic(cp.x, cp.y, p1.x, p1.y, m.x, m.y, path)
-                cp = m
-
-        return cp
-
-    def _drawQuadratic2Cubic(self, p0x, p0y, p1x, p1y, p2x, p2y, path):
-        u"""Converts a quatratic control point into a cubic.
-
-        p0 = onCurve0
-        p1 = offCurve
-        p2 = onCurve1
-        """
-
-        # Cubic control points.
-        pp0x = p0x + (p1x - p0x) * F
-        pp0y = p0y + (p1y - p0y) * F
-        pp1x = p2x + (p1x - p2x) * F
-        pp1y = p2y + (p1y - p2y) * F
-        path.curveTo((pp0x, pp0y), (pp1x, pp1y), (p2x, p2y))
-
     def _get_ttGlyph(self):
         return self.font.ttFont['glyf'][self.name]
     ttGlyph = property(_get_ttGlyph)
@@ -399,7 +520,8 @@ class Glyph(object):
         constructed from the self.ttFont coordinates, they keep a weakref to
         the glyph and their index. This way point positions in the self.ttFont
         can be modified."""
-        if self._points is None or self.dirty:
+        self._clean()
+        if self._points is None:
             self._initialize()
         return self._points
     points = property(_get_points)
@@ -411,13 +533,15 @@ class Glyph(object):
         from the self.ttFont coordinates, they keep a weakref to the glyph and
         their index. This way point positions in the self.ttFont can be
         modified."""
-        if self._points4 is None or self.dirty:
+        self._clean()
+        if self._points4 is None:
             self._initialize()
         return self._points4
     points4 = property(_get_points4)
 
     def _get_pointContexts(self):
-        if self._pointContexts is None or self.dirty:
+        self._clean()
+        if self._pointContexts is None:
             self._pointContexts = []
             for cIndex, contour in enumerate(self.contours):
                 #openPointContext = PointContext # Instance as tuple of points -3, -2, -1, 0, 1, 2, 3 contour index
@@ -440,19 +564,22 @@ class Glyph(object):
     pointContexts = property(_get_pointContexts)
 
     def _get_contours(self): # Read only for now. List of Point instance lists.
-        if self._contours is None or self.dirty:
+        self._clean()
+        if self._contours is None:
             self._initialize()
         return self._contours
     contours = property(_get_contours)
 
     def _get_segments(self): # Read only for now. List of Segment instance lists.
-        if self._segments is None or self.dirty:
+        self._clean()
+        if self._segments is None:
             self._initialize()
         return self._contours
     segments = property(_get_contours)
 
     def _get_components(self): # Read only for now. List Contour instances.
-        if self._components is None or self.dirty:
+        self._clean()
+        if self._components is None:
             self._components = []
             self.ttGlyph.expand(self.font.ttFont['glyf'])
             # Initialize the AComponent wrappers
@@ -508,8 +635,10 @@ class Glyph(object):
         >>> glyph.path is not None
         True
         """
-        if self._path is None or self.dirty:
-            self._initialize()
+        self._clean()
+        if self._path is None and len(self.outline):
+            self._path = self.context.newPath()
+            self.outline.draw(self._path)
         return self._path
     path = property(_get_path) # Read only for now.
 
@@ -548,8 +677,9 @@ class Glyph(object):
     maxY = property(_get_maxY)
 
     def _get_boundingBox(self):
-        if self._boundingBox is None or self.dirty:
-            self._initialize()
+        self._clean()
+        if self._boundingBox is None:
+            self._boundingBox = self.outline.boundingBox or (0, 0, 0, 0)
         return self._boundingBox
     boundingBox = property(_get_boundingBox)
 
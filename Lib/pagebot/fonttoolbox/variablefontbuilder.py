@@ -26,17 +26,20 @@ import os
 from fontTools.misc.py23 import *
 from fontTools.ttLib import TTFont
 from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
-from fontTools.varLib import _GetCoordinates, _SetCoordinates
 from fontTools.varLib.models import supportScalar, normalizeLocation
-from fontTools.varLib.mutator import iup_delta
 
 from pagebot.contexts.platform import getContext
-from pagebot.fonttoolbox.objects.font import getFont
+from pagebot.fonttoolbox.objects.font import getFont, getInstance
+from pagebot.fonttoolbox.variablefontinstancer import (getVariableFontInstancer, iup_delta,
+    _GetCoordinates, _SetCoordinates)
 
 context = getContext()
 
 DEBUG = False
 
+WIDTH_TOLERANCE = 0.1 # Tolerance in points of the solved width of a string.
+MAX_ITERATIONS = 32 # Maximum number of bisections to solve the width of a string.
+
 def getMasterPath():
     u"""Answer the path to read master fonts, whic typically is a user/Fonts/ folder.
     Default is at the same level as pagebot module."""
@@ -61,9 +64,70 @@ def getVariableAxisFonts(varFont, axisName,
         return minInstance, maxInstance
     return varFont, varFont
 
+def getLocationBetween(location1, location2, t):
+    u"""Answer the location at fraction t on the line from location1 to location2. Axes that
+    are only defined in one of the locations keep their value.
+
+    >>> sorted(getLocationBetween(dict(wdth=50, opsz=12), dict(wdth=150), 0.25).items())
+    [('opsz', 12), ('wdth', 75.0)]
+    """
+    location = dict(location2)
+    location.update(location1)
+    for tag, value in location2.items():
+        if tag in location1:
+            location[tag] = location1[tag] + (value - location1[tag]) * t
+    return location
+
+def solveVariableWidth(varFont, s, w, fontSize, condensedLocation, wideLocation,
+        tracking=None, rTracking=None, tolerance=WIDTH_TOLERANCE, maxIterations=MAX_ITERATIONS):
+    u"""Answer the (location, width) on the line from *condensedLocation* to *wideLocation* where
+    the width of string *s* in *fontSize* is closest to *w*, within *tolerance* points. The line
+    may include changes in [opsz] and other axes. The width is calculated from the advance widths of
+    the glyphs in the width curves of the font, without kerning, so no instance fonts are created
+    and the glyph curves are cached for all following strings. The location is solved by bisection,
+    so non-linear interpolation of the [wdth] axis is supported, as long as the string gets wider
+    along the line. If *w* is out of range, the condensed or wide location is answered.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> path = getFontPathOfFont('RobotoDelta-VF')
+    >>> location, width = solveVariableWidth(path, 'Headline', 300, 72, dict(wdth=75), dict(wdth=125))
+    >>> int(round(location['wdth'])), round(width, 1)
+    (106, 299.9)
+    >>> solveVariableWidth(path, 'Headline', 100, 72, dict(wdth=75), dict(wdth=125))[0]
+    {'wdth': 75}
+    """
+    if not isinstance(varFont, str):
+        varFont = varFont.path
+    instancer = getVariableFontInstancer(varFont)
+    curve = instancer.getStringWidthCurve(s)
+    scale = fontSize / instancer.ttFont['head'].unitsPerEm
+    spacing = len(s) * ((tracking or 0) + (rTracking or 0) * fontSize)
+
+    def getWidth(location):
+        return curve.getWidth(instancer.normalizeLocation(location)) * scale + spacing
+
+    condensedWidth = getWidth(condensedLocation)
+    if w <= condensedWidth:
+        return condensedLocation, condensedWidth
+    wideWidth = getWidth(wideLocation)
+    if w >= wideWidth:
+        return wideLocation, wideWidth
+    t0, t1 = 0, 1
+    for _ in range(maxIterations):
+        t = (t0 + t1) / 2
+        location = getLocationBetween(condensedLocation, wideLocation, t)
+        width = getWidth(location)
+        if abs(width - w) <= tolerance:
+            break
+        if width < w:
+            t0 = t
+        else:
+            t1 = t
+    return location, width
+
 def fitVariableWidth(varFont, s, w, fontSize,
                      condensedLocation, wideLocation, fixedSize=True,
-                     tracking=None, rTracking=None, cached=True, lazy=True):
+                     tracking=None, rTracking=None, cached=True, lazy=True, solve=False):
     u"""Answer the font instance that makes string s width on the given width *w* for the given *fontSize*.
     The *condensedLocation* dictionary defines the most condensed font instance (optionally including the opsz)
     and the *wideLocation* dictionary defines the most wide font instance (optionally including the opsz).
@@ -73,7 +137,33 @@ def fitVariableWidth(varFont, s, w, fontSize,
     If the requested w outside of what is possible with two locations, then interations are performed to
     change the size. Again this cannot be done by simple interpolation, as the [opsz] also changes the width.
     It one of the axes does not exist in the font, then use the default setting of the font.
+    If *solve* is True, then the location is solved by solveVariableWidth from the cached advance
+    widths of the glyphs, and only the instance of the fitting location is created. Then the
+    condensed and wide fonts, strings and widths are answered as None.
     """
+    if solve:
+        location, _ = solveVariableWidth(varFont, s, w, fontSize, condensedLocation, wideLocation,
+            tracking=tracking, rTracking=rTracking)
+        font = getInstance(varFont, location, cached=cached, lazy=lazy)
+        fs = context.newString(s,
+                               style=dict(font=font.path,
+                                          fontSize=fontSize,
+                                          tracking=tracking,
+                                          rTracking=rTracking,
+                                          textFill=0))
+        return dict(condensendFont=None,
+                    condensedFs=None,
+                    condensedWidth=None,
+                    condensedLocation=condensedLocation,
+                    wideFont=None,
+                    wideFs=None,
+                    wideWidth=None,
+                    wideLocation=wideLocation,
+                    font=font,
+                    s=fs,
+                    width=context.textSize(fs)[0],
+                    location=location)
+
     # TODO: Adjusting by size change (if requested width is not possible with the width limits of the font)
     # TODO: is not yet implemented.
 
@@ -285,4 +375,7 @@ def generateInstance(variableFontPath, location, targetDirectory, normalize=True
     # Answer the font name path.
     return outFile
 
-
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
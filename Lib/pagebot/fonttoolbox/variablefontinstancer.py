@@ -0,0 +1,380 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     variablefontinstancer.py
+#
+#     Calculate instances of a Variable Font. The gvar deltas of each glyph are
+#     converted once into a matrix with a row of point deltas for each region
+#     of the glyph (IUP applied), so the coordinates of the glyph in any location
+#     are the default coordinates plus the product of the region scalars of the
+#     location and the delta matrix. Glyphs are only converted when they are
+#     needed, so measuring a string in a location only calculates the glyphs of
+#     the string. Instance fonts are kept in memory, keyed by their normalized
+#     location.
+#
+#     If NumPy is not installed, the same calculation is done by GlyphCoordinates.
+#
+from collections import OrderedDict
+from io import BytesIO
+from math import floor
+
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+from fontTools.ttLib import TTFont
+from fontTools.ttLib.tables._g_l_y_f import GlyphCoordinates
+from fontTools.varLib.models import supportScalar, normalizeLocation
+
+try:
+    from fontTools.varLib.iup import iup_delta
+except ImportError:
+    from fontTools.varLib.mutator import iup_delta
+
+try:
+    from fontTools.varLib import _GetCoordinates, _SetCoordinates
+except ImportError:
+    # Newer versions of fontTools moved the coordinate functions into the glyf table.
+    def _GetCoordinates(ttFont, glyphName):
+        u"""Answer the (coordinates, control) tuple of the glyph, including the four phantom points."""
+        vMetrics = ttFont['vmtx'].metrics if 'vmtx' in ttFont else None
+        return ttFont['glyf']._getCoordinatesAndControls(glyphName, ttFont['hmtx'].metrics, vMetrics)
+
+    def _SetCoordinates(ttFont, glyphName, coordinates):
+        u"""Set the coordinates of the glyph and update the metrics from the phantom points."""
+        vMetrics = ttFont['vmtx'].metrics if 'vmtx' in ttFont else None
+        ttFont['glyf']._setCoordinates(glyphName, coordinates, ttFont['hmtx'].metrics, vMetrics)
+
+MAX_INSTANCES = 32 # Maximum number of instances that are kept in memory by each instancer.
+VARIATION_TABLES = ('avar', 'cvar', 'fvar', 'gvar', 'HVAR', 'MVAR', 'VVAR', 'STAT')
+
+instancers = {} # Key is the path of the Variable Font, value is its VariableFontInstancer.
+
+def getVariableFontInstancer(path):
+    u"""Answer the VariableFontInstancer of the Variable Font at path. Instancers are
+    kept, so the deltas of the font are only converted once.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> path = getFontPathOfFont('RobotoDelta-VF')
+    >>> getVariableFontInstancer(path) is getVariableFontInstancer(path)
+    True
+    """
+    instancer = instancers.get(path)
+    if instancer is None:
+        instancer = instancers[path] = VariableFontInstancer(path)
+    return instancer
+
+def roundCoordinates(coordinates):
+    u"""Answer the list of (x, y) coordinates, rounded in the same way as OpenType does.
+
+    >>> roundCoordinates([(0.5, -0.5), (1.2, 2.7)])
+    [(1, 0), (1, 3)]
+    """
+    return [(int(floor(x + 0.5)), int(floor(y + 0.5))) for x, y in coordinates]
+
+class GlyphDeltas(object):
+    u"""Hold the default coordinates of a glyph and the deltas of its regions. If NumPy is
+    available, the coordinates are a (points, 2) array and the deltas are a (regions, points, 2)
+    array, otherwise they are GlyphCoordinates and a list of GlyphCoordinates."""
+    __slots__ = ('coordinates', 'regions', 'deltas')
+
+    def __init__(self, coordinates, regions, deltas):
+        self.coordinates = coordinates
+        self.regions = regions
+        self.deltas = deltas
+
+    def getCoordinates(self, scalars):
+        u"""Answer the list of (x, y) coordinates for the region scalars of a location."""
+        if numpy is not None:
+            if self.regions:
+                return self.coordinates + numpy.tensordot(numpy.array(scalars), self.deltas, 1)
+            return self.coordinates
+        coordinates = GlyphCoordinates(self.coordinates)
+        for scalar, delta in zip(scalars, self.deltas):
+            if scalar:
+                coordinates += delta * scalar
+        return coordinates
+
+class WidthCurve(object):
+    u"""Hold the width of a glyph or string as function of the location: the width in the
+    default location and the width delta of each region. The curve of a string is the sum of
+    the curves of its glyphs, so its width in any location only needs one scalar per region.
+
+    >>> curve = WidthCurve(500, {(('wdth', (0, 1, 1)),): 100})
+    >>> curve.add(curve)
+    >>> curve.width, curve.getWidth({'wdth': 0.5}), curve.getWidth({'wdth': -1})
+    (1000, 1100.0, 1000)
+    """
+    __slots__ = ('width', 'deltas')
+
+    def __init__(self, width=0, deltas=None):
+        self.width = width
+        self.deltas = deltas or {} # Key is region, value is the width delta in the peak of the region.
+
+    def add(self, curve):
+        u"""Add the width and deltas of curve to self."""
+        self.width += curve.width
+        for region, delta in list(curve.deltas.items()):
+            self.deltas[region] = self.deltas.get(region, 0) + delta
+
+    def getWidth(self, location):
+        u"""Answer the width in the normalized location."""
+        width = self.width
+        for region, delta in self.deltas.items():
+            scalar = supportScalar(location, dict(region))
+            if scalar:
+                width += scalar * delta
+        return width
+
+class VariableFontInstancer(object):
+    u"""The VariableFontInstancer calculates glyph coordinates and instance fonts of the
+    Variable Font at path.
+
+    >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+    >>> instancer = VariableFontInstancer(getFontPathOfFont('RobotoDelta-VF'))
+    >>> instancer.axes['wght']
+    (100.0, 400.0, 900.0)
+    >>> location = instancer.normalizeLocation(dict(wght=650, wdth=75))
+    >>> location['wght'], location['wdth'], location['opsz']
+    (0.5, -1.0, 0.0)
+    >>> instancer.getAdvanceWidth('H', {}), instancer.getAdvanceWidth('H', dict(wght=900))
+    (1458, 1552)
+    >>> instancer.getStringWidth('HH', dict(wght=900))
+    3104
+    >>> instance = instancer.getInstance(dict(wght=900))
+    >>> instance['hmtx']['H'][0]
+    1552
+    >>> 'fvar' in instance
+    False
+    >>> instance is instancer.getInstance(dict(wght=900.00001))
+    True
+    """
+    def __init__(self, path, maxInstances=MAX_INSTANCES):
+        self.path = path
+        self.maxInstances = maxInstances
+        with open(path, 'rb') as f:
+            self.data = f.read() # Instance fonts are read from the binary data, not from the file.
+        self.ttFont = TTFont(BytesIO(self.data), lazy=True)
+        self.axes = {a.axisTag: (a.minValue, a.defaultValue, a.maxValue) for a in self.ttFont['fvar'].axes}
+        self.glyphDeltas = {} # Key is glyph name, value is GlyphDeltas, created when needed.
+        self.widthCurves = {} # Key is glyph name, value is the WidthCurve of its advance width.
+        self.scalars = OrderedDict() # Key is location key, value is dictionary of region scalars.
+        self.instances = OrderedDict() # Key is (location key, glyph names), value is instance TTFont.
+        self._cmap = None
+
+    def __repr__(self):
+        return '<%s %s>' % (self.__class__.__name__, self.path.split('/')[-1])
+
+    def normalizeLocation(self, location):
+        u"""Answer the location with axis values normalized to (-1, 0, 1), rounded to
+        F2Dot14 precision, so locations that create the same instance are equal."""
+        location = normalizeLocation(location, self.axes)
+        return {tag: round(value * 16384) / 16384.0 for tag, value in location.items()}
+
+    def getLocationKey(self, location):
+        u"""Answer the hashable key of the normalized location, leaving out default values.
+
+        >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+        >>> instancer = getVariableFontInstancer(getFontPathOfFont('RobotoDelta-VF'))
+        >>> instancer.getLocationKey(dict(wght=900, wdth=100))
+        (('wght', 1.0),)
+        """
+        return tuple(sorted((tag, value) for tag, value in self.normalizeLocation(location).items() if value))
+
+    def _get_cmap(self):
+        if self._cmap is None:
+            self._cmap = self.ttFont.getBestCmap() or {}
+        return self._cmap
+    cmap = property(_get_cmap)
+
+    def getGlyphDeltas(self, glyphName):
+        u"""Answer the GlyphDeltas of the glyph. The deltas are converted from the gvar table
+        the first time the glyph is used."""
+        glyphDeltas = self.glyphDeltas.get(glyphName)
+        if glyphDeltas is None:
+            coordinates, control = _GetCoordinates(self.ttFont, glyphName)
+            regions = []
+            deltas = []
+            endPts = None
+            for var in self.ttFont['gvar'].variations.get(glyphName, []):
+                delta = var.coordinates
+                if None in delta:
+                    if endPts is None:
+                        endPts = control[1] if control[0] >= 1 else list(range(len(control[1])))
+                    delta = iup_delta(delta, coordinates, endPts)
+                regions.append(tuple(sorted(var.axes.items())))
+                deltas.append(GlyphCoordinates(delta))
+            if numpy is not None:
+                coordinates = numpy.array(list(coordinates), dtype=float).reshape(-1, 2)
+                deltas = numpy.array([list(delta) for delta in deltas], dtype=float).reshape(len(deltas), len(coordinates), 2)
+            else:
+                coordinates = GlyphCoordinates(coordinates)
+            glyphDeltas = self.glyphDeltas[glyphName] = GlyphDeltas(coordinates, tuple(regions), deltas)
+        return glyphDeltas
+
+    def getScalars(self, key):
+        u"""Answer the dictionary of region scalars for the location key. The scalars of the
+        most recently used locations are kept."""
+        scalars = self.scalars.get(key)
+        if scalars is None:
+            if len(self.scalars) >= self.maxInstances:
+                self.scalars.popitem(last=False)
+            scalars = self.scalars[key] = {}
+        return scalars
+
+    def getGlyphCoordinates(self, glyphName, location):
+        u"""Answer the coordinates of the glyph in location, including the four phantom points.
+        Only the deltas of this glyph are converted, so this is the cheap way to get single
+        glyphs of an instance.
+
+        >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+        >>> instancer = getVariableFontInstancer(getFontPathOfFont('RobotoDelta-VF'))
+        >>> len(instancer.getGlyphCoordinates('H', dict(wght=900)))
+        16
+        """
+        key = self.getLocationKey(location)
+        return self._getGlyphCoordinates(glyphName, dict(key), self.getScalars(key))
+
+    def _getGlyphCoordinates(self, glyphName, location, scalars):
+        glyphDeltas = self.getGlyphDeltas(glyphName)
+        regionScalars = []
+        for region in glyphDeltas.regions:
+            scalar = scalars.get(region)
+            if scalar is None:
+                scalar = scalars[region] = supportScalar(location, dict(region))
+            regionScalars.append(scalar)
+        return glyphDeltas.getCoordinates(regionScalars)
+
+    def getWidthCurve(self, glyphName):
+        u"""Answer the WidthCurve of the advance width of the glyph, from its phantom points.
+
+        >>> from pagebot.fonttoolbox.fontpaths import getFontPathOfFont
+        >>> instancer = getVariableFontInstancer(getFontPathOfFont('RobotoDelta-VF'))
+        >>> curve = instancer.getWidthCurve('H')
+        >>> curve.width, curve.getWidth(instancer.normalizeLocation(dict(wght=900)))
+        (1458.0, 1552.0)
+        """
+        curve = self.widthCurves.get(glyphName)
+        if curve is None:
+            glyphDeltas = self.getGlyphDeltas(glyphName)
+            coordinates = glyphDeltas.coordinates
+            curve = self.widthCurves[glyphName] = WidthCurve(float(coordinates[-3][0] - coordinates[-4][0]))
+            for region, delta in zip(glyphDeltas.regions, glyphDeltas.deltas):
+                curve.deltas[region] = curve.deltas.get(region, 0) + float(delta[-3][0] - delta[-4][0])
+        return curve
+
+    def getStringWidthCurve(self, s):
+        u"""Answer the WidthCurve of the sum of advance widths of the characters of s, without
+        kerning. Characters that are not in the font are ignored."""
+        curve = WidthCurve()
+        cmap = self.cmap
+        for c in s:
+            glyphName = cmap.get(ord(c))
+            if glyphName is not None:
+                curve.add(self.getWidthCurve(glyphName))
+        return curve
+
+    def getAdvanceWidth(self, glyphName, location):
+        u"""Answer the rounded advance width of the glyph in location."""
+        return int(floor(self.getWidthCurve(glyphName).getWidth(self.normalizeLocation(location)) + 0.5))
+
+    def getStringWidth(self, s, location):
+        u"""Answer the sum of the rounded advance widths of the characters of s in location,
+        without kerning. Characters that are not in the font are ignored."""
+        location = self.normalizeLocation(location)
+        cmap = self.cmap
+        width = 0
+        for c in s:
+            glyphName = cmap.get(ord(c))
+            if glyphName is not None:
+                width += int(floor(self.getWidthCurve(glyphName).getWidth(location) + 0.5))
+        return width
+
+    def getInstance(self, location, glyphNames=None, styleName=None):
+        u"""Answer the instance TTFont of location, without variation tables. If glyphNames
+        is defined, then only these glyphs are instanced, which is sufficient for measuring
+        and drawing a single string. Instances of the most recently used locations are kept
+        in memory, the caller should copy an instance before altering it."""
+        key = self.getLocationKey(location)
+        if glyphNames is not None:
+            glyphNames = tuple(sorted(set(glyphNames)))
+        instanceKey = key, glyphNames, styleName
+        instance = self.instances.get(instanceKey)
+        if instance is not None:
+            self.instances.pop(instanceKey) # Make it the most recently used instance.
+            self.instances[instanceKey] = instance
+            return instance
+
+        location = dict(key)
+        scalars = self.getScalars(key)
+        instance = TTFont(BytesIO(self.data))
+        gvar = self.ttFont['gvar']
+        glyf = instance['glyf']
+        if glyphNames is None:
+            glyphNames = gvar.variations.keys()
+        else: # Make sure that components are instanced too.
+            glyphNames = set(glyphNames)
+            for glyphName in list(glyphNames):
+                if glyphName in glyf:
+                    glyphNames.update(glyf[glyphName].getComponentNames(glyf))
+        # Sort by component depth, so the bounds of components are set before their composites.
+        glyphNames = sorted([glyphName for glyphName in glyphNames if glyphName in gvar.variations],
+            key=lambda name: (glyf[name].getCompositeMaxpValues(glyf).maxComponentDepth
+                if glyf[name].isComposite() else 0, name))
+        for glyphName in glyphNames:
+            coordinates = self._getGlyphCoordinates(glyphName, location, scalars)
+            _SetCoordinates(instance, glyphName, GlyphCoordinates(roundCoordinates(coordinates)))
+
+        if 'cvar' in instance:
+            cvt = instance['cvt ']
+            deltas = {}
+            for var in instance['cvar'].variations:
+                scalar = supportScalar(location, var.axes)
+                if not scalar:
+                    continue
+                for i, c in enumerate(var.coordinates):
+                    if c is not None:
+                        deltas[i] = deltas.get(i, 0) + scalar * c
+            for i, delta in deltas.items():
+                cvt[i] += int(round(delta))
+
+        if styleName is not None:
+            self.setNames(instance, styleName)
+        for tag in VARIATION_TABLES:
+            if tag in instance:
+                del instance[tag]
+
+        if len(self.instances) >= self.maxInstances:
+            self.instances.popitem(last=False)
+        self.instances[instanceKey] = instance
+        return instance
+
+    def setNames(self, instance, styleName):
+        u"""Set the style name in the name table of the instance."""
+        for platformID, platEncID, langID in ((1, 0, 0), (3, 1, 0x409)): # Macintosh and Windows
+            familyName = instance['name'].getName(1, platformID, platEncID, langID) # 1 Font Family name
+            if not familyName:
+                continue
+            familyName = familyName.toUnicode() # NameRecord to unicode string
+            fullFontName = " ".join([familyName, styleName])
+            postscriptName = fullFontName.replace(" ", "-")
+            instance['name'].setName(styleName, 2, platformID, platEncID, langID) # 2 Font Subfamily name
+            instance['name'].setName(fullFontName, 4, platformID, platEncID, langID) # 4 Full font name
+            instance['name'].setName(postscriptName, 6, platformID, platEncID, langID) # 6 Postscript name for the font
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
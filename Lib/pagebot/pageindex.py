@@ -0,0 +1,207 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     pageindex.py
+#
+#     Implements the ordered index of the pages of a document. It behaves as the
+#     dictionary of rows of pages by page number that Document.pages used to be,
+#     but keeps the page numbers sorted, the maximum page number, and maps from
+#     eId and name to the pages, so that appending and finding pages does not
+#     need to sort or scan all pages of the document.
+#
+from bisect import bisect_left, bisect_right, insort
+try:
+    from collections.abc import Mapping
+except ImportError: # Python 2
+    from collections import Mapping
+
+class PageIndex(Mapping):
+    u"""Dictionary of the rows of pages by page number, iterating in sorted page number order.
+    Page numbers are kept in a sorted list, pages by eId and by name in dictionaries, so
+    lookups by number, name or eId don't depend on the amount of pages.
+
+    >>> from pagebot.elements.pbpage import Page
+    >>> pages = PageIndex()
+    >>> for pn in (3, 1, 2):
+    ...     pages.append(pn, Page(name='Page%d' % pn))
+    >>> pages.append(2, Page(name='Spread'))
+    >>> list(pages.keys()), pages.maxPn, len(pages), pages.pageCount
+    ([1, 2, 3], 3, 3, 4)
+    >>> page = pages[2][1]
+    >>> pages.getPageNumber(page), pages.nextPage(page).name, pages.nextPage(pages[3][0])
+    ('2-1', 'Page3', None)
+    >>> pages.findPages(name='Spread') == [page], pages.findPages(eId=page.eId) == [page]
+    (True, True)
+    >>> [p.name for p in pages.findPages(pattern='Page', pageSelection=(1, 3))]
+    ['Page1', 'Page3']
+    >>> pages.rename(page, 'Spread', 'Page2b') # Called when the name of page changed.
+    >>> pages.findPages(name='Spread'), pages.findPages(name='Page2b') == [page]
+    ([], True)
+    >>> pages.first.name, pages.last.name
+    ('Page1', 'Page3')
+    """
+    def __init__(self):
+        self._rows = {} # Key is pageNumber, value is row list of pages: self._rows[pn][index] = page
+        self._pns = [] # Sorted list of the page numbers in self._rows
+        self._pnOfEId = {} # Key is page.eId, value is page number of the row that holds the page.
+        self._pagesOfName = {} # Key is page.name, value is list of pages with that name.
+        self.maxPn = None # Running maximum page number, None if there are no pages.
+        self.pageCount = 0 # Total amount of pages in all rows.
+
+    def __repr__(self):
+        return '<%s %d pages in %d rows>' % (self.__class__.__name__, self.pageCount, len(self._pns))
+
+    def __getitem__(self, pn):
+        return self._rows[pn]
+
+    def __contains__(self, pn):
+        return pn in self._rows
+
+    def __iter__(self):
+        return iter(self._pns)
+
+    def __len__(self):
+        return len(self._pns)
+
+    def append(self, pn, page):
+        u"""Add the page at the end of the row of page number pn. Create the row if it does not exist."""
+        row = self._rows.get(pn)
+        if row is None:
+            row = self._rows[pn] = []
+            if self.maxPn is None or pn > self.maxPn:
+                self._pns.append(pn) # Appending at the end keeps the list sorted.
+                self.maxPn = pn
+            else:
+                insort(self._pns, pn)
+        row.append(page)
+        self._pnOfEId[page.eId] = pn
+        if page.name is not None:
+            self._pagesOfName.setdefault(page.name, []).append(page)
+        self.pageCount += 1
+
+    def rename(self, page, oldName, name):
+        u"""Update the name map for page that changed its name from oldName to name."""
+        if page.eId not in self._pnOfEId:
+            return
+        if oldName is not None:
+            pages = self._pagesOfName.get(oldName, [])
+            for index, pg in enumerate(pages):
+                if pg is page:
+                    del pages[index]
+                    break
+            if not pages:
+                self._pagesOfName.pop(oldName, None)
+        if name is not None:
+            self._pagesOfName.setdefault(name, []).append(page)
+
+    def getPosition(self, page):
+        u"""Answer the (pn, index) tuple of the page. Answer None if the page is not in self."""
+        pn = self._pnOfEId.get(page.eId)
+        if pn is None:
+            return None
+        row = self._rows[pn]
+        for index, pg in enumerate(row): # Rows have one page or a few.
+            if pg is page:
+                return pn, index
+        return None
+
+    def getPageNumber(self, page):
+        u"""Answer a string with the page number pn. If the page has index > 0 in its row,
+        then answer page format "pn-index". Answer an empty string if the page is not in self."""
+        position = self.getPosition(page)
+        if position is None:
+            return ''
+        pn, index = position
+        if index:
+            return '%d-%d' % (pn, index)
+        return '%d' % pn
+
+    def nextPage(self, page):
+        u"""Answer the page after page, in order of page number and index. Answer None if page
+        is the last page or if it is not in self."""
+        position = self.getPosition(page)
+        if position is None:
+            return None
+        pn, index = position
+        row = self._rows[pn]
+        if index + 1 < len(row):
+            return row[index + 1]
+        i = bisect_right(self._pns, pn)
+        if i < len(self._pns):
+            return self._rows[self._pns[i]][0]
+        return None
+
+    def findPages(self, eId=None, name=None, pattern=None, pageSelection=None):
+        u"""Answer the list of pages with eId, or with name, or with pattern in their name, in
+        order of page number and index. If pageSelection is defined, then only pages with a page
+        number in pageSelection are answered."""
+        if eId is not None:
+            pn = self._pnOfEId.get(eId)
+            if pn is not None and (pageSelection is None or pn in pageSelection):
+                for page in self._rows[pn]:
+                    if page.eId == eId:
+                        return [page]
+        pages = []
+        if name is not None:
+            for page in self._pagesOfName.get(name, []):
+                if pageSelection is None or self._pnOfEId[page.eId] in pageSelection:
+                    pages.append(page)
+            if pattern is None:
+                return sorted(pages, key=self.getPosition)
+        if pattern is not None: # Substring of names, scan the names instead of the pages.
+            for pageName, namedPages in self._pagesOfName.items():
+                if pattern in pageName and pageName != name:
+                    for page in namedPages:
+                        if pageSelection is None or self._pnOfEId[page.eId] in pageSelection:
+                            pages.append(page)
+        return sorted(pages, key=self.getPosition)
+
+    def getSortedPages(self, pageSelection=None):
+        u"""Answer the list of (pn, pnPages) tuples, sorted by page number. If pageSelection is
+        defined, then only answer the rows with a page number in pageSelection."""
+        if pageSelection is None:
+            return [(pn, self._rows[pn]) for pn in self._pns]
+        return [(pn, self._rows[pn]) for pn in self._pns if pn in pageSelection]
+
+    def getRange(self, pnFrom, pnTo):
+        u"""Answer the list of (pn, pnPages) tuples with pnFrom <= pn <= pnTo, sorted by page number.
+
+        >>> pages = PageIndex()
+        >>> from pagebot.elements.pbpage import Page
+        >>> for pn in range(1, 101):
+        ...     pages.append(pn, Page())
+        >>> [pn for pn, _ in pages.getRange(50, 53)]
+        [50, 51, 52, 53]
+        """
+        return [(pn, self._rows[pn]) for pn in
+            self._pns[bisect_left(self._pns, pnFrom):bisect_right(self._pns, pnTo)]]
+
+    def _get_first(self):
+        u"""Answer the first page, with the lowest page number. Answer None if there are no pages."""
+        if not self._pns:
+            return None
+        return self._rows[self._pns[0]][0]
+    first = property(_get_first)
+
+    def _get_last(self):
+        u"""Answer the last page, with the highest page number. Answer None if there are no pages."""
+        if not self._pns:
+            return None
+        return self._rows[self._pns[-1]][-1]
+    last = property(_get_last)
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
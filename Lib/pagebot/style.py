@@ -19,6 +19,289 @@
 import copy
 from pagebot.constants import *
 
+NO_VALUE = object() # Marker for a name that is not in a StyleDict.
+# Names of recorded reads (see StyleDict.reads) that are not style values: reading the position
+# and size of an element, and reading the positions of the child elements through their spatial index.
+GEOMETRY = '@geometry'
+SIBLINGS = '@siblings'
+
+class StyleDict(dict):
+    u"""Dictionary that keeps a generation stamp of its last modification. Every
+    write to any StyleDict increments the global StyleDict.epoch, so cached values
+    that were resolved from style dicts, such as the cascading Element.css() values,
+    can compare their own epoch with the stamps of the styles they depend on.
+    If the optional owner (weakref to an element) is set, then owner._changed() is
+    called on every change. The owner is not copied or pickled with the style.
+    Changes that can change the cascading values of other elements, e.g. in the root style
+    of a document (without owner) or in the style of an element with children, set
+    StyleDict.cascadeEpoch too. Caches only need to check their ancestors if it changed.
+    If StyleDict.reads is set to a dictionary, then all reading of keys is recorded
+    there, e.g. by the IncrementalSolver to know the dependencies of conditions.
+
+    >>> style = StyleDict(fontSize=12)
+    >>> stamp = style.stamp
+    >>> style['fontSize']
+    12
+    >>> style['leading'] = 14
+    >>> style.stamp > stamp, style.stamp == StyleDict.epoch
+    (True, True)
+    >>> stamp = style.stamp
+    >>> style['leading'] = 14 # Same value does not change the stamp.
+    >>> style.stamp == stamp
+    True
+    >>> style.update(dict(tracking=0.1))
+    >>> style.stamp > stamp
+    True
+    >>> StyleDict.reads = reads = {}
+    >>> style['fontSize'], style.get('font')
+    (12, None)
+    >>> StyleDict.reads = None
+    >>> sorted(name for obj, name in reads.values())
+    ['font', 'fontSize']
+    """
+    # The stamp and the optional weakref to the element that owns this style are slots,
+    # so every style dict of an element does not need an instance __dict__ too.
+    # The optional base is a dictionary with items that are shared with other styles,
+    # made by self.copyOnWrite(). It is never changed. Items of self have priority.
+    __slots__ = ('stamp', 'owner', 'base')
+
+    epoch = 0 # Global generation counter, shared by all style dicts.
+    cascadeEpoch = 0 # Epoch of the last change that can change cascading values of other elements.
+    reads = None # Optional dictionary to record reading (id(style), name) --> (style, name)
+
+    SAME_VALUE_TYPES = (int, float, str, bool, tuple, type(None))
+
+    def __init__(self, *args, **kwargs):
+        dict.__init__(self, *args, **kwargs)
+        self.owner = None # Optional weakref to the element that owns this style.
+        self.base = None
+        # A new style is not cascading yet, the element that gets it stamps the change.
+        StyleDict.epoch = self.stamp = StyleDict.epoch + 1
+
+    def touch(self):
+        u"""Mark the style as changed, by setting its stamp to a new global epoch. If there
+        is no owner, e.g. for the root style of a document, then the change may change the
+        cascading values of all elements. Otherwise the owner decides.
+
+        >>> style = StyleDict(fontSize=12)
+        >>> style.stamp > StyleDict.cascadeEpoch
+        True
+        >>> style['fontSize'] = 14
+        >>> style.stamp == StyleDict.cascadeEpoch
+        True
+        """
+        StyleDict.epoch = self.stamp = StyleDict.epoch + 1
+        owner = self.owner
+        if owner is None:
+            StyleDict.cascadeEpoch = self.stamp
+        else:
+            e = owner()
+            if e is not None:
+                e._changed()
+
+    def copyOnWrite(self):
+        u"""Answer a new style with the same items as self. The items are shared in a base
+        dictionary, so making the copy does not depend on the amount of items. Changes to
+        self or to the copy are only visible in the style that was changed.
+
+        >>> style = StyleDict(fontSize=12, leading=14)
+        >>> copied = style.copyOnWrite()
+        >>> copied['fontSize'] = 10
+        >>> style['tracking'] = 0.1
+        >>> copied == dict(fontSize=10, leading=14), style == dict(fontSize=12, leading=14, tracking=0.1)
+        (True, True)
+        >>> 'leading' in copied, copied.get('tracking'), len(copied), sorted(copied)
+        (True, None, 2, ['fontSize', 'leading'])
+        >>> del copied['leading']
+        >>> copied, style['leading'] # Removing from the copy does not remove from the shared base.
+        ({'fontSize': 10}, 14)
+        """
+        if dict.__len__(self): # Move the items of self into a new base, shared with the copy.
+            base = dict(self.base or ())
+            base.update(dict.items(self))
+            dict.clear(self) # Values don't change, keep the stamp.
+            self.base = base
+        style = self.__class__()
+        style.base = self.base
+        return style
+
+    def _unshare(self):
+        u"""Copy the items of the base that are not in self, so self does not need the base
+        anymore. Called before operations that remove items. Reading all items answers the
+        merged items of self and the base, without copying them."""
+        base = self.base
+        if base is not None:
+            self.base = None
+            for name, value in base.items():
+                if not dict.__contains__(self, name):
+                    dict.__setitem__(self, name, value)
+
+    def _getItems(self):
+        u"""Answer a new plain dictionary with the merged items of the base and self, without
+        changing self.
+
+        >>> style = StyleDict(fontSize=12, leading=14)
+        >>> copied = style.copyOnWrite()
+        >>> copied['fontSize'] = 10
+        >>> copied._getItems() == dict(fontSize=10, leading=14), dict.__len__(copied)
+        (True, 1)
+        """
+        base = self.base
+        if base is None:
+            return dict(dict.items(self))
+        items = dict(base)
+        items.update(dict.items(self))
+        return items
+
+    def __reduce__(self):
+        # Copies and pickles get their own stamp and no owner.
+        return self.__class__, (self._getItems(),)
+
+    def __getitem__(self, name):
+        reads = StyleDict.reads
+        if reads is not None:
+            reads[(id(self), name)] = self, name
+        base = self.base
+        if base is None or dict.__contains__(self, name):
+            return dict.__getitem__(self, name)
+        return base[name]
+
+    def get(self, name, default=None):
+        reads = StyleDict.reads
+        if reads is not None:
+            reads[(id(self), name)] = self, name
+        base = self.base
+        if base is None or dict.__contains__(self, name):
+            return dict.get(self, name, default)
+        return base.get(name, default)
+
+    def __contains__(self, name):
+        if dict.__contains__(self, name):
+            return True
+        base = self.base
+        return base is not None and name in base
+
+    def __iter__(self):
+        u"""Iterate over the names of self and the names of the base that are not in self,
+        without copying the base into self.
+
+        >>> style = StyleDict(fontSize=12, leading=14)
+        >>> copied = style.copyOnWrite()
+        >>> copied['tracking'] = 0.1
+        >>> sorted(copied), sorted(copied.keys()), sorted(copied.values())
+        (['fontSize', 'leading', 'tracking'], ['fontSize', 'leading', 'tracking'], [0.1, 12, 14])
+        >>> sorted(copied.items())
+        [('fontSize', 12), ('leading', 14), ('tracking', 0.1)]
+        >>> dict.__len__(copied), copied.base is style.base # Still sharing the base.
+        (1, True)
+        """
+        if self.base is None:
+            return dict.__iter__(self)
+        return self._iterNames()
+
+    def _iterNames(self):
+        for name in dict.__iter__(self):
+            yield name
+        for name in self.base:
+            if not dict.__contains__(self, name):
+                yield name
+
+    def __len__(self):
+        base = self.base
+        if base is None:
+            return dict.__len__(self)
+        return dict.__len__(self) + sum(1 for name in base if not dict.__contains__(self, name))
+
+    def __bool__(self):
+        return bool(dict.__len__(self) or self.base)
+    __nonzero__ = __bool__ # Python 2
+
+    def __eq__(self, other):
+        if isinstance(other, StyleDict):
+            other = other._getItems()
+        return dict.__eq__(self._getItems(), other)
+
+    def __ne__(self, other):
+        return not self == other
+
+    __hash__ = None
+
+    def __repr__(self):
+        return dict.__repr__(self._getItems())
+
+    # Without a base, the dictionary views of self are answered. Otherwise the merged
+    # names, values and items are answered as list, as Python 2 does.
+
+    def keys(self):
+        if self.base is None:
+            return dict.keys(self)
+        return list(self._iterNames())
+
+    def values(self):
+        if self.base is None:
+            return dict.values(self)
+        return list(self._getItems().values())
+
+    def items(self):
+        if self.base is None:
+            return dict.items(self)
+        return list(self._getItems().items())
+
+    def copy(self):
+        return self._getItems()
+
+    def __setitem__(self, name, value):
+        old = dict.get(self, name, NO_VALUE)
+        if old is NO_VALUE and self.base is not None:
+            old = self.base.get(name, NO_VALUE)
+        if old is value or (type(old) is type(value) and \
+                isinstance(value, self.SAME_VALUE_TYPES) and old == value):
+            return # Nothing changed, keep the current stamp.
+        dict.__setitem__(self, name, value)
+        self.touch()
+
+    def __delitem__(self, name):
+        self._unshare()
+        dict.__delitem__(self, name)
+        self.touch()
+
+    def clear(self):
+        self.base = None
+        dict.clear(self)
+        self.touch()
+
+    def pop(self, *args):
+        self._unshare()
+        value = dict.pop(self, *args)
+        self.touch()
+        return value
+
+    def popitem(self):
+        self._unshare()
+        item = dict.popitem(self)
+        self.touch()
+        return item
+
+    def setdefault(self, name, default=None):
+        if name not in self:
+            self[name] = default
+        return self[name]
+
+    def update(self, *args, **kwargs):
+        dict.update(self, *args, **kwargs) # Items of self have priority over the base.
+        self.touch()
+
+def newStyleEpoch():
+    u"""Answer a new global style epoch, e.g. to stamp a change in the parent tree of
+    an element, which changes the cascading of its style values as well.
+
+    >>> epoch = newStyleEpoch()
+    >>> newStyleEpoch() > epoch
+    True
+    """
+    StyleDict.epoch += 1
+    return StyleDict.epoch
+
 def newStyle(**kwargs):
     return dict(**kwargs)
 
@@ -370,6 +653,49 @@ def css(name, e=None, styles=None, default=None):
         return e.css(name)
     return default
 
+# Names of the style values that are used by BabelString.newString to make formatted strings.
+TEXT_STYLE_NAMES = ('font', 'fontSize', 'leading', 'rLeading', 'hyphenation', 'language', 'fallbackFont',
+    'textFill', 'cmykFill', 'textStroke', 'textStrokeWidth', 'cmykStroke', 'xTextAlign', 'underline',
+    'paragraphTopSpacing', 'rParagraphTopSpacing', 'paragraphBottomSpacing', 'rParagraphBottomSpacing',
+    'tracking', 'rTracking', 'baselineShift', 'rBaselineShift', 'openTypeFeatures', 'tabs',
+    'firstLineIndent', 'rFirstLineIndent', 'firstColumnIndent', 'rFirstColumnIndent',
+    'indent', 'rIndent', 'tailIndent', 'rTaildIndent', 'uppercase', 'lowercase', 'capitalized',
+    'fitTolerance')
+
+class TextStyle(dict):
+    u"""Compiled bundle of text style values, as made by newTextStyle. The values of the
+    TEXT_STYLE_NAMES are already resolved from the style (stack) and the cascading styles of
+    the element, so newString can use them without looking up the element ancestry.
+    TextStyle instances are cached and shared by strings, so they should not be altered."""
+
+def newTextStyle(e=None, styles=None, names=TEXT_STYLE_NAMES):
+    u"""Answer a new TextStyle with all values of the style (stack) and the resolved
+    css(name, e, styles) values of names that are not None.
+
+    >>> textStyle = newTextStyle(styles=[dict(fontSize=12), dict(fontSize=24, postfix='\\n')])
+    >>> sorted(textStyle.items())
+    [('fontSize', 12), ('postfix', '\\n')]
+    >>> from pagebot.elements.element import Element
+    >>> parent = Element(fontSize=14)
+    >>> e = Element(font='Roboto-Regular', parent=parent)
+    >>> textStyle = newTextStyle(e, dict(tracking=0.2))
+    >>> textStyle['font'], textStyle['fontSize'], textStyle['tracking'], 'leading' in textStyle
+    ('Roboto-Regular', 14, 0.2, False)
+    """
+    textStyle = TextStyle()
+    if styles is not None:
+        if not isinstance(styles, (tuple, list)):
+            styles = [styles]
+        for style in reversed(styles): # First style in the stack has priority.
+            textStyle.update(style)
+    if e is not None:
+        for name in names:
+            if name not in textStyle:
+                value = e.css(name)
+                if value is not None:
+                    textStyle[name] = value
+    return textStyle
+
 
 
 
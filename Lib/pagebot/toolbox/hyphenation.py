@@ -25,23 +25,35 @@
 #     "pt-br"   Portugese-Brasilian     Contributed by @filipenegrao
 #     "dk"      Danish                  Contributed by Torben Wilhemsem
 #
-import os, codecs
-from pagebot import getResourcesPath
+import os, codecs, mmap
+from struct import pack, unpack_from
+from pagebot import getResourcesPath, getCachePath, getTempCachePath
 
 DEFAULT_LANGUAGE = 'en'
 
 # Key is language id (2 letters), value is dictionary of word-->hyphenated
 languages = {} 
+# Key is language id, value is the HyphenationIndex of the compiled language file.
+indices = {}
+# Key is language id, value is dictionary of (word, checkCombined)-->hyphenated results.
+hyphenations = {}
+MAX_HYPHENATIONS = 100000 # Maximum number of cached results per language.
 
 def reset():
-    global languages
+    global languages, indices, hyphenations
     languages = {}
+    indices = {}
+    hyphenations = {}
+
+def getLanguagePath(language=DEFAULT_LANGUAGE):
+    u"""Answer the path of the text file with hyphenated words of the language."""
+    return getResourcesPath() + '/languages/%s.txt' % language
 
 def hyphenatedWords(language=DEFAULT_LANGUAGE):
     u"""Answer the dictionary of hyphenated words for this language (default is English)."""
     if language not in languages:
         # Not initialized yet, try to read.
-        path = getResourcesPath() + '/languages/%s.txt' % language
+        path = getLanguagePath(language)
         if os.path.exists(path):
             languages[language] = words = {}
             f = codecs.open(path, mode="r", encoding="utf-8")
@@ -53,6 +65,142 @@ def hyphenatedWords(language=DEFAULT_LANGUAGE):
                 words[line.replace('-','')] = line
     return languages.get(language)
 
+class HyphenationIndex(object):
+    u"""Compiled form of the hyphenated words of a language, as a memory-mapped file with
+    the records sorted by word. Looking up a word is a binary search in the mapped file,
+    so processes can start hyphenating without parsing the text file into a dictionary,
+    and forked processes share the same memory pages.
+
+    The file has a header with the number of records, an array of record offsets and
+    the UTF-8 records, each as word + tab + hyphenated word + newline.
+
+    >>> import os, tempfile
+    >>> path = os.path.join(tempfile.mkdtemp(), 'test.hyph')
+    >>> HyphenationIndex.compile(dict(housing='hous-ing', apartment='apart-ment'), path)
+    >>> index = HyphenationIndex(path)
+    >>> len(index), index.get('housing') == 'hous-ing'
+    (2, True)
+    >>> index.get('building') is None, 'apartment' in index
+    (True, True)
+    """
+    MAGIC = b'PBHYPH1\n'
+
+    def __init__(self, path):
+        self.path = path
+        f = open(path, 'rb')
+        try:
+            self._data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            f.close() # The map stays valid after closing the file.
+        if self._data[:len(self.MAGIC)] != self.MAGIC:
+            raise ValueError('[HyphenationIndex] Not a compiled hyphenation file: "%s"' % path)
+        self._count = unpack_from('<I', self._data, len(self.MAGIC))[0]
+        self._offsets = len(self.MAGIC) + 4 # Start of the offsets array.
+        self._records = self._offsets + 4 * self._count # Start of the records.
+
+    def __repr__(self):
+        return '<%s %s %d>' % (self.__class__.__name__, self.path.split('/')[-1], self._count)
+
+    def __len__(self):
+        return self._count
+
+    def __contains__(self, word):
+        return self.get(word) is not None
+
+    def get(self, word, default=None):
+        u"""Answer the hyphenated word, or default if the word does not exist."""
+        key = word.encode('utf-8')
+        data = self._data
+        lo, hi = 0, self._count
+        while lo < hi:
+            mid = (lo + hi) // 2
+            start = self._records + unpack_from('<I', data, self._offsets + 4 * mid)[0]
+            tab = data.find(b'\t', start)
+            recordKey = data[start:tab]
+            if recordKey < key:
+                lo = mid + 1
+            elif recordKey > key:
+                hi = mid
+            else:
+                return data[tab+1:data.find(b'\n', tab)].decode('utf-8')
+        return default
+
+    @classmethod
+    def compile(cls, words, path):
+        u"""Write the dictionary of word-->hyphenated words as compiled file at path. The file
+        is written under a temporary name and then renamed, so other processes never open an
+        incomplete file."""
+        records = sorted((word.encode('utf-8'), hyphenated.encode('utf-8')) for word, hyphenated in words.items())
+        offsets = []
+        data = []
+        offset = 0
+        for word, hyphenated in records:
+            offsets.append(offset)
+            record = word + b'\t' + hyphenated + b'\n'
+            data.append(record)
+            offset += len(record)
+        tmpPath = '%s.%d.tmp' % (path, os.getpid())
+        f = open(tmpPath, 'wb')
+        f.write(cls.MAGIC)
+        f.write(pack('<I', len(offsets)))
+        f.write(pack('<%dI' % len(offsets), *offsets))
+        f.write(b''.join(data))
+        f.close()
+        os.rename(tmpPath, path)
+
+def compileLanguage(language, compiledPath):
+    u"""Compile the hyphenated words of the language into the file at compiledPath."""
+    if not os.path.exists(os.path.dirname(compiledPath)):
+        os.makedirs(os.path.dirname(compiledPath))
+    HyphenationIndex.compile(hyphenatedWords(language), compiledPath)
+
+def getHyphenationIndex(language=DEFAULT_LANGUAGE):
+    u"""Answer the HyphenationIndex of the language, or None if the language does not exist.
+    The compiled file is kept in the cache folder of PageBot. It is made from the text file
+    of the language if it does not exist or if it is older than the text file.
+
+    >>> getHyphenationIndex('en')
+    <HyphenationIndex en.hyph 171942>
+    >>> getHyphenationIndex('xx') is None
+    True
+    """
+    index = indices.get(language)
+    if index is None:
+        path = getLanguagePath(language)
+        if not os.path.exists(path):
+            return None
+        compiledPath = getCachePath() + '/languages/%s.hyph' % language
+        if not os.path.exists(compiledPath) or os.path.getmtime(compiledPath) < os.path.getmtime(path):
+            try:
+                compileLanguage(language, compiledPath)
+            except (IOError, OSError): # Cache folder cannot be written, compile for this process only.
+                compiledPath = getTempCachePath() + '/languages/%s.hyph' % language
+                compileLanguage(language, compiledPath)
+        index = indices[language] = HyphenationIndex(compiledPath)
+    return index
+
+def _hyphenateCombined(word, index, cache):
+    u"""Answer the hyphenated word from the index, or the first combination of two parts
+    that can be hyphenated. Results of all parts are kept in cache, so each part is
+    only searched once."""
+    key = word, True
+    if key in cache:
+        return cache[key]
+    hyphenated = index.get(word)
+    if hyphenated is None and len(word) > 4:
+        # Checking on combined words (as in 'nl' and 'de').
+        for i in range(4, len(word)-4):
+            hw1 = _hyphenateCombined(word[:i], index, cache)
+            if hw1 is None:
+                continue
+            hw2 = _hyphenateCombined(word[i:], index, cache)
+            if hw2 is None:
+                continue
+            hyphenated = hw1 + '-' + hw2
+            break
+    cache[key] = hyphenated
+    return hyphenated
+
 def hyphenate(word, language=DEFAULT_LANGUAGE, checkCombined=False):
     u"""Get the dictionary for the defined language and answer the hyphenated word if it exists.
     If it does not exists and checkCombined flag is True, try break the word into parts and check
@@ -93,9 +241,11 @@ def hyphenate(word, language=DEFAULT_LANGUAGE, checkCombined=False):
     u'och-tend-jas-kle-ding-han-ger-schroef-draad'
     >>> hyphenate('hagelslagroomboterbloemkoolstofzuigerveerpont', 'nl', True)
     u'ha-gel-slag-room-bo-ter-bloem-kool-stof-zui-ger-veer-pont'
-    >>> # Longest in practice. Don't go longer than this, as calculation time exponentioally increases.
+    >>> # Results of all parts are cached, so calculation time only grows polynomially with the length.
     >>> hyphenate('kernenergieadviesbureaugebouwtoegangsdeurknopbedieningspaneeltjes', 'nl', True)
     u'kern-ener-gie-ad-vies-bu-reau-ge-bouw-toe-gangs-deur-knop-be-die-nings-pa-neel-tjes'
+    >>> hyphenate('kernenergieadviesbureaugebouwtoegangsdeurknopbedieningspaneeltjesxyz', 'nl', True) is None
+    True
     >>> hyphenate('housewarmingpartyinvitation', 'nl', True) is None # --> None: no matching in another language.
     True
     >>> hyphenate('housewarmingpartyinvitation', 'en', True) # --> Still works: house-warm-ing-par-ty-in-vi-ta-tion
@@ -133,25 +283,21 @@ def hyphenate(word, language=DEFAULT_LANGUAGE, checkCombined=False):
     # Word: hagelslagroomboterbloemkoolstofzuigerveerpont
     # Hyphenated: ha-gel-slag-room-bo-ter-bloem-kool-stof-zui-ger-veer-pont
 
-    hWords = hyphenatedWords(language) or {} # Empty dictionary if the langueage does not exist.
-    hyphenated = hWords.get(word)
-    if hyphenated is not None: # If exact, then stop searching.
-        return hyphenated
+    index = getHyphenationIndex(language)
+    if index is None: # The language does not exist.
+        return None
+    cache = hyphenations.get(language)
+    if cache is None or len(cache) > MAX_HYPHENATIONS:
+        cache = hyphenations[language] = {}
+    key = word, bool(checkCombined)
+    if key in cache:
+        return cache[key]
     # In case the language support combined words, try to find matching parts.
-    if checkCombined and len(word) > 4:
-        # Checking on combined words (as in 'nl' and 'de').
-
-        for i in range(4, len(word)-4):
-            w1 = word[:i]
-            hw1 = hyphenate(w1, language, True)
-            if hw1 is None:
-                continue
-            w2 = word[i:]
-            hw2 = hyphenate(w2, language, True)
-            if hw2 is None:
-                continue
-            return hw1 + '-' + hw2
-    return None
+    if checkCombined:
+        hyphenated = _hyphenateCombined(word, index, cache)
+    else:
+        hyphenated = cache[key] = index.get(word)
+    return hyphenated
 
 def words(language=DEFAULT_LANGUAGE):
     u"""Answer the sorted list of all words in the dictionary for this language."""
@@ -0,0 +1,237 @@
+#!/usr/bin/env python
+# -*- coding: UTF-8 -*-
+# -----------------------------------------------------------------------------
+#
+#     P A G E B O T
+#
+#     Copyright (c) 2016+ Buro Petr van Blokland + Claudia Mens & Font Bureau
+#     www.pagebot.io
+#     Licensed under MIT conditions
+#
+#     Supporting usage of DrawBot, www.drawbot.com
+#     Supporting usage of Flat, https://github.com/xxyxyz/flat
+# -----------------------------------------------------------------------------
+#
+#     siteexport.py
+#
+#     Writes the files of an exported site, keeping a manifest with the content
+#     hash of every file in the site folder. In incremental mode, files that did
+#     not change since the previous export are skipped, and files that are no
+#     longer exported are removed. Files are written to a temporary file that is
+#     renamed, so a browser or server never sees a half written file. Resources
+#     are hard-linked if the file system allows it.
+#
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+MANIFEST_NAME = '.pagebot-manifest.json'
+
+def getHash(data):
+    u"""Answer the hex digest of the content hash of data, which is a unicode string or bytes.
+
+    >>> getHash(u'PageBot') == getHash(b'PageBot'), len(getHash(''))
+    (True, 40)
+    """
+    if not isinstance(data, bytes):
+        data = data.encode('utf-8')
+    return hashlib.sha1(data).hexdigest()
+
+def getFileHash(path, blockSize=0x10000):
+    u"""Answer the hex digest of the content hash of the file at path."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        block = f.read(blockSize)
+        while block:
+            h.update(block)
+            block = f.read(blockSize)
+    return h.hexdigest()
+
+class SiteExport(object):
+    u"""Export the files of a site into the folder path. All file names are relative to path.
+    If incremental is True, then files with the same content hash as in the manifest of the
+    previous export are skipped. Otherwise all files are written. Call self.finish() when all
+    files are exported, to remove the stale files and save the manifest.
+
+    >>> path = tempfile.mkdtemp()
+    >>> export = SiteExport(path, incremental=True)
+    >>> export.writeText('index.html', '<html>Home</html>')
+    True
+    >>> export.writeText('about.html', '<html>About</html>')
+    True
+    >>> export.finish()
+    <SiteExport 2 written, 0 skipped, 0 removed>
+    >>> export = SiteExport(path, incremental=True)
+    >>> export.writeText('index.html', '<html>Home</html>')
+    False
+    >>> export.writeText('news.html', '<html>News</html>')
+    True
+    >>> export.finish() # about.html is not exported anymore.
+    <SiteExport 1 written, 1 skipped, 1 removed>
+    >>> sorted(os.listdir(path))
+    ['.pagebot-manifest.json', 'index.html', 'news.html']
+    >>> export = SiteExport(path) # Not incremental, write all.
+    >>> export.writeText('index.html', '<html>Home</html>'), export.writeText('news.html', '<html>News</html>')
+    (True, True)
+    >>> export.finish()
+    <SiteExport 2 written, 0 skipped, 0 removed>
+    >>> shutil.rmtree(path)
+    """
+    def __init__(self, path, incremental=False):
+        self.path = path
+        self.incremental = incremental
+        self.written = 0 # Counters for the report
+        self.skipped = 0
+        self.removed = 0
+        self.linked = 0 # Part of self.written that are hard-linked resources.
+        self.manifest = self._readManifest()
+        self.files = {} # Key is relative path, value is content hash of this export.
+        self.sources = {} # Key is resource path, value is (size, mtime, hash), so unchanged sources are not read.
+
+    def __repr__(self):
+        return '<%s %d written, %d skipped, %d removed>' % (self.__class__.__name__,
+            self.written, self.skipped, self.removed)
+
+    def _get_manifestPath(self):
+        return os.path.join(self.path, MANIFEST_NAME)
+    manifestPath = property(_get_manifestPath)
+
+    def _readManifest(self):
+        u"""Answer the manifest dictionary of the previous export, or an empty one if it does not
+        exist or cannot be read."""
+        try:
+            with open(self.manifestPath, 'r') as f:
+                manifest = json.load(f)
+        except (IOError, OSError, ValueError):
+            manifest = {}
+        manifest.setdefault('files', {})
+        manifest.setdefault('sources', {})
+        return manifest
+
+    def _isUnchanged(self, fileName, contentHash):
+        u"""Answer the boolean flag if fileName was exported with the same content hash and still exists."""
+        return self.incremental and self.manifest['files'].get(fileName) == contentHash\
+            and os.path.exists(os.path.join(self.path, fileName))
+
+    def _getTempPath(self, fileName):
+        u"""Answer the path of a new temporary file in the folder of fileName, so it can be renamed."""
+        dstPath = os.path.join(self.path, fileName)
+        folder = os.path.dirname(dstPath)
+        if not os.path.exists(folder):
+            os.makedirs(folder)
+        fd, tmpPath = tempfile.mkstemp(prefix='.' + os.path.basename(dstPath) + '.', suffix='.tmp', dir=folder)
+        os.close(fd)
+        return tmpPath
+
+    def writeText(self, fileName, text):
+        u"""Write the unicode text as UTF-8 into fileName, relative to self.path. Answer the
+        boolean flag if the file was written, or skipped because it did not change."""
+        data = text.encode('utf-8')
+        return self.writeBytes(fileName, data)
+
+    def writeBytes(self, fileName, data):
+        u"""Write the bytes data into fileName, relative to self.path. Answer the boolean flag if
+        the file was written."""
+        contentHash = getHash(data)
+        self.files[fileName] = contentHash
+        if self._isUnchanged(fileName, contentHash):
+            self.skipped += 1
+            return False
+        tmpPath = self._getTempPath(fileName)
+        try:
+            with open(tmpPath, 'wb') as f:
+                f.write(data)
+            os.replace(tmpPath, os.path.join(self.path, fileName))
+        except:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        self.written += 1
+        return True
+
+    def copyFile(self, srcPath, fileName):
+        u"""Hard-link or copy the resource file at srcPath to fileName, relative to self.path.
+        The content hash of the source is only calculated if its size or modification time
+        changed since the previous export. Answer the boolean flag if the file was written.
+
+        >>> path = tempfile.mkdtemp()
+        >>> srcPath = os.path.join(path, 'logo.svg')
+        >>> with open(srcPath, 'w') as f: n = f.write('<svg/>')
+        >>> export = SiteExport(os.path.join(path, 'site'), incremental=True)
+        >>> export.copyFile(srcPath, 'images/logo.svg'), export.linked
+        (True, 1)
+        >>> export.finish()
+        <SiteExport 1 written, 0 skipped, 0 removed>
+        >>> export = SiteExport(os.path.join(path, 'site'), incremental=True)
+        >>> export.copyFile(srcPath, 'images/logo.svg')
+        False
+        >>> shutil.rmtree(path)
+        """
+        stat = os.stat(srcPath)
+        source = self.manifest['sources'].get(fileName)
+        if source is not None and source[:2] == [stat.st_size, stat.st_mtime]:
+            contentHash = source[2]
+        else:
+            contentHash = getFileHash(srcPath)
+        self.sources[fileName] = [stat.st_size, stat.st_mtime, contentHash]
+        self.files[fileName] = contentHash
+        if self._isUnchanged(fileName, contentHash):
+            self.skipped += 1
+            return False
+        tmpPath = self._getTempPath(fileName)
+        try:
+            os.remove(tmpPath) # Link needs a free name.
+            try:
+                os.link(srcPath, tmpPath)
+                self.linked += 1
+            except (OSError, AttributeError): # Other device or no hard links on this platform.
+                shutil.copy2(srcPath, tmpPath)
+            os.replace(tmpPath, os.path.join(self.path, fileName))
+        except:
+            if os.path.exists(tmpPath):
+                os.remove(tmpPath)
+            raise
+        self.written += 1
+        return True
+
+    def copyTree(self, srcPath, folderName):
+        u"""Hard-link or copy all files of the resource folder srcPath into folderName, relative to
+        self.path. Hidden files are skipped."""
+        for dirPath, dirNames, fileNames in os.walk(srcPath):
+            dirNames[:] = [dirName for dirName in dirNames if not dirName.startswith('.')]
+            for fileName in fileNames:
+                if fileName.startswith('.'):
+                    continue
+                filePath = os.path.join(dirPath, fileName)
+                self.copyFile(filePath, os.path.join(folderName, os.path.relpath(filePath, srcPath)))
+
+    def finish(self):
+        u"""Remove the files of the previous export that are not exported this time, and empty
+        folders they leave. Then save the manifest. Answer self for the report."""
+        for fileName in self.manifest['files']:
+            if fileName in self.files:
+                continue
+            filePath = os.path.join(self.path, fileName)
+            if os.path.exists(filePath):
+                os.remove(filePath)
+                self.removed += 1
+            folder = os.path.dirname(filePath)
+            while os.path.abspath(folder) != os.path.abspath(self.path) and os.path.isdir(folder)\
+                    and not os.listdir(folder):
+                os.rmdir(folder)
+                folder = os.path.dirname(folder)
+        if not os.path.exists(self.path):
+            os.makedirs(self.path)
+        self.manifest = dict(files=self.files, sources=self.sources)
+        tmpPath = self._getTempPath(MANIFEST_NAME)
+        with open(tmpPath, 'w') as f:
+            json.dump(self.manifest, f, sort_keys=True)
+        os.replace(tmpPath, self.manifestPath)
+        return self
+
+if __name__ == '__main__':
+    import doctest
+    import sys
+    sys.exit(doctest.testmod()[0])
@@ -15,6 +15,8 @@
 #
 #     Implements basic intelligent spacing units with build-in conversions.
 #
+import re
+
 from pagebot.constants import MM, INCH
 from pagebot.toolbox.transformer import asNumberOrNone
 
@@ -54,6 +56,22 @@ class Unit(object):
     def __init__(self, v):
         self._v = v or 0
 
+    @classmethod
+    def make(cls, v):
+        u"""Answer a new instance of cls if v is a number, or a string with the units of cls.
+        Answer None otherwise.
+
+        >>> pt.make('12pt'), pt.make(12), pt.make('12mm'), pt.make(None)
+        (12pt, 12pt, None, None)
+        """
+        if isinstance(v, (int, float)):
+            return cls(v)
+        if isinstance(v, str):
+            parsed = parseUnits(v)
+            if parsed is not None and parsed[0] is cls:
+                return cls(parsed[1])
+        return None
+
     def _get_css(self):
         # Assuming that px == pt == class inits
         if int(round(self._v)) != self._v:
@@ -173,18 +191,6 @@ class mm(Unit):
     842.0
     """
 
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith(UNIT_MM):
-                v = asNumberOrNone(v[:-2])
-                if v is not None:
-                    return cls(v)
-        return None
-
     def asPt(self, factor=MM):
         return self._v * factor
     @classmethod
@@ -208,18 +214,6 @@ class px(Unit):
     40.0
     """
 
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith('px'):
-                v = asNumberOrNone(v[:-2])
-                if v is not None:
-                    return cls(v)
-        return None
-
     def asPt(self, factor=1):
         return self._v * factor
     @classmethod
@@ -242,17 +236,6 @@ class pt(Unit):
     >>> u.asPt(100) # Answer pt value, relative to master value.
     40.0
     """
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith(UNIT_PT):
-                v = asNumberOrNone(v[:-2])
-                if v is not None:
-                    return cls(v)
-        return None
 
     def asPt(self, factor=1):
         return self._v * factor
@@ -279,21 +262,6 @@ class inch(Unit):
     >>> u.asPt(100) # Answer pt value, relative to master value.
     40.0
     """
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith('"'):
-                v = asNumberOrNone(v[:-1])
-                if v is not None:
-                    return cls(v)
-            elif v.endswith('inch'):
-                v = asNumberOrNone(v[:-4])
-                if v is not None:
-                    return cls(v)
-        return None
 
     def asPt(self, factor=INCH):
         return self._v * factor
@@ -342,17 +310,6 @@ class fr(RelativeUnit):
     >>> u.asPt(100) # Answer fr value as points, relative to master value.
     40.0
     """
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith('fr'):
-                v = asNumberOrNone(v[:-2])
-                if v is not None:
-                    return cls(v)
-        return None
 
 class em(RelativeUnit):
     u"""Em size is based on the current setting of the fontSize.
@@ -372,17 +329,6 @@ class em(RelativeUnit):
     >>> u.asPt(12) # Answer em value in points, relative to master value.
     120
     """
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith('em'):
-                v = asNumberOrNone(v[:-2])
-                if v is not None:
-                    return cls(v)
-        return None
 
 class perc(RelativeUnit):
     u"""Answer the relative percentage unit, if parsing as percentage (ending with % order "perc").
@@ -404,21 +350,6 @@ class perc(RelativeUnit):
     >>> u.asPt(500) # Answer percentage value relative to master value
     330
     """
-    @classmethod
-    def make(cls, v):
-        if isinstance(v, (int, float)):
-            return cls(v)
-        if isinstance(v, str):
-            v = v.strip().lower()
-            if v.endswith('%'):
-                v = asNumberOrNone(v[:-1])
-                if v is not None:
-                    return cls(v)
-            elif v.endswith(UNIT_PERC):
-                v = asNumberOrNone(v[:-4])
-                if v is not None:
-                    return cls(v)
-        return None
 
     def asPt(self, masterValue):
         u"""Convert to points. Percentage has a different relative master calculation."""
@@ -434,6 +365,41 @@ class perc(RelativeUnit):
 
 UNIT_CLASSES = (mm, px, pt, inch, fr, em, perc)
 
+# Dispatch table of the lower case unit names to their class, used by the compiled UNIT_PATTERN.
+UNIT_NAMES = {UNIT_MM: mm, 'px': px, UNIT_PT: pt, '"': inch, 'inch': inch, 'fr': fr, 'em': em,
+    '%': perc, UNIT_PERC: perc}
+UNIT_PATTERN = re.compile(r'^\s*([-+]?(?:\d+\.?\d*|\.\d+)(?:e[-+]?\d+)?)\s*(%s)\s*$' %
+    '|'.join(re.escape(name) for name in sorted(UNIT_NAMES, key=len, reverse=True)), re.IGNORECASE)
+
+# Cache of parsed unit strings, as styles use the same few strings many times.
+PARSED_UNITS = {}
+PARSED_UNITS_MAX = 1000
+
+def parseUnits(v):
+    u"""Answer the (unitClass, value) tuple of the string v, matching one number and the
+    name of the units. Answer None if v is not a units string. The results are cached.
+
+    >>> [parseUnits(v) for v in ('12pt', ' 0.5 FR ', '10"', '1e2%')] == [(pt, 12), (fr, 0.5), (inch, 10), (perc, 100)]
+    True
+    >>> parseUnits('12'), parseUnits('pt'), parseUnits('12 pt pt')
+    (None, None, None)
+    """
+    try:
+        return PARSED_UNITS[v]
+    except KeyError:
+        pass
+    parsed = None
+    match = UNIT_PATTERN.match(v)
+    if match is not None:
+        number, name = match.groups()
+        value = asNumberOrNone(number)
+        if value is not None:
+            parsed = UNIT_NAMES[name.lower()], value
+    if len(PARSED_UNITS) >= PARSED_UNITS_MAX: # Unlikely, e.g. for generated values. Start again.
+        PARSED_UNITS.clear()
+    PARSED_UNITS[v] = parsed
+    return parsed
+
 def getUnits(v):
     u"""If value is a string, then try to guess what type of units value is
     and answer the right instance.
@@ -459,12 +425,13 @@ def getUnits(v):
     >>> getUnits('SomethingElse')
     'SomethingElse'
     """
-    if v is None or isinstance(v, (int, float)):
+    if v is None or isinstance(v, (int, float)): # Fast path for plain numbers.
         return v
-    for unitClass in UNIT_CLASSES:
-        u = unitClass.make(v)
-        if u is not None:
-            return u
+    if isinstance(v, str):
+        parsed = parseUnits(v)
+        if parsed is not None:
+            unitClass, value = parsed
+            return unitClass(value)
     return v
 
 if __name__ == '__main__':
@@ -41,6 +41,8 @@ class Typesetter(object):
     GALLEY_CLASS = Galley
 
     DEFAULT_BULLET = u'•' # Used if no valid bullet string can be found in styles.
+    CHAPTER_TAGS = ('h1',) # Tags that start a new chapter in self.typesetChapters.
+    PARSE_CHUNK = 64 * 1024 # Number of characters of converted MarkDown that are parsed at a time.
 
     TAG_MATCHING = {
         'document': [],
@@ -103,6 +105,10 @@ class Typesetter(object):
         # Stack of graphic state as cascading styles. Last is template for the next.
         self.gState = []
         self.tagHistory = []
+        # Merged node styles, key is (id(style on top of the stack), matching style name), value is
+        # (style on top of the stack, merged style). Reusing the same merged style makes the cached
+        # TextStyle bundles of elements reusable for all nodes with that style.
+        self._nodeStyles = {}
         # Code block results if any ~~~Python blocks defined in the Markdown file.
         self.globalDocName = globalDocName or 'doc' # Name of global doc to find in code blocks, to be stored in self.doc
         self.globalPageName = globalPageName or 'page'
@@ -395,6 +401,7 @@ class Typesetter(object):
             # "~~~Python" code blocks are processed by self.
             return None, None
 
+        self._nodeStyles = {} # Code blocks may change the doc and its styles.
         codeId = 'codeBlock_%d' % (len(self.codeBlocks)+1)
         # Will contain all "global" defined objects in one code block.
         # self.doc contains the Typesetter doc reference, which can be defined in an earlier code block
@@ -499,17 +506,35 @@ class Typesetter(object):
         u"""Make a copy of the top of the style graphics state and mew *style* into it. Answer the new style."""
         if self.peekStyle() is None: # Not an initialized stack, use doc.rootStyle as default.
             self.pushStyle(self.getNamedStyle('root')) # Happens if calling directly, without check on e
-        mergedStyle = copy.copy(self.peekStyle())
+        parentStyle = self.peekStyle()
         # Find the best matching style for tag on order of relevance,
         # considering the possible HTML tag parents and the history.
+        nodeStyle = None
         for styleName in self.getMatchingStyleNames(tag):
             nodeStyle = self.getNamedStyle(styleName)
             if nodeStyle: # Not None and not empty
-                for name, value in nodeStyle.items():
-                    mergedStyle[name] = value
                 break
+        else:
+            styleName = None
+        key = id(parentStyle), styleName
+        cached = self._nodeStyles.get(key)
+        if cached is not None and cached[0] is parentStyle:
+            return cached[1]
+        mergedStyle = copy.copy(parentStyle)
+        if nodeStyle:
+            for name, value in nodeStyle.items():
+                mergedStyle[name] = value
+        # Keep parentStyle too, so its id cannot be reused by another style.
+        self._nodeStyles[key] = parentStyle, mergedStyle
         return mergedStyle
 
+    def getTextStyle(self, style, e=None):
+        u"""Answer the TextStyle bundle of the *style* and the cascading styles of *e*, as cached by *e*.
+        If *e* is None, then just answer *style*, as its values don't need further resolving."""
+        if e is None:
+            return style
+        return e.getTextStyle(style)
+
     def append(self, bs):
         u"""Append the string (or BabelString instance) to the current box,
         if it is defined and it has a context. Otherwise add to the existing galley."""
@@ -555,7 +580,15 @@ class Typesetter(object):
         u"""Recursively typeset the etree *node*, using a reference to element *e* or the cascading *style*.
         If *e* is None, then the tag style is merged on top of the doc.rootStyle. If *e* is defined, then
         rootstyle of the stack starts with an empty dictionary, leaving root searching for the e.parent path."""
+        textStyle = self.openNode(node, e)
+        # Type set all child node in the current node, by recursive call.
+        for child in node:
+            self.typesetChild(child, e, textStyle)
+        self.closeNode(node)
 
+    def openNode(self, node, e=None):
+        u"""Start typesetting the etree *node*: run its code block, push its style on the stack and
+        typeset its text. Answer the TextStyle, to be used for the tails of its child nodes."""
         # Fills self.codeBlocks dictionary from node codeblocks.
         # Side effect is to update self.doc, self.page and self.box
         cid, codeResult = self.runCodeBlock(node)
@@ -575,6 +608,7 @@ class Typesetter(object):
             self.pushStyle({}) # Define top level for styles.
         nodeStyle = self.getNodeStyle(node.tag) # Merge found tag style with current top of stack
         self.pushStyle(nodeStyle) # Push this merged style on the stack
+        textStyle = self.getTextStyle(nodeStyle, e) # Resolve the text values of nodeStyle and e once.
 
         # XML-nodes are organized as: node - node.text - node.children - node.tail
         # If there is no text or if the node does not have tail text, these are None.
@@ -584,30 +618,33 @@ class Typesetter(object):
         if nodeText: # Not None and still has content after stripping?
             # Don't cache the context from self.galley as variable, as it may become dynamically updated by code blocks.
             # The galley context will define the type of BabelStrings generated by the Typesetter.
-            bs = self.context.newString(nodeText, e=e, style=nodeStyle)
+            bs = self.context.newString(nodeText, e=e, style=textStyle)
+            self.append(bs)
+        return textStyle
+
+    def typesetChild(self, child, e, textStyle):
+        u"""Typeset the *child* node and its tail, using *textStyle* of the parent node for the tail."""
+        hook = 'node_'+child.tag
+        # Method will handle the styled body of the element, but not the tail.
+        if hasattr(self, hook):
+            # There is a hook for this node, let this method do the work.
+            getattr(self, hook)(child, e) # Hook must be able to derive styles from e.
+            # We are in tail mode now, but we don't know what happened in the child block.
+        else:
+            # If no method hook defined, then just solve recursively. Child node will get the style.
+            self.typesetNode(child, e)
+        # XML-nodes are organized as: node - node.text - node.children - node.tail
+        # If there is no text or if the node does not have tail text, these are None.
+        # Still we want to be able to add the postfix to the tail, so then the tail is changed
+        # to empty string?
+        childTail = child.tail #self._strip(child.tail, postfix=self.getStyleValue('postfix', e, nodeStyle, ''))
+        if childTail: # Any tail left after stripping, then append to the galley.
+            # Don't cache the context from self.galley as variable, as it may become dynamically updated by code blocks.
+            bs = self.context.newString(childTail, e=e, style=textStyle)
             self.append(bs)
 
-        # Type set all child node in the current node, by recursive call.
-        for child in node:
-            hook = 'node_'+child.tag
-            # Method will handle the styled body of the element, but not the tail.
-            if hasattr(self, hook):
-                # There is a hook for this node, let this method do the work.
-                getattr(self, hook)(child, e) # Hook must be able to derive styles from e.
-                # We are in tail mode now, but we don't know what happened in the child block.
-            else:
-                # If no method hook defined, then just solve recursively. Child node will get the style.
-                self.typesetNode(child, e)
-            # XML-nodes are organized as: node - node.text - node.children - node.tail
-            # If there is no text or if the node does not have tail text, these are None.
-            # Still we want to be able to add the postfix to the tail, so then the tail is changed
-            # to empty string?
-            childTail = child.tail #self._strip(child.tail, postfix=self.getStyleValue('postfix', e, nodeStyle, ''))
-            if childTail: # Any tail left after stripping, then append to the galley.
-                # Don't cache the context from self.galley as variable, as it may become dynamically updated by code blocks.
-                bs = self.context.newString(childTail, e=e, style=nodeStyle)
-                self.append(bs)
-
+    def closeNode(self, node):
+        u"""Finish typesetting the etree *node*, after its text and child nodes."""
         if self.writeTags:
             # Close the HTML tag of this node.
             self._htmlNode(node)
@@ -641,20 +678,11 @@ class Typesetter(object):
         child elements. Answer the root node for convenience of the caller."""
         fileExtension = fileName.split('.')[-1]
         if fileExtension == 'md':
-            # If we have MarkDown content, convert to XML (XHTML)
-            f = codecs.open(fileName, mode="r", encoding="utf-8")
-            mdText = f.read()
-            f.close()
-            mdExtensions = [FencedCodeExtension(), FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
-            xml = u'<?xml version="1.0" encoding="utf-8"?>\n<document>%s</document>' % markdown.markdown(mdText, extensions=mdExtensions)
-            xml = xml.replace('&nbsp;', ' ')
-            fileName = fileName + '.xml' # New file name to XML export
-            f = codecs.open(fileName, mode="w", encoding="utf-8")
-            f.write(xml)
-            f.close()
-
-        tree = ET.parse(fileName)
-        root = tree.getroot() # Get the root element of the tree.
+            # If we have MarkDown content, convert to XML (XHTML) and parse it, without writing a file.
+            root = ET.fromstring(self.markdown2Xml(fileName))
+        else:
+            tree = ET.parse(fileName)
+            root = tree.getroot() # Get the root element of the tree.
         # If there is XSL filtering defined, they get the filtered nodes.
         if xPath is not None:
             filteredNodes = root.findall(xPath)
@@ -670,6 +698,117 @@ class Typesetter(object):
         # of node than the PageBot Element.
         return root
 
+    def markdown2Xml(self, fileName):
+        u"""Read the MarkDown file and answer its conversion to an XML (XHTML) string, with
+        a <document> root tag."""
+        f = codecs.open(fileName, mode="r", encoding="utf-8")
+        mdText = f.read()
+        f.close()
+        mdExtensions = [FencedCodeExtension(), FootnoteExtension(), LiteratureExtension(), Nl2BrExtension()]
+        xml = u'<?xml version="1.0" encoding="utf-8"?>\n<document>%s</document>' % markdown.markdown(mdText, extensions=mdExtensions)
+        return xml.replace('&nbsp;', ' ')
+
+    def typesetChapters(self, fileName, e=None, chapterTags=None):
+        u"""Generator version of self.typesetFile, that typesets the XML or MarkDown file chapter by chapter.
+        The XML is read by iterparse, and each child node of the root is typeset and removed from the tree
+        as soon as it is complete, including its tail, which is when the next child starts or the root ends.
+        A chapter starts with a node in *chapterTags*, default is self.CHAPTER_TAGS. For every chapter a new
+        galley is made and answered, e.g. to be composed by Composer.composeChapters, so memory only needs
+        to hold one chapter of the tree. Note that MarkDown is converted in memory, without writing an XML
+        file. The converter needs the whole text, e.g. for footnotes, so for MarkDown the converted XHTML
+        string is still held in memory, while it is parsed in chunks, see self.iterParseString.
+
+        >>> from pagebot.contexts.flatcontext import FlatContext
+        >>> from pagebot.elements.element import Element
+        >>> path = '/tmp/TypesetChapters.xml'
+        >>> f = open(path, 'w')
+        >>> f.write('<document><h1>One</h1><p>Text</p><h1>Two</h1><p>Text <em>more</em> text</p></document>')
+        86
+        >>> f.close()
+        >>> t = Typesetter(context=FlatContext(), writeTags=False)
+        >>> galleys = []
+        >>> for galley in t.typesetChapters(path, Element()):
+        ...     galleys.append(galley)
+        >>> len(galleys), t.galley is galleys[-1], galleys[0] is galleys[1]
+        (2, True, False)
+
+        Tails of the child nodes of the root are typeset, also if the file is larger than the chunks
+        that iterparse reads.
+
+        >>> chapter = '<h1>Chapter %d</h1>Tail %d<p>Text <em>more</em> text</p>Tail %d.'
+        >>> xml = '<document>Head%s</document>' % ''.join([chapter % (n, n, n) for n in range(2000)])
+        >>> len(xml) > 64 * 1024
+        True
+        >>> f = open(path, 'w')
+        >>> f.write(xml) == len(xml)
+        True
+        >>> f.close()
+        >>> t = Typesetter(context=FlatContext(), writeTags=False)
+        >>> galleys = list(t.typesetChapters(path, Element()))
+        >>> text = u''.join([tb.bs.asText() for galley in galleys for tb in galley.elements])
+        >>> t = Typesetter(context=FlatContext(), writeTags=False)
+        >>> root = t.typesetFile(path, Element())
+        >>> len(galleys) # Head text of the root, and 2000 chapters.
+        2001
+        >>> 'Tail 1999.' in text, text == u''.join([tb.bs.asText() for tb in t.galley.elements])
+        (True, True)
+        """
+        if chapterTags is None:
+            chapterTags = self.CHAPTER_TAGS
+        if fileName.split('.')[-1] == 'md':
+            events = self.iterParseString(self.markdown2Xml(fileName))
+        else:
+            events = ET.iterparse(fileName, events=('start', 'end'))
+        root = textStyle = pending = None # Pending is the last ended child node of the root, without its tail yet.
+        depth = 0
+        for event, node in events:
+            ready = None # Child node of the root that is complete, including its tail.
+            if event == 'start':
+                depth += 1
+                if root is None:
+                    root = node
+                elif depth == 2: # Next child of the root starts, the text before it is parsed now.
+                    ready, pending = pending, None
+                    if textStyle is None:
+                        textStyle = self.openNode(root, e)
+            else:
+                depth -= 1
+                if depth == 1:
+                    pending = node
+                elif depth == 0: # End of the root, the tail of the last child is parsed now.
+                    ready, pending = pending, None
+                    if textStyle is None: # Root without child nodes.
+                        textStyle = self.openNode(root, e)
+            if ready is not None:
+                if ready.tag in chapterTags and self.galley.elements:
+                    yield self.galley # Answer the galley of the previous chapter.
+                    self.galley = self.GALLEY_CLASS(context=self.context)
+                self.typesetChild(ready, e, textStyle)
+                root.remove(ready) # The node is typeset, no need to keep it in memory.
+        if root is not None:
+            self.closeNode(root)
+            yield self.galley
+
+
+    def iterParseString(self, xml):
+        u"""Generator of the ('start', node) and ('end', node) events of parsing the xml string, as
+        ET.iterparse answers them for a file. The string is fed to the parser in chunks of
+        self.PARSE_CHUNK characters, without making an encoded copy of the whole string.
+
+        >>> t = Typesetter()
+        >>> t.PARSE_CHUNK = 8
+        >>> xml = u'<?xml version="1.0" encoding="utf-8"?>\n<document><h1>Caf\xe9</h1>Tail</document>'
+        >>> [(event, node.tag) for event, node in t.iterParseString(xml)]
+        [('start', 'document'), ('start', 'h1'), ('end', 'h1'), ('end', 'document')]
+        """
+        parser = ET.XMLPullParser(events=('start', 'end'))
+        for index in range(0, len(xml), self.PARSE_CHUNK):
+            parser.feed(xml[index:index + self.PARSE_CHUNK])
+            for event in parser.read_events():
+                yield event
+        parser.close()
+        for event in parser.read_events():
+            yield event
 
     def DEPRECATED_makeXMLFile(self, fileName):
         u"""If fileName is pointing to a non-XML file, then try to convert. This needs to be